@@ -2,8 +2,9 @@ from langchain_core.messages import HumanMessage
 from src.utils.openrouter_config import get_chat_completion
 
 from src.agents.state import AgentState
-from src.utils.api import get_financial_metrics, get_financial_statements, get_market_data, get_price_history
-from src.utils.logger_config import get_logger, ERROR_ICON, SUCCESS_ICON
+from src.utils.api import get_financial_metrics, get_financial_statements, get_market_data, get_price_history, prices_to_columns
+from src.utils.logger_config import get_logger, SUCCESS_ICON
+from src.utils.concurrency import run_concurrently, run_concurrently_async
 
 from datetime import datetime, timedelta
 import pandas as pd
@@ -11,12 +12,20 @@ import pandas as pd
 # 设置日志记录
 logger = get_logger()
 
-def market_data_agent(state: AgentState):
-    """Responsible for gathering and preprocessing market data"""
-    logger.info("[MARKET_DATA_AGENT] 开始执行市场数据Agent ...")
-    messages = state["messages"]
-    data = state["data"]
+# 单个数据源失败时使用的默认值
+FETCH_DEFAULTS = {
+    "financial_metrics": [{}],
+    "financial_line_items": [{}, {}],
+    "market_data": {"market_cap": 0},
+}
+
+
+def _fetch_plan(data: dict):
+    """解析数据区间并生成相互独立的数据请求
 
+    Returns:
+        (start_date, end_date, tasks): tasks 为任务名到无参可调用对象的映射
+    """
     # Set default dates
     current_date = datetime.now()
     yesterday = current_date - timedelta(days=1)
@@ -38,49 +47,54 @@ def market_data_agent(state: AgentState):
     # Get all required data
     ticker = data["ticker"]
 
-    # 获取价格数据并验证
-    prices_df = get_price_history(ticker, start_date, end_date)
-    if prices_df is None or prices_df.empty:
-        logger.warning(f"WARNING: 无法获取{ticker}的价格数据，将使用空数据继续")
-        prices_df = pd.DataFrame(
-            columns=['close', 'open', 'high', 'low', 'volume'])
-
-    # 获取财务指标
-    try:
-        financial_metrics = get_financial_metrics(ticker)
-    except Exception as e:
-        logger.error(f"{ERROR_ICON} 获取财务指标失败: {str(e)}")
-        financial_metrics = {}
-
-    # 获取财务报表
-    try:
-        financial_line_items = get_financial_statements(ticker)
-    except Exception as e:
-        logger.error(f"{ERROR_ICON} 获取财务报表失败: {str(e)}")
-        financial_line_items = {}
-
-    # 获取市场数据
-    try:
-        market_data = get_market_data(ticker)
-    except Exception as e:
-        logger.error(f"{ERROR_ICON} 获取市场数据失败: {str(e)}")
-        market_data = {"market_cap": 0}
-
-    # 确保数据格式正确
-    if not isinstance(prices_df, pd.DataFrame):
-        prices_df = pd.DataFrame(
-            columns=['close', 'open', 'high', 'low', 'volume'])
-
-    # 转换价格数据为字典格式
-    prices_dict = prices_df.to_dict('records')
+    # 价格、财务指标、财务报表和市场数据相互独立，并发获取
+    tasks = {
+        "financial_metrics": lambda: get_financial_metrics(ticker),
+        "financial_line_items": lambda: get_financial_statements(ticker),
+        "market_data": lambda: get_market_data(ticker),
+    }
+    # 调用方（如回测）已提供行情切片时直接使用，不再获取
+    if data.get("prices") is None:
+        # 只获取行情，技术指标由下游节点通过 feature_frame 按需计算
+        tasks["prices"] = lambda: get_price_history(
+            ticker, start_date, end_date, with_indicators=False)
+    return start_date, end_date, tasks
+
+
+def _market_data_update(state: AgentState, start_date: str, end_date: str, fetched: dict):
+    """把获取到的数据整理为节点输出"""
+    data = state["data"]
+    ticker = data["ticker"]
+    preloaded_prices = data.get("prices")
+    if preloaded_prices is not None:
+        prices_columns = preloaded_prices
+    else:
+        # 验证价格数据
+        prices_df = fetched["prices"]
+        if prices_df is None or prices_df.empty:
+            logger.warning(f"WARNING: 无法获取{ticker}的价格数据，将使用空数据继续")
+            prices_df = pd.DataFrame(
+                columns=['close', 'open', 'high', 'low', 'volume'])
+
+        # 确保数据格式正确
+        if not isinstance(prices_df, pd.DataFrame):
+            prices_df = pd.DataFrame(
+                columns=['close', 'open', 'high', 'low', 'volume'])
+
+        # 转换为只读的列式数据，下游节点零拷贝重建 DataFrame
+        prices_columns = prices_to_columns(prices_df)
+
+    financial_metrics = fetched["financial_metrics"]
+    financial_line_items = fetched["financial_line_items"]
+    market_data = fetched["market_data"] or {"market_cap": 0}
     
     logger.info(f"{SUCCESS_ICON} [MARKET_DATA_AGENT] 市场数据Agent执行完成。")
 
     return {
-        "messages": messages,
+        "messages": state["messages"],
         "data": {
             **data,
-            "prices": prices_dict,
+            "prices": prices_columns,
             "start_date": start_date,
             "end_date": end_date,
             "financial_metrics": financial_metrics,
@@ -89,3 +103,20 @@ def market_data_agent(state: AgentState):
             "market_data": market_data,
         }
     }
+
+
+def market_data_agent(state: AgentState):
+    """Responsible for gathering and preprocessing market data"""
+    logger.info("[MARKET_DATA_AGENT] 开始执行市场数据Agent ...")
+    start_date, end_date, tasks = _fetch_plan(state["data"])
+    # 单个数据源失败时使用默认值，不影响其他数据源
+    fetched = run_concurrently(tasks, defaults=FETCH_DEFAULTS)
+    return _market_data_update(state, start_date, end_date, fetched)
+
+
+async def market_data_agent_async(state: AgentState):
+    """market_data_agent 的异步版本，数据请求在线程中执行，不阻塞事件循环"""
+    logger.info("[MARKET_DATA_AGENT] 开始执行市场数据Agent ...")
+    start_date, end_date, tasks = _fetch_plan(state["data"])
+    fetched = await run_concurrently_async(tasks, defaults=FETCH_DEFAULTS)
+    return _market_data_update(state, start_date, end_date, fetched)
@@ -1,6 +1,5 @@
 from langchain_core.messages import HumanMessage
-from langchain_core.prompts import ChatPromptTemplate
-from src.utils.openrouter_config import get_chat_completion
+from src.utils.openrouter_config import get_chat_completion, get_chat_completion_async
 from src.utils.logger_config import get_logger, SUCCESS_ICON, ERROR_ICON, WAIT_ICON
 import json
 
@@ -10,11 +9,8 @@ from src.agents.state import AgentState, show_agent_reasoning
 logger = get_logger()
 
 ##### Portfolio Management Agent #####
-def portfolio_management_agent(state: AgentState):
-    """Makes final trading decisions and generates orders"""
-    logger.info("[PORTFOLIO_MANAGEMENT_AGENT] 开始执行投资组合管理Agent ...")
-    model = state["metadata"]["model"]
-    show_reasoning = state["metadata"]["show_reasoning"]
+def _decision_messages(state: AgentState) -> list:
+    """根据各代理的分析结果构造投资决策的提示词"""
     portfolio = state["data"]["portfolio"]
 
     # Get the technical analyst, fundamentals agent, and risk management agent messages
@@ -112,9 +108,33 @@ def portfolio_management_agent(state: AgentState):
             You can only sell if you have shares in the portfolio to sell."""
     }
 
+    return [system_message, user_message]
+
+
+def portfolio_management_agent(state: AgentState):
+    """Makes final trading decisions and generates orders"""
+    logger.info("[PORTFOLIO_MANAGEMENT_AGENT] 开始执行投资组合管理Agent ...")
+    messages = _decision_messages(state)
+
     # Get the completion from OpenRouter
     logger.info(f"{WAIT_ICON} 正在获取LLM决策结果...")
-    results = get_chat_completion([system_message, user_message], model)
+    results = get_chat_completion(messages, state["metadata"]["model"])
+    return _portfolio_update(state, results)
+
+
+async def portfolio_management_agent_async(state: AgentState):
+    """portfolio_management_agent 的异步版本，等待 LLM 期间不阻塞事件循环"""
+    logger.info("[PORTFOLIO_MANAGEMENT_AGENT] 开始执行投资组合管理Agent ...")
+    messages = _decision_messages(state)
+
+    logger.info(f"{WAIT_ICON} 正在获取LLM决策结果...")
+    results = await get_chat_completion_async(messages, state["metadata"]["model"])
+    return _portfolio_update(state, results)
+
+
+def _portfolio_update(state: AgentState, results: dict):
+    """解析各模型的决策结果，API 调用失败时使用默认的保守决策"""
+    show_reasoning = state["metadata"]["show_reasoning"]
 
     # 如果API调用失败，使用默认的保守决策
     if len(results) == 0:
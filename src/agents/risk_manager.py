@@ -4,6 +4,7 @@ from langchain_core.messages import HumanMessage
 
 from src.agents.state import AgentState, show_agent_reasoning
 from src.utils.api import prices_to_df
+from src.utils.feature_engine import feature_frame
 from src.utils.logger_config import get_logger, SUCCESS_ICON, ERROR_ICON, WAIT_ICON
 
 import json
@@ -58,13 +59,14 @@ def risk_management_agent(state: AgentState):
     }
 
     # 1. Calculate Risk Metrics
-    returns = prices_df['close'].pct_change().dropna()
+    features = feature_frame(prices_df)
+    returns = features.series("returns").dropna()
     daily_vol = returns.std()
     # Annualized volatility approximation
     volatility = daily_vol * (252 ** 0.5)
 
     # 计算波动率的历史分布
-    rolling_std = returns.rolling(window=120).std() * (252 ** 0.5)
+    rolling_std = features.series("volatility", window=120)
     volatility_mean = rolling_std.mean()
     volatility_std = rolling_std.std()
     volatility_percentile = (volatility - volatility_mean) / volatility_std
@@ -73,7 +75,7 @@ def risk_management_agent(state: AgentState):
     var_95 = returns.quantile(0.05)
     # 使用60天窗口计算最大回撤
     max_drawdown = (
-        prices_df['close'] / prices_df['close'].rolling(window=60).max() - 1).min()
+        prices_df['close'] / features.series("rolling_max", window=60) - 1).min()
 
     # 2. Market Risk Assessment
     market_risk_score = 0
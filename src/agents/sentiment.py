@@ -1,35 +1,66 @@
 from langchain_core.messages import HumanMessage
 from src.agents.state import AgentState, show_agent_reasoning
-from src.utils.news_crawler import get_stock_news, get_news_sentiment
-from src.utils.logger_config import get_logger, SUCCESS_ICON, ERROR_ICON, WAIT_ICON
+from src.utils.news_crawler import get_stock_news, get_news_sentiment, get_stock_news_async, get_news_sentiment_async
+from src.utils.logger_config import get_logger, payload, SUCCESS_ICON, ERROR_ICON, WAIT_ICON
 import json
 from datetime import datetime, timedelta
 
 # 设置日志记录
 logger = get_logger()
 
-def sentiment_agent(state: AgentState):
-    """分析市场情绪并生成交易信号"""
+def _recent_news(news_list: list, news_as_of: str = None) -> list:
+    """过滤7天内的新闻，回测时以新闻时点为准"""
+    reference_time = (datetime.strptime(news_as_of[:10], '%Y-%m-%d') + timedelta(days=1)
+                      if news_as_of else datetime.now())
+    cutoff_date = reference_time - timedelta(days=7)
+    recent_news = [news for news in news_list
+                   if datetime.strptime(news['publish_time'], '%Y-%m-%d %H:%M:%S') > cutoff_date]
+    logger.info(f"{WAIT_ICON} 获取到 {len(recent_news)} 条近7天的新闻")
+    return recent_news
+
+
+def _sentiment_request(state: AgentState) -> tuple:
+    """同步与异步版本共用的开头：返回股票代码、新闻数量和新闻时点"""
     logger.info("[SENTIMENT_AGENT] 开始执行情绪分析Agent ...")
-    logger.info(f"状态数据: {state}")
-    show_reasoning = state["metadata"]["show_reasoning"]
-    model = state["metadata"]["model"]
+    logger.info("状态数据: %s", payload(state))
     data = state["data"]
     symbol = data["ticker"]
     logger.info(f"{WAIT_ICON} 正在分析股票: {symbol}")
     # 从命令行参数获取新闻数量，默认为5条
     num_of_news = data.get("num_of_news", 5)
 
+    # 回测时只使用当时已发布的新闻（从新闻存档查询，不访问网络）
+    news_as_of = data.get("news_as_of")
+    return symbol, num_of_news, news_as_of
+
+
+def sentiment_agent(state: AgentState):
+    """分析市场情绪并生成交易信号"""
+    symbol, num_of_news, news_as_of = _sentiment_request(state)
+
     # 获取新闻数据并分析情感
-    news_list = get_stock_news(symbol, max_news=num_of_news)  # 确保获取足够的新闻
-    
-    # 过滤7天内的新闻
-    cutoff_date = datetime.now() - timedelta(days=7)
-    recent_news = [news for news in news_list
-                   if datetime.strptime(news['publish_time'], '%Y-%m-%d %H:%M:%S') > cutoff_date]
-    
-    logger.info(f"{WAIT_ICON} 获取到 {len(recent_news)} 条近7天的新闻")
-    sentiment_score = get_news_sentiment(recent_news, num_of_news=num_of_news, model=model)
+    news_list = get_stock_news(symbol, max_news=num_of_news, as_of=news_as_of)  # 确保获取足够的新闻
+    recent_news = _recent_news(news_list, news_as_of)
+    sentiment_score = get_news_sentiment(
+        recent_news, num_of_news=num_of_news, model=state["metadata"]["model"])
+    return _sentiment_update(state, recent_news, sentiment_score)
+
+
+async def sentiment_agent_async(state: AgentState):
+    """sentiment_agent 的异步版本，新闻获取与 LLM 调用期间不阻塞其他分支"""
+    symbol, num_of_news, news_as_of = _sentiment_request(state)
+
+    news_list = await get_stock_news_async(symbol, max_news=num_of_news, as_of=news_as_of)
+    recent_news = _recent_news(news_list, news_as_of)
+    sentiment_score = await get_news_sentiment_async(
+        recent_news, num_of_news=num_of_news, model=state["metadata"]["model"])
+    return _sentiment_update(state, recent_news, sentiment_score)
+
+
+def _sentiment_update(state: AgentState, recent_news: list, sentiment_score: float):
+    """根据情感得分生成节点输出"""
+    show_reasoning = state["metadata"]["show_reasoning"]
+    data = state["data"]
     logger.info(f"{SUCCESS_ICON} 情感分析完成，得分: {sentiment_score:.2f}")
 
     # 根据情感分数生成交易信号和置信度
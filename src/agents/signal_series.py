@@ -0,0 +1,268 @@
+"""
+规则类 Agent 信号的向量化计算
+
+technical_analyst_agent 和 risk_management_agent 的规则只依赖价格，这里在整段历史上
+一次性计算出每个交易日的信号，供 Backtester.run_fast_backtest 使用，不再逐日运行
+完整的工作流和 LLM。
+
+第 t 日的结果对应把截至 t 日、最近 history_bars 根 K 线的切片交给 Agent 得到的结果。
+滚动窗口类指标与切片计算完全一致；EMA / ADX 从整段历史的起点开始递推，与切片起点
+不同带来的差异在预热期之后可以忽略。
+
+fundamentals_agent 和 valuation_agent 使用的财务数据与市值不是时点数据（完整工作流的
+回测同样始终使用最新值），因此只运行一次，在整个回测区间内视为常量；sentiment_agent
+依赖 LLM，不参与快速回测。
+"""
+import json
+import math
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from src.agents.fundamentals import fundamentals_agent
+from src.agents.technicals import SIGNAL_VALUES, STRATEGY_WEIGHTS
+from src.agents.valuation import valuation_agent
+from src.utils.api import (FALLBACK_HISTORY_DAYS, get_financial_metrics,
+                           get_financial_statements, get_market_data)
+from src.utils.concurrency import run_concurrently
+from src.utils.feature_engine import feature_frame
+from src.utils.logger_config import get_logger, SUCCESS_ICON, WAIT_ICON
+
+# 设置日志记录
+logger = get_logger()
+
+# 完整工作流回测中每日切片约覆盖的交易日数（FALLBACK_HISTORY_DAYS 个自然日）
+HISTORY_BARS = FALLBACK_HISTORY_DAYS * 250 // 365
+
+# 数值信号到信号名的映射
+SIGNAL_NAMES = {value: name for name, value in SIGNAL_VALUES.items()}
+
+
+def _choose(bullish: np.ndarray, bearish: np.ndarray,
+            bullish_confidence, bearish_confidence, neutral_confidence=0.5):
+    """按 看多 / 看空 / 中性 的优先级逐日选择信号和置信度"""
+    signal = np.where(bullish, 1, np.where(bearish, -1, 0))
+    confidence = np.where(bullish, bullish_confidence,
+                          np.where(bearish, bearish_confidence, neutral_confidence))
+    return signal, confidence
+
+
+def rolling_hurst_exponent(close: np.ndarray, window: int, max_lag: int = 10) -> np.ndarray:
+    """逐日计算 calculate_hurst_exponent 在最近 window 根 K 线上的结果"""
+    close = np.asarray(close, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = pd.Series(np.log(close[1:] / close[:-1]))
+    span = window - 1  # 切片内的收益率个数
+    lags = np.arange(2, max_lag)
+
+    log_tau = []
+    for lag in lags:
+        diff = returns - returns.shift(lag)
+        std = diff.rolling(span - lag, min_periods=1).std(ddof=0).to_numpy()
+        log_tau.append(np.log(np.maximum(np.sqrt(std), 1e-8)))
+    log_tau = np.vstack(log_tau)
+
+    # 对 log(lag) 做最小二乘回归的斜率
+    x = np.log(lags) - np.log(lags).mean()
+    slope = (x[:, None] * log_tau).sum(axis=0) / (x ** 2).sum()
+    hurst = np.clip(slope, 0.0, 1.0)
+
+    counts = np.minimum(np.arange(1, len(returns) + 1), span)
+    hurst = np.where((counts < max_lag * 2) | np.isnan(slope), 0.5, hurst)
+    # 第一根 K 线没有收益率
+    return np.concatenate([[0.5], hurst]) if len(close) else hurst
+
+
+def technical_signal_frame(prices_df: pd.DataFrame, history_bars: int = HISTORY_BARS) -> pd.DataFrame:
+    """technical_analyst_agent 综合信号的逐日序列
+
+    Returns:
+        DataFrame，索引与 prices_df 一致：
+        - signal: 1 看多 / 0 中性 / -1 看空
+        - confidence: 置信度，与 Agent 输出一样保留到百分位整数
+    """
+    features = feature_frame(prices_df)
+    close = features.get("close")
+
+    # 1. 趋势跟踪
+    ema_8 = features.get("ema", span=8)
+    ema_21 = features.get("ema", span=21)
+    ema_55 = features.get("ema", span=55)
+    trend_strength = features.get("adx", period=14)[0] / 100.0
+    short_trend = ema_8 > ema_21
+    medium_trend = ema_21 > ema_55
+    trend = _choose(short_trend & medium_trend, ~short_trend & ~medium_trend,
+                    trend_strength, trend_strength)
+
+    # 2. 均值回归
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_score = (close - features.get("sma", window=50)) / features.get("rolling_std", window=50)
+        bb_upper, _, bb_lower = features.get("bollinger", window=20)
+        price_vs_bb = (close - bb_lower) / (bb_upper - bb_lower)
+    z_confidence = np.minimum(np.abs(z_score) / 4, 1.0)
+    mean_reversion = _choose((z_score < -2) & (price_vs_bb < 0.2), (z_score > 2) & (price_vs_bb > 0.8),
+                             z_confidence, z_confidence)
+
+    # 3. 动量
+    mom_1m = pd.Series(features.get("rolling_sum", window=21, min_periods=5)).fillna(0)
+    mom_3m = pd.Series(features.get("rolling_sum", window=63, min_periods=42)).fillna(mom_1m)
+    mom_6m = pd.Series(features.get("rolling_sum", window=126, min_periods=63)).fillna(mom_3m)
+    momentum_score = (0.2 * mom_1m + 0.3 * mom_3m + 0.5 * mom_6m).to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        volume_confirmation = features.get("volume") / features.get(
+            "sma", column="volume", window=21, min_periods=10) > 1.0
+    momentum_confidence = np.minimum(np.abs(momentum_score) * 5, 1.0)
+    momentum = _choose((momentum_score > 0.05) & volume_confirmation,
+                       (momentum_score < -0.05) & volume_confirmation,
+                       momentum_confidence, momentum_confidence)
+
+    # 4. 波动率
+    hist_vol = features.series("volatility", window=21, min_periods=10)
+    vol_ma = hist_vol.rolling(42, min_periods=21).mean()
+    vol_std = hist_vol.rolling(42, min_periods=21).std()
+    vol_regime = (hist_vol / vol_ma).fillna(1.0).to_numpy()
+    vol_z = ((hist_vol - vol_ma) / vol_std.replace(0, np.nan)).fillna(0.0).to_numpy()
+    vol_confidence = np.minimum(np.abs(vol_z) / 3, 1.0)
+    volatility = _choose((vol_regime < 0.8) & (vol_z < -1), (vol_regime > 1.2) & (vol_z > 1),
+                         vol_confidence, vol_confidence)
+
+    # 5. 统计套利
+    skew = np.nan_to_num(features.get("rolling_skew", window=42, min_periods=21), nan=0.0)
+    hurst = rolling_hurst_exponent(close, history_bars)
+    stat_arb = _choose((hurst < 0.4) & (skew > 1), (hurst < 0.4) & (skew < -1),
+                       (0.5 - hurst) * 2, (0.5 - hurst) * 2)
+
+    # 加权组合，与 weighted_signal_combination 一致
+    weighted_sum = np.zeros(len(close))
+    total_confidence = np.zeros(len(close))
+    for name, (signal, confidence) in zip(
+            ['trend', 'mean_reversion', 'momentum', 'volatility', 'stat_arb'],
+            [trend, mean_reversion, momentum, volatility, stat_arb]):
+        weight = STRATEGY_WEIGHTS[name]
+        weighted_sum += signal * weight * confidence
+        total_confidence += weight * confidence
+    with np.errstate(divide="ignore", invalid="ignore"):
+        final_score = np.where(total_confidence > 0, weighted_sum / total_confidence, 0.0)
+    # 预热期内 ADX 等指标为 NaN，视为中性
+    final_score = np.nan_to_num(final_score, nan=0.0)
+
+    return pd.DataFrame({
+        "signal": np.where(final_score > 0.2, 1, np.where(final_score < -0.2, -1, 0)),
+        "confidence": np.round(np.abs(final_score) * 100) / 100,
+    }, index=prices_df.index)
+
+
+def risk_frame(prices_df: pd.DataFrame, history_bars: int = HISTORY_BARS) -> pd.DataFrame:
+    """risk_management_agent 市场风险评分的逐日序列
+
+    Returns:
+        DataFrame，索引与 prices_df 一致：
+        - market_risk_score: 市场风险评分（0-6）
+        - position_limit: 最大持仓占组合总值的比例
+    """
+    features = feature_frame(prices_df)
+    returns = features.series("returns")
+    span = history_bars - 1  # 切片内的收益率个数
+
+    volatility = returns.rolling(span, min_periods=2).std() * math.sqrt(252)
+    # 切片内 120 日波动率的分布
+    rolling_vol = features.series("volatility", window=120)
+    vol_window = max(span - 119, 1)
+    volatility_mean = rolling_vol.rolling(vol_window, min_periods=1).mean()
+    volatility_std = rolling_vol.rolling(vol_window, min_periods=1).std()
+    volatility_percentile = ((volatility - volatility_mean) / volatility_std).to_numpy()
+
+    var_95 = returns.rolling(span, min_periods=1).quantile(0.05).to_numpy()
+    drawdown = features.series("close") / features.series("rolling_max", window=60) - 1
+    max_drawdown = drawdown.rolling(max(history_bars - 59, 1), min_periods=1).min().to_numpy()
+
+    with np.errstate(invalid="ignore"):
+        score = (np.where(volatility_percentile > 1.5, 2, np.where(volatility_percentile > 1.0, 1, 0))
+                 + np.where(var_95 < -0.03, 2, np.where(var_95 < -0.02, 1, 0))
+                 + np.where(max_drawdown < -0.20, 2, np.where(max_drawdown < -0.10, 1, 0)))
+
+    return pd.DataFrame({
+        "market_risk_score": score,
+        "position_limit": 0.25 * np.where(score >= 4, 0.5, np.where(score >= 2, 0.75, 1.0)),
+    }, index=prices_df.index)
+
+
+def parse_confidence(confidence) -> float:
+    """把 "75%" 或数值形式的置信度转为 0-1 之间的小数"""
+    try:
+        if isinstance(confidence, str):
+            return float(confidence.replace('%', '')) / 100.0
+        return float(confidence)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def trading_actions(technical: pd.DataFrame, risk: pd.DataFrame,
+                    static_signals: Dict[str, dict]) -> pd.Series:
+    """按 risk_management_agent 的规则逐日给出交易动作
+
+    Args:
+        technical: technical_signal_frame 的结果
+        risk: risk_frame 的结果
+        static_signals: 回测区间内不变的 Agent 信号，如
+            {"fundamental": {"signal": "bullish", "confidence": "75%"}, "valuation": {...}}
+
+    Returns:
+        pd.Series: buy / reduce / hold 或估值信号（bullish / bearish / neutral）
+    """
+    static_values = {SIGNAL_VALUES[s["signal"]] for s in static_signals.values()}
+    static_low_confidence = any(parse_confidence(s["confidence"]) < 0.30
+                                for s in static_signals.values())
+
+    tech_signal = technical["signal"].to_numpy()
+    tech_confidence = technical["confidence"].to_numpy()
+
+    low_confidence = static_low_confidence | (tech_confidence < 0.30)
+    unique_signals = np.full(len(technical), len(static_values))
+    unique_signals += ~np.isin(tech_signal, list(static_values))
+    signal_divergence = np.where(unique_signals == 3, 2, 0)
+    risk_score = np.minimum(
+        risk["market_risk_score"].to_numpy() + np.where(low_confidence, 2, 0) + signal_divergence, 10)
+
+    valuation = static_signals["valuation"]["signal"]
+    actions = np.where(risk_score >= 9, "hold",
+                       np.where(risk_score >= 7, "reduce",
+                                np.where((tech_signal == 1) & (tech_confidence > 0.5), "buy", valuation)))
+    return pd.Series(actions, index=technical.index)
+
+
+def static_agent_signals(ticker: str) -> Dict[str, dict]:
+    """获取一次财务数据，运行 fundamentals_agent 与 valuation_agent 得到常量信号"""
+    logger.info(f"{WAIT_ICON} 获取 {ticker} 的财务数据并计算基本面与估值信号...")
+    fetched = run_concurrently(
+        {
+            "financial_metrics": lambda: get_financial_metrics(ticker),
+            "financial_line_items": lambda: get_financial_statements(ticker),
+            "market_data": lambda: get_market_data(ticker),
+        },
+        defaults={
+            "financial_metrics": [{}],
+            "financial_line_items": [{}, {}],
+            "market_data": {"market_cap": 0},
+        }
+    )
+    market_data = fetched["market_data"] or {"market_cap": 0}
+    state = {
+        "messages": [],
+        "data": {
+            "ticker": ticker,
+            "financial_metrics": fetched["financial_metrics"],
+            "financial_line_items": fetched["financial_line_items"],
+            "market_cap": market_data.get("market_cap", 0),
+            "market_data": market_data,
+        },
+        "metadata": {"show_reasoning": False},
+    }
+
+    signals = {}
+    for name, agent in (("fundamental", fundamentals_agent), ("valuation", valuation_agent)):
+        content = json.loads(agent(state)["messages"][-1].content)
+        signals[name] = {"signal": content["signal"], "confidence": content["confidence"]}
+    logger.info(f"{SUCCESS_ICON} 基本面与估值信号: {signals}")
+    return signals
@@ -1,4 +1,3 @@
-import math
 from typing import Dict
 
 from langchain_core.messages import HumanMessage
@@ -10,10 +9,27 @@ import pandas as pd
 import numpy as np
 
 from src.utils.api import prices_to_df
+from src.utils.feature_engine import feature_frame
 
 # 设置日志记录
 logger = get_logger()
 
+# 各策略信号在综合信号中的权重
+STRATEGY_WEIGHTS = {
+    'trend': 0.30,
+    'mean_reversion': 0.25,  # Increased weight for mean reversion
+    'momentum': 0.25,
+    'volatility': 0.15,
+    'stat_arb': 0.05
+}
+
+# 信号到数值的映射
+SIGNAL_VALUES = {
+    'bullish': 1,
+    'neutral': 0,
+    'bearish': -1
+}
+
 ##### Technical Analyst #####
 def technical_analyst_agent(state: AgentState):
     """
@@ -158,21 +174,13 @@ def technical_analyst_agent(state: AgentState):
     stat_arb_signals = calculate_stat_arb_signals(prices_df)
 
     # Combine all signals using a weighted ensemble approach
-    strategy_weights = {
-        'trend': 0.30,
-        'mean_reversion': 0.25,  # Increased weight for mean reversion
-        'momentum': 0.25,
-        'volatility': 0.15,
-        'stat_arb': 0.05
-    }
-
     combined_signal = weighted_signal_combination({
         'trend': trend_signals,
         'mean_reversion': mean_reversion_signals,
         'momentum': momentum_signals,
         'volatility': volatility_signals,
         'stat_arb': stat_arb_signals
-    }, strategy_weights)
+    }, STRATEGY_WEIGHTS)
 
     # Generate detailed analysis report
     analysis_report = {
@@ -236,8 +244,7 @@ def calculate_trend_signals(prices_df):
     # Calculate ADX for trend strength
     adx = calculate_adx(prices_df, 14)
 
-    # Calculate Ichimoku Cloud
-    ichimoku = calculate_ichimoku(prices_df)
+    # 一目均衡表未参与信号计算，按需计算时不再求值
 
     # Determine trend direction and strength
     short_trend = ema_8 > ema_21
@@ -271,9 +278,11 @@ def calculate_mean_reversion_signals(prices_df):
     """
     Mean reversion strategy using statistical measures and Bollinger Bands
     """
+    features = feature_frame(prices_df)
+
     # Calculate z-score of price relative to moving average
-    ma_50 = prices_df['close'].rolling(window=50).mean()
-    std_50 = prices_df['close'].rolling(window=50).std()
+    ma_50 = features.series("sma", window=50)
+    std_50 = features.series("rolling_std", window=50)
     z_score = (prices_df['close'] - ma_50) / std_50
 
     # Calculate Bollinger Bands
@@ -315,14 +324,15 @@ def calculate_momentum_signals(prices_df):
     """
     Multi-factor momentum strategy with conservative settings
     """
+    features = feature_frame(prices_df)
+
     # Price momentum with adjusted min_periods
-    returns = prices_df['close'].pct_change()
-    mom_1m = returns.rolling(21, min_periods=5).sum()  # 短期动量允许较少数据点
-    mom_3m = returns.rolling(63, min_periods=42).sum()  # 中期动量要求更多数据点
-    mom_6m = returns.rolling(126, min_periods=63).sum()  # 长期动量保持严格执行
+    mom_1m = features.series("rolling_sum", window=21, min_periods=5)  # 短期动量允许较少数据点
+    mom_3m = features.series("rolling_sum", window=63, min_periods=42)  # 中期动量要求更多数据点
+    mom_6m = features.series("rolling_sum", window=126, min_periods=63)  # 长期动量保持严格执行
 
     # Volume momentum
-    volume_ma = prices_df['volume'].rolling(21, min_periods=10).mean()
+    volume_ma = features.series("sma", column="volume", window=21, min_periods=10)
     volume_momentum = prices_df['volume'] / volume_ma
 
     # 处理NaN值
@@ -366,10 +376,10 @@ def calculate_volatility_signals(prices_df):
     """
     Optimized volatility calculation with shorter lookback periods
     """
-    returns = prices_df['close'].pct_change()
+    features = feature_frame(prices_df)
 
     # 使用更短的周期和最小周期要求计算历史波动率
-    hist_vol = returns.rolling(21, min_periods=10).std() * math.sqrt(252)
+    hist_vol = features.series("volatility", window=21, min_periods=10)
 
     # 使用更短的周期计算波动率均值，并允许更少的数据点
     vol_ma = hist_vol.rolling(42, min_periods=21).mean()
@@ -419,27 +429,26 @@ def calculate_stat_arb_signals(prices_df):
     """
     Optimized statistical arbitrage signals with shorter lookback periods
     """
-    # Calculate price distribution statistics
-    returns = prices_df['close'].pct_change()
+    features = feature_frame(prices_df)
 
     # 使用更短的周期计算偏度和峰度
-    skew = returns.rolling(42, min_periods=21).skew()
-    kurt = returns.rolling(42, min_periods=21).kurt()
+    skew = features.get("rolling_skew", window=42, min_periods=21)[-1]
+    kurt = features.get("rolling_kurt", window=42, min_periods=21)[-1]
 
     # 优化Hurst指数计算
     hurst = calculate_hurst_exponent(prices_df['close'], max_lag=10)
 
-    # 处理NaN值
-    if pd.isna(skew.iloc[-1]):
-        skew.iloc[-1] = 0.0  # 假设正态分布
-    if pd.isna(kurt.iloc[-1]):
-        kurt.iloc[-1] = 3.0  # 假设正态分布
+    # 处理NaN值（特征结果为只读的共享数组，只替换取出的标量）
+    if pd.isna(skew):
+        skew = 0.0  # 假设正态分布
+    if pd.isna(kurt):
+        kurt = 3.0  # 假设正态分布
 
     # Generate signal based on statistical properties
-    if hurst < 0.4 and skew.iloc[-1] > 1:
+    if hurst < 0.4 and skew > 1:
         signal = 'bullish'
         confidence = (0.5 - hurst) * 2
-    elif hurst < 0.4 and skew.iloc[-1] < -1:
+    elif hurst < 0.4 and skew < -1:
         signal = 'bearish'
         confidence = (0.5 - hurst) * 2
     else:
@@ -451,8 +460,8 @@ def calculate_stat_arb_signals(prices_df):
         'confidence': confidence,
         'metrics': {
             'hurst_exponent': float(hurst),
-            'skewness': float(skew.iloc[-1]),
-            'kurtosis': float(kurt.iloc[-1])
+            'skewness': float(skew),
+            'kurtosis': float(kurt)
         }
     }
 
@@ -461,18 +470,11 @@ def weighted_signal_combination(signals, weights):
     """
     Combines multiple trading signals using a weighted approach
     """
-    # Convert signals to numeric values
-    signal_values = {
-        'bullish': 1,
-        'neutral': 0,
-        'bearish': -1
-    }
-
     weighted_sum = 0
     total_confidence = 0
 
     for strategy, signal in signals.items():
-        numeric_signal = signal_values[signal['signal']]
+        numeric_signal = SIGNAL_VALUES[signal['signal']]
         weight = weights[strategy]
         confidence = signal['confidence']
 
@@ -513,33 +515,22 @@ def normalize_pandas(obj):
 
 
 def calculate_macd(prices_df: pd.DataFrame) -> tuple[pd.Series, pd.Series]:
-    ema_12 = prices_df['close'].ewm(span=12, adjust=False).mean()
-    ema_26 = prices_df['close'].ewm(span=26, adjust=False).mean()
-    macd_line = ema_12 - ema_26
-    signal_line = macd_line.ewm(span=9, adjust=False).mean()
-    return macd_line, signal_line
+    macd_line, signal_line = feature_frame(prices_df).get("macd")
+    return (pd.Series(macd_line, index=prices_df.index),
+            pd.Series(signal_line, index=prices_df.index))
 
 
 def calculate_rsi(prices_df: pd.DataFrame, period: int = 14) -> pd.Series:
-    delta = prices_df['close'].diff()
-    gain = (delta.where(delta > 0, 0)).fillna(0)
-    loss = (-delta.where(delta < 0, 0)).fillna(0)
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+    return feature_frame(prices_df).series("rsi", period=period)
 
 
 def calculate_bollinger_bands(
     prices_df: pd.DataFrame,
     window: int = 20
 ) -> tuple[pd.Series, pd.Series]:
-    sma = prices_df['close'].rolling(window).mean()
-    std_dev = prices_df['close'].rolling(window).std()
-    upper_band = sma + (std_dev * 2)
-    lower_band = sma - (std_dev * 2)
-    return upper_band, lower_band
+    upper_band, _, lower_band = feature_frame(prices_df).get("bollinger", window=window)
+    return (pd.Series(upper_band, index=prices_df.index),
+            pd.Series(lower_band, index=prices_df.index))
 
 
 def calculate_ema(df: pd.DataFrame, window: int) -> pd.Series:
@@ -553,7 +544,7 @@ def calculate_ema(df: pd.DataFrame, window: int) -> pd.Series:
     Returns:
         pd.Series: EMA values
     """
-    return df['close'].ewm(span=window, adjust=False).mean()
+    return feature_frame(df).series("ema", span=window)
 
 
 def calculate_adx(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
@@ -567,36 +558,9 @@ def calculate_adx(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
     Returns:
         DataFrame with ADX values
     """
-    # Calculate True Range
-    df['high_low'] = df['high'] - df['low']
-    df['high_close'] = abs(df['high'] - df['close'].shift())
-    df['low_close'] = abs(df['low'] - df['close'].shift())
-    df['tr'] = df[['high_low', 'high_close', 'low_close']].max(axis=1)
-
-    # Calculate Directional Movement
-    df['up_move'] = df['high'] - df['high'].shift()
-    df['down_move'] = df['low'].shift() - df['low']
-
-    df['plus_dm'] = np.where(
-        (df['up_move'] > df['down_move']) & (df['up_move'] > 0),
-        df['up_move'],
-        0
-    )
-    df['minus_dm'] = np.where(
-        (df['down_move'] > df['up_move']) & (df['down_move'] > 0),
-        df['down_move'],
-        0
-    )
-
-    # Calculate ADX
-    df['+di'] = 100 * (df['plus_dm'].ewm(span=period).mean() /
-                       df['tr'].ewm(span=period).mean())
-    df['-di'] = 100 * (df['minus_dm'].ewm(span=period).mean() /
-                       df['tr'].ewm(span=period).mean())
-    df['dx'] = 100 * abs(df['+di'] - df['-di']) / (df['+di'] + df['-di'])
-    df['adx'] = df['dx'].ewm(span=period).mean()
-
-    return df[['adx', '+di', '-di']]
+    adx, plus_di, minus_di = feature_frame(df).get("adx", period=period)
+    # 不再向输入的 DataFrame 写入临时列
+    return pd.DataFrame({'adx': adx, '+di': plus_di, '-di': minus_di}, index=df.index)
 
 
 def calculate_ichimoku(df: pd.DataFrame) -> Dict[str, pd.Series]:
@@ -609,34 +573,8 @@ def calculate_ichimoku(df: pd.DataFrame) -> Dict[str, pd.Series]:
     Returns:
         Dictionary containing Ichimoku components
     """
-    # Tenkan-sen (Conversion Line): (9-period high + 9-period low)/2
-    period9_high = df['high'].rolling(window=9).max()
-    period9_low = df['low'].rolling(window=9).min()
-    tenkan_sen = (period9_high + period9_low) / 2
-
-    # Kijun-sen (Base Line): (26-period high + 26-period low)/2
-    period26_high = df['high'].rolling(window=26).max()
-    period26_low = df['low'].rolling(window=26).min()
-    kijun_sen = (period26_high + period26_low) / 2
-
-    # Senkou Span A (Leading Span A): (Conversion Line + Base Line)/2
-    senkou_span_a = ((tenkan_sen + kijun_sen) / 2).shift(26)
-
-    # Senkou Span B (Leading Span B): (52-period high + 52-period low)/2
-    period52_high = df['high'].rolling(window=52).max()
-    period52_low = df['low'].rolling(window=52).min()
-    senkou_span_b = ((period52_high + period52_low) / 2).shift(26)
-
-    # Chikou Span (Lagging Span): Close shifted back 26 periods
-    chikou_span = df['close'].shift(-26)
-
-    return {
-        'tenkan_sen': tenkan_sen,
-        'kijun_sen': kijun_sen,
-        'senkou_span_a': senkou_span_a,
-        'senkou_span_b': senkou_span_b,
-        'chikou_span': chikou_span
-    }
+    components = feature_frame(df).get("ichimoku")
+    return {name: pd.Series(values, index=df.index) for name, values in components.items()}
 
 
 def calculate_atr(df: pd.DataFrame, period: int = 14, min_periods: int = 7) -> pd.Series:
@@ -651,14 +589,7 @@ def calculate_atr(df: pd.DataFrame, period: int = 14, min_periods: int = 7) -> p
     Returns:
         pd.Series: ATR values
     """
-    high_low = df['high'] - df['low']
-    high_close = abs(df['high'] - df['close'].shift())
-    low_close = abs(df['low'] - df['close'].shift())
-
-    ranges = pd.concat([high_low, high_close, low_close], axis=1)
-    true_range = ranges.max(axis=1)
-
-    return true_range.rolling(period, min_periods=min_periods).mean()
+    return feature_frame(df).series("atr", period=period, min_periods=min_periods)
 
 
 def calculate_hurst_exponent(price_series: pd.Series, max_lag: int = 10) -> float:
@@ -674,7 +605,8 @@ def calculate_hurst_exponent(price_series: pd.Series, max_lag: int = 10) -> floa
     """
     try:
         # 使用对数收益率而不是价格
-        returns = np.log(price_series / price_series.shift(1)).dropna()
+        # 转为数组按位置做差，Series 相减会按索引对齐，差值恒为 0
+        returns = np.log(price_series / price_series.shift(1)).dropna().to_numpy()
 
         # 如果数据不足，返回0.5（随机游走）
         if len(returns) < max_lag * 2:
@@ -701,13 +633,5 @@ def calculate_hurst_exponent(price_series: pd.Series, max_lag: int = 10) -> floa
 
 
 def calculate_obv(prices_df: pd.DataFrame) -> pd.Series:
-    obv = [0]
-    for i in range(1, len(prices_df)):
-        if prices_df['close'].iloc[i] > prices_df['close'].iloc[i - 1]:
-            obv.append(obv[-1] + prices_df['volume'].iloc[i])
-        elif prices_df['close'].iloc[i] < prices_df['close'].iloc[i - 1]:
-            obv.append(obv[-1] - prices_df['volume'].iloc[i])
-        else:
-            obv.append(obv[-1])
-    prices_df['OBV'] = obv
-    return prices_df['OBV']
+    obv = feature_frame(prices_df).get("obv")
+    return pd.Series(obv, index=prices_df.index, name='OBV')
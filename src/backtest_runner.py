@@ -0,0 +1,328 @@
+import os
+import json
+import time
+import argparse
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from src.backtester import Backtester
+from src.batch import load_tickers
+from src.main import resolve_date_range, run_hedge_fund
+from src.utils.price_panel import PricePanel
+from src.utils.logger_config import flush_logs, get_logger, ERROR_ICON, SUCCESS_ICON, WAIT_ICON
+from src.utils.tracing import run_trace_path, trace_file, trace_run
+
+# 设置日志记录
+logger = get_logger()
+
+# 默认同时运行的回测进程数
+DEFAULT_BACKTEST_WORKERS = 4
+
+# 工作进程崩溃后，单个任务最多被重新提交的次数
+MAX_JOB_ATTEMPTS = 2
+
+# 结果表的列
+RESULT_COLUMNS = ["ticker", "start_date", "end_date", "status",
+                  "total_return", "sharpe_ratio", "max_drawdown", "final_value",
+                  "elapsed_seconds", "error"]
+
+# 工作进程内：股票代码 -> 共享内存描述符 / 已挂载的 (面板, 共享内存块)
+_worker_handles: Dict[str, dict] = {}
+_worker_panels: Dict[str, tuple] = {}
+# 工作进程内：与主进程共享的任务运行标记，按任务序号索引
+_worker_started = None
+
+
+def _init_worker(handles: Dict[str, dict], started=None):
+    """工作进程初始化：记录各股票行情面板的共享内存描述符和任务运行标记"""
+    global _worker_started
+    _worker_handles.clear()
+    _worker_handles.update(handles)
+    _worker_started = started
+
+
+def worker_panel(ticker: str) -> Optional[PricePanel]:
+    """在工作进程中挂载股票的共享行情面板，每个进程每只股票只挂载一次"""
+    if ticker not in _worker_panels:
+        handle = _worker_handles.get(ticker)
+        if handle is None:
+            return None
+        _worker_panels[ticker] = PricePanel.attach_shared(handle)
+    return _worker_panels[ticker][0]
+
+
+def run_job(job: dict, options: dict) -> dict:
+    """在工作进程中运行单个 (股票, 区间) 回测，返回绩效指标
+
+    Args:
+        job: {"ticker", "start_date", "end_date"}
+        options: mode（fast / agent）、initial_capital、num_of_news、model、
+                 lookback_days，以及可选的 static_signals（股票代码 -> 基本面与估值信号）
+    """
+    ticker = job["ticker"]
+    backtester = Backtester(
+        agent=run_hedge_fund,
+        ticker=ticker,
+        start_date=job["start_date"],
+        end_date=job["end_date"],
+        initial_capital=options.get("initial_capital", 100000),
+        num_of_news=options.get("num_of_news", 5),
+        model=options.get("model"),
+        lookback_days=options.get("lookback_days", 30),
+        price_panel=worker_panel(ticker),
+    )
+    if options.get("mode", "fast") == "fast":
+        backtester.run_fast_backtest((options.get("static_signals") or {}).get(ticker))
+    else:
+        backtester.run_backtest()
+
+    if not backtester.portfolio_values:
+        raise ValueError("回测区间内没有可交易的日期")
+    return {
+        **backtester.performance_metrics(),
+        "final_value": float(backtester.portfolio["portfolio_value"]),
+    }
+
+
+def _run_in_worker(job_func, index: int, job: dict, options: dict) -> dict:
+    """在工作进程中执行单个任务，结束时写完排队的日志
+
+    执行期间设置共享的运行标记，任务返回或抛出异常后清除。工作进程崩溃时
+    它正在执行的任务标记不会被清除，主进程据此找出崩溃时正在运行的任务。
+
+    工作进程以 os._exit 退出，不执行 atexit 中的日志收尾，
+    任务结束（包括失败）时立即写完后台队列中的日志。
+    options 中指定 trace 时，每个任务的耗时追踪写入各自的文件，如 logs/trace.600519_2024-01-01_2024-06-30.json。
+    """
+    if _worker_started is not None:
+        _worker_started[index] = 1
+    trace = options.get("trace")
+    if trace:
+        trace = run_trace_path(trace, f"{job['ticker']}_{job['start_date']}_{job['end_date']}")
+    try:
+        with trace_run(trace):
+            return job_func(job, options)
+    finally:
+        flush_logs()
+        if _worker_started is not None:
+            _worker_started[index] = 0
+
+
+def _record(job: dict, status: str, started: float, **fields) -> dict:
+    return {
+        "ticker": job["ticker"],
+        "start_date": job["start_date"],
+        "end_date": job["end_date"],
+        "status": status,
+        **fields,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def _share_panels(jobs: List[dict], lookback_days: int) -> tuple:
+    """每只股票加载一次覆盖其全部回测区间的行情面板并放入共享内存"""
+    blocks, handles = [], {}
+    for ticker in dict.fromkeys(job["ticker"] for job in jobs):
+        ticker_jobs = [job for job in jobs if job["ticker"] == ticker]
+        start = min(PricePanel.history_start(job["start_date"], lookback_days) for job in ticker_jobs)
+        end = max(pd.Timestamp(job["end_date"]) for job in ticker_jobs)
+        try:
+            shm, handles[ticker] = PricePanel.load(ticker, start, end).to_shared_memory()
+            blocks.append(shm)
+        except Exception as e:
+            # 工作进程会自行加载行情
+            logger.error(f"{ERROR_ICON} 预加载 {ticker} 行情失败: {e}")
+    return blocks, handles
+
+
+def run_backtests(jobs: List[dict], options: Optional[dict] = None,
+                  max_workers: Optional[int] = None, job_func=run_job) -> Iterator[dict]:
+    """在进程池上并行运行多个回测任务，按完成顺序逐条产出结果记录
+
+    每只股票的行情只在主进程加载一次，以共享内存的形式交给各工作进程只读挂载，
+    不会在每个进程中各复制一份。单个任务抛出异常时记为 error；工作进程崩溃时，
+    已完成任务的结果不受影响，未完成的任务在新的进程池中重新提交。崩溃时只有一个任务在运行
+    （或进程池只有一个进程）时该任务计一次尝试；多个任务同时在运行时无法判断是哪个任务导致的崩溃，
+    这些任务先不计次数，改为在单进程的进程池中逐个重跑；没有任务开始运行就崩溃时（如工作进程
+    初始化失败），所有未完成的任务各计一次尝试。最多尝试 MAX_JOB_ATTEMPTS 次，之后记为 crashed。
+
+    Args:
+        jobs: 任务列表，元素为 {"ticker", "start_date", "end_date"}
+        options: 传给 job_func 的回测参数，见 run_job
+        max_workers: 进程数，默认读取 BACKTEST_MAX_WORKERS
+        job_func: 在工作进程中执行单个任务的函数，需可被 pickle（模块级函数）
+
+    Yields:
+        dict: 每个任务一条结果记录
+    """
+    if not jobs:
+        return
+    options = dict(options or {})
+    if max_workers is None:
+        max_workers = int(os.getenv("BACKTEST_MAX_WORKERS", DEFAULT_BACKTEST_WORKERS))
+    max_workers = max(1, min(max_workers, len(jobs)))
+
+    blocks, handles = _share_panels(jobs, options.get("lookback_days", 30))
+    attempts = {index: 0 for index in range(len(jobs))}
+    started = {index: time.perf_counter() for index in attempts}
+    # 待提交的轮次：(任务序号列表, 进程数)
+    rounds = deque([(list(attempts), max_workers)])
+
+    try:
+        while rounds:
+            pending, workers = rounds.popleft()
+            logger.info(f"{WAIT_ICON} 提交 {len(pending)} 个回测任务，进程数 {workers}")
+            crashed = []
+            # 各任务是否正在工作进程中执行
+            running = multiprocessing.Array("b", len(jobs), lock=False)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(handles, running)) as executor:
+                futures = {executor.submit(_run_in_worker, job_func, index, jobs[index], options): index
+                           for index in pending}
+                for future in as_completed(futures):
+                    index = futures[future]
+                    job = jobs[index]
+                    try:
+                        metrics = future.result()
+                    except BrokenProcessPool:
+                        crashed.append(index)
+                        continue
+                    except Exception as e:
+                        logger.error(f"{ERROR_ICON} 回测 {job['ticker']} 失败: {e}")
+                        yield _record(job, "error", started[index], error=str(e))
+                        continue
+                    yield _record(job, "ok", started[index], **metrics)
+            if not crashed:
+                continue
+
+            suspects = [index for index in crashed if running[index]]
+            if not suspects:
+                # 没有任务开始运行就崩溃，无法归咎于某个任务，全部计一次尝试以保证终止
+                for index in crashed:
+                    attempts[index] += 1
+            elif len(suspects) == 1 or workers == 1:
+                attempts[suspects[0]] += 1
+            # 多个任务同时在运行时先不计次数，放到单进程的进程池中逐个重跑以找出崩溃的任务
+            isolated = [] if len(suspects) == 1 or workers == 1 else suspects
+
+            retry = []
+            for index in crashed:
+                job = jobs[index]
+                if attempts[index] < MAX_JOB_ATTEMPTS:
+                    retry.append(index)
+                else:
+                    logger.error(f"{ERROR_ICON} 回测 {job['ticker']} 的工作进程多次崩溃，放弃该任务")
+                    yield _record(job, "crashed", started[index], error="工作进程异常退出")
+            if retry:
+                logger.error(f"{ERROR_ICON} 工作进程异常退出，重新提交 {len(retry)} 个未完成的任务")
+            if isolated:
+                rounds.append((isolated, 1))
+            rest = [index for index in retry if index not in isolated]
+            if rest:
+                rounds.append((rest, max_workers))
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+
+def results_table(records: List[dict]) -> pd.DataFrame:
+    """把各任务的结果记录合并为一张按股票和区间排序的表"""
+    table = pd.DataFrame(records).reindex(columns=RESULT_COLUMNS)
+    return table.sort_values(["ticker", "start_date", "end_date"], ignore_index=True)
+
+
+def build_jobs(tickers: List[str], periods: List[tuple]) -> List[dict]:
+    """股票与回测区间的笛卡尔积"""
+    return [{"ticker": ticker, "start_date": start, "end_date": end}
+            for ticker in tickers for start, end in periods]
+
+
+def parse_periods(periods: str) -> List[tuple]:
+    """解析 "2023-01-01:2023-06-30,2023-07-01:2023-12-31" 形式的区间列表"""
+    result = []
+    for period in periods.split(','):
+        start, end = (part.strip() for part in period.split(':'))
+        result.append((start, end))
+    return result
+
+
+if __name__ == "__main__":
+    logger.info("启动并行回测...")
+
+    parser = argparse.ArgumentParser(
+        description='Run backtests for a list of tickers on a process pool')
+    parser.add_argument('--tickers', type=str,
+                        help='Comma separated stock ticker symbols')
+    parser.add_argument('--ticker-file', type=str,
+                        help='File with one ticker per line, # starts a comment')
+    parser.add_argument('--start-date', type=str,
+                        help='Start date (YYYY-MM-DD). Defaults to 1 year before end date')
+    parser.add_argument('--end-date', type=str,
+                        help='End date (YYYY-MM-DD). Defaults to yesterday')
+    parser.add_argument('--periods', type=str,
+                        help='Comma separated START:END date ranges, overrides --start-date/--end-date')
+    parser.add_argument('--mode', choices=['fast', 'agent'], default='fast',
+                        help='fast: rule-based vectorized signals without LLM; agent: full workflow (default: fast)')
+    parser.add_argument('--initial-capital', type=float, default=100000.0,
+                        help='Initial cash amount per backtest (default: 100,000)')
+    parser.add_argument('--num-of-news', type=int, default=5,
+                        help='Number of news articles to analyze for sentiment (default: 5)')
+    parser.add_argument('--model', type=str, default='moonshot',
+                        help='Model to use for chat completion (default: moonshot), use comma to separate multiple models.')
+    parser.add_argument('--max-workers', type=int,
+                        help=f'Number of worker processes (default: {DEFAULT_BACKTEST_WORKERS})')
+    parser.add_argument('--output', type=str,
+                        help='Append one JSON line per finished backtest to this file')
+    parser.add_argument('--table', type=str,
+                        help='Write the merged results table to this CSV file')
+    parser.add_argument('--trace', type=str,
+                        help='Write a Chrome trace-event JSON per backtest, e.g. logs/trace.json -> logs/trace.<ticker>_<start>_<end>.json (default: $TRACE_FILE)')
+
+    args = parser.parse_args()
+
+    tickers = load_tickers(args.tickers, args.ticker_file)
+    if not tickers:
+        parser.error("at least one ticker is required (--tickers or --ticker-file)")
+
+    if args.periods:
+        periods = parse_periods(args.periods)
+    else:
+        start_date, end_date = resolve_date_range(args.start_date, args.end_date)
+        periods = [(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))]
+
+    records = []
+    output = open(args.output, 'a', encoding='utf-8') if args.output else None
+    try:
+        for record in run_backtests(
+            build_jobs(tickers, periods),
+            options={
+                "mode": args.mode,
+                "initial_capital": args.initial_capital,
+                "num_of_news": args.num_of_news,
+                "model": args.model.split(','),
+                "trace": trace_file(args.trace),
+            },
+            max_workers=args.max_workers,
+        ):
+            records.append(record)
+            # 每完成一个任务立即落盘，进程中途退出时已完成的结果不会丢失
+            if output:
+                output.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                output.flush()
+    finally:
+        if output:
+            output.close()
+
+    table = results_table(records)
+    if args.table:
+        table.to_csv(args.table, index=False, encoding='utf-8')
+    print(table.to_string(index=False))
+
+    succeeded = int((table["status"] == "ok").sum()) if len(table) else 0
+    logger.info(f"{SUCCESS_ICON} 并行回测完成：成功 {succeeded} / {len(table)}")
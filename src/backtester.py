@@ -2,32 +2,54 @@ from datetime import datetime, timedelta
 import json
 import time
 import logging
-import matplotlib.pyplot as plt
 import pandas as pd
-from src.tools.api import get_price_data
-from src.main import run_hedge_fund
+from src.agents.signal_series import (SIGNAL_NAMES, risk_frame, static_agent_signals,
+                                      technical_signal_frame, trading_actions)
+from src.utils.cassette import cassette_from_args
+from src.utils.tracing import trace_file, trace_run
+from src.utils.openrouter_config import is_rate_limit_error
+from src.utils.price_panel import PricePanel
+from src.utils.rate_limiter import rate_limiter
+from src.main import build_hedge_workflow, run_hedge_fund
 import sys
-import matplotlib
 import os
+import threading
+
+_pyplot = None
+_pyplot_lock = threading.Lock()
+
+
+def get_pyplot():
+    """首次绘图时才导入 matplotlib 并配置中文字体，不绘图的回测不付出导入开销"""
+    global _pyplot
+    with _pyplot_lock:
+        if _pyplot is None:
+            import matplotlib
+            import matplotlib.pyplot as plt
+
+            # 根据操作系统配置中文字体
+            if sys.platform.startswith('win'):
+                # Windows系统
+                matplotlib.rc('font', family='Microsoft YaHei')
+            elif sys.platform.startswith('linux'):
+                # Linux系统
+                matplotlib.rc('font', family='WenQuanYi Micro Hei')
+            else:
+                # macOS系统
+                matplotlib.rc('font', family='PingFang SC')
 
-# 根据操作系统配置中文字体
-if sys.platform.startswith('win'):
-    # Windows系统
-    matplotlib.rc('font', family='Microsoft YaHei')
-elif sys.platform.startswith('linux'):
-    # Linux系统
-    matplotlib.rc('font', family='WenQuanYi Micro Hei')
-else:
-    # macOS系统
-    matplotlib.rc('font', family='PingFang SC')
-
-# 用来正常显示负号
-matplotlib.rcParams['axes.unicode_minus'] = False
+            # 用来正常显示负号
+            matplotlib.rcParams['axes.unicode_minus'] = False
+            _pyplot = plt
+        return _pyplot
 
 
 class Backtester:
-    def __init__(self, agent, ticker, start_date, end_date, initial_capital, num_of_news):
+    def __init__(self, agent, ticker, start_date, end_date, initial_capital, num_of_news,
+                 model=None, app=None, lookback_days=30, price_panel=None):
         self.agent = agent
+        self.model = model or ["moonshot"]
+        self.app = app
         self.ticker = ticker
         self.start_date = start_date
         self.end_date = end_date
@@ -35,15 +57,14 @@ class Backtester:
         self.portfolio = {"cash": initial_capital, "stock": 0}
         self.portfolio_values = []
         self.num_of_news = num_of_news
+        # 每个交易日传给智能体的回看天数
+        self.lookback_days = lookback_days
+        # 整个回测区间的行情面板，未传入时在回测开始时加载一次
+        self.price_panel = price_panel
         # 设置回测日志
         self.setup_backtest_logging()
         self.logger = self.setup_logging()
 
-        # 初始化 API 调用管理
-        self._api_call_count = 0
-        self._api_window_start = time.time()
-        self._last_api_call = 0
-
         # 验证输入参数
         self.validate_inputs()
 
@@ -75,46 +96,28 @@ class Backtester:
             self.logger.error(f"输入参数验证失败: {str(e)}")
             raise
 
-    def get_agent_decision(self, current_date, lookback_start, portfolio):
-        """获取智能体决策，包含 API 限制处理"""
-        max_retries = 3
+    def get_agent_decision(self, current_date, lookback_start, portfolio, prices=None):
+        """获取智能体决策，失败时重试
 
-        # 检查并重置 API 时间窗口
-        current_time = time.time()
-        if current_time - self._api_window_start >= 60:
-            self._api_call_count = 0
-            self._api_window_start = current_time
-            self.logger.debug("API 调用计数已重置")
-
-        # 如果达到 API 限制，等待新的时间窗口
-        if self._api_call_count >= 8:  # 预留余量
-            wait_time = 60 - (current_time - self._api_window_start)
-            if wait_time > 0:
-                self.logger.info(f"已达到 API 限制，等待 {wait_time:.1f} 秒...")
-                time.sleep(wait_time)
-                self._api_call_count = 0
-                self._api_window_start = time.time()
+        prices 为行情面板截至 current_date 的时点切片，智能体不再自行获取行情；
+        新闻同样只使用 current_date 之前发布的存档新闻。
+        LLM 调用的速率由 rate_limiter 按各服务商的配额统一控制，这里不再固定等待。
+        """
+        max_retries = 3
 
         for attempt in range(max_retries):
             try:
-                # 确保调用间隔至少 6 秒
-                if self._last_api_call:
-                    time_since_last_call = time.time() - self._last_api_call
-                    if time_since_last_call < 6:
-                        sleep_time = 6 - time_since_last_call
-                        time.sleep(sleep_time)
-
-                # 更新调用时间和计数
-                self._last_api_call = time.time()
-                self._api_call_count += 1
-
                 # 调用智能体并解析结果
                 result = self.agent(
+                    app=self.app,
+                    model=self.model,
                     ticker=self.ticker,
                     start_date=lookback_start,
                     end_date=current_date,
                     portfolio=portfolio,
-                    num_of_news=self.num_of_news
+                    num_of_news=self.num_of_news,
+                    prices=prices,
+                    news_as_of=current_date
                 )
 
                 try:
@@ -132,10 +135,10 @@ class Backtester:
                             "analyst_signals": {}
                         }
 
-                        # 处理智能体信号
+                        # 处理智能体信号（投资组合管理输出 agent_name，兼容旧格式的 agent）
                         if "agent_signals" in parsed_result:
                             formatted_result["analyst_signals"] = {
-                                signal["agent"]: {
+                                signal.get("agent_name", signal.get("agent")): {
                                     "signal": signal.get("signal", "unknown"),
                                     "confidence": signal.get("confidence", 0)
                                 }
@@ -156,11 +159,11 @@ class Backtester:
                     }
 
             except Exception as e:
-                if "AFC is enabled" in str(e):
-                    self.logger.warning(f"触发 AFC 限制，等待 60 秒后重试...")
-                    time.sleep(60)
-                    self._api_call_count = 0
-                    self._api_window_start = time.time()
+                if is_rate_limit_error(e):
+                    # 暂停所有调用方对该服务商的请求，重试时由令牌桶等待
+                    self.logger.warning(f"触发服务商限流，暂停 60 秒后重试...")
+                    for provider in self.model:
+                        rate_limiter.pause(provider, 60)
                     continue
 
                 self.logger.warning(
@@ -249,22 +252,38 @@ class Backtester:
         self.backtest_logger.info(f"初始资金: {self.initial_capital:,.2f}\n")
         self.backtest_logger.info("-" * 100)
 
+    def load_price_panel(self):
+        """加载整个回测区间（含回看窗口）的行情面板，已传入面板时直接使用"""
+        if self.price_panel is None:
+            self.price_panel = PricePanel.load(
+                self.ticker,
+                PricePanel.history_start(self.start_date, self.lookback_days),
+                self.end_date)
+        return self.price_panel
+
     def run_backtest(self):
         """运行回测"""
         dates = pd.date_range(self.start_date, self.end_date, freq="B")
 
+        if self.app is None:
+            self.app = build_hedge_workflow()
+
+        # 一次性加载整个回测区间（含回看窗口）的行情，之后每日只做数组索引
+        self.load_price_panel()
+
         self.logger.info("\n开始回测...")
         print(f"{'日期':<12} {'代码':<6} {'操作':<6} {'数量':>8} {'价格':>8} {'现金':>12} {'持仓':>8} {'总值':>12} {'看多':>8} {'看空':>8} {'中性':>8}")
         print("-" * 110)
 
         for current_date in dates:
-            lookback_start = (current_date - timedelta(days=30)
+            lookback_start = (current_date - timedelta(days=self.lookback_days)
                               ).strftime("%Y-%m-%d")
             current_date_str = current_date.strftime("%Y-%m-%d")
 
-            # 获取智能体决策
+            # 获取智能体决策，行情使用面板截至当日的切片
             output = self.get_agent_decision(
-                current_date_str, lookback_start, self.portfolio)
+                current_date_str, lookback_start, self.portfolio,
+                prices=self.price_panel.history(lookback_start, current_date_str))
 
             # 记录每个智能体的信号和分析结果
             self.backtest_logger.info(f"\n交易日期: {current_date_str}")
@@ -321,11 +340,10 @@ class Backtester:
                 self.backtest_logger.info(f"决策理由: {agent_decision['reason']}")
 
             # 获取当前价格并执行交易
-            df = get_price_data(self.ticker, lookback_start, current_date_str)
-            if df is None or df.empty:
+            current_price = self.price_panel.price_on(current_date_str, 'open')
+            if current_price is None:
                 continue
 
-            current_price = df.iloc[-1]['open']
             executed_quantity = self.execute_trade(
                 action, quantity, current_price)
 
@@ -348,6 +366,82 @@ class Backtester:
                 "Daily Return": daily_return
             })
 
+    def run_fast_backtest(self, static_signals=None):
+        """不调用 LLM 的快速回测
+
+        一次性计算整个区间内技术分析与风险控制 Agent 的逐日信号，按确定性规则
+        转换为持仓，结果同样写入 portfolio_values，可直接用 analyze_performance 分析。
+        第 t-1 日收盘后的信号在第 t 日开盘价成交，避免使用未来数据。
+
+        Args:
+            static_signals: 基本面与估值 Agent 的信号，默认运行一次 static_agent_signals
+        """
+        if static_signals is None:
+            static_signals = static_agent_signals(self.ticker)
+
+        self.load_price_panel()
+        prices_df = pd.DataFrame(self.price_panel.columns)
+        if prices_df.empty:
+            self.logger.warning("回测区间内没有行情数据")
+            return
+
+        technical = technical_signal_frame(prices_df)
+        risk = risk_frame(prices_df)
+        actions = trading_actions(technical, risk, static_signals)
+
+        self.logger.info("\n开始快速回测...")
+        dates = pd.date_range(self.start_date, self.end_date, freq="B")
+        for current_date in dates:
+            current_date_str = current_date.strftime("%Y-%m-%d")
+            current_price = self.price_panel.price_on(current_date_str, 'open')
+            if current_price is None:
+                continue
+
+            # 使用前一个交易日收盘后的信号
+            row = int(self.price_panel.dates.searchsorted(
+                current_date.to_datetime64(), side="left")) - 1
+            action, quantity = "hold", 0
+            if row >= 0:
+                trading_action = actions.iloc[row]
+                total_value = self.portfolio["cash"] + self.portfolio["stock"] * current_price
+                max_position_size = total_value * risk["position_limit"].iloc[row]
+                if trading_action in ("buy", "bullish"):
+                    action = "buy"
+                    quantity = max(int((max_position_size - self.portfolio["stock"] * current_price)
+                                       // current_price), 0)
+                elif trading_action == "bearish":
+                    action, quantity = "sell", self.portfolio["stock"]
+                elif trading_action == "reduce":
+                    action, quantity = "sell", self.portfolio["stock"] // 2
+
+                self.backtest_logger.info(
+                    f"\n交易日期: {current_date_str}\n"
+                    f"技术信号: {SIGNAL_NAMES[technical['signal'].iloc[row]]} "
+                    f"({technical['confidence'].iloc[row]:.0%}), "
+                    f"市场风险评分: {risk['market_risk_score'].iloc[row]}, "
+                    f"风控动作: {trading_action}\n"
+                    f"行动: {action.upper()}\n数量: {quantity}")
+
+            self.execute_trade(action, quantity, current_price)
+
+            # 更新组合总值
+            total_value = self.portfolio["cash"] + \
+                self.portfolio["stock"] * current_price
+            self.portfolio["portfolio_value"] = total_value
+
+            # 计算当日收益率
+            if len(self.portfolio_values) > 0:
+                daily_return = (
+                    total_value / self.portfolio_values[-1]["Portfolio Value"] - 1) * 100
+            else:
+                daily_return = 0
+
+            self.portfolio_values.append({
+                "Date": current_date,
+                "Portfolio Value": total_value,
+                "Daily Return": daily_return
+            })
+
     def analyze_performance(self):
         """分析回测性能"""
         performance_df = pd.DataFrame(self.portfolio_values).set_index("Date")
@@ -360,6 +454,7 @@ class Backtester:
         performance_df["Portfolio Value (K)"] = performance_df["Portfolio Value"] / 1000
 
         # 创建两个子图
+        plt = get_pyplot()
         fig, (ax1, ax2) = plt.subplots(
             2, 1, figsize=(12, 10), height_ratios=[1, 1])
         fig.suptitle("回测结果分析", fontsize=12)
@@ -406,8 +501,8 @@ class Backtester:
         plt.show()
 
         # 计算和打印性能指标
-        total_return = (
-            self.portfolio["portfolio_value"] - self.initial_capital) / self.initial_capital
+        metrics = self.performance_metrics(performance_df)
+        total_return = metrics["total_return"]
         print(f"\n总收益率: {total_return * 100:.2f}%")
 
         # 记录最终回测结果
@@ -419,23 +514,42 @@ class Backtester:
             f"最终总值: {self.portfolio['portfolio_value']:,.2f}")
         self.backtest_logger.info(f"总收益率: {total_return * 100:.2f}%")
 
+        # print(f"夏普比率: {sharpe_ratio:.2f}")
+        self.backtest_logger.info(f"夏普比率: {metrics['sharpe_ratio']:.2f}")
+        # print(f"最大回撤: {max_drawdown:.2f}%")
+        self.backtest_logger.info(f"最大回撤: {metrics['max_drawdown']:.2f}%")
+
+        return performance_df
+
+    def performance_metrics(self, performance_df=None):
+        """计算回测的总收益率、夏普比率和最大回撤
+
+        Returns:
+            dict: total_return 为小数，max_drawdown 为百分比（与 analyze_performance 的输出一致）
+        """
+        if performance_df is None:
+            performance_df = pd.DataFrame(self.portfolio_values).set_index("Date")
+
+        total_return = (
+            self.portfolio["portfolio_value"] - self.initial_capital) / self.initial_capital
+
         # 计算夏普比率
         daily_returns = performance_df["Daily Return"] / 100  # 转换为小数
         mean_daily_return = daily_returns.mean()
         std_daily_return = daily_returns.std()
         sharpe_ratio = (mean_daily_return / std_daily_return) * \
             (252 ** 0.5) if std_daily_return != 0 else 0
-        # print(f"夏普比率: {sharpe_ratio:.2f}")
-        self.backtest_logger.info(f"夏普比率: {sharpe_ratio:.2f}")
 
         # 计算最大回撤
         rolling_max = performance_df["Portfolio Value"].cummax()
         drawdown = (performance_df["Portfolio Value"] / rolling_max - 1) * 100
         max_drawdown = drawdown.min()
-        # print(f"最大回撤: {max_drawdown:.2f}%")
-        self.backtest_logger.info(f"最大回撤: {max_drawdown:.2f}%")
 
-        return performance_df
+        return {
+            "total_return": float(total_return),
+            "sharpe_ratio": float(sharpe_ratio),
+            "max_drawdown": float(max_drawdown),
+        }
 
 
 if __name__ == "__main__":
@@ -446,28 +560,55 @@ if __name__ == "__main__":
     parser.add_argument('--ticker', type=str, required=True,
                         help='股票代码 (例如: 600519)')
     parser.add_argument('--end-date', type=str,
-                        default=datetime.now().strftime('%Y-%m-%d'), help='结束日期，格式：YYYY-MM-DD')
-    parser.add_argument('--start-date', type=str, default=(datetime.now() -
-                        timedelta(days=90)).strftime('%Y-%m-%d'), help='开始日期，格式：YYYY-MM-DD')
+                        help='结束日期，格式：YYYY-MM-DD (默认: 今天)')
+    parser.add_argument('--start-date', type=str,
+                        help='开始日期，格式：YYYY-MM-DD (默认: 90 天前)')
     parser.add_argument('--initial-capital', type=float,
                         default=100000, help='初始资金 (默认: 100000)')
     parser.add_argument('--num-of-news', type=int, default=5,
                         help='Number of news articles to analyze for sentiment (default: 5)')
+    parser.add_argument('--model', type=str, default='moonshot',
+                        help='Model to use for chat completion (default: moonshot), use comma to separate multiple models.')
+    parser.add_argument('--fast', action='store_true',
+                        help='不调用 LLM，按规则类 Agent 的向量化信号快速回测')
+    parser.add_argument('--record', type=str,
+                        help='把回测中所有 akshare 与 LLM 调用的结果录制到该磁带文件')
+    parser.add_argument('--replay', type=str,
+                        help='从该磁带文件回放 akshare 与 LLM 调用的结果，不访问网络（磁带为 pickle 文件，只回放可信来源的磁带）')
+    parser.add_argument('--trace', type=str,
+                        help='把整个回测的耗时追踪写入该 JSON 文件 (默认: 环境变量 TRACE_FILE)')
 
     args = parser.parse_args()
-
-    # 创建回测器实例
-    backtester = Backtester(
-        agent=run_hedge_fund,
-        ticker=args.ticker,
-        start_date=args.start_date,
-        end_date=args.end_date,
-        initial_capital=args.initial_capital,
-        num_of_news=args.num_of_news
-    )
-
-    # 运行回测
-    backtester.run_backtest()
+    if args.record and args.replay:
+        parser.error("--record 与 --replay 不能同时使用")
+    trace_path = trace_file(args.trace)
+
+    with trace_run(trace_path), cassette_from_args(args.record, args.replay) as cassette:
+        # 回放时未指定的日期使用录制时的日期
+        recorded = cassette.meta.get("run", {}) if cassette is not None else {}
+        end_date = args.end_date or recorded.get("end_date") or datetime.now().strftime('%Y-%m-%d')
+        start_date = args.start_date or recorded.get("start_date") or (
+            datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
+        if cassette is not None and cassette.recording:
+            cassette.meta["run"] = {"ticker": args.ticker, "start_date": start_date, "end_date": end_date,
+                                    "model": args.model.split(','), "fast": args.fast}
+
+        # 创建回测器实例
+        backtester = Backtester(
+            agent=run_hedge_fund,
+            ticker=args.ticker,
+            start_date=start_date,
+            end_date=end_date,
+            initial_capital=args.initial_capital,
+            num_of_news=args.num_of_news,
+            model=args.model.split(',')
+        )
+
+        # 运行回测
+        if args.fast:
+            backtester.run_fast_backtest()
+        else:
+            backtester.run_backtest()
 
     # 分析性能
     performance_df = backtester.analyze_performance()
@@ -0,0 +1,262 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import AsyncIterator, Iterator, List, Optional
+
+from src.main import build_hedge_workflow, run_hedge_fund, run_hedge_fund_async, resolve_date_range
+from src.utils.spot_snapshot import spot_snapshot
+from src.utils.logger_config import get_logger, ERROR_ICON, SUCCESS_ICON, WAIT_ICON
+from src.utils.tracing import trace_file, trace_run
+
+# 设置日志记录
+logger = get_logger()
+
+# 默认同时分析的股票数量
+DEFAULT_BATCH_CONCURRENCY = 4
+
+
+def load_tickers(tickers: Optional[str] = None, ticker_file: Optional[str] = None) -> List[str]:
+    """合并命令行和文件中的股票代码，去重并保持顺序
+
+    文件中每行一个或多个（逗号、空白分隔）股票代码，# 之后为注释。
+    """
+    raw = []
+    if tickers:
+        raw.extend(tickers.split(','))
+    if ticker_file:
+        with open(ticker_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.split('#', 1)[0]
+                raw.extend(line.replace(',', ' ').split())
+
+    result = []
+    seen = set()
+    for ticker in (t.strip() for t in raw):
+        if ticker and ticker not in seen:
+            seen.add(ticker)
+            result.append(ticker)
+    return result
+
+
+def _result_record(ticker: str, started: float, content=None, error: Exception = None) -> dict:
+    """构造单只股票的结果记录"""
+    if error is not None:
+        logger.error(f"{ERROR_ICON} 分析 {ticker} 失败: {error}")
+        return {
+            "ticker": ticker,
+            "status": "error",
+            "error": str(error),
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+        }
+    try:
+        result = json.loads(content)
+    except (TypeError, ValueError):
+        result = content
+    return {
+        "ticker": ticker,
+        "status": "ok",
+        "result": result,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def analyse_ticker(app, ticker: str, **kwargs) -> dict:
+    """分析单只股票，失败时返回错误记录而不是抛出异常"""
+    started = time.perf_counter()
+    try:
+        return _result_record(ticker, started, run_hedge_fund(app=app, ticker=ticker, **kwargs))
+    except Exception as e:
+        return _result_record(ticker, started, error=e)
+
+
+async def analyse_ticker_async(app, ticker: str, **kwargs) -> dict:
+    """analyse_ticker 的异步版本"""
+    started = time.perf_counter()
+    try:
+        return _result_record(ticker, started, await run_hedge_fund_async(app=app, ticker=ticker, **kwargs))
+    except Exception as e:
+        return _result_record(ticker, started, error=e)
+
+
+def _prefetch_spot_snapshot():
+    # 预取全市场快照，避免第一批股票同时等待下载
+    try:
+        spot_snapshot.get_table()
+    except Exception as e:
+        logger.error(f"{ERROR_ICON} 预取实时行情快照失败，将在分析时重试: {e}")
+
+
+def run_batch(tickers: List[str], model: list, start_date: str, end_date: str, portfolio: dict,
+              show_reasoning: bool = False, num_of_news: int = 5,
+              max_concurrency: Optional[int] = None, app=None) -> Iterator[dict]:
+    """批量分析多只股票，按完成顺序逐条产出结果
+
+    工作流只构建一次，全市场实时行情快照在开始前预取，由所有股票共享；
+    最多同时分析 max_concurrency 只股票。
+
+    Args:
+        tickers: 股票代码列表
+        model: 使用的模型列表
+        start_date / end_date: 数据区间（YYYY-MM-DD）
+        portfolio: 每只股票使用的初始持仓
+        max_concurrency: 同时分析的股票数量，默认读取 BATCH_MAX_CONCURRENCY
+        app: 已编译的工作流，默认调用 build_hedge_workflow 构建
+
+    Yields:
+        dict: 每只股票一条结果记录
+    """
+    if not tickers:
+        return
+    if max_concurrency is None:
+        max_concurrency = int(os.getenv("BATCH_MAX_CONCURRENCY", DEFAULT_BATCH_CONCURRENCY))
+    max_concurrency = max(1, min(max_concurrency, len(tickers)))
+
+    app = app or build_hedge_workflow()
+
+    _prefetch_spot_snapshot()
+
+    logger.info(f"{WAIT_ICON} 开始批量分析 {len(tickers)} 只股票，并发数 {max_concurrency}")
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = [
+            executor.submit(
+                analyse_ticker, app, ticker,
+                model=model,
+                start_date=start_date,
+                end_date=end_date,
+                # 每只股票使用独立的持仓副本
+                portfolio=dict(portfolio),
+                show_reasoning=show_reasoning,
+                num_of_news=num_of_news,
+            )
+            for ticker in tickers
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+async def run_batch_async(tickers: List[str], model: list, start_date: str, end_date: str,
+                          portfolio: dict, show_reasoning: bool = False, num_of_news: int = 5,
+                          max_concurrency: Optional[int] = None, app=None) -> AsyncIterator[dict]:
+    """run_batch 的异步版本，所有股票的工作流共享当前事件循环
+
+    参数与 run_batch 相同，工作流通过 run_hedge_fund_async 执行，
+    同时分析的股票数量由信号量限制。
+
+    Yields:
+        dict: 每只股票一条结果记录，按完成顺序产出
+    """
+    if not tickers:
+        return
+    if max_concurrency is None:
+        max_concurrency = int(os.getenv("BATCH_MAX_CONCURRENCY", DEFAULT_BATCH_CONCURRENCY))
+    max_concurrency = max(1, min(max_concurrency, len(tickers)))
+
+    app = app or build_hedge_workflow()
+    await asyncio.to_thread(_prefetch_spot_snapshot)
+
+    logger.info(f"{WAIT_ICON} 开始异步批量分析 {len(tickers)} 只股票，并发数 {max_concurrency}")
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def analyse(ticker: str) -> dict:
+        async with semaphore:
+            return await analyse_ticker_async(
+                app, ticker,
+                model=model,
+                start_date=start_date,
+                end_date=end_date,
+                # 每只股票使用独立的持仓副本
+                portfolio=dict(portfolio),
+                show_reasoning=show_reasoning,
+                num_of_news=num_of_news,
+            )
+
+    for next_done in asyncio.as_completed([analyse(ticker) for ticker in tickers]):
+        yield await next_done
+
+
+if __name__ == "__main__":
+    logger.info("启动StockAgent批量分析...")
+
+    parser = argparse.ArgumentParser(
+        description='Run the hedge fund trading system on a list of tickers')
+    parser.add_argument('--tickers', type=str,
+                        help='Comma separated stock ticker symbols')
+    parser.add_argument('--ticker-file', type=str,
+                        help='File with one ticker per line, # starts a comment')
+    parser.add_argument('--start-date', type=str,
+                        help='Start date (YYYY-MM-DD). Defaults to 1 year before end date')
+    parser.add_argument('--end-date', type=str,
+                        help='End date (YYYY-MM-DD). Defaults to yesterday')
+    parser.add_argument('--show-reasoning', action='store_true',
+                        help='Show reasoning from each agent')
+    parser.add_argument('--num-of-news', type=int, default=5,
+                        help='Number of news articles to analyze for sentiment (default: 5)')
+    parser.add_argument('--initial-capital', type=float, default=100000.0,
+                        help='Initial cash amount per ticker (default: 100,000)')
+    parser.add_argument('--initial-position', type=int, default=0,
+                        help='Initial stock position per ticker (default: 0)')
+    parser.add_argument('--model', type=str, default='moonshot',
+                        help='Model to use for chat completion (default: moonshot), use comma to separate multiple models.')
+    parser.add_argument('--max-concurrency', type=int,
+                        help=f'Number of tickers analysed at the same time (default: {DEFAULT_BATCH_CONCURRENCY})')
+    parser.add_argument('--output', type=str,
+                        help='Append JSON lines to this file instead of stdout')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Run all tickers on one asyncio event loop')
+    parser.add_argument('--trace', type=str,
+                        help='Write a Chrome trace-event JSON of the whole batch to this path (default: $TRACE_FILE)')
+
+    args = parser.parse_args()
+
+    tickers = load_tickers(args.tickers, args.ticker_file)
+    if not tickers:
+        parser.error("at least one ticker is required (--tickers or --ticker-file)")
+    if not 1 <= args.num_of_news <= 100:
+        raise ValueError("Number of news articles must be between 1 and 100")
+
+    start_date, end_date = resolve_date_range(args.start_date, args.end_date)
+    logger.info("start_date: {}".format(start_date.strftime('%Y-%m-%d')))
+    logger.info("end_date: {}".format(end_date.strftime('%Y-%m-%d')))
+
+    output = open(args.output, 'a', encoding='utf-8') if args.output else sys.stdout
+    batch_kwargs = dict(
+        model=args.model.split(','),
+        start_date=start_date.strftime('%Y-%m-%d'),
+        end_date=end_date.strftime('%Y-%m-%d'),
+        portfolio={"cash": args.initial_capital, "stock": args.initial_position},
+        show_reasoning=args.show_reasoning,
+        num_of_news=args.num_of_news,
+        max_concurrency=args.max_concurrency,
+    )
+    succeeded = 0
+
+    def write_record(record: dict):
+        # 每完成一只股票立即输出一行 JSON
+        global succeeded
+        output.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        output.flush()
+        succeeded += record["status"] == "ok"
+
+    async def consume_async():
+        async for record in run_batch_async(tickers, **batch_kwargs):
+            write_record(record)
+
+    trace_path = trace_file(args.trace)
+    try:
+        with trace_run(trace_path):
+            if args.use_async:
+                asyncio.run(consume_async())
+            else:
+                for record in run_batch(tickers, **batch_kwargs):
+                    write_record(record)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    if trace_path:
+        logger.info(f"耗时追踪已写入 {trace_path}，可在 chrome://tracing 或 https://ui.perfetto.dev 中打开")
+
+    logger.info(f"{SUCCESS_ICON} 批量分析完成：成功 {succeeded} / {len(tickers)}")
@@ -0,0 +1,49 @@
+"""
+基准测试基线文件的读写与比较
+
+基线保存在 src/benchmarks/baselines/*.json 中，results 为 名称 -> 秒数。
+基线与机器相关，更换 CI 机器后用各基准测试的 --update-baseline 重新生成。
+"""
+import os
+import json
+import platform
+from datetime import datetime
+
+# 超过基线多少倍视为性能退化
+DEFAULT_TOLERANCE = 1.5
+
+# 基线文件目录
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+
+def load_baseline(path: str) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("results", {})
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(results: dict, path: str, settings: dict = None):
+    """保存基线，只覆盖本次运行的项目"""
+    merged = {**load_baseline(path), **results}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            "machine": f"{platform.machine()} {platform.system()} Python {platform.python_version()}",
+            "updated_at": datetime.now().strftime("%Y-%m-%d"),
+            "settings": settings or {},
+            "results": dict(sorted(merged.items())),
+        }, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """逐项与基线比较，没有基线的项目不判定退化"""
+    rows = []
+    for name, seconds in results.items():
+        reference = baseline.get(name)
+        ratio = seconds / reference if reference else None
+        rows.append({"name": name, "seconds": seconds, "baseline": reference, "ratio": ratio,
+                     "ok": ratio is None or ratio <= tolerance})
+    return rows
@@ -0,0 +1,81 @@
+"""
+滚动 Hurst 指数基准测试
+
+对比 get_price_history 原先的 rolling.apply 实现与 src.utils.indicators.rolling_hurst，
+默认使用 10 年（约 2520 个交易日）的模拟日线数据。
+
+用法：
+    poetry run python -m src.benchmarks.bench_hurst --years 10 --repeat 3
+"""
+import argparse
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from src.benchmarks.legacy import legacy_rolling_hurst
+from src.utils.indicators import rolling_hurst
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def make_log_returns(num_bars: int, seed: int = 42) -> pd.Series:
+    """生成带停牌（价格不变）区间的模拟收盘价，并返回对数收益率"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, num_bars)))
+    for start in rng.integers(0, num_bars - 5, size=max(num_bars // 500, 1)):
+        close[start:start + 5] = close[start]
+    close = pd.Series(close)
+    return np.log(close / close.shift(1))
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run_benchmark(years: int = 10, repeat: int = 3) -> dict:
+    log_returns = make_log_returns(years * TRADING_DAYS_PER_YEAR)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        # 旧实现耗时较长，只运行一次
+        start = time.perf_counter()
+        legacy = legacy_rolling_hurst(log_returns).values
+        legacy_time = time.perf_counter() - start
+
+        vectorized = rolling_hurst(log_returns.values)
+        vectorized_time = best_of(lambda: rolling_hurst(log_returns.values), repeat)
+
+    same_nan = bool(np.array_equal(np.isnan(legacy), np.isnan(vectorized)))
+    max_abs_diff = float(np.nanmax(np.abs(legacy - vectorized)))
+
+    return {
+        "bars": len(log_returns),
+        "legacy_seconds": legacy_time,
+        "vectorized_seconds": vectorized_time,
+        "speedup": legacy_time / vectorized_time,
+        "same_nan_mask": same_nan,
+        "max_abs_diff": max_abs_diff,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='滚动 Hurst 指数基准测试')
+    parser.add_argument('--years', type=int, default=10,
+                        help='模拟数据的年数 (默认: 10)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='向量化实现的重复次数，取最快一次 (默认: 3)')
+    args = parser.parse_args()
+
+    result = run_benchmark(args.years, args.repeat)
+    print(f"数据长度: {result['bars']} 个交易日")
+    print(f"rolling.apply 实现: {result['legacy_seconds'] * 1000:.1f} ms")
+    print(f"向量化实现: {result['vectorized_seconds'] * 1000:.2f} ms")
+    print(f"加速比: {result['speedup']:.0f}x")
+    print(f"NaN 位置一致: {result['same_nan_mask']}，最大绝对误差: {result['max_abs_diff']:.2e}")
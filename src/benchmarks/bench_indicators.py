@@ -0,0 +1,146 @@
+"""
+技术指标基准测试
+
+对比 src/agents/technicals.py 原先的 pandas 实现（src.benchmarks.legacy）与
+src.utils.indicators 中的 NumPy 内核，默认在 1k、10k、100k 根 K 线上运行，并校验
+两者结果一致。
+
+用法：
+    poetry run python -m src.benchmarks.bench_indicators --bars 1000 10000 100000 --repeat 5
+"""
+import argparse
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from src.benchmarks import legacy
+from src.benchmarks.bench_hurst import best_of
+from src.utils import indicators
+
+# 逐行 .iloc 的 OBV 原实现在大数据量下耗时很长，超过该长度时只运行一次
+LEGACY_SINGLE_RUN_BARS = 20000
+
+
+def make_ohlcv(num_bars: int, seed: int = 42) -> pd.DataFrame:
+    """生成带停牌（价格不变）区间的模拟 OHLCV 数据"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, num_bars)))
+    for start in rng.integers(0, num_bars - 5, size=max(num_bars // 500, 1)):
+        close[start:start + 5] = close[start]
+    spread = np.abs(rng.normal(0, 0.01, num_bars))
+    return pd.DataFrame({
+        "open": close * (1 + rng.normal(0, 0.005, num_bars)),
+        "high": close * (1 + spread),
+        "low": close * (1 - spread),
+        "close": close,
+        "volume": rng.integers(100_000, 10_000_000, num_bars).astype(np.float64),
+    })
+
+
+def make_cases(df: pd.DataFrame) -> dict:
+    """指标名 -> (原实现, NumPy 内核, 结果转换为数组列表的函数)
+
+    会向输入写入列的原实现使用副本，避免影响后续用例。
+    """
+    high = df["high"].to_numpy()
+    low = df["low"].to_numpy()
+    close = df["close"].to_numpy()
+    volume = df["volume"].to_numpy()
+
+    return {
+        "ema": (
+            lambda: legacy.legacy_ema(df, 21),
+            lambda: indicators.ema(close, 21),
+            lambda result: [result],
+        ),
+        "macd": (
+            lambda: legacy.legacy_macd(df),
+            lambda: indicators.macd(close),
+            lambda result: list(result),
+        ),
+        "rsi": (
+            lambda: legacy.legacy_rsi(df, 14),
+            lambda: indicators.rsi(close, 14),
+            lambda result: [result],
+        ),
+        "bollinger": (
+            lambda: legacy.legacy_bollinger_bands(df),
+            lambda: indicators.bollinger_bands(close)[::2],
+            lambda result: list(result),
+        ),
+        "obv": (
+            lambda: legacy.legacy_obv(df.copy()),
+            lambda: indicators.obv(close, volume),
+            lambda result: [result],
+        ),
+        "atr": (
+            lambda: legacy.legacy_atr(df, 14, 7),
+            lambda: indicators.atr(high, low, close, 14, 7),
+            lambda result: [result],
+        ),
+        "adx": (
+            lambda: legacy.legacy_adx(df.copy(), 14),
+            lambda: indicators.adx(high, low, close, 14),
+            lambda result: ([result[c] for c in ["adx", "+di", "-di"]]
+                            if isinstance(result, pd.DataFrame) else list(result)),
+        ),
+        "ichimoku": (
+            lambda: legacy.legacy_ichimoku(df),
+            lambda: indicators.ichimoku(high, low, close),
+            lambda result: [result[k] for k in sorted(result)],
+        ),
+    }
+
+
+def max_scaled_diff(expected: list, actual: list, scale: np.ndarray) -> float:
+    """按价格水平归一化的最大绝对误差，NaN 位置不一致时返回 inf"""
+    worst = 0.0
+    for e, a in zip(expected, actual):
+        e = np.asarray(e, dtype=np.float64)
+        a = np.asarray(a, dtype=np.float64)
+        if not np.array_equal(np.isnan(e), np.isnan(a)):
+            return float("inf")
+        mask = np.isfinite(e)
+        if mask.any():
+            worst = max(worst, float(np.max(np.abs(e[mask] - a[mask]) / scale[mask])))
+    return worst
+
+
+def run_benchmark(bars=(1000, 10000, 100000), repeat: int = 5) -> list:
+    results = []
+    for num_bars in bars:
+        df = make_ohlcv(num_bars)
+        scale = np.maximum(df["close"].to_numpy(), 1.0)
+        legacy_repeat = 1 if num_bars > LEGACY_SINGLE_RUN_BARS else repeat
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            for name, (legacy_func, kernel_func, to_arrays) in make_cases(df).items():
+                legacy_time = best_of(legacy_func, legacy_repeat)
+                kernel_time = best_of(kernel_func, repeat)
+                diff = max_scaled_diff(to_arrays(legacy_func()), to_arrays(kernel_func()), scale)
+                results.append({
+                    "indicator": name,
+                    "bars": num_bars,
+                    "legacy_seconds": legacy_time,
+                    "numpy_seconds": kernel_time,
+                    "speedup": legacy_time / kernel_time,
+                    "max_scaled_diff": diff,
+                })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='技术指标基准测试')
+    parser.add_argument('--bars', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='模拟数据的 K 线数量 (默认: 1000 10000 100000)')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='重复次数，取最快一次 (默认: 5)')
+    args = parser.parse_args()
+
+    print(f"{'指标':<10}{'K线数':>8}{'pandas(ms)':>14}{'numpy(ms)':>12}{'加速比':>10}{'最大误差':>12}")
+    for row in run_benchmark(args.bars, args.repeat):
+        print(f"{row['indicator']:<10}{row['bars']:>8}"
+              f"{row['legacy_seconds'] * 1000:>14.2f}{row['numpy_seconds'] * 1000:>12.2f}"
+              f"{row['speedup']:>9.1f}x{row['max_scaled_diff']:>12.1e}")
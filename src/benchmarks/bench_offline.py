@@ -0,0 +1,216 @@
+"""
+离线基准测试套件
+
+在合成市场数据（src.benchmarks.synthetic）和本地 stub 模型上运行，不需要网络和 API 密钥：
+- indicators: 各技术指标内核
+- agent.*: 每个智能体单独运行（输入为同一份市场数据状态）
+- graph.cold / graph.warm: 完整的 build_hedge_workflow 工作流，首次运行（缓存为空）与之后的运行
+- backtest.*: Backtester 逐日调用工作流回测 N 个交易日，以及不调用 LLM 的快速回测
+
+结果与 src/benchmarks/baselines/offline.json 中保存的基线比较，任一项超过基线的
+tolerance 倍时以非零状态退出。基线与机器相关，更换 CI 机器后用 --update-baseline 重新生成。
+
+--cassette 指定用 `src/main.py --record` 录制的磁带时，agents 与 graph 两组改为回放其中的
+真实行情、新闻和模型回复（src.utils.cassette），按 CPU 速度重跑这次运行。
+
+用法：
+    poetry run python -m src.benchmarks.bench_offline
+    poetry run python -m src.benchmarks.bench_offline --only graph,backtest --days 60
+    poetry run python -m src.benchmarks.bench_offline --update-baseline
+    poetry run python -m src.benchmarks.bench_offline --only agents,graph --cassette cassettes/600519.cassette
+"""
+import io
+import os
+import sys
+import time
+import logging
+import argparse
+import warnings
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from src.benchmarks.baseline import BASELINE_DIR, DEFAULT_TOLERANCE, compare, load_baseline, save_baseline
+from src.benchmarks.bench_hurst import best_of
+from src.benchmarks.bench_indicators import make_cases, make_ohlcv
+from src.benchmarks.synthetic import SyntheticMarket, offline_environment
+from src.utils.cassette import use_cassette
+from src.utils.news_crawler import get_stock_news
+
+# 基线文件
+BASELINE_FILE = os.path.join(BASELINE_DIR, "offline.json")
+
+# 所有基准测试组
+GROUPS = ("indicators", "agents", "graph", "backtest")
+
+# 单独运行的智能体，按工作流中的顺序（后面的智能体需要前面智能体的输出）
+AGENT_NAMES = ("technical_analyst_agent", "fundamentals_agent", "sentiment_agent",
+               "valuation_agent", "risk_management_agent", "portfolio_management_agent")
+
+BENCH_TICKER = "600519"
+BENCH_MODEL = ["stub"]
+BENCH_PORTFOLIO = {"cash": 100000.0, "stock": 0}
+
+# 合成数据上的单次运行参数，回放磁带时使用录制时的参数
+BENCH_RUN = {"ticker": BENCH_TICKER, "model": BENCH_MODEL, "portfolio": BENCH_PORTFOLIO,
+             "start_date": None, "end_date": None, "num_of_news": 5}
+
+
+def _end_date() -> str:
+    return (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def bench_indicators(bars: int = 10000, repeat: int = 5) -> dict:
+    """各技术指标 NumPy 内核的耗时"""
+    cases = make_cases(make_ohlcv(bars))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return {f"indicators.{name}": best_of(kernel, repeat)
+                for name, (_, kernel, _) in cases.items()}
+
+
+def bench_agents(run: dict = BENCH_RUN, repeat: int = 5) -> dict:
+    """每个智能体在同一份市场数据状态上单独运行的耗时"""
+    from src.agents.market_data import market_data_agent
+    from src import main
+
+    nodes = {name: getattr(main, name) for name in AGENT_NAMES}
+    state = main._initial_state(run["model"], run["ticker"], run["start_date"], run["end_date"] or _end_date(),
+                                dict(run["portfolio"]), False, run["num_of_news"], None, None)
+    # 首次运行填充行情、财务和新闻缓存，之后测量缓存命中时的耗时
+    market_data_agent(state)
+    results = {"agent.market_data_agent": best_of(lambda: market_data_agent(state), repeat)}
+    # 与工作流一致，节点输出合并到状态中
+    state = {**state, **market_data_agent(state)}
+
+    for name in AGENT_NAMES:
+        node = nodes[name]
+        output = node(state)
+        results[f"agent.{name}"] = best_of(lambda: node(state), repeat)
+        # 分析师节点只返回新消息，风险管理与投资组合管理节点返回完整消息列表
+        messages = output["messages"]
+        if name not in ("risk_management_agent", "portfolio_management_agent"):
+            messages = state["messages"] + messages
+        state = {**state, "messages": messages, "data": {**state["data"], **output.get("data", {})}}
+    return results
+
+
+def bench_graph(run: dict = BENCH_RUN, repeat: int = 5) -> dict:
+    """完整工作流的首次运行与缓存命中后的耗时"""
+    from src.main import build_hedge_workflow, run_hedge_fund
+
+    app = build_hedge_workflow()
+
+    def invoke():
+        return run_hedge_fund(app, run["model"], run["ticker"], run["start_date"], run["end_date"] or _end_date(),
+                              dict(run["portfolio"]), num_of_news=run["num_of_news"])
+
+    started = time.perf_counter()
+    invoke()
+    return {"graph.cold": time.perf_counter() - started, "graph.warm": best_of(invoke, repeat)}
+
+
+def bench_backtest(days: int = 20) -> dict:
+    """Backtester 逐日运行工作流回测 days 个交易日，以及同一区间的快速回测"""
+    from src.backtester import Backtester
+    from src.main import build_hedge_workflow, run_hedge_fund
+
+    end = pd.Timestamp(_end_date())
+    start = (end - pd.offsets.BDay(days - 1)).strftime("%Y-%m-%d")
+    end = end.strftime("%Y-%m-%d")
+    app = build_hedge_workflow()
+
+    results = {}
+    for name, run in (("backtest.workflow", lambda b: b.run_backtest()),
+                      ("backtest.fast", lambda b: b.run_fast_backtest())):
+        backtester = Backtester(agent=run_hedge_fund, ticker=BENCH_TICKER, start_date=start,
+                                end_date=end, initial_capital=BENCH_PORTFOLIO["cash"],
+                                num_of_news=5, model=BENCH_MODEL, app=app)
+        started = time.perf_counter()
+        # 回测逐日打印交易记录，测量时不输出
+        with redirect_stdout(io.StringIO()):
+            run(backtester)
+        results[name] = time.perf_counter() - started
+    return results
+
+
+@contextmanager
+def data_environment(cassette: str = None):
+    """合成数据环境，或者回放磁带中录制的一次真实运行，返回运行参数"""
+    if cassette is None:
+        with offline_environment(SyntheticMarket()):
+            # 历史时点的新闻只从存档中查询，先抓取一次把合成新闻写入存档
+            get_stock_news(BENCH_TICKER, 1)
+            yield BENCH_RUN
+    else:
+        with use_cassette(cassette, "replay") as recorded:
+            yield {**BENCH_RUN, **recorded.meta.get("run", {})}
+
+
+def run_suite(groups=GROUPS, repeat: int = 5, days: int = 20, bars: int = 10000, cassette: str = None) -> dict:
+    """在新的数据环境中依次运行各组基准测试，返回名称到耗时（秒）的映射
+
+    指定 cassette 时 agents 与 graph 两组回放磁带中录制的运行，backtest 组仍使用合成数据。
+    """
+    results = {}
+    if "indicators" in groups:
+        results.update(bench_indicators(bars, repeat))
+    # 每组使用独立的数据目录，graph.cold 总是从空缓存开始
+    for group, bench in (("agents", lambda run: bench_agents(run, repeat)),
+                         ("graph", lambda run: bench_graph(run, repeat))):
+        if group in groups:
+            with data_environment(cassette) as run:
+                results.update(bench(run))
+    if "backtest" in groups:
+        with data_environment():
+            results.update(bench_backtest(days))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='离线基准测试套件（合成数据 + stub 模型）')
+    parser.add_argument('--only', type=str,
+                        help=f'逗号分隔的测试组 (默认: {",".join(GROUPS)})')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='重复次数，取最快一次 (默认: 5)')
+    parser.add_argument('--days', type=int, default=20,
+                        help='回测的交易日数量 (默认: 20)')
+    parser.add_argument('--bars', type=int, default=10000,
+                        help='技术指标测试的 K 线数量 (默认: 10000)')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'超过基线多少倍视为退化 (默认: {DEFAULT_TOLERANCE})')
+    parser.add_argument('--baseline', type=str,
+                        help='基线文件路径 (默认: baselines/offline.json，回放磁带时为 baselines/<磁带名>.json)')
+    parser.add_argument('--cassette', type=str,
+                        help='agents 与 graph 两组改为回放该磁带中录制的真实运行')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='把本次结果写入基线文件')
+    parser.add_argument('--verbose', action='store_true',
+                        help='输出运行日志 (默认只输出警告和错误)')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        # 各 logger 在首次使用时才设置级别，这里全局屏蔽 INFO 及以下的日志
+        logging.disable(logging.INFO)
+
+    groups = args.only.split(',') if args.only else GROUPS
+    if args.baseline is None:
+        # 真实数据与合成数据的耗时不可比，回放磁带时使用单独的基线
+        args.baseline = BASELINE_FILE if args.cassette is None else os.path.join(
+            os.path.dirname(BASELINE_FILE), os.path.basename(args.cassette).split('.')[0] + ".json")
+    results = run_suite(groups, args.repeat, args.days, args.bars, args.cassette)
+
+    if args.update_baseline:
+        save_baseline(results, args.baseline,
+                      {"repeat": args.repeat, "days": args.days, "bars": args.bars})
+        print(f"基线已更新: {args.baseline}")
+
+    rows = compare(results, load_baseline(args.baseline), args.tolerance)
+    print(f"{'名称':<40}{'耗时(ms)':>12}{'基线(ms)':>12}{'比值':>8}")
+    for row in rows:
+        baseline = f"{row['baseline'] * 1000:.2f}" if row["baseline"] else "-"
+        ratio = f"{row['ratio']:.2f}" if row["ratio"] is not None else "-"
+        status = "" if row["ok"] else "  退化"
+        print(f"{row['name']:<40}{row['seconds'] * 1000:>12.2f}{baseline:>12}{ratio:>8}{status}")
+    sys.exit(0 if all(row["ok"] for row in rows) else 1)
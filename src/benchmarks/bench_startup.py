@@ -0,0 +1,102 @@
+"""
+命令行入口启动耗时基准测试
+
+在全新的解释器中分别导入各入口模块，记录导入耗时（取多次中最快的一次）以及
+导入后已经加载的重量级依赖。akshare、openai、google-genai、langgraph、matplotlib
+应当在首次使用时才导入；任一入口在导入阶段加载了这些依赖，或耗时超过
+src/benchmarks/baselines/startup.json 中基线的 tolerance 倍，以非零状态退出，
+可直接用于 CI 检查启动耗时是否退化。基线与机器相关，更换 CI 机器后用 --update-baseline 重新生成。
+
+用法：
+    poetry run python -m src.benchmarks.bench_startup --repeat 5
+    poetry run python -m src.benchmarks.bench_startup --repeat 5 --update-baseline
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+from src.benchmarks.baseline import BASELINE_DIR, DEFAULT_TOLERANCE, compare, load_baseline, save_baseline
+
+# 基线文件
+BASELINE_FILE = os.path.join(BASELINE_DIR, "startup.json")
+
+# 命令行入口模块
+ENTRY_MODULES = ("src.main", "src.backtester", "src.batch", "src.backtest_runner", "src.server")
+
+# 只应在首次使用时才导入的依赖
+DEFERRED_MODULES = ("akshare", "openai", "google.genai", "langgraph.graph", "matplotlib")
+
+_PROBE = """
+import sys, json, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+loaded = [name for name in {deferred!r} if name in sys.modules]
+print("\\n" + json.dumps({{"seconds": elapsed, "loaded": loaded}}))
+"""
+
+
+def _project_root() -> str:
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def measure_import(module: str, repeat: int = 3) -> dict:
+    """在全新的解释器中导入模块，返回最快一次的耗时和已加载的重量级依赖"""
+    env = dict(os.environ, PYTHONPATH=_project_root())
+    timings = []
+    loaded = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, deferred=DEFERRED_MODULES)],
+            cwd=_project_root(), env=env, capture_output=True, text=True, check=True)
+        # 入口模块导入时会初始化日志并输出到标准输出，结果在最后一行
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        timings.append(result["seconds"])
+        loaded = result["loaded"]
+    return {"module": module, "seconds": min(timings), "loaded": loaded}
+
+
+def run_benchmark(modules=None, repeat: int = 3) -> list:
+    """测量各入口模块的导入耗时和提前加载的重量级依赖"""
+    return [measure_import(module, repeat) for module in modules or ENTRY_MODULES]
+
+
+def check(results: list, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """与基线比较，超过基线 tolerance 倍或提前加载了重量级依赖的模块判定为退化"""
+    rows = compare({result["module"]: result["seconds"] for result in results}, baseline, tolerance)
+    for row, result in zip(rows, results):
+        row["loaded"] = result["loaded"]
+        row["ok"] = row["ok"] and not result["loaded"]
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='命令行入口启动耗时基准测试')
+    parser.add_argument('--modules', type=str,
+                        help='逗号分隔的模块名 (默认: 全部入口模块)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='每个模块的导入次数，取最快一次 (默认: 3)')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'超过基线多少倍视为退化 (默认: {DEFAULT_TOLERANCE})')
+    parser.add_argument('--baseline', type=str, default=BASELINE_FILE,
+                        help='基线文件路径 (默认: baselines/startup.json)')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='用本次结果更新基线文件')
+    args = parser.parse_args()
+
+    results = run_benchmark(args.modules.split(',') if args.modules else None, args.repeat)
+    if args.update_baseline:
+        save_baseline({result["module"]: result["seconds"] for result in results}, args.baseline,
+                      {"repeat": args.repeat})
+        print(f"基线已更新: {args.baseline}")
+
+    rows = check(results, load_baseline(args.baseline), args.tolerance)
+    for row in rows:
+        status = "OK" if row["ok"] else "FAIL"
+        baseline = f"{row['baseline'] * 1000:.0f} ms" if row["baseline"] else "-"
+        loaded = f"  提前加载: {', '.join(row['loaded'])}" if row["loaded"] else ""
+        print(f"{status:<5} {row['name']:<22} {row['seconds'] * 1000:8.1f} ms"
+              f"  (基线 {baseline}){loaded}")
+    sys.exit(0 if all(row["ok"] for row in rows) else 1)
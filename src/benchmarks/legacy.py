@@ -0,0 +1,162 @@
+"""
+旧版 pandas 指标实现
+
+保留原样，仅用于基准测试对比和数值一致性校验，业务代码不应再引用。
+"""
+import numpy as np
+import pandas as pd
+
+
+def legacy_rolling_hurst(log_returns: pd.Series, window: int = 120, min_periods: int = 60) -> pd.Series:
+    """get_price_history 中原先逐窗口回调的 Hurst 指数实现"""
+    def calculate_hurst(series):
+        try:
+            series = series.dropna()
+            if len(series) < 30:
+                return np.nan
+
+            log_returns = np.log(series / series.shift(1)).dropna()
+            if len(log_returns) < 30:
+                return np.nan
+
+            lags = range(2, min(11, len(log_returns) // 4))
+
+            tau = []
+            for lag in lags:
+                std = log_returns.rolling(window=lag).std().dropna()
+                if len(std) > 0:
+                    tau.append(np.mean(std))
+
+            if len(tau) < 3:
+                return np.nan
+
+            lags_log = np.log(list(lags))
+            tau_log = np.log(tau)
+
+            reg = np.polyfit(lags_log, tau_log, 1)
+            hurst = reg[0] / 2.0
+
+            if np.isnan(hurst) or np.isinf(hurst):
+                return np.nan
+
+            return hurst
+
+        except Exception:
+            return np.nan
+
+    return log_returns.rolling(window=window, min_periods=min_periods).apply(calculate_hurst)
+
+
+# 以下为 src/agents/technicals.py 中原先的 pandas 实现，输入为含 OHLCV 列的 DataFrame
+
+def legacy_macd(prices_df: pd.DataFrame) -> tuple[pd.Series, pd.Series]:
+    ema_12 = prices_df['close'].ewm(span=12, adjust=False).mean()
+    ema_26 = prices_df['close'].ewm(span=26, adjust=False).mean()
+    macd_line = ema_12 - ema_26
+    signal_line = macd_line.ewm(span=9, adjust=False).mean()
+    return macd_line, signal_line
+
+
+def legacy_rsi(prices_df: pd.DataFrame, period: int = 14) -> pd.Series:
+    delta = prices_df['close'].diff()
+    gain = (delta.where(delta > 0, 0)).fillna(0)
+    loss = (-delta.where(delta < 0, 0)).fillna(0)
+    avg_gain = gain.rolling(window=period).mean()
+    avg_loss = loss.rolling(window=period).mean()
+    rs = avg_gain / avg_loss
+    rsi = 100 - (100 / (1 + rs))
+    return rsi
+
+
+def legacy_bollinger_bands(prices_df: pd.DataFrame, window: int = 20) -> tuple[pd.Series, pd.Series]:
+    sma = prices_df['close'].rolling(window).mean()
+    std_dev = prices_df['close'].rolling(window).std()
+    upper_band = sma + (std_dev * 2)
+    lower_band = sma - (std_dev * 2)
+    return upper_band, lower_band
+
+
+def legacy_ema(df: pd.DataFrame, window: int) -> pd.Series:
+    return df['close'].ewm(span=window, adjust=False).mean()
+
+
+def legacy_adx(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
+    """原实现会向输入写入临时列，这里保持原样"""
+    df['high_low'] = df['high'] - df['low']
+    df['high_close'] = abs(df['high'] - df['close'].shift())
+    df['low_close'] = abs(df['low'] - df['close'].shift())
+    df['tr'] = df[['high_low', 'high_close', 'low_close']].max(axis=1)
+
+    df['up_move'] = df['high'] - df['high'].shift()
+    df['down_move'] = df['low'].shift() - df['low']
+
+    df['plus_dm'] = np.where(
+        (df['up_move'] > df['down_move']) & (df['up_move'] > 0),
+        df['up_move'],
+        0
+    )
+    df['minus_dm'] = np.where(
+        (df['down_move'] > df['up_move']) & (df['down_move'] > 0),
+        df['down_move'],
+        0
+    )
+
+    df['+di'] = 100 * (df['plus_dm'].ewm(span=period).mean() /
+                       df['tr'].ewm(span=period).mean())
+    df['-di'] = 100 * (df['minus_dm'].ewm(span=period).mean() /
+                       df['tr'].ewm(span=period).mean())
+    df['dx'] = 100 * abs(df['+di'] - df['-di']) / (df['+di'] + df['-di'])
+    df['adx'] = df['dx'].ewm(span=period).mean()
+
+    return df[['adx', '+di', '-di']]
+
+
+def legacy_ichimoku(df: pd.DataFrame) -> dict:
+    period9_high = df['high'].rolling(window=9).max()
+    period9_low = df['low'].rolling(window=9).min()
+    tenkan_sen = (period9_high + period9_low) / 2
+
+    period26_high = df['high'].rolling(window=26).max()
+    period26_low = df['low'].rolling(window=26).min()
+    kijun_sen = (period26_high + period26_low) / 2
+
+    senkou_span_a = ((tenkan_sen + kijun_sen) / 2).shift(26)
+
+    period52_high = df['high'].rolling(window=52).max()
+    period52_low = df['low'].rolling(window=52).min()
+    senkou_span_b = ((period52_high + period52_low) / 2).shift(26)
+
+    chikou_span = df['close'].shift(-26)
+
+    return {
+        'tenkan_sen': tenkan_sen,
+        'kijun_sen': kijun_sen,
+        'senkou_span_a': senkou_span_a,
+        'senkou_span_b': senkou_span_b,
+        'chikou_span': chikou_span
+    }
+
+
+def legacy_atr(df: pd.DataFrame, period: int = 14, min_periods: int = 7) -> pd.Series:
+    high_low = df['high'] - df['low']
+    high_close = abs(df['high'] - df['close'].shift())
+    low_close = abs(df['low'] - df['close'].shift())
+
+    ranges = pd.concat([high_low, high_close, low_close], axis=1)
+    true_range = ranges.max(axis=1)
+
+    return true_range.rolling(period, min_periods=min_periods).mean()
+
+
+def legacy_obv(prices_df: pd.DataFrame) -> pd.Series:
+    """原实现会向输入写入 OBV 列，这里保持原样"""
+    obv = [0]
+    for i in range(1, len(prices_df)):
+        if prices_df['close'].iloc[i] > prices_df['close'].iloc[i - 1]:
+            obv.append(obv[-1] + prices_df['volume'].iloc[i])
+        elif prices_df['close'].iloc[i] < prices_df['close'].iloc[i - 1]:
+            obv.append(obv[-1] - prices_df['volume'].iloc[i])
+        else:
+            obv.append(obv[-1])
+    prices_df['OBV'] = obv
+    return prices_df['OBV']
@@ -0,0 +1,215 @@
+"""
+合成市场数据
+
+SyntheticMarket 提供与 akshare 同名、同列名的数据函数（日线行情、全市场实时行情、
+新浪财务报表与财务指标、个股新闻），数据由股票代码确定性地生成；offline_environment
+用它替换各模块中的 akshare，并把行情、财务、新闻和各类缓存指向临时目录，
+配合 stub 模型即可在没有网络的机器上完整运行工作流和回测。
+
+用法：
+    with offline_environment() as market:
+        run_hedge_fund(build_hedge_workflow(), ["stub"], "600519", ...)
+"""
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.utils.cassette import isolated_environment
+
+# 合成行情的起始日期，同一股票在任意区间内的价格都来自同一条路径
+EPOCH = "2010-01-04"
+
+# 全市场实时行情表的默认股票数量（与 A 股数量级相当）
+DEFAULT_UNIVERSE_SIZE = 5000
+
+# 资产负债表 / 利润表 / 现金流量表中 api 使用的科目及其相对营业收入的比例
+REPORT_ITEMS = {
+    "资产负债表": {"流动资产合计": 1.6, "流动负债合计": 0.9},
+    "利润表": {"营业总收入": 1.0, "营业利润": 0.22, "净利润": 0.17},
+    "现金流量表": {
+        "经营活动产生的现金流量净额": 0.2,
+        "购建固定资产、无形资产和其他长期资产支付的现金": -0.06,
+        "固定资产折旧、油气资产折耗、生产性生物资产折旧": 0.03,
+    },
+}
+
+# 新浪财务指标中 api 使用的列及其取值范围
+INDICATOR_RANGES = {
+    "净资产收益率(%)": (2.0, 30.0),
+    "销售净利率(%)": (5.0, 40.0),
+    "营业利润率(%)": (8.0, 50.0),
+    "主营业务收入增长率(%)": (-10.0, 40.0),
+    "净利润增长率(%)": (-20.0, 50.0),
+    "净资产增长率(%)": (-5.0, 25.0),
+    "流动比率": (0.8, 3.0),
+    "资产负债率(%)": (20.0, 70.0),
+    "每股经营性现金流(元)": (0.1, 5.0),
+    "加权每股收益(元)": (0.1, 8.0),
+}
+
+
+def symbol_seed(symbol: str, salt: str = "") -> int:
+    """由股票代码得到确定性的随机种子"""
+    return int(hashlib.sha256(f"{salt}{symbol}".encode("utf-8")).hexdigest()[:8], 16)
+
+
+def _strip_market(symbol: str) -> str:
+    """新浪接口的代码带有 sh / sz 前缀"""
+    return symbol[2:] if symbol[:2] in ("sh", "sz", "bj") else symbol
+
+
+class SyntheticMarket:
+    """与 akshare 接口相同的确定性合成数据源
+
+    Args:
+        universe_size: 全市场实时行情表的股票数量
+        news_days: 每只股票生成新闻的天数（截至今天）
+        news_per_day: 每天的新闻条数
+        quarters: 财务报表和财务指标的报告期数量
+    """
+
+    def __init__(self, universe_size: int = DEFAULT_UNIVERSE_SIZE, news_days: int = 400,
+                 news_per_day: int = 1, quarters: int = 12):
+        self.universe_size = universe_size
+        self.news_days = news_days
+        self.news_per_day = news_per_day
+        self.quarters = quarters
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def ohlcv(self, symbol: str) -> pd.DataFrame:
+        """从 EPOCH 到今天的完整日线路径，按股票代码缓存"""
+        with self._lock:
+            if symbol not in self._series:
+                self._series[symbol] = self._generate_ohlcv(symbol)
+            return self._series[symbol]
+
+    @staticmethod
+    def _generate_ohlcv(symbol: str) -> pd.DataFrame:
+        dates = pd.bdate_range(EPOCH, datetime.now().date())
+        n = len(dates)
+        rng = np.random.default_rng(symbol_seed(symbol, "ohlcv"))
+        start_price = 5 + rng.random() * 95
+        close = start_price * np.exp(np.cumsum(rng.normal(0.0002, 0.02, n)))
+        prev_close = np.concatenate([[close[0]], close[:-1]])
+        open_ = prev_close * (1 + rng.normal(0, 0.006, n))
+        spread = np.abs(rng.normal(0, 0.012, n))
+        high = np.maximum(open_, close) * (1 + spread)
+        low = np.minimum(open_, close) * (1 - spread)
+        volume = rng.integers(50_000, 2_000_000, n).astype(np.float64)
+        return pd.DataFrame({
+            "日期": dates.strftime("%Y-%m-%d"),
+            "开盘": open_.round(2),
+            "收盘": close.round(2),
+            "最高": high.round(2),
+            "最低": low.round(2),
+            "成交量": volume,
+            "成交额": (volume * 100 * close).round(2),
+            "振幅": ((high - low) / prev_close * 100).round(2),
+            "涨跌幅": ((close / prev_close - 1) * 100).round(2),
+            "涨跌额": (close - prev_close).round(2),
+            "换手率": (volume / 1e6).round(2),
+        })
+
+    # ---- 与 akshare 同名的数据函数 ----
+
+    def stock_zh_a_hist(self, symbol: str, period: str = "daily", start_date: str = "19700101",
+                        end_date: str = "20500101", adjust: str = "") -> pd.DataFrame:
+        df = self.ohlcv(symbol)
+        start = f"{start_date[:4]}-{start_date[4:6]}-{start_date[6:]}"
+        end = f"{end_date[:4]}-{end_date[4:6]}-{end_date[6:]}"
+        return df[(df["日期"] >= start) & (df["日期"] <= end)].reset_index(drop=True)
+
+    def universe(self) -> list:
+        """全市场股票代码：沪市主板、深市主板和创业板各占三分之一"""
+        per_board = -(-self.universe_size // 3)
+        codes = [f"{prefix + i:06d}" for prefix in (600000, 1, 300001) for i in range(per_board)]
+        return codes[:self.universe_size]
+
+    def stock_zh_a_spot_em(self) -> pd.DataFrame:
+        codes = self.universe()
+        n = len(codes)
+        rng = np.random.default_rng(symbol_seed("spot"))
+        price = 5 + rng.random(n) * 95
+        shares = rng.integers(100_000_000, 5_000_000_000, n).astype(np.float64)
+        return pd.DataFrame({
+            "代码": codes,
+            "名称": [f"合成{code}" for code in codes],
+            "最新价": price.round(2),
+            "成交量": rng.integers(10_000, 5_000_000, n).astype(np.float64),
+            "总市值": (price * shares).round(0),
+            "流通市值": (price * shares * 0.8).round(0),
+            "市盈率-动态": (5 + rng.random(n) * 60).round(2),
+            "市净率": (0.5 + rng.random(n) * 8).round(2),
+            "52周最高": (price * 1.3).round(2),
+            "52周最低": (price * 0.7).round(2),
+        })
+
+    def _report_periods(self) -> list:
+        """最近 quarters 个已披露的报告期，从新到旧（按报告期结束后 60 天披露估算）"""
+        cutoff = datetime.now().date() - timedelta(days=60)
+        year, quarter = cutoff.year, (cutoff.month - 1) // 3
+        periods = []
+        for _ in range(self.quarters):
+            if quarter == 0:
+                year, quarter = year - 1, 4
+            periods.append(pd.Timestamp(year, quarter * 3, 1) + pd.offsets.MonthEnd(0))
+            quarter -= 1
+        return periods
+
+    def stock_financial_report_sina(self, stock: str, symbol: str) -> pd.DataFrame:
+        code = _strip_market(stock)
+        periods = self._report_periods()
+        rng = np.random.default_rng(symbol_seed(code, symbol))
+        revenue = 1e9 * (1 + rng.random()) * np.cumprod(1 + rng.normal(0.02, 0.05, len(periods)))
+        data = {"报告日": [period.strftime("%Y%m%d") for period in periods]}
+        for item, ratio in REPORT_ITEMS[symbol].items():
+            data[item] = (revenue * ratio * (1 + rng.normal(0, 0.1, len(periods)))).round(2)
+        return pd.DataFrame(data)
+
+    def stock_financial_analysis_indicator(self, symbol: str, start_year: str = "1900") -> pd.DataFrame:
+        periods = [period for period in self._report_periods() if period.year >= int(start_year)]
+        rng = np.random.default_rng(symbol_seed(symbol, "indicator"))
+        # 按日期从旧到新，与新浪接口一致
+        data = {"日期": [period.strftime("%Y-%m-%d") for period in reversed(periods)]}
+        for column, (low, high) in INDICATOR_RANGES.items():
+            data[column] = (low + rng.random(len(periods)) * (high - low)).round(2)
+        return pd.DataFrame(data)
+
+    def stock_news_em(self, symbol: str) -> pd.DataFrame:
+        rng = np.random.default_rng(symbol_seed(symbol, "news"))
+        today = datetime.now().replace(hour=9, minute=30, second=0, microsecond=0)
+        rows = []
+        for day in range(self.news_days):
+            for i in range(self.news_per_day):
+                published = today - timedelta(days=day, minutes=37 * i)
+                tone = ("业绩预增", "签订重大合同", "高管减持", "获得政府补助", "收到监管问询函")[
+                    int(rng.integers(0, 5))]
+                rows.append({
+                    "关键词": symbol,
+                    "新闻标题": f"{symbol} {tone}（{published:%m月%d日}）",
+                    "新闻内容": f"{published:%Y年%m月%d日}，公司{symbol}发布公告称{tone}，"
+                              f"相关事项对公司经营的影响仍在评估中。",
+                    "发布时间": published.strftime("%Y-%m-%d %H:%M:%S"),
+                    "文章来源": "合成新闻",
+                    "新闻链接": f"https://synthetic.local/{symbol}/{published:%Y%m%d%H%M}{i}",
+                })
+        return pd.DataFrame(rows)
+
+
+@contextmanager
+def offline_environment(market=None, data_dir: str = None, llm_cache: bool = False):
+    """在合成数据和临时缓存上运行工作流
+
+    Args:
+        market: 与 akshare 接口相同的数据源，默认为新的 SyntheticMarket
+        data_dir: 行情、财务、新闻与各类缓存的目录，默认为临时目录，退出时删除
+        llm_cache: 是否启用 LLM 回复缓存，默认关闭，每次都调用模型
+    """
+    market = market if market is not None else SyntheticMarket()
+    with isolated_environment(market, data_dir, llm_cache):
+        yield market
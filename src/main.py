@@ -2,56 +2,121 @@ from datetime import datetime, timedelta
 import argparse
 from src.agents.valuation import valuation_agent
 from src.agents.state import AgentState
-from src.agents.sentiment import sentiment_agent
+from src.agents.sentiment import sentiment_agent, sentiment_agent_async
 from src.agents.risk_manager import risk_management_agent
 from src.agents.technicals import technical_analyst_agent
-from src.agents.portfolio_manager import portfolio_management_agent
-from src.agents.market_data import market_data_agent
+from src.agents.portfolio_manager import portfolio_management_agent, portfolio_management_agent_async
+from src.agents.market_data import market_data_agent, market_data_agent_async
 from src.agents.fundamentals import fundamentals_agent
-from langgraph.graph import END, StateGraph
 from langchain_core.messages import HumanMessage
-import akshare as ak
-import pandas as pd
 from src.utils.logger_config import setup_logger, get_logger
+from src.utils.cassette import cassette_from_args
+from src.utils.lazy import lazy_import
+from src.utils.tracing import trace_file, trace_run, traced, tracer
+
+# langgraph 与 langchain_core.runnables 只在构建工作流时才需要
+langgraph_graph = lazy_import("langgraph.graph")
+runnables = lazy_import("langchain_core.runnables")
 
 
 ##### Run the Hedge Fund #####
-def run_hedge_fund(app, model: list, ticker: str, start_date: str, end_date: str, portfolio: dict, show_reasoning: bool = False, num_of_news: int = 5):
-    final_state = app.invoke(
-        {
-            "messages": [
-                HumanMessage(
-                    content="Make a trading decision based on the provided data.",
-                )
-            ],
-            "data": {
-                "ticker": ticker,
-                "portfolio": portfolio,
-                "start_date": start_date,
-                "end_date": end_date,
-                "num_of_news": num_of_news,
-            },
-            "metadata": {
-                "model": model,
-                "show_reasoning": show_reasoning,
-            }
-        },
-    )
+def run_hedge_fund(app, model: list, ticker: str, start_date: str, end_date: str, portfolio: dict, show_reasoning: bool = False, num_of_news: int = 5, prices: dict = None, news_as_of: str = None):
+    """运行一次完整的分析工作流
+
+    prices 为预先加载好的列式行情数据（如回测面板的时点切片），提供时
+    market_data_agent 不再重新获取行情。news_as_of 为新闻的时点，
+    提供时情绪分析只使用该时点之前发布的存档新闻。
+    """
+    with tracer.span("run_hedge_fund", "run", ticker=ticker):
+        final_state = app.invoke(_initial_state(
+            model, ticker, start_date, end_date, portfolio, show_reasoning, num_of_news, prices, news_as_of))
+    return final_state["messages"][-1].content
+
+
+async def run_hedge_fund_async(app, model: list, ticker: str, start_date: str, end_date: str, portfolio: dict, show_reasoning: bool = False, num_of_news: int = 5, prices: dict = None, news_as_of: str = None):
+    """run_hedge_fund 的异步版本，通过 app.ainvoke 运行工作流
+
+    I/O 密集的节点（市场数据、情绪分析、投资组合管理）使用异步实现，
+    新闻获取与 LLM 调用期间其他分支可以继续执行，多只股票可以共享一个事件循环。
+    """
+    with tracer.span("run_hedge_fund", "run", ticker=ticker):
+        final_state = await app.ainvoke(_initial_state(
+            model, ticker, start_date, end_date, portfolio, show_reasoning, num_of_news, prices, news_as_of))
     return final_state["messages"][-1].content
 
 
+def _initial_state(model, ticker, start_date, end_date, portfolio, show_reasoning, num_of_news, prices, news_as_of):
+    data = {
+        "ticker": ticker,
+        "portfolio": portfolio,
+        "start_date": start_date,
+        "end_date": end_date,
+        "num_of_news": num_of_news,
+    }
+    if prices is not None:
+        data["prices"] = prices
+    if news_as_of is not None:
+        data["news_as_of"] = news_as_of
+    return {
+        "messages": [
+            HumanMessage(
+                content="Make a trading decision based on the provided data.",
+            )
+        ],
+        "data": data,
+        "metadata": {
+            "model": model,
+            "show_reasoning": show_reasoning,
+        }
+    }
+
+
+def resolve_date_range(start_date: str = None, end_date: str = None):
+    """解析命令行日期参数
+
+    结束日期默认为昨天且不晚于昨天，开始日期默认为结束日期前一年。
+
+    Returns:
+        (start_date, end_date): datetime 类型的起止日期
+    """
+    yesterday = datetime.now() - timedelta(days=1)
+    end = yesterday if not end_date else min(
+        datetime.strptime(end_date, '%Y-%m-%d'), yesterday)
+
+    if not start_date:
+        start = end - timedelta(days=365)  # 默认获取一年的数据
+    else:
+        start = datetime.strptime(start_date, '%Y-%m-%d')
+
+    if start > end:
+        raise ValueError("Start date cannot be after end date")
+    return start, end
+
+
+def _node(name: str, func, afunc=None):
+    """为节点加上计时区间；提供异步实现时 app.invoke 使用同步版本，app.ainvoke 使用异步版本"""
+    func = traced(name, "node")(func)
+    if afunc is None:
+        return func
+    return runnables.RunnableLambda(func, afunc=traced(name, "node")(afunc), name=name)
+
+
 def build_hedge_workflow():
     # Define the new workflow
-    workflow = StateGraph(AgentState)
+    workflow = langgraph_graph.StateGraph(AgentState)
 
     # Add nodes
-    workflow.add_node("market_data_agent", market_data_agent)
-    workflow.add_node("technical_analyst_agent", technical_analyst_agent)
-    workflow.add_node("fundamentals_agent", fundamentals_agent)
-    workflow.add_node("sentiment_agent", sentiment_agent)
-    workflow.add_node("risk_management_agent", risk_management_agent)
-    workflow.add_node("portfolio_management_agent", portfolio_management_agent)
-    workflow.add_node("valuation_agent", valuation_agent)
+    # I/O 密集的节点同时提供同步和异步实现
+    workflow.add_node("market_data_agent", _node(
+        "market_data_agent", market_data_agent, market_data_agent_async))
+    workflow.add_node("technical_analyst_agent", _node("technical_analyst_agent", technical_analyst_agent))
+    workflow.add_node("fundamentals_agent", _node("fundamentals_agent", fundamentals_agent))
+    workflow.add_node("sentiment_agent", _node(
+        "sentiment_agent", sentiment_agent, sentiment_agent_async))
+    workflow.add_node("risk_management_agent", _node("risk_management_agent", risk_management_agent))
+    workflow.add_node("portfolio_management_agent", _node(
+        "portfolio_management_agent", portfolio_management_agent, portfolio_management_agent_async))
+    workflow.add_node("valuation_agent", _node("valuation_agent", valuation_agent))
 
     # Define the workflow
     workflow.set_entry_point("market_data_agent")
@@ -64,7 +129,7 @@ def build_hedge_workflow():
     workflow.add_edge("sentiment_agent", "risk_management_agent")
     workflow.add_edge("valuation_agent", "risk_management_agent")
     workflow.add_edge("risk_management_agent", "portfolio_management_agent")
-    workflow.add_edge("portfolio_management_agent", END)
+    workflow.add_edge("portfolio_management_agent", langgraph_graph.END)
 
     app = workflow.compile()
     
@@ -95,55 +160,70 @@ if __name__ == "__main__":
                         help='Initial stock position (default: 0)')
     parser.add_argument('--model', type=str, default='moonshot',
                         help='Model to use for chat completion (default: moonshot), use comma to separate multiple models.')
+    parser.add_argument('--trace', type=str,
+                        help='Write a Chrome trace-event JSON of the run to this path and print a timing summary (default: $TRACE_FILE)')
+    parser.add_argument('--record', type=str,
+                        help='Record every akshare and LLM response of the run into this cassette file')
+    parser.add_argument('--replay', type=str,
+                        help='Replay akshare and LLM responses from this cassette file without network (trusted files only: cassettes are pickles)')
 
     args = parser.parse_args()
+    if args.record and args.replay:
+        parser.error("--record and --replay cannot be used together")
+    trace_path = trace_file(args.trace)
 
     logger.info("系统入参:")
     for arg_name, arg_value in vars(args).items():
         logger.info("{} = {}".format(arg_name, arg_value))
 
-    # Set end date to yesterday if not specified
-    current_date = datetime.now()
-    yesterday = current_date - timedelta(days=1)
-    end_date = yesterday if not args.end_date else min(
-        datetime.strptime(args.end_date, '%Y-%m-%d'), yesterday)
-
-    # Set start date to one year before end date if not specified
-    if not args.start_date:
-        start_date = end_date - timedelta(days=365)  # 默认获取一年的数据
-    else:
-        start_date = datetime.strptime(args.start_date, '%Y-%m-%d')
-
-    # Validate dates
-    if start_date > end_date:
-        raise ValueError("Start date cannot be after end date")
-
-    # Validate num_of_news
-    if args.num_of_news < 1:
-        raise ValueError("Number of news articles must be at least 1")
-    if args.num_of_news > 100:
-        raise ValueError("Number of news articles cannot exceed 100")
-    
-    logger.info("start_date: {}".format(start_date.strftime('%Y-%m-%d')))
-    logger.info("end_date: {}".format(end_date.strftime('%Y-%m-%d')))
-
-    # Configure portfolio
-    portfolio = {
-        "cash": args.initial_capital,
-        "stock": args.initial_position
-    }
-
-    app = build_hedge_workflow()
-
-    result = run_hedge_fund(
-        app=app,
-        model=args.model.split(','),
-        ticker=args.ticker,
-        start_date=start_date.strftime('%Y-%m-%d'),
-        end_date=end_date.strftime('%Y-%m-%d'),
-        portfolio=portfolio,
-        show_reasoning=args.show_reasoning,
-        num_of_news=args.num_of_news
-    )
+    with trace_run(trace_path), cassette_from_args(args.record, args.replay) as cassette:
+        # 回放时未指定的日期使用录制时的日期
+        recorded = cassette.meta.get("run", {}) if cassette is not None else {}
+
+        # End date defaults to yesterday, start date to one year before end date
+        start_date, end_date = resolve_date_range(args.start_date or recorded.get("start_date"),
+                                                  args.end_date or recorded.get("end_date"))
+
+        # Validate num_of_news
+        if args.num_of_news < 1:
+            raise ValueError("Number of news articles must be at least 1")
+        if args.num_of_news > 100:
+            raise ValueError("Number of news articles cannot exceed 100")
+
+        logger.info("start_date: {}".format(start_date.strftime('%Y-%m-%d')))
+        logger.info("end_date: {}".format(end_date.strftime('%Y-%m-%d')))
+
+        # Configure portfolio
+        portfolio = {
+            "cash": args.initial_capital,
+            "stock": args.initial_position
+        }
+        run = {
+            "ticker": args.ticker,
+            "start_date": start_date.strftime('%Y-%m-%d'),
+            "end_date": end_date.strftime('%Y-%m-%d'),
+            "model": args.model.split(','),
+            "portfolio": portfolio,
+            "num_of_news": args.num_of_news,
+        }
+        if cassette is not None and cassette.recording:
+            cassette.meta["run"] = run
+
+        app = build_hedge_workflow()
+
+        result = run_hedge_fund(
+            app=app,
+            model=run["model"],
+            ticker=args.ticker,
+            start_date=run["start_date"],
+            end_date=run["end_date"],
+            portfolio=portfolio,
+            show_reasoning=args.show_reasoning,
+            num_of_news=args.num_of_news
+        )
     logger.info("Final Result:")
     logger.info(result)
+
+    if trace_path:
+        logger.info(f"耗时追踪已写入 {trace_path}，可在 chrome://tracing 或 https://ui.perfetto.dev 中打开")
+        print(tracer.format_summary())
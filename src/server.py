@@ -0,0 +1,370 @@
+import os
+import json
+import time
+import uuid
+import queue
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from typing import Optional
+
+from src.batch import DEFAULT_BATCH_CONCURRENCY, analyse_ticker
+from src.main import build_hedge_workflow, resolve_date_range
+from src.utils.openrouter_config import client_manager
+from src.utils.spot_snapshot import spot_snapshot
+from src.utils.logger_config import get_logger, ERROR_ICON, SUCCESS_ICON, WAIT_ICON
+from src.utils.tracing import run_trace_path, trace_file, tracer
+
+# 设置日志记录
+logger = get_logger()
+
+DEFAULT_SERVER_HOST = "127.0.0.1"
+DEFAULT_SERVER_PORT = 8765
+# 排队等待的请求数量上限，超过时返回 503
+DEFAULT_SERVER_QUEUE_SIZE = 64
+# 保留结果的已完成任务数量
+MAX_FINISHED_JOBS = 1000
+
+
+class QueueFullError(Exception):
+    """请求队列已满"""
+
+
+def parse_analysis_request(payload: dict) -> dict:
+    """校验分析请求并转换为 analyse_ticker 的参数
+
+    字段与命令行参数相同：ticker（必需）、start_date、end_date、model（字符串或列表）、
+    num_of_news、initial_capital、initial_position、show_reasoning。
+
+    Raises:
+        ValueError: 请求字段缺失或不合法
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("request body must be a JSON object")
+    ticker = str(payload.get("ticker") or "").strip()
+    if not ticker:
+        raise ValueError("ticker is required")
+
+    try:
+        start_date, end_date = resolve_date_range(payload.get("start_date"), payload.get("end_date"))
+        num_of_news = int(payload.get("num_of_news", 5))
+        portfolio = {
+            "cash": float(payload.get("initial_capital", 100000.0)),
+            "stock": int(payload.get("initial_position", 0)),
+        }
+    except TypeError as e:
+        # null、列表等类型不对的字段
+        raise ValueError(f"invalid field type: {e}") from e
+    if not 1 <= num_of_news <= 100:
+        raise ValueError("num_of_news must be between 1 and 100")
+
+    model = payload.get("model") or "moonshot"
+    if isinstance(model, str):
+        model = model.split(',')
+
+    return {
+        "ticker": ticker,
+        "model": model,
+        "start_date": start_date.strftime('%Y-%m-%d'),
+        "end_date": end_date.strftime('%Y-%m-%d'),
+        "portfolio": portfolio,
+        "show_reasoning": bool(payload.get("show_reasoning", False)),
+        "num_of_news": num_of_news,
+    }
+
+
+def parse_wait_options(payload: dict) -> tuple:
+    """解析请求中的 wait 与 timeout（秒），在提交任务之前校验
+
+    Raises:
+        ValueError: timeout 不是正数
+    """
+    wait = bool(payload.get("wait", True))
+    timeout = payload.get("timeout")
+    if not timeout:
+        return wait, None
+    try:
+        timeout = float(timeout)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"timeout must be a number: {e}") from e
+    if timeout <= 0:
+        raise ValueError("timeout must be positive")
+    return wait, timeout
+
+
+class AnalysisService:
+    """常驻的分析服务
+
+    工作流只编译一次，LLM 客户端、各类缓存和全市场行情快照在进程内保持热状态。
+    请求进入有界队列，由固定数量的工作线程依次处理，同时运行的分析不超过 max_concurrency。
+    指定 trace_path（默认为环境变量 TRACE_FILE）时，每个任务的耗时追踪写入各自的文件，
+    如 logs/trace.<任务编号>.json；并发运行的任务在时间上重叠的区间会同时出现在各自的文件中。
+    """
+
+    def __init__(self, app=None, max_concurrency: Optional[int] = None,
+                 queue_size: Optional[int] = None, trace_path: Optional[str] = None):
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("SERVER_MAX_CONCURRENCY", DEFAULT_BATCH_CONCURRENCY))
+        if queue_size is None:
+            queue_size = int(os.getenv("SERVER_QUEUE_SIZE", DEFAULT_SERVER_QUEUE_SIZE))
+        self.max_concurrency = max(1, max_concurrency)
+        self.app = app
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        # 任务编号 -> 任务记录，已完成的任务按完成顺序淘汰
+        self._jobs = OrderedDict()
+        self._done_events = {}
+        self._lock = threading.Lock()
+        self._running = 0
+        self._workers = []
+        self.trace_path = trace_file(trace_path)
+        if self.trace_path:
+            tracer.enable()
+            tracer.reset()
+
+    def warm_up(self, models: Optional[list] = None):
+        """编译工作流、初始化 LLM 客户端并预取全市场行情快照"""
+        started = time.perf_counter()
+        if self.app is None:
+            self.app = build_hedge_workflow()
+        client_manager.get_clients_info(models or ["moonshot"])
+        try:
+            spot_snapshot.get_table()
+        except Exception as e:
+            logger.error(f"{ERROR_ICON} 预取实时行情快照失败，将在分析时重试: {e}")
+        logger.info(f"{SUCCESS_ICON} 服务预热完成，耗时 {time.perf_counter() - started:.2f} 秒")
+
+    def start(self):
+        """启动工作线程"""
+        if self.app is None:
+            self.warm_up()
+        for i in range(self.max_concurrency - len(self._workers)):
+            worker = threading.Thread(target=self._work, name=f"analysis-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def shutdown(self):
+        """处理完已排队的请求后停止工作线程"""
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def submit(self, request: dict) -> dict:
+        """把已校验的请求放入队列
+
+        Raises:
+            QueueFullError: 队列已满
+        """
+        job_id = uuid.uuid4().hex
+        job = {"job_id": job_id, "ticker": request["ticker"], "status": "queued",
+               "submitted_at": time.time()}
+        with self._lock:
+            self._jobs[job_id] = job
+            self._done_events[job_id] = threading.Event()
+        try:
+            self._queue.put_nowait((job_id, request))
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job_id, None)
+                self._done_events.pop(job_id, None)
+            raise QueueFullError(f"request queue is full ({self._queue.maxsize})")
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """等待任务完成，超时后返回任务的当前状态"""
+        event = self._done_events.get(job_id)
+        if event is not None:
+            event.wait(timeout)
+        return self.get(job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "status": "ok",
+                "workers": self.max_concurrency,
+                "running": self._running,
+                "queued": self._queue.qsize(),
+                "queue_size": self._queue.maxsize,
+            }
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            job_id, request = item
+            with self._lock:
+                self._running += 1
+                self._jobs[job_id].update(status="running", started_at=time.time())
+            request = dict(request)
+            ticker = request.pop("ticker")
+            started = time.perf_counter()
+            record = analyse_ticker(self.app, ticker, **request)
+            trace = self._export_trace(job_id, started)
+            with self._lock:
+                self._running -= 1
+                # 没有运行中的任务时清空追踪，常驻进程中的区间不会一直累积
+                if trace and self._running == 0:
+                    tracer.reset()
+                self._jobs[job_id].update(status=record["status"], finished_at=time.time(),
+                                          record=record)
+                if trace:
+                    self._jobs[job_id]["trace"] = trace
+                self._done_events.pop(job_id).set()
+                self._evict_finished()
+
+    def _export_trace(self, job_id: str, started: float) -> Optional[str]:
+        """把任务开始后记录的区间写入该任务的追踪文件"""
+        if not self.trace_path:
+            return None
+        path = run_trace_path(self.trace_path, job_id)
+        try:
+            return tracer.export_chrome_trace(path, tracer.events(since=started))
+        except OSError as e:
+            logger.error(f"{ERROR_ICON} 写入耗时追踪 {path} 失败: {e}")
+            return None
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items()
+                    if job["status"] not in ("queued", "running")]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    """本地 HTTP 接口
+
+    GET  /health        服务状态
+    POST /analyze       提交分析请求，默认等待结果；{"wait": false} 时立即返回任务编号
+    GET  /jobs/<编号>   查询任务状态和结果
+    """
+
+    server_version = "StockAgent"
+
+    @property
+    def service(self) -> AnalysisService:
+        return self.server.service
+
+    def _send_json(self, status: int, body: dict, headers: Optional[dict] = None):
+        data = json.dumps(body, ensure_ascii=False, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, self.service.stats())
+        elif self.path.startswith("/jobs/"):
+            job = self.service.get(self.path[len("/jobs/"):])
+            if job is None:
+                self._send_json(404, {"error": "job not found"})
+            else:
+                self._send_json(200, job)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/analyze":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            request = parse_analysis_request(payload)
+            wait, timeout = parse_wait_options(payload)
+        except (TypeError, ValueError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        try:
+            job = self.service.submit(request)
+        except QueueFullError as e:
+            self._send_json(503, {"error": str(e)}, headers={"Retry-After": "5"})
+            return
+
+        if not wait:
+            self._send_json(202, job)
+            return
+        job = self.service.wait(job["job_id"], timeout=timeout)
+        self._send_json(200 if job["status"] in ("ok", "error") else 202, job)
+
+    def address_string(self):
+        # Unix 套接字的客户端地址为空字符串
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        logger.info(f"{self.address_string()} - {format % args}")
+
+
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    """通过 Unix 套接字提供同样的 HTTP 接口"""
+
+    daemon_threads = True
+
+
+def create_server(service: AnalysisService, host: str = DEFAULT_SERVER_HOST,
+                  port: int = DEFAULT_SERVER_PORT, unix_socket: Optional[str] = None):
+    """创建绑定到 TCP 端口或 Unix 套接字的 HTTP 服务器"""
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = UnixHTTPServer(unix_socket, AnalysisRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), AnalysisRequestHandler)
+        server.daemon_threads = True
+    server.service = service
+    return server
+
+
+if __name__ == "__main__":
+    logger.info("启动StockAgent分析服务...")
+
+    parser = argparse.ArgumentParser(
+        description='Run the hedge fund trading system as a resident local service')
+    parser.add_argument('--host', type=str, default=DEFAULT_SERVER_HOST,
+                        help=f'Host to bind (default: {DEFAULT_SERVER_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_SERVER_PORT,
+                        help=f'Port to bind (default: {DEFAULT_SERVER_PORT})')
+    parser.add_argument('--unix-socket', type=str,
+                        help='Serve on this Unix socket path instead of a TCP port')
+    parser.add_argument('--max-concurrency', type=int,
+                        help=f'Number of analyses running at the same time (default: {DEFAULT_BATCH_CONCURRENCY})')
+    parser.add_argument('--queue-size', type=int,
+                        help=f'Maximum number of queued requests (default: {DEFAULT_SERVER_QUEUE_SIZE})')
+    parser.add_argument('--model', type=str, default='moonshot',
+                        help='Models whose clients are created at startup, comma separated (default: moonshot)')
+    parser.add_argument('--trace', type=str,
+                        help='Write a Chrome trace-event JSON per request, e.g. logs/trace.json -> logs/trace.<job_id>.json (default: $TRACE_FILE)')
+
+    args = parser.parse_args()
+
+    service = AnalysisService(max_concurrency=args.max_concurrency, queue_size=args.queue_size,
+                              trace_path=args.trace)
+    logger.info(f"{WAIT_ICON} 正在预热工作流、LLM 客户端和行情快照...")
+    service.warm_up(args.model.split(','))
+    service.start()
+
+    server = create_server(service, args.host, args.port, args.unix_socket)
+    address = args.unix_socket or f"http://{args.host}:{server.server_address[1]}"
+    logger.info(f"{SUCCESS_ICON} 分析服务已启动: {address}，并发数 {service.max_concurrency}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info(f"{WAIT_ICON} 正在停止分析服务...")
+    finally:
+        server.server_close()
+        service.shutdown()
+        if args.unix_socket and os.path.exists(args.unix_socket):
+            os.remove(args.unix_socket)
@@ -0,0 +1,83 @@
+import time
+import json
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from langchain_core.messages import HumanMessage
+
+from src import main
+
+
+def fake_node(name, calls, delay=0.0):
+    """返回一条信号消息的同步节点"""
+    def node(state):
+        calls.append(name)
+        time.sleep(delay)
+        return {"messages": [HumanMessage(content=json.dumps({"signal": "neutral"}), name=name)],
+                "data": state["data"]}
+    return node
+
+
+def fake_async_node(name, calls, delay=0.0):
+    """等待期间让出事件循环的异步节点"""
+    async def node(state):
+        calls.append(name + "_async")
+        await asyncio.sleep(delay)
+        return {"messages": [HumanMessage(content=json.dumps({"signal": "neutral"}), name=name)],
+                "data": state["data"]}
+    return node
+
+
+class TestAsyncWorkflow(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        nodes = {
+            "market_data_agent": fake_node("market_data_agent", self.calls),
+            "market_data_agent_async": fake_async_node("market_data_agent", self.calls, 0.1),
+            "technical_analyst_agent": fake_node("technical_analyst_agent", self.calls),
+            "fundamentals_agent": fake_node("fundamentals_agent", self.calls),
+            "valuation_agent": fake_node("valuation_agent", self.calls),
+            "sentiment_agent": fake_node("sentiment_agent", self.calls),
+            "sentiment_agent_async": fake_async_node("sentiment_agent", self.calls, 0.2),
+            "risk_management_agent": fake_node("risk_management_agent", self.calls),
+            "portfolio_management_agent": fake_node("portfolio_management_agent", self.calls),
+            "portfolio_management_agent_async": fake_async_node(
+                "portfolio_management_agent", self.calls, 0.1),
+        }
+        for name, node in nodes.items():
+            patcher = patch.object(main, name, node)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.app = main.build_hedge_workflow()
+        self.kwargs = dict(model=["moonshot"], start_date="2024-01-01", end_date="2024-12-31",
+                           portfolio={"cash": 100000.0, "stock": 0})
+
+    def test_invoke_uses_sync_nodes(self):
+        """app.invoke 仍使用同步节点"""
+        content = main.run_hedge_fund(app=self.app, ticker="600519", **self.kwargs)
+        self.assertEqual(json.loads(content), {"signal": "neutral"})
+        self.assertIn("sentiment_agent", self.calls)
+        self.assertFalse(any(call.endswith("_async") for call in self.calls))
+
+    def test_tickers_share_event_loop(self):
+        """ainvoke 使用异步节点，多只股票的 I/O 等待在同一个事件循环中重叠"""
+        tickers = ["600519", "000001", "301155", "300750"]
+
+        async def run_all():
+            return await asyncio.gather(*(
+                main.run_hedge_fund_async(app=self.app, ticker=ticker, **self.kwargs)
+                for ticker in tickers))
+
+        started = time.perf_counter()
+        contents = asyncio.run(run_all())
+
+        # 串行执行需要 4 * 0.4 秒
+        self.assertLess(time.perf_counter() - started, 0.9)
+        self.assertEqual(len(contents), 4)
+        self.assertEqual(self.calls.count("sentiment_agent_async"), 4)
+        self.assertNotIn("sentiment_agent", self.calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
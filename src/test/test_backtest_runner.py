@@ -0,0 +1,169 @@
+import os
+import time
+import tempfile
+import logging
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from src.backtest_runner import build_jobs, results_table, run_backtests, worker_panel
+from src.utils import logger_config
+from src.utils.logger_config import get_logger
+from src.utils.price_panel import PricePanel
+from src.test.test_price_payload import make_price_frame
+
+STATIC_SIGNALS = {"fundamental": {"signal": "bullish", "confidence": "80%"},
+                  "valuation": {"signal": "bullish", "confidence": "80%"}}
+
+
+def panel_job(job, options):
+    """在工作进程中检查共享行情面板"""
+    panel = worker_panel(job["ticker"])
+    return {"total_return": 0.0, "rows": len(panel),
+            "read_only": not panel.columns["close"].flags.writeable,
+            "last_close": float(panel.columns["close"][-1])}
+
+
+def crashing_job(job, options):
+    """000002 的工作进程直接退出，其余任务正常返回"""
+    if job["ticker"] == "000002":
+        # 等其他任务先完成
+        time.sleep(1)
+        os._exit(1)
+    if job["ticker"] == "000003":
+        raise ValueError("bad data")
+    return {"total_return": 0.1, "sharpe_ratio": 1.0, "max_drawdown": -5.0}
+
+
+def neighbour_crash_job(job, options):
+    """000002 的工作进程很快退出，000001 在它崩溃时仍在运行，之后正常返回"""
+    if job["ticker"] == "000002":
+        time.sleep(0.2)
+        os._exit(1)
+    time.sleep(1)
+    return {"total_return": 0.1, "sharpe_ratio": 1.0, "max_drawdown": -5.0}
+
+
+def dying_init(*args):
+    """工作进程在初始化时直接退出，任何任务都来不及开始"""
+    os._exit(1)
+
+
+def logging_job(job, options):
+    """退出前排队大量日志，最后一条为任务标记"""
+    logger = get_logger()
+    for i in range(2000):
+        logger.info("filler %d", i)
+    logger.info(f"job marker {job['ticker']} {options['run_id']}")
+    raise ValueError("bad data")
+
+
+class TestBacktestRunner(unittest.TestCase):
+    def setUp(self):
+        self.panel = PricePanel(make_price_frame(num_bars=500, seed=3))
+
+    def test_shared_memory_roundtrip(self):
+        """共享内存中的面板与原面板一致，且挂载后为只读"""
+        shm, handle = self.panel.to_shared_memory()
+        try:
+            attached, block = PricePanel.attach_shared(handle)
+            for col, values in self.panel.columns.items():
+                np.testing.assert_array_equal(attached.columns[col], values)
+            self.assertFalse(attached.columns["close"].flags.writeable)
+            self.assertEqual(attached.price_on("2024-06-03"), self.panel.price_on("2024-06-03"))
+            del attached
+            block.close()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def test_workers_share_loaded_panel(self):
+        """每只股票只在主进程加载一次，工作进程挂载同一份数据"""
+        jobs = build_jobs(["600519"], [("2024-01-02", "2024-06-28"), ("2024-07-01", "2024-11-29")])
+        with patch.object(PricePanel, "load", return_value=self.panel) as mock_load:
+            records = list(run_backtests(jobs, max_workers=2, job_func=panel_job))
+
+        mock_load.assert_called_once()
+        self.assertEqual(len(records), 2)
+        for record in records:
+            self.assertEqual(record["status"], "ok")
+            self.assertEqual(record["rows"], len(self.panel))
+            self.assertTrue(record["read_only"])
+            self.assertEqual(record["last_close"], self.panel.columns["close"][-1])
+
+    def test_partial_results_survive_crash(self):
+        """工作进程崩溃不影响其他任务的结果，崩溃的任务重试后记为 crashed"""
+        jobs = build_jobs(["000001", "000002", "000003", "000004"], [("2024-06-03", "2024-11-29")])
+        with patch.object(PricePanel, "load", return_value=self.panel):
+            records = list(run_backtests(jobs, max_workers=2, job_func=crashing_job))
+
+        table = results_table(records)
+        self.assertEqual(list(table["ticker"]), ["000001", "000002", "000003", "000004"])
+        self.assertEqual(list(table["status"]), ["ok", "crashed", "error", "ok"])
+        self.assertEqual(table.loc[0, "total_return"], 0.1)
+
+    def test_queued_jobs_not_charged_for_crash(self):
+        """进程池崩溃时尚未开始的任务不计尝试次数，重新提交后正常完成"""
+        jobs = build_jobs(["000002", "000001"], [("2024-06-03", "2024-11-29")])
+        with patch.object(PricePanel, "load", return_value=self.panel):
+            records = list(run_backtests(jobs, max_workers=1, job_func=crashing_job))
+
+        table = results_table(records)
+        self.assertEqual(list(table["status"]), ["ok", "crashed"])
+
+    def test_running_neighbour_not_charged_for_crash(self):
+        """崩溃时同在运行的正常任务不会被记为 crashed"""
+        jobs = build_jobs(["000001", "000002"], [("2024-06-03", "2024-11-29")])
+        with patch.object(PricePanel, "load", return_value=self.panel):
+            records = list(run_backtests(jobs, max_workers=2, job_func=neighbour_crash_job))
+
+        table = results_table(records)
+        self.assertEqual(list(table["status"]), ["ok", "crashed"])
+
+    def test_worker_init_crash_terminates(self):
+        """工作进程在初始化时崩溃，没有任务开始运行，重试若干次后全部记为 crashed"""
+        jobs = build_jobs(["000001", "000002"], [("2024-06-03", "2024-11-29")])
+        with patch.object(PricePanel, "load", return_value=self.panel), \
+                patch("src.backtest_runner._init_worker", dying_init):
+            records = list(run_backtests(jobs, max_workers=2, job_func=neighbour_crash_job))
+
+        table = results_table(records)
+        self.assertEqual(list(table["status"]), ["crashed", "crashed"])
+
+    def test_worker_logs_written_before_exit(self):
+        """工作进程以 os._exit 退出，任务结束时（包括失败）已写完排队的日志"""
+        if logger_config._listener is None:
+            self.skipTest("LOG_ASYNC=off")
+        file_handler = next(h for h in logger_config._listener.handlers
+                            if isinstance(h, logging.FileHandler))
+        run_id = f"{os.getpid()}-{time.time()}"
+        jobs = build_jobs(["000001"], [("2024-06-03", "2024-11-29")])
+        with patch.object(PricePanel, "load", return_value=self.panel):
+            records = list(run_backtests(jobs, {"run_id": run_id}, max_workers=1, job_func=logging_job))
+
+        self.assertEqual(records[0]["status"], "error")
+        with open(file_handler.baseFilename, encoding="utf-8") as f:
+            self.assertIn(f"job marker 000001 {run_id}", f.read())
+
+    def test_fast_backtest_jobs(self):
+        """快速回测任务在工作进程中运行并返回绩效指标，每个任务写入各自的追踪文件"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        jobs = build_jobs(["600519", "000001"], [("2024-06-03", "2024-11-29")])
+        options = {"mode": "fast", "static_signals": {t: STATIC_SIGNALS for t in ("600519", "000001")},
+                   "trace": os.path.join(tmp.name, "trace.json")}
+        with patch.object(PricePanel, "load", return_value=self.panel):
+            table = results_table(list(run_backtests(jobs, options, max_workers=2)))
+
+        self.assertEqual(list(table["status"]), ["ok", "ok"])
+        # 两只股票使用同一份模拟行情，结果相同
+        self.assertEqual(table.loc[0, "total_return"], table.loc[1, "total_return"])
+        self.assertTrue(np.isfinite(table["sharpe_ratio"]).all())
+        self.assertLessEqual(table.loc[0, "max_drawdown"], 0)
+        self.assertEqual(sorted(os.listdir(tmp.name)), ["trace.000001_2024-06-03_2024-11-29.json",
+                                                         "trace.600519_2024-06-03_2024-11-29.json"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import asyncio
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from langchain_core.messages import HumanMessage
+
+from src.batch import load_tickers, run_batch, run_batch_async
+
+
+class FakeApp:
+    """模拟已编译的工作流，记录同时运行的最大数量"""
+
+    def __init__(self, delay=0.05, fail=()):
+        self.delay = delay
+        self.fail = set(fail)
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def invoke(self, state):
+        ticker = state["data"]["ticker"]
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            time.sleep(self.delay)
+            if ticker in self.fail:
+                raise RuntimeError("数据源异常")
+            content = json.dumps({"action": "hold", "quantity": 0, "confidence": 0.5})
+            return {"messages": [HumanMessage(content=content)]}
+        finally:
+            with self.lock:
+                self.running -= 1
+
+    async def ainvoke(self, state):
+        ticker = state["data"]["ticker"]
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            if ticker in self.fail:
+                raise RuntimeError("数据源异常")
+            content = json.dumps({"action": "hold", "quantity": 0, "confidence": 0.5})
+            return {"messages": [HumanMessage(content=content)]}
+        finally:
+            self.running -= 1
+
+
+class TestBatch(unittest.TestCase):
+    def test_load_tickers(self):
+        """合并命令行与文件中的代码，去重并忽略注释"""
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False, encoding='utf-8') as f:
+            f.write("600519\n# 自选股\n000001, 301155  # 风电\n\n600519\n")
+        try:
+            tickers = load_tickers("300750,600519", f.name)
+        finally:
+            os.remove(f.name)
+        self.assertEqual(tickers, ["300750", "600519", "000001", "301155"])
+
+    @patch('src.batch.spot_snapshot.get_table')
+    def test_run_batch_streams_records(self, mock_table):
+        """每只股票一条记录，并发数受限，单只股票失败不影响其他股票"""
+        app = FakeApp(fail={"000001"})
+        tickers = ["600519", "000001", "301155", "300750", "002594"]
+
+        records = list(run_batch(
+            tickers, model=["moonshot"], start_date="2024-01-01", end_date="2024-12-31",
+            portfolio={"cash": 100000.0, "stock": 0}, max_concurrency=2, app=app))
+
+        mock_table.assert_called_once()
+        self.assertEqual(sorted(r["ticker"] for r in records), sorted(tickers))
+        self.assertLessEqual(app.max_running, 2)
+        by_ticker = {r["ticker"]: r for r in records}
+        self.assertEqual(by_ticker["000001"]["status"], "error")
+        self.assertEqual(by_ticker["600519"]["result"]["action"], "hold")
+
+    @patch('src.batch.spot_snapshot.get_table')
+    def test_run_batch_async_shares_event_loop(self, mock_table):
+        """异步批量分析在同一个事件循环中执行，并发数同样受限"""
+        app = FakeApp(delay=0.1, fail={"000001"})
+        tickers = ["600519", "000001", "301155", "300750"]
+
+        async def collect():
+            return [record async for record in run_batch_async(
+                tickers, model=["moonshot"], start_date="2024-01-01", end_date="2024-12-31",
+                portfolio={"cash": 100000.0, "stock": 0}, max_concurrency=2, app=app)]
+
+        started = time.perf_counter()
+        records = asyncio.run(collect())
+
+        self.assertLess(time.perf_counter() - started, 0.35)
+        self.assertEqual(app.max_running, 2)
+        by_ticker = {r["ticker"]: r for r in records}
+        self.assertEqual(sorted(by_ticker), sorted(tickers))
+        self.assertEqual(by_ticker["000001"]["status"], "error")
+        self.assertEqual(by_ticker["301155"]["result"]["action"], "hold")
+
+
+if __name__ == '__main__':
+    unittest.main()
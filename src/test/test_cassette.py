@@ -0,0 +1,111 @@
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from src.benchmarks.synthetic import SyntheticMarket
+from src.main import build_hedge_workflow, run_hedge_fund
+from src.utils.cassette import Cassette, CassetteMiss, use_cassette
+
+
+class _NoNetwork:
+    """回放时不应访问的数据源"""
+
+    def __getattr__(self, name):
+        raise AssertionError(f"回放时调用了 ak.{name}")
+
+
+class TestCassette(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "run.cassette")
+
+    def _record(self):
+        cassette = Cassette(self.path, "record")
+        cassette.meta["run"] = {"ticker": "600519"}
+        frame = pd.DataFrame({"日期": ["2024-01-02"], "收盘": [10.5]})
+        cassette.call("akshare", "stock_zh_a_hist", [["600519"], {"end_date": "20240102"}], lambda: frame)
+        cassette.call("llm", "stub", [{"content": "a"}], lambda: {"stub": "first"})
+        cassette.call("llm", "stub", [{"content": "a"}], lambda: {"stub": "second"})
+        with self.assertRaises(ConnectionError):
+            cassette.call("akshare", "stock_news_em", [["600519"], {}],
+                          lambda: (_ for _ in ()).throw(ConnectionError("timeout")))
+        cassette.save()
+        return frame
+
+    def test_replay_round_trip(self):
+        """回放返回录制的结果和异常，同一调用依次返回各次结果，用完后重复最后一次"""
+        frame = self._record()
+        replay = Cassette(self.path, "replay")
+        self.assertEqual(replay.meta["run"], {"ticker": "600519"})
+        self.assertEqual(len(replay), 4)
+
+        fail = lambda: self.fail("回放时执行了真实调用")
+        result = replay.call("akshare", "stock_zh_a_hist", [["600519"], {"end_date": "20240102"}], fail)
+        self.assertTrue(result.equals(frame))
+        answers = [replay.call("llm", "stub", [{"content": "a"}], fail)["stub"] for _ in range(3)]
+        self.assertEqual(answers, ["first", "second", "second"])
+        with self.assertRaises(ConnectionError):
+            replay.call("akshare", "stock_news_em", [["600519"], {}], fail)
+
+    def test_fallback_only_for_date_range(self):
+        """只有查询区间不同的 akshare 调用按录制顺序回放，用完或其他参数不同时抛出 CassetteMiss"""
+        self._record()
+        replay = Cassette(self.path, "replay")
+        result = replay.call("akshare", "stock_zh_a_hist", [["600519"], {"end_date": "20240103"}], None)
+        self.assertEqual(list(result["收盘"]), [10.5])
+        with self.assertRaises(CassetteMiss):
+            replay.call("akshare", "stock_zh_a_hist", [["600519"], {"end_date": "20240104"}], None)
+        with self.assertRaises(CassetteMiss):
+            replay.call("akshare", "stock_zh_a_hist", [["000001"], {"end_date": "20240102"}], None)
+        with self.assertRaises(CassetteMiss):
+            replay.call("akshare", "stock_zh_a_spot_em", [[], {}], None)
+
+    def test_changed_llm_request_misses(self):
+        """LLM 请求与录制时不同时不替代，避免用其他提示词的回复回放"""
+        self._record()
+        replay = Cassette(self.path, "replay")
+        with self.assertRaises(CassetteMiss):
+            replay.call("llm", "stub", [{"content": "b"}], None)
+
+    def test_async_calls_share_records(self):
+        """异步调用与同步调用使用同一份记录"""
+        cassette = Cassette(self.path, "record")
+
+        async def complete():
+            return {"stub": "0.5"}
+
+        asyncio.run(cassette.acall("llm", "stub", [{"content": "b"}], complete))
+        cassette.save()
+        replay = Cassette(self.path, "replay")
+        self.assertEqual(replay.call("llm", "stub", [{"content": "b"}], None), {"stub": "0.5"})
+
+
+class TestRecordReplayRun(unittest.TestCase):
+    def test_replay_reproduces_run_without_network(self):
+        """录制一次完整运行后，回放不调用数据源和模型，得到相同的决策"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "600001.cassette")
+        args = (["stub"], "600001", "2024-01-01", "2024-12-31", {"cash": 100000.0, "stock": 0})
+
+        with use_cassette(path, "record", source=SyntheticMarket(universe_size=30)):
+            recorded = run_hedge_fund(build_hedge_workflow(), *args)
+
+        with patch("src.utils.openrouter_config._chat_completion",
+                   side_effect=AssertionError("回放时调用了模型")):
+            with use_cassette(path, "replay", source=_NoNetwork()) as cassette:
+                replayed = run_hedge_fund(build_hedge_workflow(), *args)
+
+        self.assertEqual(json.loads(replayed), json.loads(recorded))
+        kinds = {record["kind"] for record in cassette._records}
+        self.assertEqual(kinds, {"akshare", "llm"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import time
+import asyncio
+import unittest
+
+from src.utils.concurrency import run_concurrently, run_concurrently_async
+
+
+class TestRunConcurrently(unittest.TestCase):
+    def test_tasks_run_in_parallel(self):
+        """相互独立的任务并发执行，总耗时接近最慢的单个任务"""
+        def slow(value):
+            time.sleep(0.2)
+            return value
+
+        start = time.perf_counter()
+        results = run_concurrently({
+            "a": lambda: slow(1),
+            "b": lambda: slow(2),
+            "c": lambda: slow(3),
+        }, max_workers=3)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(results, {"a": 1, "b": 2, "c": 3})
+        self.assertLess(elapsed, 0.5)
+
+    def test_failure_falls_back_to_default(self):
+        """单个任务失败时返回默认值，不影响其他任务"""
+        def broken():
+            raise ConnectionError("timeout")
+
+        results = run_concurrently(
+            {"ok": lambda: "data", "broken": broken, "no_default": broken},
+            defaults={"broken": {"market_cap": 0}}
+        )
+        self.assertEqual(results["ok"], "data")
+        self.assertEqual(results["broken"], {"market_cap": 0})
+        self.assertIsNone(results["no_default"])
+
+    def test_async_version_does_not_block_loop(self):
+        """异步版本在线程中执行阻塞任务，等待期间其他协程继续运行"""
+        def slow(value):
+            time.sleep(0.2)
+            return value
+
+        def broken():
+            raise ConnectionError("timeout")
+
+        async def main():
+            started = time.perf_counter()
+            results, _ = await asyncio.gather(
+                run_concurrently_async({"a": lambda: slow(1), "b": lambda: slow(2), "broken": broken},
+                                       defaults={"broken": []}, max_workers=3),
+                asyncio.sleep(0.2))
+            return results, time.perf_counter() - started
+
+        results, elapsed = asyncio.run(main())
+        self.assertEqual(results, {"a": 1, "b": 2, "broken": []})
+        self.assertLess(elapsed, 0.35)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import gc
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from src.utils import feature_engine
+from src.utils.feature_engine import FEATURES, FeatureFrame, feature_frame
+from src.agents.technicals import (
+    calculate_mean_reversion_signals, calculate_rsi, calculate_trend_signals)
+from src.test.test_price_payload import make_price_frame
+
+
+def count_calls(name):
+    """统计特征计算函数被调用的次数"""
+    return patch.object(FEATURES[name], 'func', wraps=FEATURES[name].func)
+
+
+class TestFeatureFrame(unittest.TestCase):
+    def setUp(self):
+        self.df = make_price_frame()
+
+    def test_memoized_per_frame(self):
+        """同一 frame 上相同参数的特征只计算一次，不同参数分别计算"""
+        with count_calls("rsi") as rsi:
+            features = feature_frame(self.df)
+            first = features.get("rsi", period=14)
+            self.assertIs(feature_frame(self.df).get("rsi", period=14), first)
+            calculate_rsi(self.df, 14)
+            features.get("rsi", period=28)
+        self.assertEqual(rsi.call_count, 2)
+
+    def test_dependencies_shared(self):
+        """布林带中轨复用同窗口的 sma，MACD 复用已计算的 EMA"""
+        features = FeatureFrame.from_df(self.df)
+        with count_calls("sma") as sma, count_calls("ema") as ema:
+            ma20 = features.get("sma", window=20)
+            upper, middle, lower = features.get("bollinger", window=20)
+            features.get("ema", span=12)
+            features.get("macd")
+        self.assertIs(middle, ma20)
+        self.assertEqual(sma.call_count, 1)
+        self.assertEqual(ema.call_count, 2)
+
+    def test_lazy_evaluation(self):
+        """只计算被请求的特征，趋势信号不再计算一目均衡表"""
+        calculate_trend_signals(self.df)
+        calculate_mean_reversion_signals(self.df)
+        features = feature_frame(self.df)
+        self.assertTrue(features.is_computed("adx", period=14))
+        self.assertTrue(features.is_computed("rsi", period=14))
+        self.assertFalse(features.is_computed("ichimoku"))
+
+    def test_results_read_only(self):
+        """缓存的结果是只读数组，调用方无法修改共享数据"""
+        values = feature_frame(self.df).get("returns")
+        with self.assertRaises(ValueError):
+            values[-1] = 0.0
+
+    def test_matches_pandas(self):
+        """特征与直接使用 pandas 计算的结果一致"""
+        features = feature_frame(self.df)
+        close = self.df["close"]
+        np.testing.assert_allclose(features.get("returns", periods=5),
+                                   close.pct_change(periods=5), equal_nan=True)
+        np.testing.assert_allclose(features.get("volatility", window=21, min_periods=10),
+                                   close.pct_change().rolling(21, min_periods=10).std() * np.sqrt(252),
+                                   equal_nan=True)
+
+    def test_unknown_parameter(self):
+        """未声明的参数直接报错，避免拼写错误产生新的缓存项"""
+        with self.assertRaises(TypeError):
+            feature_frame(self.df).get("rsi", periods=14)
+
+    def test_released_with_frame(self):
+        """DataFrame 被回收后对应的缓存随之释放"""
+        df = make_price_frame()
+        feature_frame(df).get("rsi")
+        key = id(df)
+        self.assertIn(key, feature_engine._frames)
+        del df
+        gc.collect()
+        self.assertNotIn(key, feature_engine._frames)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+import tempfile
+import shutil
+from datetime import date
+from unittest.mock import patch
+
+import pandas as pd
+
+from src.utils.financial_cache import FinancialCache, next_report_period, disclosure_deadline
+
+
+def make_report(periods):
+    """生成 ak.stock_financial_report_sina 格式的模拟利润表，报告日从新到旧"""
+    periods = sorted(periods, reverse=True)
+    return pd.DataFrame({
+        "报告日": periods,
+        "营业总收入": [1000.0 + i for i in range(len(periods))],
+        "净利润": [100.0 + i for i in range(len(periods))],
+    })
+
+
+def make_indicator(dates):
+    """生成 ak.stock_financial_analysis_indicator 格式的模拟数据，日期从旧到新"""
+    return pd.DataFrame({
+        "日期": [pd.Timestamp(d).date() for d in sorted(dates)],
+        "净资产收益率(%)": [10.0] * len(dates),
+    })
+
+
+class TestReportCalendar(unittest.TestCase):
+    def test_next_report_period(self):
+        """报告期按季度末推进"""
+        self.assertEqual(next_report_period(date(2024, 3, 31)), date(2024, 6, 30))
+        self.assertEqual(next_report_period(date(2024, 9, 30)), date(2024, 12, 31))
+        self.assertEqual(next_report_period(date(2024, 12, 31)), date(2025, 3, 31))
+
+    def test_disclosure_deadline(self):
+        """年报在次年 4 月 30 日前披露"""
+        self.assertEqual(disclosure_deadline(date(2024, 6, 30)), date(2024, 8, 31))
+        self.assertEqual(disclosure_deadline(date(2024, 12, 31)), date(2025, 4, 30))
+
+
+class TestFinancialCache(unittest.TestCase):
+    def setUp(self):
+        """每个测试使用独立的临时缓存目录"""
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = FinancialCache(root_dir=self.cache_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def set_today(self, today):
+        patcher = patch.object(FinancialCache, '_today', return_value=today)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('src.utils.financial_cache.ak.stock_financial_report_sina')
+    def test_no_refetch_before_next_period_ends(self, mock_report):
+        """下一报告期结束前不会重新下载，且缓存跨实例持久化"""
+        mock_report.return_value = make_report(["20240331", "20240630", "20240930"])
+        self.set_today(date(2024, 11, 5))
+
+        report = self.cache.get_report("600519", "利润表")
+        self.assertEqual(report["报告日"].tolist(), ["20240930", "20240630", "20240331"])
+
+        # 新实例从磁盘读取，12 月 31 日前不可能有新报告
+        self.set_today(date(2024, 12, 20))
+        reloaded = FinancialCache(root_dir=self.cache_dir)
+        self.assertEqual(len(reloaded.get_report("600519", "利润表")), 3)
+        mock_report.assert_called_once()
+
+    @patch('src.utils.financial_cache.ak.stock_financial_report_sina')
+    def test_refetch_at_most_once_per_day_in_window(self, mock_report):
+        """进入披露窗口后每天最多确认一次，发现新报告期后更新缓存"""
+        mock_report.return_value = make_report(["20240630", "20240930"])
+        self.set_today(date(2024, 11, 5))
+        self.cache.get_report("600519", "利润表")
+
+        # 年报披露窗口内，同一天只确认一次
+        self.set_today(date(2025, 3, 20))
+        self.cache.get_report("600519", "利润表")
+        self.cache.get_report("600519", "利润表")
+        self.assertEqual(mock_report.call_count, 2)
+
+        # 次日年报已披露
+        mock_report.return_value = make_report(["20240630", "20240930", "20241231"])
+        self.set_today(date(2025, 3, 21))
+        report = self.cache.get_report("600519", "利润表")
+        self.assertEqual(report["报告日"].iloc[0], "20241231")
+        self.assertEqual(mock_report.call_count, 3)
+
+    @patch('src.utils.financial_cache.ak.stock_financial_report_sina')
+    def test_stale_cache_used_when_refresh_fails(self, mock_report):
+        """刷新失败时继续使用旧数据"""
+        mock_report.side_effect = [make_report(["20240930"]), ConnectionError("timeout")]
+        self.set_today(date(2024, 11, 5))
+        self.cache.get_report("600519", "利润表")
+
+        self.set_today(date(2025, 3, 20))
+        report = self.cache.get_report("600519", "利润表")
+        self.assertEqual(report["报告日"].tolist(), ["20240930"])
+
+    @patch('src.utils.financial_cache.ak.stock_financial_analysis_indicator')
+    def test_indicator_merged_incrementally(self, mock_indicator):
+        """财务指标只下载最新报告期所在年度之后的数据并按日期合并"""
+        mock_indicator.return_value = make_indicator(
+            ["2022-12-31", "2023-12-31", "2024-06-30", "2024-09-30"])
+        self.set_today(date(2024, 11, 5))
+        self.cache.get_indicator("600519")
+
+        mock_indicator.return_value = make_indicator(
+            ["2024-06-30", "2024-09-30", "2024-12-31"])
+        self.set_today(date(2025, 3, 20))
+        data = self.cache.get_indicator("600519")
+
+        self.assertEqual(mock_indicator.call_args.kwargs["start_year"], "2024")
+        self.assertEqual(len(data), 5)
+        self.assertEqual(data["日期"].iloc[0], pd.Timestamp("2024-12-31"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from src.benchmarks import legacy
+from src.benchmarks.legacy import legacy_rolling_hurst
+from src.benchmarks.bench_indicators import make_ohlcv
+from src.utils import indicators
+from src.utils.indicators import rolling_hurst
+from src.agents.technicals import calculate_adx, calculate_obv
+
+
+def make_close(num_bars, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, num_bars)))
+    # 模拟停牌：连续几天价格不变，产生零收益率
+    close[40:46] = close[39]
+    return pd.Series(close)
+
+
+class TestRollingHurst(unittest.TestCase):
+    def assert_matches_legacy(self, close):
+        log_returns = np.log(close / close.shift(1))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            expected = legacy_rolling_hurst(log_returns).values
+            actual = rolling_hurst(log_returns.values)
+
+        np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+        np.testing.assert_allclose(actual[~np.isnan(actual)], expected[~np.isnan(expected)],
+                                   rtol=1e-9, atol=1e-12)
+
+    def test_matches_rolling_apply(self):
+        """向量化实现与原 rolling.apply 实现结果一致"""
+        self.assert_matches_legacy(make_close(400))
+
+    def test_matches_with_missing_prices(self):
+        """价格序列中存在缺失值时结果仍一致"""
+        close = make_close(300, seed=1)
+        close.iloc[150] = np.nan
+        self.assert_matches_legacy(close)
+
+    def test_short_series(self):
+        """数据不足时全部为 NaN"""
+        result = rolling_hurst(np.log(make_close(50)).diff().values)
+        self.assertTrue(np.isnan(result).all())
+        self.assertEqual(len(rolling_hurst(np.array([]))), 0)
+
+
+class TestIndicatorKernels(unittest.TestCase):
+    def setUp(self):
+        self.df = make_ohlcv(600, seed=3)
+        # 带缺失值的版本：开头缺失、中间零星缺失
+        self.df_nan = self.df.copy()
+        rng = np.random.default_rng(5)
+        for col in ["high", "low", "close", "volume"]:
+            self.df_nan.loc[rng.integers(0, 600, 8), col] = np.nan
+        self.df_nan.loc[:3, "close"] = np.nan
+
+    def assert_same(self, actual, expected):
+        actual = np.asarray(actual, dtype=np.float64)
+        expected = np.asarray(expected, dtype=np.float64)
+        np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+        np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+    def columns(self, df):
+        return df["high"].to_numpy(), df["low"].to_numpy(), df["close"].to_numpy()
+
+    def test_matches_legacy_pandas(self):
+        """各指标内核与原 pandas 实现结果一致，包括缺失值的处理"""
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            for df in [self.df, self.df_nan]:
+                high, low, close = self.columns(df)
+                for expected, actual in zip(legacy.legacy_macd(df), indicators.macd(close)):
+                    self.assert_same(actual, expected)
+                for span in [8, 21, 55]:
+                    self.assert_same(indicators.ema(close, span), legacy.legacy_ema(df, span))
+                    self.assert_same(indicators.ema(close, span, adjust=True),
+                                     df["close"].ewm(span=span).mean())
+                self.assert_same(indicators.rsi(close, 14), legacy.legacy_rsi(df, 14))
+                upper, _, lower = indicators.bollinger_bands(close)
+                legacy_upper, legacy_lower = legacy.legacy_bollinger_bands(df)
+                self.assert_same(upper, legacy_upper)
+                self.assert_same(lower, legacy_lower)
+                self.assert_same(indicators.obv(close, df["volume"].to_numpy()),
+                                 legacy.legacy_obv(df.copy()))
+                self.assert_same(indicators.atr(high, low, close), legacy.legacy_atr(df))
+                expected_adx = legacy.legacy_adx(df.copy())
+                for actual, col in zip(indicators.adx(high, low, close), ["adx", "+di", "-di"]):
+                    self.assert_same(actual, expected_adx[col])
+                expected_ichimoku = legacy.legacy_ichimoku(df)
+                for name, values in indicators.ichimoku(high, low, close).items():
+                    self.assert_same(values, expected_ichimoku[name])
+
+    def test_long_series_ema_is_stable(self):
+        """长序列上分块递推的 EMA 与逐点递推一致"""
+        close = make_ohlcv(20000, seed=9)["close"]
+        self.assert_same(indicators.ema(close.to_numpy(), 5), close.ewm(span=5, adjust=False).mean())
+        self.assert_same(indicators.ema(close.to_numpy(), 200, adjust=True), close.ewm(span=200).mean())
+
+    def test_inputs_not_mutated(self):
+        """内核与 technicals 中的封装均不修改输入"""
+        df = self.df.copy()
+        snapshot = df.copy()
+        high, low, close = self.columns(df)
+        for arr in (high, low, close):
+            arr.flags.writeable = False
+        indicators.adx(high, low, close)
+        indicators.ichimoku(high, low, close)
+        indicators.obv(close, df["volume"].to_numpy())
+
+        calculate_adx(df)
+        calculate_obv(df)
+        pd.testing.assert_frame_equal(df, snapshot)
+
+    def test_empty_and_short_inputs(self):
+        """空序列和短于窗口的序列"""
+        empty = np.array([])
+        self.assertEqual(len(indicators.ema(empty, 12)), 0)
+        self.assertEqual(len(indicators.rsi(empty)), 0)
+        self.assertEqual(len(indicators.obv(empty, empty)), 0)
+        short = np.arange(5, dtype=float) + 1
+        self.assertTrue(np.isnan(indicators.rolling_max(short, 9)).all())
+        self.assertTrue(np.isnan(indicators.bollinger_bands(short)[0]).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
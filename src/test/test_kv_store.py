@@ -0,0 +1,158 @@
+import os
+import json
+import asyncio
+import sqlite3
+import tempfile
+import threading
+import unittest
+from multiprocessing import Pool
+from unittest.mock import AsyncMock, patch
+
+from src.utils import news_crawler
+from src.utils.kv_store import KVStore, connect_sqlite, hash_key, retry_locked
+
+NEWS = [{"title": "业绩预增", "content": "公司预计年度净利润同比增长" * 20,
+         "publish_time": "2025-01-20 17:58:14", "source": "证券时报"}]
+
+
+def write_keys(args):
+    """在独立进程中写入一批记录"""
+    path, worker = args
+    store = KVStore(path)
+    for i in range(50):
+        store.put(f"worker-{worker}-{i}", {"score": i})
+    return worker
+
+
+class TestKVStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "cache.sqlite3")
+
+    def test_point_lookup_with_hashed_key(self):
+        """任意长度的键以哈希存储，按原始键查询"""
+        store = KVStore(self.path)
+        long_key = "标题|内容" * 1000
+        store.put(long_key, 0.5)
+        self.assertEqual(store.get(long_key), 0.5)
+        self.assertIn(long_key, store)
+        self.assertIsNone(store.get("missing"))
+        row = store._connect().execute("SELECT key FROM kv").fetchone()
+        self.assertEqual(row[0], hash_key(long_key))
+        self.assertEqual(store._connect().execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_concurrent_processes(self):
+        """多个进程同时写入同一个文件，所有记录都完整保存"""
+        with Pool(4) as pool:
+            pool.map(write_keys, [(self.path, worker) for worker in range(4)])
+        store = KVStore(self.path)
+        self.assertEqual(len(store), 200)
+        self.assertEqual(store.get("worker-3-49"), {"score": 49})
+
+    def test_schema_setup_waits_for_lock(self):
+        """另一个连接持有写锁时，建表在锁释放后完成；锁冲突的操作会重试"""
+        connect_sqlite(self.path).close()
+        blocker = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.addCleanup(blocker.close)
+        blocker.execute("BEGIN IMMEDIATE")
+        timer = threading.Timer(0.2, lambda: blocker.execute("COMMIT"))
+        timer.start()
+        store = KVStore(self.path)
+        store.put("a", 1)
+        timer.join()
+        self.assertEqual(store.get("a"), 1)
+
+        failures = iter([sqlite3.OperationalError("database is locked")] * 2)
+
+        def flaky():
+            error = next(failures, None)
+            if error is not None:
+                raise error
+            return "ok"
+        self.assertEqual(retry_locked(flaky), "ok")
+
+
+class TestSentimentCache(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = patch.object(news_crawler, "_sentiment_cache", KVStore(os.path.join(tmp.name, "s.sqlite3")))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('src.utils.news_crawler.get_chat_completion', return_value={"moonshot": "0.6"})
+    def test_score_cached(self, mock_completion):
+        """情感得分写入缓存，相同新闻再次分析时不再调用 LLM"""
+        self.assertEqual(news_crawler.get_news_sentiment(NEWS, num_of_news=1), 0.6)
+        self.assertEqual(news_crawler.get_news_sentiment(NEWS, num_of_news=1), 0.6)
+        mock_completion.assert_called_once()
+
+    @patch('src.utils.news_crawler.get_chat_completion')
+    def test_only_unseen_articles_scored(self, mock_completion):
+        """只把未分析过的新闻发送给 LLM，整体得分由各条新闻的缓存得分汇总"""
+        articles = [dict(NEWS[0], title=f"新闻{i}", url=f"https://example.com/{i}") for i in range(7)]
+
+        mock_completion.side_effect = lambda messages, model: {
+            "moonshot": json.dumps([0.5] * messages[1]["content"].count("【新闻"))}
+        news_crawler.get_news_sentiment(articles[:6], num_of_news=6)
+        # 6 条新闻分两批打分
+        self.assertEqual(mock_completion.call_count, 2)
+
+        mock_completion.reset_mock()
+        mock_completion.side_effect = lambda messages, model: {"moonshot": "[-1.0]"}
+        score = news_crawler.get_news_sentiment(articles[1:], num_of_news=6)
+        mock_completion.assert_called_once()
+        self.assertEqual(mock_completion.call_args[0][0][1]["content"].count("【新闻"), 1)
+        self.assertAlmostEqual(score, (0.5 * 5 - 1.0) / 6)
+
+    @patch('src.utils.news_crawler.get_chat_completion',
+           return_value={"moonshot": "[0.2, 0.4]", "gemini": "```json\n[0.4, 0.8]\n```"})
+    def test_models_averaged_per_article(self, mock_completion):
+        """多个模型的得分按新闻取平均，格式错误的回复被忽略"""
+        articles = [dict(NEWS[0], url="a"), dict(NEWS[0], url="b")]
+        self.assertAlmostEqual(news_crawler.get_news_sentiment(articles), 0.45)
+        cache = news_crawler.get_sentiment_cache()
+        self.assertAlmostEqual(cache.get(news_crawler.article_key(articles[1])), 0.6)
+
+    @patch('src.utils.news_crawler.get_chat_completion', return_value={})
+    def test_failure_not_cached(self, mock_completion):
+        """LLM 调用失败时返回中性分数且不写入缓存"""
+        self.assertEqual(news_crawler.get_news_sentiment(NEWS, num_of_news=1), 0.0)
+        self.assertEqual(len(news_crawler.get_sentiment_cache()), 0)
+
+    @patch('src.utils.news_crawler.get_chat_completion_async', new_callable=AsyncMock,
+           return_value={"moonshot": "[0.2, 0.4]"})
+    def test_async_shares_cache(self, mock_completion):
+        """异步版本与同步版本共用同一份逐条新闻缓存"""
+        articles = [dict(NEWS[0], url="a"), dict(NEWS[0], url="b")]
+        self.assertAlmostEqual(asyncio.run(news_crawler.get_news_sentiment_async(articles)), 0.3)
+        with patch('src.utils.news_crawler.get_chat_completion') as sync_completion:
+            self.assertAlmostEqual(news_crawler.get_news_sentiment(articles), 0.3)
+        sync_completion.assert_not_called()
+        mock_completion.assert_awaited_once()
+
+    @patch('src.utils.news_crawler.get_chat_completion_async', new_callable=AsyncMock,
+           return_value={"moonshot": "[0.2]"})
+    def test_async_cache_access_off_event_loop(self, mock_completion):
+        """异步版本在线程中读写 SQLite 缓存，不在事件循环线程上执行"""
+        loop_thread = threading.get_ident()
+        threads = []
+        cache = news_crawler.get_sentiment_cache()
+        for name in ("get", "put_many"):
+            original = getattr(cache, name)
+
+            def record(*args, original=original, **kwargs):
+                threads.append(threading.get_ident())
+                return original(*args, **kwargs)
+            patcher = patch.object(cache, name, side_effect=record)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        asyncio.run(news_crawler.get_news_sentiment_async([dict(NEWS[0], url="a")]))
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(loop_thread, threads)
+
+
+if __name__ == '__main__':
+    unittest.main()
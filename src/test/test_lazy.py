@@ -0,0 +1,69 @@
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+from src.benchmarks.baseline import load_baseline
+from src.benchmarks.bench_startup import BASELINE_FILE, ENTRY_MODULES, check, measure_import
+from src.utils.lazy import LazyModule, is_loaded, lazy_import
+
+
+class TestLazyModule(unittest.TestCase):
+    def setUp(self):
+        # 使用标准库中本进程尚未导入的模块
+        self.name = "colorsys" if "colorsys" not in sys.modules else "wave"
+        sys.modules.pop(self.name, None)
+        self.addCleanup(sys.modules.pop, self.name, None)
+
+    def test_loaded_on_first_attribute_access(self):
+        """只有访问属性时才真正导入"""
+        module = lazy_import(self.name)
+        self.assertFalse(is_loaded(module))
+        self.assertNotIn(self.name, sys.modules)
+        self.assertEqual(module.__name__, self.name)
+        self.assertTrue(is_loaded(module))
+        self.assertIn(self.name, sys.modules)
+        # 已导入的模块直接返回模块本身
+        self.assertIs(lazy_import(self.name), sys.modules[self.name])
+
+    def test_patch_targets_real_module(self):
+        """patch("x.ak.func") 修改的是真实模块，结束后恢复原值"""
+        module = LazyModule("json")
+        import json
+        original = json.dumps
+        with patch.object(module, "dumps", return_value="patched"):
+            self.assertEqual(json.dumps({}), "patched")
+            self.assertEqual(module.dumps({}), "patched")
+        self.assertIs(json.dumps, original)
+
+    def test_concurrent_first_access(self):
+        """多个线程同时首次访问时只导入一次"""
+        module = LazyModule(self.name)
+        with patch("importlib.import_module", wraps=__import__("importlib").import_module) as mock_import:
+            threads = [threading.Thread(target=lambda: module.__name__) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(mock_import.call_count, 1)
+
+
+class TestStartup(unittest.TestCase):
+    def test_entry_point_defers_heavy_imports(self):
+        """导入命令行入口时不加载 akshare、LLM SDK、langgraph 和 matplotlib"""
+        result = measure_import("src.backtester", repeat=1)
+        self.assertEqual(result["loaded"], [])
+
+    def test_check_against_baseline(self):
+        """超过基线 tolerance 倍或提前加载重量级依赖时判定为退化，每个入口都有基线"""
+        results = [{"module": "src.main", "seconds": 0.5, "loaded": []},
+                   {"module": "src.batch", "seconds": 0.9, "loaded": []},
+                   {"module": "src.server", "seconds": 0.3, "loaded": ["akshare"]}]
+        baseline = {"src.main": 0.4, "src.batch": 0.4, "src.server": 0.4}
+        self.assertEqual([row["ok"] for row in check(results, baseline, tolerance=1.5)],
+                         [True, False, False])
+        self.assertEqual(set(load_baseline(BASELINE_FILE)), set(ENTRY_MODULES))
+
+
+if __name__ == '__main__':
+    unittest.main()
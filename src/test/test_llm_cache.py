@@ -0,0 +1,97 @@
+import os
+import time
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+
+from src.utils.llm_cache import LLMCache, cache_key
+from src.utils.openrouter_config import get_chat_completion
+
+MESSAGES = [{"role": "user", "content": "请分析以下新闻的情感倾向"}]
+
+
+class TestLLMCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_key_covers_request(self):
+        """模型、实际模型名、消息或温度任一不同都得到不同的键"""
+        key = cache_key("moonshot", "moonshot-v1-8k", MESSAGES, 0.3)
+        self.assertEqual(key, cache_key("moonshot", "moonshot-v1-8k", [dict(MESSAGES[0])], 0.3))
+        self.assertNotEqual(key, cache_key("gemini", "moonshot-v1-8k", MESSAGES, 0.3))
+        self.assertNotEqual(key, cache_key("moonshot", "moonshot-v1-32k", MESSAGES, 0.3))
+        self.assertNotEqual(key, cache_key("moonshot", "moonshot-v1-8k", MESSAGES + MESSAGES, 0.3))
+        self.assertNotEqual(key, cache_key("moonshot", "moonshot-v1-8k", MESSAGES, 0.7))
+
+    def test_persisted_across_instances(self):
+        """缓存写入磁盘，新的实例（新进程）可以直接读取"""
+        LLMCache(self.tmp.name).put("ab" * 32, "0.5")
+        self.assertEqual(LLMCache(self.tmp.name).get("ab" * 32), "0.5")
+        self.assertIsNone(LLMCache(self.tmp.name).get("cd" * 32))
+
+    def test_ttl(self):
+        """超过有效期的条目视为未命中并被删除"""
+        cache = LLMCache(self.tmp.name, ttl=0.1)
+        cache.put("ab" * 32, "0.5")
+        self.assertEqual(cache.get("ab" * 32), "0.5")
+        time.sleep(0.2)
+        self.assertIsNone(cache.get("ab" * 32))
+        self.assertFalse(os.path.exists(cache._path("ab" * 32)))
+
+    def test_size_bounded_lru_eviction(self):
+        """超过容量时淘汰最久未使用的条目"""
+        cache = LLMCache(self.tmp.name, max_bytes=400)
+        keys = [f"{i:02d}" * 32 for i in range(3)]
+        cache.put(keys[0], "x" * 100)
+        time.sleep(0.01)
+        cache.put(keys[1], "x" * 100)
+        time.sleep(0.01)
+        # 访问第一个条目后，第二个成为最久未使用的条目
+        cache.get(keys[0])
+        time.sleep(0.01)
+        cache.put(keys[2], "x" * 100)
+
+        self.assertLessEqual(cache._size, 400)
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertEqual(cache.get(keys[0]), "x" * 100)
+        self.assertEqual(cache.get(keys[2]), "x" * 100)
+
+
+class TestCachedCompletion(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patchers = {
+            "cache": patch('src.utils.openrouter_config.llm_cache', LLMCache(tmp.name)),
+            "clients": patch('src.utils.openrouter_config.client_manager'),
+            "generate": patch('src.utils.openrouter_config.generate_openai_content_with_retry'),
+        }
+        mocks = {}
+        for name, patcher in patchers.items():
+            mocks[name] = patcher.start()
+            self.addCleanup(patcher.stop)
+        mocks["clients"].get_clients_info.return_value = {"moonshot": (Mock(), "moonshot-v1-8k")}
+        self.mock_generate = mocks["generate"]
+        self.mock_generate.return_value = Mock(choices=[Mock(message=Mock(content="0.8"))])
+
+    def test_repeated_request_served_from_cache(self):
+        """相同请求第二次直接返回缓存的回复，不再调用接口"""
+        self.assertEqual(get_chat_completion(MESSAGES, "moonshot"), {"moonshot": "0.8"})
+        self.assertEqual(get_chat_completion(MESSAGES, "moonshot"), {"moonshot": "0.8"})
+        self.assertEqual(self.mock_generate.call_count, 1)
+
+        get_chat_completion(MESSAGES + MESSAGES, "moonshot")
+        self.assertEqual(self.mock_generate.call_count, 2)
+
+    def test_bypass(self):
+        """use_cache=False 或 LLM_CACHE=off 时不读写缓存"""
+        get_chat_completion(MESSAGES, "moonshot", use_cache=False)
+        with patch.dict(os.environ, {"LLM_CACHE": "off"}):
+            get_chat_completion(MESSAGES, "moonshot")
+        get_chat_completion(MESSAGES, "moonshot")
+        self.assertEqual(self.mock_generate.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
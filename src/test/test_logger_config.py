@@ -0,0 +1,101 @@
+import os
+import queue
+import logging
+import logging.handlers
+import threading
+import unittest
+from unittest.mock import patch
+
+from src.utils import logger_config
+from src.utils.logger_config import DeferredQueueHandler, flush_logs, get_logger, payload, preview, summarize
+
+
+class CountingPayload:
+    """记录 __str__ 被调用的线程"""
+
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread().name)
+        return "payload"
+
+
+class TestLazyPayload(unittest.TestCase):
+    def test_not_formatted_when_level_disabled(self):
+        """级别未启用时不转换为字符串"""
+        obj = CountingPayload()
+        logger = logging.getLogger("test_logger_config.disabled")
+        logger.setLevel(logging.WARNING)
+        logger.info("状态数据: %s", payload(obj))
+        self.assertEqual(obj.threads, [])
+
+    def test_compact_summary(self):
+        """紧凑模式只输出类型、长度和哈希"""
+        state = {"prices": list(range(1000))}
+        with patch.dict(os.environ, {"LOG_COMPACT": "on"}):
+            text = str(payload(state))
+            self.assertEqual(text, str(preview(state)))
+        self.assertTrue(text.startswith("<dict len=1 chars="))
+        self.assertEqual(text, summarize(state))
+        self.assertLess(len(text), 60)
+        # 内容不同则哈希不同
+        self.assertNotEqual(summarize({"prices": [1]}), text)
+
+    def test_snapshot_at_log_time(self):
+        """格式化的是记录时的状态，之后对状态的修改不影响已记录的日志"""
+        state = {"messages": ["a"], "data": {"ticker": "600519"}}
+        arg = payload(state)
+        state["messages"].append("b")
+        state["data"]["signal"] = "bullish"
+        with patch.dict(os.environ, {"LOG_COMPACT": "off"}):
+            self.assertEqual(str(arg), str({"messages": ["a"], "data": {"ticker": "600519"}}))
+
+    def test_preview_truncates(self):
+        with patch.dict(os.environ, {"LOG_COMPACT": "off"}):
+            self.assertEqual(str(preview("x" * 600, limit=10)), "x" * 10 + "...")
+            self.assertEqual(str(preview("short")), "short")
+
+
+class TestDeferredQueueHandler(unittest.TestCase):
+    def test_formatting_happens_off_caller_thread(self):
+        """调用线程只负责入队，格式化由后台线程完成"""
+        records = []
+
+        class ListHandler(logging.Handler):
+            def emit(self, record):
+                records.append(self.format(record))
+
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, ListHandler())
+        logger = logging.getLogger("test_logger_config.deferred")
+        logger.propagate = False
+        handler = DeferredQueueHandler(log_queue)
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+
+        obj = CountingPayload()
+        with patch.dict(os.environ, {"LOG_COMPACT": "off"}):
+            logger.warning("状态数据: %s", payload(obj))
+            self.assertEqual(obj.threads, [])
+            listener.start()
+            listener.stop()
+        self.assertEqual(records, ["状态数据: payload"])
+        self.assertNotEqual(obj.threads, [threading.current_thread().name])
+
+    def test_flush_logs(self):
+        """flush_logs 返回时已排队的日志已经写入文件"""
+        logger = get_logger()
+        if logger_config._listener is None:
+            self.skipTest("LOG_ASYNC=off")
+        file_handler = next(h for h in logger_config._listener.handlers
+                            if isinstance(h, logging.FileHandler))
+        marker = f"flush marker {threading.get_ident()}"
+        logger.info(marker)
+        flush_logs()
+        with open(file_handler.baseFilename, encoding="utf-8") as f:
+            self.assertIn(marker, f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import os
+import json
+import time
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+from src.utils import news_crawler
+from src.utils.news_archive import NewsArchive
+
+
+def make_news(day: int, url: str = None) -> dict:
+    return {"title": f"新闻{day}", "content": f"第{day}天的公司经营情况说明" * 2,
+            "publish_time": f"2025-01-{day:02d} 09:30:00", "source": "证券时报",
+            "url": url or f"http://news/{day}", "keyword": "000001"}
+
+
+def news_frame(news_list: list) -> pd.DataFrame:
+    """构造与 ak.stock_news_em 相同列名的数据"""
+    return pd.DataFrame([{
+        "关键词": news["keyword"], "新闻标题": news["title"], "新闻内容": news["content"],
+        "发布时间": news["publish_time"], "文章来源": news["source"], "新闻链接": news["url"],
+    } for news in news_list])
+
+
+class TestNewsArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.archive = NewsArchive(os.path.join(self.tmp.name, "news.sqlite3"))
+
+    def test_merge_by_url(self):
+        """按新闻链接合并，重复的新闻不会再次写入"""
+        self.assertEqual(self.archive.merge("000001", [make_news(1), make_news(2)]), 2)
+        self.assertEqual(self.archive.merge("000001", [make_news(2), make_news(3)]), 1)
+        self.assertEqual(self.archive.merge("600519", [make_news(2)]), 1)
+        self.assertEqual(self.archive.count("000001"), 3)
+
+    def test_point_in_time_query(self):
+        """只返回时点之前发布的新闻，按发布时间倒序"""
+        self.archive.merge("000001", [make_news(day) for day in (3, 1, 5, 2, 4)])
+        titles = [news["title"] for news in self.archive.query("000001", 2, as_of="2025-01-03")]
+        self.assertEqual(titles, ["新闻3", "新闻2"])
+        titles = [news["title"] for news in self.archive.query("000001", 2, as_of="2025-01-03 09:00:00")]
+        self.assertEqual(titles, ["新闻2", "新闻1"])
+        self.assertEqual(self.archive.query("000001", 10)[0]["title"], "新闻5")
+
+    def test_import_legacy_file_once(self):
+        """旧版按天保存的新闻文件只导入一次"""
+        legacy = os.path.join(self.tmp.name, "000001_news.json")
+        with open(legacy, 'w', encoding='utf-8') as f:
+            json.dump({"date": "2025-01-05", "news": [make_news(1), make_news(2)]}, f)
+        self.assertEqual(self.archive.import_json("000001", legacy), 2)
+        self.assertEqual(self.archive.import_json("000001", legacy), 0)
+        self.assertEqual(self.archive.count("000001"), 2)
+
+
+class TestGetStockNews(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = patch.object(news_crawler, "_news_archive",
+                               NewsArchive(os.path.join(self.tmp.name, "news.sqlite3")))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('src.utils.news_crawler.ak.stock_news_em')
+    def test_refresh_within_ttl_and_accumulate(self, mock_news):
+        """更新间隔内不再访问网络，历史新闻在存档中累积"""
+        archive = news_crawler.get_news_archive()
+        archive.merge("000001", [make_news(1), make_news(2)])
+        mock_news.return_value = news_frame([make_news(2), make_news(3)])
+
+        news_list = news_crawler.get_stock_news("000001", max_news=10)
+        news_crawler.get_stock_news("000001", max_news=20)
+
+        self.assertEqual(mock_news.call_count, 1)
+        self.assertEqual([news["title"] for news in news_list], ["新闻3", "新闻2", "新闻1"])
+        self.assertAlmostEqual(archive.last_refresh("000001"), time.time(), delta=60)
+
+        # 超过更新间隔后再次访问网络；旧版按日期记录的更新时间视为未更新
+        self.assertEqual(news_crawler.refresh_stock_news("000001", ttl=0), 0)
+        archive.set_meta("refreshed:000001", "2025-01-05")
+        news_crawler.get_stock_news("000001", max_news=10)
+        self.assertEqual(mock_news.call_count, 3)
+
+    @patch('src.utils.news_crawler.ak.stock_news_em')
+    def test_historical_query_is_offline(self, mock_news):
+        """早于今天的时点只查询存档"""
+        news_crawler.get_news_archive().merge("000001", [make_news(day) for day in range(1, 6)])
+        news_list = news_crawler.get_stock_news("000001", max_news=2, as_of="2025-01-03")
+        mock_news.assert_not_called()
+        self.assertEqual([news["title"] for news in news_list], ["新闻3", "新闻2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import json
+import unittest
+
+from src.backtester import Backtester
+from src.benchmarks.bench_offline import compare
+from src.benchmarks.synthetic import SyntheticMarket, offline_environment
+from src.main import build_hedge_workflow, run_hedge_fund
+from src.utils.news_crawler import _batch_messages
+from src.utils.openrouter_config import client_manager, get_chat_completion
+
+
+class TestSyntheticMarket(unittest.TestCase):
+    def test_deterministic_and_akshare_columns(self):
+        """同一股票在不同实例、不同区间中的价格相同，列名与 akshare 一致"""
+        first = SyntheticMarket(universe_size=30).stock_zh_a_hist("600519", "daily", "20240101", "20241231", "qfq")
+        second = SyntheticMarket(universe_size=30).stock_zh_a_hist("600519", "daily", "20240601", "20241231", "qfq")
+        self.assertTrue({"日期", "开盘", "收盘", "最高", "最低", "成交量"} <= set(first.columns))
+        self.assertEqual(first["日期"].iloc[0], "2024-01-01")
+        tail = first[first["日期"] >= "2024-06-01"].reset_index(drop=True)
+        self.assertTrue(tail.equals(second))
+
+    def test_spot_and_financials(self):
+        market = SyntheticMarket(universe_size=30, quarters=4)
+        spot = market.stock_zh_a_spot_em()
+        self.assertEqual(len(spot), 30)
+        self.assertIn("总市值", spot.columns)
+
+        income = market.stock_financial_report_sina("sh600519", "利润表")
+        self.assertEqual(len(income), 4)
+        self.assertIn("净利润", income.columns)
+        indicator = market.stock_financial_analysis_indicator("600519")
+        # 指标按日期从旧到新
+        self.assertEqual(list(indicator["日期"]), sorted(indicator["日期"]))
+
+
+class TestStubModel(unittest.TestCase):
+    def test_sentiment_scores(self):
+        """stub 模型为每条新闻返回 [-1, 1] 内的确定性得分"""
+        batch = [{"title": f"标题{i}", "source": "合成新闻", "publish_time": "2024-01-02 09:30:00",
+                  "content": f"内容{i}"} for i in range(3)]
+        with offline_environment(SyntheticMarket(universe_size=30)):
+            first = json.loads(get_chat_completion(_batch_messages(batch), ["stub"])["stub"])
+            second = json.loads(get_chat_completion(_batch_messages(batch), ["stub"])["stub"])
+        self.assertEqual(len(first), 3)
+        self.assertEqual(first, second)
+        self.assertTrue(all(-1 <= score <= 1 for score in first))
+
+    def test_stub_not_in_default_models(self):
+        """未指定模型时不会使用 stub"""
+        self.assertNotIn("stub", client_manager.get_clients_info(None))
+        self.assertIn("stub", client_manager.get_clients_info(["stub"]))
+
+
+class TestOfflineWorkflow(unittest.TestCase):
+    def test_workflow_and_backtest_run_offline(self):
+        """合成数据 + stub 模型完整运行工作流，回测能解析决策中的智能体信号"""
+        with offline_environment(SyntheticMarket(universe_size=30)):
+            app = build_hedge_workflow()
+            decision = json.loads(run_hedge_fund(app, ["stub"], "600001", "2024-01-01", "2024-12-31",
+                                                 {"cash": 100000.0, "stock": 0}))
+            self.assertIn(decision["action"], ("buy", "sell", "hold"))
+
+            backtester = Backtester(agent=run_hedge_fund, ticker="600001", start_date="2024-12-02",
+                                    end_date="2024-12-31", initial_capital=100000.0, num_of_news=5,
+                                    model=["stub"], app=app)
+            output = backtester.get_agent_decision("2024-12-31", "2024-01-01",
+                                                   {"cash": 100000.0, "stock": 0})
+        self.assertIn("risk_management", output["analyst_signals"])
+
+    def test_compare_flags_regressions(self):
+        rows = compare({"graph.warm": 0.2, "graph.cold": 0.1, "backtest.fast": 0.5},
+                       {"graph.warm": 0.1, "graph.cold": 0.1})
+        self.assertEqual([row["ok"] for row in rows], [False, True, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,23 @@
+import asyncio
 import unittest
 from unittest.mock import Mock, patch
 import os
 import sys
-from src.utils.openrouter_config import get_chat_completion, ClientManager, model_handlers
+import time
+import tempfile
+from src.utils.llm_cache import LLMCache
+from src.utils.openrouter_config import get_chat_completion, get_chat_completion_async, ClientManager, model_handlers
 
 class TestGetChatCompletion(unittest.TestCase):
     def setUp(self):
         """测试前的准备工作"""
+        # 每个测试使用独立的空缓存目录
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        cache_patcher = patch('src.utils.openrouter_config.llm_cache', LLMCache(cache_dir.name))
+        cache_patcher.start()
+        self.addCleanup(cache_patcher.stop)
+
         # 模拟消息
         self.messages = [
             {"role": "system", "content": "你是一个助手"},
@@ -128,5 +139,84 @@ class TestGetChatCompletion(unittest.TestCase):
         })
         self.assertEqual(mock_generate_openai.call_count, 2)
 
+    def slow_completion(self, delays):
+        """按 provider 延迟不同时间后返回各自的回复"""
+        def generate(client, model, messages, provider):
+            time.sleep(delays[provider])
+            return Mock(choices=[Mock(message=Mock(content=f"{provider}的回复"))])
+        return generate
+
+    @patch('src.utils.openrouter_config.client_manager')
+    @patch('src.utils.openrouter_config.generate_openai_content_with_retry')
+    def test_models_called_concurrently(self, mock_generate_openai, mock_client_manager):
+        """多个模型并发调用，总耗时接近最慢的模型而不是耗时之和"""
+        mock_client_manager.get_clients_info.return_value = {
+            "moonshot-1": (self.mock_openai_client, "moonshot-v1-8k"),
+            "moonshot-2": (self.mock_openai_client, "moonshot-v1-8k")
+        }
+        mock_generate_openai.side_effect = self.slow_completion({"moonshot-1": 0.4, "moonshot-2": 0.4})
+
+        started = time.perf_counter()
+        result = get_chat_completion(self.messages, model=["moonshot-1", "moonshot-2"])
+
+        self.assertLess(time.perf_counter() - started, 0.7)
+        self.assertEqual(list(result), ["moonshot-1", "moonshot-2"])
+
+    @patch('src.utils.openrouter_config.client_manager')
+    @patch('src.utils.openrouter_config.generate_openai_content_with_retry')
+    def test_first_n_and_timeout(self, mock_generate_openai, mock_client_manager):
+        """first_n 拿到足够结果后立即返回，超过截止时间的模型被丢弃"""
+        mock_client_manager.get_clients_info.return_value = {
+            "moonshot-slow": (self.mock_openai_client, "moonshot-v1-8k"),
+            "moonshot-fast": (self.mock_openai_client, "moonshot-v1-8k")
+        }
+        mock_generate_openai.side_effect = self.slow_completion({"moonshot-slow": 1.0, "moonshot-fast": 0.05})
+
+        started = time.perf_counter()
+        result = get_chat_completion(self.messages, model=["moonshot-slow", "moonshot-fast"], first_n=1)
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(result, {"moonshot-fast": "moonshot-fast的回复"})
+
+        started = time.perf_counter()
+        result = get_chat_completion(self.messages, model=["moonshot-slow", "moonshot-fast"], timeout=0.3)
+        self.assertLess(time.perf_counter() - started, 0.6)
+        self.assertEqual(result, {"moonshot-fast": "moonshot-fast的回复"})
+
+        # 等待被丢弃的调用在后台结束
+        time.sleep(1.0)
+
+    @patch('src.utils.openrouter_config.client_manager')
+    @patch('src.utils.openrouter_config.generate_openai_content_with_retry')
+    def test_async_completion(self, mock_generate_openai, mock_client_manager):
+        """异步版本与同步版本的返回格式、first_n 和超时行为一致"""
+        mock_client_manager.get_clients_info.return_value = {
+            "moonshot-slow": (self.mock_openai_client, "moonshot-v1-8k"),
+            "moonshot-fast": (self.mock_openai_client, "moonshot-v1-8k")
+        }
+        mock_generate_openai.side_effect = self.slow_completion({"moonshot-slow": 0.6, "moonshot-fast": 0.05})
+
+        async def main():
+            started = time.perf_counter()
+            first = await get_chat_completion_async(
+                self.messages, model=["moonshot-slow", "moonshot-fast"], first_n=1)
+            first_elapsed = time.perf_counter() - started
+            both = await get_chat_completion_async(self.messages, model=["moonshot-slow", "moonshot-fast"])
+            return first, first_elapsed, both
+
+        first, first_elapsed, both = asyncio.run(main())
+        self.assertLess(first_elapsed, 0.4)
+        self.assertEqual(first, {"moonshot-fast": "moonshot-fast的回复"})
+        self.assertEqual(list(both), ["moonshot-slow", "moonshot-fast"])
+
+class TestClientManager(unittest.TestCase):
+    def test_returns_only_requested_models(self):
+        """已为其他请求初始化的客户端不会出现在本次调用中"""
+        manager = ClientManager()
+        clients = {"gemini": (Mock(), "gemini-1.5-flash"), "moonshot": (Mock(), "moonshot-v1-8k")}
+        with patch.dict(manager.clients, clients, clear=True):
+            self.assertEqual(list(manager.get_clients_info(["moonshot"])), ["moonshot"])
+            self.assertEqual(list(manager.get_clients_info("gemini")), ["gemini"])
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,84 @@
+import logging
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from src.agents.market_data import market_data_agent
+from src.backtester import Backtester
+from src.utils.price_panel import PricePanel
+from src.test.test_price_payload import make_price_frame
+
+
+class TestPricePanel(unittest.TestCase):
+    def setUp(self):
+        # 2023-01-02 起的 300 个工作日
+        self.df = make_price_frame(num_bars=300)
+        self.panel = PricePanel(self.df)
+
+    def test_history_is_point_in_time_view(self):
+        """切片截止到当日（含），且是面板的只读视图"""
+        prices = self.panel.history("2023-06-01", "2023-12-29")
+        self.assertEqual(str(prices["date"][-1])[:10], "2023-12-29")
+        self.assertTrue(np.shares_memory(prices["close"], self.panel.columns["close"]))
+        self.assertFalse(prices["close"].flags.writeable)
+
+    def test_history_extends_short_lookback(self):
+        """回看区间不足 120 个交易日时与 get_price_history 一样扩大到两年"""
+        prices = self.panel.history("2023-12-01", "2023-12-29")
+        self.assertEqual(len(prices["close"]), len(self.panel.history("2022-01-01", "2023-12-29")["close"]))
+        self.assertGreaterEqual(len(prices["close"]), 120)
+
+    def test_price_on(self):
+        """非交易日取之前最近一个交易日的价格，早于面板时返回 None"""
+        friday = self.df.index[self.df["date"] == "2023-01-06"][0]
+        self.assertEqual(self.panel.price_on("2023-01-07"), self.df["open"].iloc[friday])
+        self.assertIsNone(self.panel.price_on("2022-12-30"))
+
+
+class TestBacktesterPanel(unittest.TestCase):
+    def test_prices_loaded_once(self):
+        """整个回测只加载一次行情，每天的智能体调用拿到同一面板的切片"""
+        panel = PricePanel(make_price_frame(num_bars=300))
+        calls = []
+
+        def fake_agent(**kwargs):
+            calls.append(kwargs)
+            return '{"action": "buy", "quantity": 100}'
+
+        def quiet_logging(backtester):
+            backtester.backtest_logger = logging.getLogger("test_backtest")
+
+        with patch.object(Backtester, "setup_backtest_logging", quiet_logging), \
+                patch.object(PricePanel, "load", return_value=panel) as mock_load, \
+                patch("src.backtester.time.sleep"):
+            backtester = Backtester(fake_agent, "600519", "2023-12-01", "2023-12-15",
+                                    100000, 5, app=object())
+            backtester.run_backtest()
+
+        mock_load.assert_called_once()
+        self.assertEqual(len(calls), 11)
+        for kwargs in calls:
+            self.assertTrue(np.shares_memory(kwargs["prices"]["open"], panel.columns["open"]))
+            self.assertLessEqual(str(kwargs["prices"]["date"][-1])[:10], kwargs["end_date"])
+        self.assertEqual(len(backtester.portfolio_values), 11)
+
+    @patch('src.agents.market_data.get_market_data', return_value={"market_cap": 1})
+    @patch('src.agents.market_data.get_financial_statements', return_value=[{}, {}])
+    @patch('src.agents.market_data.get_financial_metrics', return_value=[{}])
+    @patch('src.agents.market_data.get_price_history')
+    def test_market_data_uses_preloaded_prices(self, mock_history, *_):
+        """状态中已有行情切片时 market_data_agent 不再获取行情"""
+        prices = PricePanel(make_price_frame()).history("2023-06-01", "2023-12-29")
+        result = market_data_agent({
+            "messages": [],
+            "data": {"ticker": "600519", "prices": prices,
+                     "start_date": "2023-06-01", "end_date": "2023-12-29"},
+            "metadata": {},
+        })
+        mock_history.assert_not_called()
+        self.assertIs(result["data"]["prices"], prices)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import json
+import unittest
+
+import numpy as np
+import pandas as pd
+from langchain_core.messages import HumanMessage
+
+from src.utils.api import prices_to_columns, prices_to_df
+from src.agents.technicals import technical_analyst_agent
+
+
+def make_price_frame(num_bars=300, seed=7):
+    """生成 get_price_history 格式的模拟日线数据"""
+    rng = np.random.default_rng(seed)
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, num_bars)))
+    return pd.DataFrame({
+        "date": pd.bdate_range("2023-01-02", periods=num_bars),
+        "open": close * (1 + rng.normal(0, 0.005, num_bars)),
+        "high": close * 1.01,
+        "low": close * 0.99,
+        "close": close,
+        "volume": rng.integers(1e5, 1e6, num_bars).astype(float),
+    })
+
+
+class TestPricePayload(unittest.TestCase):
+    def test_columns_are_read_only_views(self):
+        """列式数据不复制底层数组，且无法被原地修改"""
+        df = make_price_frame()
+        columns = prices_to_columns(df)
+
+        self.assertTrue(np.shares_memory(columns["close"], df["close"].to_numpy()))
+        with self.assertRaises(ValueError):
+            columns["close"][0] = 0.0
+        # 原 DataFrame 仍可写
+        df.loc[0, "close"] = 1.0
+
+    def test_round_trip_without_copy(self):
+        """prices_to_df 零拷贝重建 DataFrame，新增列不影响共享数据"""
+        df = make_price_frame()
+        columns = prices_to_columns(df)
+        rebuilt = prices_to_df(columns)
+
+        pd.testing.assert_frame_equal(rebuilt[df.columns], df)
+        self.assertTrue(np.shares_memory(rebuilt["close"].to_numpy(), columns["close"]))
+        rebuilt["OBV"] = 0.0
+        self.assertNotIn("OBV", columns)
+
+    def test_legacy_records_still_supported(self):
+        """旧格式的 list-of-dicts 仍可转换"""
+        df = make_price_frame(10)
+        rebuilt = prices_to_df(df.to_dict('records'))
+        pd.testing.assert_series_equal(rebuilt["close"], df["close"])
+
+    def test_technical_agent_consumes_columns(self):
+        """技术分析节点直接消费列式价格数据"""
+        state = {
+            "messages": [HumanMessage(content="test")],
+            "data": {"ticker": "600519", "prices": prices_to_columns(make_price_frame())},
+            "metadata": {"show_reasoning": False},
+        }
+        result = technical_analyst_agent(state)
+        signal = json.loads(result["messages"][-1].content)
+        self.assertIn(signal["signal"], ["bullish", "bearish", "neutral"])
+
+
+if __name__ == '__main__':
+    unittest.main()
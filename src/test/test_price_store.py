@@ -0,0 +1,155 @@
+import os
+import time
+import unittest
+import tempfile
+import shutil
+import threading
+from datetime import datetime
+from unittest.mock import patch
+
+import pandas as pd
+
+from src.utils.price_store import PriceStore, _series_file_lock, fcntl
+
+
+def make_hist(start_date, end_date, price_offset=0.0):
+    """按工作日生成 ak.stock_zh_a_hist 格式的模拟数据"""
+    dates = pd.bdate_range(start_date, end_date)
+    closes = [10.0 + i * 0.1 + price_offset for i in range(len(dates))]
+    return pd.DataFrame({
+        "日期": dates.date,
+        "股票代码": "600519",
+        "开盘": closes,
+        "收盘": closes,
+        "最高": [c + 0.2 for c in closes],
+        "最低": [c - 0.2 for c in closes],
+        "成交量": [1000] * len(dates),
+        "成交额": [10000.0] * len(dates),
+        "振幅": [1.0] * len(dates),
+        "涨跌幅": [0.5] * len(dates),
+        "涨跌额": [0.1] * len(dates),
+        "换手率": [0.3] * len(dates),
+    })
+
+
+class TestPriceStore(unittest.TestCase):
+    def setUp(self):
+        """每个测试使用独立的临时存储目录"""
+        self.store_dir = tempfile.mkdtemp()
+        self.store = PriceStore(root_dir=self.store_dir)
+        self.calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+
+    def fake_hist(self, symbol, period, start_date, end_date, adjust):
+        self.calls.append((start_date, end_date))
+        # 价格与日期一一对应，保证重叠区间的数据一致
+        full = make_hist("2024-01-01", "2024-12-31")
+        full["日期"] = pd.to_datetime(full["日期"])
+        mask = (full["日期"] >= pd.Timestamp(start_date)) & (full["日期"] <= pd.Timestamp(end_date))
+        return full[mask].reset_index(drop=True)
+
+    def test_only_missing_ranges_are_fetched(self):
+        """已覆盖的区间直接从本地切片，未覆盖的部分增量下载"""
+        with patch('src.utils.price_store.ak.stock_zh_a_hist', side_effect=self.fake_hist):
+            df = self.store.get("600519", datetime(2024, 3, 1), datetime(2024, 3, 29))
+            self.assertEqual(len(self.calls), 1)
+            self.assertEqual(df["date"].min(), pd.Timestamp("2024-03-01"))
+            self.assertEqual(df["date"].max(), pd.Timestamp("2024-03-29"))
+
+            # 子区间完全命中本地数据
+            sub = self.store.get("600519", datetime(2024, 3, 5), datetime(2024, 3, 15))
+            self.assertEqual(len(self.calls), 1)
+            self.assertEqual(len(sub), 9)
+
+            # 向后扩展时只下载新增部分（与最后一根K线重叠一天）
+            self.store.get("600519", datetime(2024, 3, 1), datetime(2024, 4, 30))
+            self.assertEqual(len(self.calls), 2)
+            self.assertEqual(self.calls[-1], ("20240329", "20240430"))
+
+            # 向前扩展时同理
+            extended = self.store.get("600519", datetime(2024, 2, 1), datetime(2024, 4, 30))
+            self.assertEqual(len(self.calls), 3)
+            self.assertEqual(self.calls[-1], ("20240201", "20240301"))
+            self.assertFalse(extended["date"].duplicated().any())
+            self.assertTrue(extended["date"].is_monotonic_increasing)
+
+    def test_store_is_shared_across_instances(self):
+        """数据落盘后，新的实例（例如其他进程）可以直接读取"""
+        with patch('src.utils.price_store.ak.stock_zh_a_hist', side_effect=self.fake_hist):
+            self.store.get("600519", datetime(2024, 3, 1), datetime(2024, 3, 29))
+            other = PriceStore(root_dir=self.store_dir)
+            df = other.get("600519", datetime(2024, 3, 1), datetime(2024, 3, 29))
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(len(df), 21)
+        self.assertAlmostEqual(df["close"].iloc[0], 10.0 + 44 * 0.1)
+
+    def test_adjustment_change_triggers_full_refetch(self):
+        """前复权价格整体变化时，重新下载完整区间而不是拼接"""
+        with patch('src.utils.price_store.ak.stock_zh_a_hist', side_effect=self.fake_hist):
+            self.store.get("600519", datetime(2024, 3, 1), datetime(2024, 3, 29))
+
+        def shifted_hist(symbol, period, start_date, end_date, adjust):
+            self.calls.append((start_date, end_date))
+            return make_hist(start_date, end_date, price_offset=-1.0)
+
+        with patch('src.utils.price_store.ak.stock_zh_a_hist', side_effect=shifted_hist):
+            df = self.store.get("600519", datetime(2024, 3, 1), datetime(2024, 4, 30))
+
+        self.assertEqual(self.calls[-1], ("20240301", "20240430"))
+        self.assertAlmostEqual(df["close"].iloc[0], 9.0)
+
+    def test_fetch_error_does_not_extend_coverage(self):
+        """下载失败时返回已有数据，且下次仍会尝试下载缺失区间"""
+        with patch('src.utils.price_store.ak.stock_zh_a_hist', side_effect=self.fake_hist):
+            self.store.get("600519", datetime(2024, 3, 1), datetime(2024, 3, 29))
+
+        with patch('src.utils.price_store.ak.stock_zh_a_hist', side_effect=ConnectionError("timeout")):
+            df = self.store.get("600519", datetime(2024, 3, 1), datetime(2024, 4, 30))
+        self.assertEqual(len(df), 21)
+
+        with patch('src.utils.price_store.ak.stock_zh_a_hist', side_effect=self.fake_hist):
+            df = self.store.get("600519", datetime(2024, 3, 1), datetime(2024, 4, 30))
+        self.assertEqual(self.calls[-1], ("20240329", "20240430"))
+        self.assertEqual(df["date"].max(), pd.Timestamp("2024-04-30"))
+
+    def test_empty_fetch_does_not_extend_coverage(self):
+        """没有返回数据的区间不计入已覆盖区间，下次仍会下载"""
+        empty = lambda *args, **kwargs: self.fake_hist(*args, **kwargs).iloc[0:0]
+        with patch('src.utils.price_store.ak.stock_zh_a_hist', side_effect=empty):
+            self.assertTrue(self.store.get("600519", datetime(2024, 3, 1), datetime(2024, 3, 29)).empty)
+        self.assertIsNone(self.store._read_meta(self.store._series_dir("600519", "qfq")))
+
+        with patch('src.utils.price_store.ak.stock_zh_a_hist', side_effect=self.fake_hist):
+            self.store.get("600519", datetime(2024, 3, 1), datetime(2024, 3, 29))
+        with patch('src.utils.price_store.ak.stock_zh_a_hist', side_effect=empty):
+            df = self.store.get("600519", datetime(2024, 3, 1), datetime(2024, 4, 30))
+        self.assertEqual(len(df), 21)
+        meta = self.store._read_meta(self.store._series_dir("600519", "qfq"))
+        self.assertEqual((meta["start"], meta["end"]), ("2024-03-01", "2024-03-29"))
+
+    @unittest.skipIf(fcntl is None, "no fcntl")
+    def test_old_version_kept_while_other_process_loads(self):
+        """其他进程持有共享锁（正在打开旧版本）时，写入者等待后才删除旧版本文件"""
+        with patch('src.utils.price_store.ak.stock_zh_a_hist', side_effect=self.fake_hist):
+            self.store.get("600519", datetime(2024, 3, 1), datetime(2024, 3, 29))
+        series_dir = self.store._series_dir("600519", "qfq")
+        old_version = self.store._read_meta(series_dir)["version"]
+        old_file = os.path.join(series_dir, f"close.{old_version}.npy")
+
+        other = PriceStore(root_dir=self.store_dir)
+        with patch('src.utils.price_store.ak.stock_zh_a_hist', side_effect=self.fake_hist):
+            with _series_file_lock(series_dir, exclusive=False):
+                writer = threading.Thread(
+                    target=other.get, args=("600519", datetime(2024, 3, 1), datetime(2024, 4, 30)))
+                writer.start()
+                time.sleep(0.3)
+                self.assertTrue(os.path.exists(old_file))
+            writer.join()
+        self.assertFalse(os.path.exists(old_file))
+        self.assertEqual(self.store._read_meta(series_dir)["end"], "2024-04-30")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import time
+import asyncio
+import threading
+import unittest
+from unittest.mock import Mock, patch
+
+from src.utils.rate_limiter import RateLimiter, TokenBucket
+from src.utils.openrouter_config import generate_openai_content_with_retry, is_rate_limit_error
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_refill(self):
+        """突发容量内的请求立即通过，之后按速率等待"""
+        bucket = TokenBucket(rate=20, capacity=2)
+        started = time.monotonic()
+        self.assertTrue(bucket.try_acquire())
+        self.assertTrue(bucket.try_acquire())
+        self.assertFalse(bucket.try_acquire())
+        self.assertTrue(bucket.acquire())
+        self.assertGreaterEqual(time.monotonic() - started, 0.04)
+
+    def test_shared_across_threads(self):
+        """多个线程共用一个令牌桶时，总速率不超过配额"""
+        bucket = TokenBucket(rate=100, capacity=1)
+        started = time.monotonic()
+        threads = [threading.Thread(target=lambda: [bucket.acquire() for _ in range(5)])
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 20 个请求中只有第一个不需要等待
+        self.assertGreaterEqual(time.monotonic() - started, 19 / 100 - 0.01)
+
+    def test_acquire_async(self):
+        """协程等待令牌时不阻塞事件循环"""
+        bucket = TokenBucket(rate=50, capacity=1)
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def main():
+            started = time.monotonic()
+            await asyncio.gather(ticker(), *(bucket.acquire_async() for _ in range(4)))
+            return time.monotonic() - started
+
+        self.assertGreaterEqual(asyncio.run(main()), 3 / 50 - 0.01)
+        self.assertEqual(len(ticks), 5)
+
+    def test_pause_and_timeout(self):
+        """限流暂停期间不发放令牌，超时后返回 False"""
+        bucket = TokenBucket(rate=1000, capacity=5)
+        bucket.pause(0.2)
+        self.assertFalse(bucket.try_acquire())
+        self.assertFalse(bucket.acquire(timeout=0.05))
+        self.assertTrue(bucket.acquire(timeout=1))
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_per_provider_and_model(self):
+        """同一服务商的不同模型使用独立的令牌桶，配额可由环境变量覆盖"""
+        limiter = RateLimiter()
+        limiter.configure("moonshot", requests_per_minute=60, burst=1)
+        self.assertIs(limiter.bucket("moonshot", "a"), limiter.bucket("moonshot", "a"))
+        self.assertIsNot(limiter.bucket("moonshot", "a"), limiter.bucket("moonshot", "b"))
+        self.assertEqual(limiter.bucket("moonshot", "a").rate, 1.0)
+
+        with patch.dict(os.environ, {"MOONSHOT_RPM": "600", "MOONSHOT_BURST": "3"}):
+            limiter.configure("moonshot")
+            bucket = limiter.bucket("moonshot", "a")
+        self.assertEqual((bucket.rate, bucket.capacity), (10.0, 3.0))
+
+    def test_pause_provider(self):
+        """暂停服务商时其全部模型都停止发放令牌"""
+        limiter = RateLimiter()
+        limiter.configure("gemini", requests_per_minute=6000, burst=2)
+        limiter.bucket("gemini", "a")
+        limiter.bucket("gemini", "b")
+        limiter.pause("gemini", 10)
+        self.assertFalse(limiter.bucket("gemini", "a").try_acquire())
+        self.assertFalse(limiter.bucket("gemini", "b").try_acquire())
+        self.assertTrue(limiter.bucket("moonshot", "a").try_acquire())
+
+
+class TestLimitedCompletion(unittest.TestCase):
+    def test_rate_limit_detection(self):
+        """按状态码、RateLimitError 类型和限流标记识别，消息中的数字 429 不算限流"""
+        class RateLimitError(Exception):
+            pass
+
+        status = Exception("Too Many Requests")
+        status.status_code = 429
+        code = Exception("quota")
+        code.code = 429
+        for error in (status, code, RateLimitError("slow down"), Exception("Rate limit reached"),
+                      Exception("429 RESOURCE_EXHAUSTED")):
+            self.assertTrue(is_rate_limit_error(error), error)
+        for error in (Exception("股票 600429 数据获取失败"), Exception("context has 14290 tokens"),
+                      ValueError("bad json")):
+            self.assertFalse(is_rate_limit_error(error), error)
+
+    @patch('src.utils.openrouter_config.rate_limiter')
+    def test_every_attempt_takes_a_token(self, mock_limiter):
+        """每次调用（包括重试）都先取令牌，限流错误会暂停该服务商"""
+        client = Mock()
+        response = Mock(choices=[Mock(message=Mock(content="ok"))])
+        client.chat.completions.create.side_effect = [Exception("Error code: 429 - rate limit"), response]
+
+        with patch('time.sleep'):
+            result = generate_openai_content_with_retry(client, "moonshot-v1-8k", [], provider="moonshot")
+
+        self.assertIs(result, response)
+        self.assertEqual(mock_limiter.acquire.call_count, 2)
+        mock_limiter.acquire.assert_called_with("moonshot", "moonshot-v1-8k")
+        mock_limiter.pause.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import os
+import json
+import socket
+import tempfile
+import threading
+import unittest
+import urllib.request
+from urllib.error import HTTPError
+
+from src.server import (AnalysisService, QueueFullError, create_server, parse_analysis_request,
+                        parse_wait_options)
+from src.test.test_batch import FakeApp
+from src.utils.tracing import tracer
+
+
+class TestAnalysisService(unittest.TestCase):
+    def start_server(self, service, **kwargs):
+        server = create_server(service, port=0, **kwargs)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+            service.shutdown()
+        self.addCleanup(stop)
+        return server
+
+    def request(self, server, method, path, body=None):
+        url = f"http://127.0.0.1:{server.server_address[1]}{path}"
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(url, data=data, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=10) as response:
+                return response.status, json.loads(response.read())
+        except HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_parse_request(self):
+        """请求字段与命令行参数一致，缺少股票代码时报错"""
+        request = parse_analysis_request({"ticker": "600519", "start_date": "2024-01-01",
+                                          "end_date": "2024-12-31", "model": "moonshot,gemini"})
+        self.assertEqual(request["model"], ["moonshot", "gemini"])
+        self.assertEqual(request["portfolio"], {"cash": 100000.0, "stock": 0})
+        self.assertEqual(request["end_date"], "2024-12-31")
+        with self.assertRaises(ValueError):
+            parse_analysis_request({"start_date": "2024-01-01"})
+        for field in ("num_of_news", "initial_capital", "initial_position"):
+            with self.assertRaises(ValueError):
+                parse_analysis_request({"ticker": "600519", field: None})
+        self.assertEqual(parse_wait_options({"wait": False, "timeout": "2.5"}), (False, 2.5))
+        for timeout in ("soon", [1], -1):
+            with self.assertRaises(ValueError):
+                parse_wait_options({"timeout": timeout})
+
+    def test_analyze_over_http(self):
+        """同一个工作流处理多个请求，可同步等待结果或异步查询任务"""
+        app = FakeApp(delay=0.05, fail={"000001"})
+        service = AnalysisService(app=app, max_concurrency=2, queue_size=8)
+        service.start()
+        server = self.start_server(service)
+
+        status, body = self.request(server, "POST", "/analyze", {"ticker": "600519"})
+        self.assertEqual(status, 200)
+        self.assertEqual(body["record"]["result"]["action"], "hold")
+
+        status, body = self.request(server, "POST", "/analyze", {"ticker": "000001", "wait": False})
+        self.assertEqual(status, 202)
+        job = service.wait(body["job_id"], timeout=5)
+        self.assertEqual(job["status"], "error")
+        status, body = self.request(server, "GET", f"/jobs/{body['job_id']}")
+        self.assertEqual((status, body["status"]), (200, "error"))
+
+        self.assertEqual(self.request(server, "POST", "/analyze", {"model": "moonshot"})[0], 400)
+        # 参数不合法的请求不会提交任务
+        for body in ({"ticker": "600519", "num_of_news": None}, {"ticker": "600519", "timeout": "soon"}):
+            self.assertEqual(self.request(server, "POST", "/analyze", body)[0], 400)
+        self.assertEqual(len(service._jobs), 2)
+        self.assertEqual(self.request(server, "GET", "/jobs/missing")[0], 404)
+        status, body = self.request(server, "GET", "/health")
+        self.assertEqual((body["workers"], body["running"], body["queued"]), (2, 0, 0))
+
+    def test_trace_per_job(self):
+        """指定追踪文件时每个任务写入各自的文件，运行结束后清空内存中的区间"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(tracer.disable)
+        service = AnalysisService(app=FakeApp(), max_concurrency=1, queue_size=4,
+                                  trace_path=os.path.join(tmp.name, "trace.json"))
+        service.start()
+        self.addCleanup(service.shutdown)
+
+        job = service.submit(parse_analysis_request({"ticker": "600519"}))
+        job = service.wait(job["job_id"], timeout=5)
+        self.assertEqual(job["trace"], os.path.join(tmp.name, f"trace.{job['job_id']}.json"))
+        with open(job["trace"], encoding="utf-8") as f:
+            runs = [event for event in json.load(f)["traceEvents"] if event.get("cat") == "run"]
+        self.assertEqual(runs[0]["args"]["ticker"], "600519")
+        self.assertEqual(tracer.events(), [])
+
+    def test_concurrency_and_queue_limit(self):
+        """同时运行的分析数量受限，队列满时拒绝新请求"""
+        app = FakeApp(delay=0.2)
+        service = AnalysisService(app=app, max_concurrency=2, queue_size=2)
+        request = parse_analysis_request({"ticker": "600519"})
+        # 工作线程启动前队列只能容纳 2 个请求
+        jobs = [service.submit(request) for _ in range(2)]
+        with self.assertRaises(QueueFullError):
+            service.submit(request)
+
+        service.start()
+        self.addCleanup(service.shutdown)
+        jobs += [service.submit(request) for _ in range(2)]
+        for job in jobs:
+            self.assertEqual(service.wait(job["job_id"], timeout=5)["status"], "ok")
+        self.assertEqual(app.max_running, 2)
+
+    def test_unix_socket(self):
+        """通过 Unix 套接字提供同样的接口"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "agent.sock")
+        service = AnalysisService(app=FakeApp(), max_concurrency=1)
+        service.start()
+        self.start_server(service, unix_socket=path)
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(path)
+            client.sendall(b"GET /health HTTP/1.0\r\n\r\n")
+            response = b""
+            while chunk := client.recv(4096):
+                response += chunk
+        header, body = response.split(b"\r\n\r\n", 1)
+        self.assertTrue(header.startswith(b"HTTP/1.0 200"))
+        self.assertEqual(json.loads(body)["workers"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
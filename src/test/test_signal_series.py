@@ -0,0 +1,94 @@
+import json
+import logging
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from langchain_core.messages import HumanMessage
+
+from src.agents.risk_manager import risk_management_agent
+from src.agents.signal_series import (SIGNAL_NAMES, risk_frame, rolling_hurst_exponent,
+                                      technical_signal_frame, trading_actions)
+from src.agents.technicals import calculate_hurst_exponent, technical_analyst_agent
+from src.backtester import Backtester
+from src.utils.api import prices_to_columns
+from src.utils.price_panel import PricePanel
+from src.test.test_price_payload import make_price_frame
+
+# 每日切片的 K 线数
+HISTORY_BARS = 300
+
+
+def run_agents(prices_df, static_signal):
+    """在一个切片上运行技术分析与风险控制 Agent，其余 Agent 使用相同的固定信号"""
+    state = {
+        "messages": [],
+        "data": {"prices": prices_to_columns(prices_df), "portfolio": {"cash": 100000, "stock": 0}},
+        "metadata": {"show_reasoning": False},
+    }
+    technical = technical_analyst_agent(state)["messages"][-1]
+    state["messages"] = [technical] + [
+        HumanMessage(content=json.dumps(static_signal), name=name)
+        for name in ("fundamentals_agent", "sentiment_agent", "valuation_agent")]
+    risk = risk_management_agent(state)["messages"][-1]
+    return json.loads(technical.content), json.loads(risk.content)
+
+
+class TestSignalSeries(unittest.TestCase):
+    def setUp(self):
+        self.df = make_price_frame(num_bars=500, seed=3)
+        self.technical = technical_signal_frame(self.df, HISTORY_BARS)
+        self.risk = risk_frame(self.df, HISTORY_BARS)
+
+    def test_matches_agents_on_daily_slices(self):
+        """逐日序列与在当日切片上运行 Agent 的结果一致"""
+        static_signal = {"signal": "bearish", "confidence": "90%"}
+        static_signals = {"fundamental": static_signal, "valuation": static_signal}
+        actions = trading_actions(self.technical, self.risk, static_signals)
+
+        for end in range(HISTORY_BARS - 1, len(self.df), 50):
+            prices_df = self.df.iloc[end - HISTORY_BARS + 1:end + 1].reset_index(drop=True)
+            technical, risk = run_agents(prices_df, static_signal)
+
+            self.assertEqual(technical["signal"], SIGNAL_NAMES[self.technical["signal"].iloc[end]])
+            self.assertAlmostEqual(float(technical["confidence"].rstrip("%")) / 100,
+                                   self.technical["confidence"].iloc[end], delta=0.011)
+            self.assertEqual(risk["risk_metrics"]["market_risk_score"],
+                             self.risk["market_risk_score"].iloc[end])
+            self.assertEqual(risk["trading_action"], actions.iloc[end])
+
+    def test_rolling_hurst_matches_scalar(self):
+        """滚动 Hurst 指数与 calculate_hurst_exponent 在各切片上的结果一致"""
+        close = self.df["close"]
+        hurst = rolling_hurst_exponent(close.to_numpy(), HISTORY_BARS)
+        for end in (10, 25, 150, HISTORY_BARS + 40, len(close) - 1):
+            window = close.iloc[max(end - HISTORY_BARS + 1, 0):end + 1]
+            self.assertAlmostEqual(hurst[end], calculate_hurst_exponent(window), places=9)
+
+    def test_fast_backtest(self):
+        """快速回测只加载一次行情，不调用智能体，并生成绩效数据"""
+        panel = PricePanel(make_price_frame(num_bars=500, seed=3))
+        static_signals = {"fundamental": {"signal": "bullish", "confidence": "80%"},
+                          "valuation": {"signal": "bullish", "confidence": "80%"}}
+
+        def quiet_logging(backtester):
+            backtester.backtest_logger = logging.getLogger("test_backtest")
+
+        def agent(**kwargs):
+            raise AssertionError("快速回测不应调用智能体")
+
+        with patch.object(Backtester, "setup_backtest_logging", quiet_logging), \
+                patch.object(PricePanel, "load", return_value=panel) as mock_load:
+            backtester = Backtester(agent, "600519", "2024-06-03", "2024-11-29", 100000, 5)
+            backtester.run_fast_backtest(static_signals)
+
+        mock_load.assert_called_once()
+        values = [row["Portfolio Value"] for row in backtester.portfolio_values]
+        self.assertEqual(len(values), 130)
+        self.assertGreater(backtester.portfolio["stock"], 0)
+        self.assertAlmostEqual(backtester.portfolio["portfolio_value"], values[-1])
+        self.assertTrue(np.all(np.isfinite(values)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import threading
+from unittest.mock import patch
+
+import pandas as pd
+
+from src.utils.spot_snapshot import SpotSnapshot
+
+
+def make_spot_table():
+    return pd.DataFrame({
+        "代码": ["600519", "000001", "301155"],
+        "名称": ["贵州茅台", "平安银行", "海力风电"],
+        "总市值": [2.1e12, 2.2e11, 1.3e10],
+        "成交量": [30000.0, 900000.0, 50000.0],
+    })
+
+
+class TestSpotSnapshot(unittest.TestCase):
+    @patch('src.utils.spot_snapshot.ak.stock_zh_a_spot_em')
+    def test_single_download_serves_all_tickers(self, mock_spot):
+        """TTL 内多只股票、多线程查询只下载一次"""
+        mock_spot.return_value = make_spot_table()
+        snapshot = SpotSnapshot(ttl=60)
+
+        results = {}
+
+        def lookup(symbol):
+            results[symbol] = snapshot.get_row(symbol)
+
+        threads = [threading.Thread(target=lookup, args=(s,))
+                   for s in ["600519", "000001", "301155", "600519"]]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        mock_spot.assert_called_once()
+        self.assertEqual(results["000001"]["名称"], "平安银行")
+        self.assertEqual(float(results["600519"]["总市值"]), 2.1e12)
+        self.assertIsNone(snapshot.get_row("999999"))
+
+    @patch('src.utils.spot_snapshot.ak.stock_zh_a_spot_em')
+    def test_expired_snapshot_is_refreshed(self, mock_spot):
+        """TTL 过期后重新下载"""
+        mock_spot.return_value = make_spot_table()
+        snapshot = SpotSnapshot(ttl=0)
+
+        snapshot.get_row("600519")
+        snapshot.get_row("600519")
+        self.assertEqual(mock_spot.call_count, 2)
+
+    @patch('src.utils.spot_snapshot.ak.stock_zh_a_spot_em')
+    def test_stale_snapshot_used_when_refresh_fails(self, mock_spot):
+        """刷新失败时继续使用旧快照"""
+        mock_spot.side_effect = [make_spot_table(), ConnectionError("timeout")]
+        snapshot = SpotSnapshot(ttl=0, retry=0)
+
+        snapshot.get_row("600519")
+        row = snapshot.get_row("301155")
+        self.assertEqual(row["名称"], "海力风电")
+
+    @patch('src.utils.spot_snapshot.ak.stock_zh_a_spot_em')
+    def test_failed_refresh_backs_off(self, mock_spot):
+        """刷新失败后在重试间隔内不再下载，间隔过后重新尝试"""
+        mock_spot.side_effect = [make_spot_table(), ConnectionError("timeout"), make_spot_table()]
+        snapshot = SpotSnapshot(ttl=0, retry=60)
+
+        for symbol in ("600519", "000001", "301155", "600519"):
+            self.assertIsNotNone(snapshot.get_row(symbol))
+        self.assertEqual(mock_spot.call_count, 2)
+
+        snapshot.retry = 0
+        snapshot.get_row("600519")
+        self.assertEqual(mock_spot.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
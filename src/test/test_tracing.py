@@ -0,0 +1,130 @@
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+
+from src.main import run_hedge_fund
+from src.test.test_batch import FakeApp
+from src.utils.llm_cache import LLMCache
+from src.utils.tracing import Tracer, run_trace_path, trace_run, traced, tracer
+
+
+class TestTracer(unittest.TestCase):
+    def test_disabled_records_nothing(self):
+        """关闭时返回空区间，不记录任何数据"""
+        local = Tracer(enabled=False)
+        with local.span("ak.stock_zh_a_hist", "akshare") as span:
+            span.set(size=10)
+        self.assertFalse(span)
+        self.assertEqual(local.events(), [])
+
+    def test_span_records_args_and_errors(self):
+        local = Tracer(enabled=True)
+        with local.span("llm_cache", "cache") as span:
+            span.set(cache_hit=True, size=12)
+        with self.assertRaises(ValueError):
+            with local.span("ak.stock_news_em", "akshare"):
+                raise ValueError("network")
+
+        hit, failed = local.events()
+        self.assertEqual((hit["name"], hit["cat"], hit["ph"]), ("llm_cache", "cache", "X"))
+        self.assertEqual(hit["args"], {"cache_hit": True, "size": 12})
+        self.assertGreaterEqual(hit["dur"], 0)
+        self.assertEqual(failed["args"]["error"], "ValueError")
+
+    def test_chrome_trace_and_summary(self):
+        """导出 Chrome trace-event JSON，汇总表按名称合并次数、命中和数据量"""
+        local = Tracer(enabled=True)
+        for hit in (True, False, True):
+            with local.span("price_store", "cache") as span:
+                span.set(cache_hit=hit, size=100)
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = local.export_chrome_trace(os.path.join(tmp.name, "trace.json"))
+        with open(path, encoding="utf-8") as f:
+            trace = json.load(f)
+        phases = [event["ph"] for event in trace["traceEvents"]]
+        self.assertEqual(phases, ["M", "X", "X", "X"])
+
+        row, = local.summary()
+        self.assertEqual((row["count"], row["cache_hits"], row["size"]), (3, "2/3", 300))
+        self.assertIn("price_store", local.format_summary())
+
+    def test_buffer_capped(self):
+        """超过上限后丢弃最早的区间，导出时记录丢弃数量"""
+        local = Tracer(enabled=True, max_events=3)
+        for i in range(5):
+            with local.span(f"span{i}", "function"):
+                pass
+        self.assertEqual([event["name"] for event in local.events()], ["span2", "span3", "span4"])
+        self.assertEqual(local.chrome_trace()["otherData"]["dropped_events"], 2)
+        local.reset()
+        self.assertEqual((local.events(), local.dropped), ([], 0))
+
+    def test_trace_run_exports_on_error(self):
+        """trace_run 开始时清空之前的区间，出错时也写入追踪文件"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(tracer.reset)
+        self.addCleanup(tracer.disable)
+        path = run_trace_path(os.path.join(tmp.name, "trace.json"), "600519")
+        self.assertTrue(path.endswith("trace.600519.json"))
+
+        with tracer.span("before", "function"):
+            pass
+        with self.assertRaises(ValueError):
+            with trace_run(path):
+                with tracer.span("inside", "function"):
+                    raise ValueError("bad data")
+        with open(path, encoding="utf-8") as f:
+            names = [event["name"] for event in json.load(f)["traceEvents"] if event["ph"] == "X"]
+        self.assertEqual(names, ["inside"])
+
+    def test_traced_async_tasks_get_own_tracks(self):
+        """并发的协程各自一条轨道"""
+        @traced("node", "node")
+        async def node():
+            await asyncio.sleep(0.01)
+
+        async def main():
+            await asyncio.gather(node(), node())
+
+        tracer.reset()
+        tracer.enable()
+        self.addCleanup(tracer.reset)
+        self.addCleanup(tracer.disable)
+        asyncio.run(main())
+        events = tracer.events()
+        self.assertEqual([event["name"] for event in events], ["node", "node"])
+        self.assertNotEqual(events[0]["tid"], events[1]["tid"])
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        tracer.reset()
+        tracer.enable()
+        self.addCleanup(tracer.reset)
+        self.addCleanup(tracer.disable)
+
+    def test_cache_lookup_and_run_spans(self):
+        """缓存查询记录是否命中，每次运行记录整体耗时"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cache = LLMCache(tmp.name)
+        cache.put("ab" * 32, "0.5")
+        cache.get("ab" * 32)
+        cache.get("cd" * 32)
+        run_hedge_fund(FakeApp(delay=0), ["moonshot"], "600519", "2024-01-01", "2024-12-31",
+                       {"cash": 100000.0, "stock": 0})
+
+        events = tracer.events()
+        lookups = [event["args"]["cache_hit"] for event in events if event["name"] == "llm_cache"]
+        self.assertEqual(lookups, [True, False])
+        run, = [event for event in events if event["cat"] == "run"]
+        self.assertEqual(run["args"]["ticker"], "600519")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,63 +1,68 @@
 from typing import Dict, Any, List
 import pandas as pd
-import akshare as ak
 from datetime import datetime, timedelta
-from src.utils.logger_config import get_logger, ERROR_ICON, SUCCESS_ICON, WAIT_ICON
+from src.utils.logger_config import get_logger, payload, ERROR_ICON, SUCCESS_ICON, WAIT_ICON
+from src.utils.lazy import lazy_import
+from src.utils.price_store import price_store
+from src.utils.spot_snapshot import spot_snapshot
+from src.utils import indicators
+from src.utils.feature_engine import feature_frame
+from src.utils.concurrency import run_concurrently
+from src.utils.financial_cache import financial_cache
 import json 
 import numpy as np
 
 # 设置日志记录
 logger = get_logger()
 
+# akshare 导入耗时较长，首次请求数据时才导入
+ak = lazy_import("akshare")
+
+# 计算全部技术指标至少需要的交易日数量
+MIN_HISTORY_ROWS = 120
+
+# 数据量不足时扩大到的历史区间（天）
+FALLBACK_HISTORY_DAYS = 730
+
 def get_financial_metrics(symbol: str) -> Dict[str, Any]:
     """获取财务指标数据"""
     try:
         logger.info(f"{WAIT_ICON} 正在获取 {symbol} 的财务指标数据...")
 
-        # 获取实时行情数据（用于市值和估值比率）
-        logger.info(f"{WAIT_ICON} 获取实时行情...")
-        realtime_data = ak.stock_zh_a_spot_em()
-        if realtime_data is None or realtime_data.empty:
-            logger.error(f"{ERROR_ICON} 警告：无法获取实时行情数据")
-            return [{}]
-
-        stock_data = realtime_data[realtime_data['代码'] == symbol]
-        if stock_data.empty:
+        # 实时行情、新浪财务指标和利润表相互独立，并发获取
+        # 财务指标和利润表只在新报告披露后才会重新下载
+        logger.info(f"{WAIT_ICON} 获取实时行情、新浪财务指标和利润表数据...")
+        fetched = run_concurrently({
+            "realtime": lambda: spot_snapshot.get_row(symbol),
+            "indicator": lambda: financial_cache.get_indicator(symbol),
+            "income": lambda: financial_cache.get_report(symbol, "利润表"),
+        })
+
+        # 实时行情数据（用于市值和估值比率）
+        stock_data = fetched["realtime"]
+        if stock_data is None:
             logger.error(f"{ERROR_ICON} 警告：未找到股票 {symbol} 的实时行情数据")
             return [{}]
-
-        stock_data = stock_data.iloc[0]
         logger.info(f"{SUCCESS_ICON} 成功获取实时行情数据")
 
-        # 获取新浪财务指标
-        logger.info(f"{WAIT_ICON} 获取新浪财务指标...")
-        current_year = datetime.now().year
-        financial_data = ak.stock_financial_analysis_indicator(
-            symbol=symbol, start_year=str(current_year-1))
+        # 新浪财务指标
+        financial_data = fetched["indicator"]
         if financial_data is None or financial_data.empty:
             logger.error(f"{ERROR_ICON} 警告：无法获取新浪财务指标数据")
             return [{}]
 
-        # 按日期排序并获取最新的数据
-        financial_data['日期'] = pd.to_datetime(financial_data['日期'])
-        financial_data = financial_data.sort_values('日期', ascending=False)
+        # 缓存中的数据已按日期从新到旧排序
         latest_financial = financial_data.iloc[0] if not financial_data.empty else pd.Series()
         logger.info(f"{SUCCESS_ICON} 成功获取新浪财务指标数据，共 {len(financial_data)} 条记录")
         logger.info(f"{SUCCESS_ICON} 最新数据日期：{latest_financial.get('日期')}")
 
-        # 获取利润表数据（用于计算 price_to_sales）
-        logger.info(f"{WAIT_ICON} 获取利润表数据...")
-        try:
-            income_statement = ak.stock_financial_report_sina(
-                stock=f"sh{symbol}", symbol="利润表")
-            if not income_statement.empty:
-                latest_income = income_statement.iloc[0]
-                logger.info(f"{SUCCESS_ICON} 成功获取利润表数据")
-            else:
-                logger.error(f"{ERROR_ICON} 警告：无法获取利润表数据")
-                latest_income = pd.Series()
-        except Exception as e:
-            logger.error(f"{ERROR_ICON} 获取利润表数据时出错：{e}")
+        # 利润表数据（用于计算 price_to_sales）
+        income_statement = fetched["income"]
+        if income_statement is not None and not income_statement.empty:
+            latest_income = income_statement.iloc[0]
+            logger.info(f"{SUCCESS_ICON} 成功获取利润表数据")
+        else:
+            logger.error(f"{ERROR_ICON} 警告：无法获取利润表数据")
             latest_income = pd.Series()
 
         # 构建完整指标数据
@@ -125,14 +130,9 @@ def get_financial_metrics(symbol: str) -> Dict[str, Any]:
 
             logger.info("成功构建指标数据")
 
-            # 打印所有获取到的指标数据（用于调试）
-            logger.info(f"{SUCCESS_ICON} 获取到的完整指标数据：")
-            for key, value in all_metrics.items():
-                logger.info(f"{key}: {value}")
-
-            logger.info(f"{SUCCESS_ICON} 传递给 agent 的指标数据：")
-            for key, value in agent_metrics.items():
-                logger.info(f"{key}: {value}")
+            # 指标数据只在日志输出时才格式化（用于调试）
+            logger.debug("%s 获取到的完整指标数据: %s", SUCCESS_ICON, payload(all_metrics))
+            logger.info("%s 传递给 agent 的指标数据: %s", SUCCESS_ICON, payload(agent_metrics))
 
             return [agent_metrics]
 
@@ -145,137 +145,96 @@ def get_financial_metrics(symbol: str) -> Dict[str, Any]:
         return [{}]
 
 
-def get_financial_statements(symbol: str) -> Dict[str, Any]:
-    """获取财务报表数据"""
-    try:
-        logger.info(f"{WAIT_ICON} 正在获取 {symbol} 的财务报表数据...")
+def _build_line_item(balance: pd.Series, income: pd.Series, cash_flow: pd.Series) -> Dict[str, float]:
+    """由同一报告期的三张报表构建 agent 使用的财务数据"""
+    capital_expenditure = abs(float(cash_flow.get("购建固定资产、无形资产和其他长期资产支付的现金", 0)))
+    return {
+        # 从利润表获取
+        "net_income": float(income.get("净利润", 0)),
+        "operating_revenue": float(income.get("营业总收入", 0)),
+        "operating_profit": float(income.get("营业利润", 0)),
 
-        # 获取资产负债表数据
-        logger.info(f"{WAIT_ICON} 获取资产负债表数据...")
-        try:
-            balance_sheet = ak.stock_financial_report_sina(
-                stock=f"sh{symbol}", symbol="资产负债表")
-            if not balance_sheet.empty:
-                latest_balance = balance_sheet.iloc[0]
-                previous_balance = balance_sheet.iloc[1] if len(
-                    balance_sheet) > 1 else balance_sheet.iloc[0]
-                logger.info(f"{SUCCESS_ICON} 成功获取资产负债表数据")
-            else:
-                logger.error(f"{ERROR_ICON} 警告：无法获取资产负债表数据")
-                latest_balance = pd.Series()
-                previous_balance = pd.Series()
-        except Exception as e:
-            logger.error(f"{ERROR_ICON} 获取资产负债表数据时出错：{e}")
-            latest_balance = pd.Series()
-            previous_balance = pd.Series()
+        # 从资产负债表计算营运资金
+        "working_capital": float(balance.get("流动资产合计", 0)) - float(balance.get("流动负债合计", 0)),
 
-        # 获取利润表数据
-        logger.info("获取利润表数据...")
-        try:
-            income_statement = ak.stock_financial_report_sina(
-                stock=f"sh{symbol}", symbol="利润表")
-            if not income_statement.empty:
-                latest_income = income_statement.iloc[0]
-                previous_income = income_statement.iloc[1] if len(
-                    income_statement) > 1 else income_statement.iloc[0]
-                logger.info(f"{SUCCESS_ICON} 成功获取利润表数据")
-            else:
-                logger.warning(f"警告：无法获取利润表数据")
-                latest_income = pd.Series()
-                previous_income = pd.Series()
-        except Exception as e:
-            logger.error(f"获取利润表数据时出错：{e}")
-            latest_income = pd.Series()
-            previous_income = pd.Series()
+        # 从现金流量表获取
+        "depreciation_and_amortization": float(cash_flow.get("固定资产折旧、油气资产折耗、生产性生物资产折旧", 0)),
+        "capital_expenditure": capital_expenditure,
+        "free_cash_flow": float(cash_flow.get("经营活动产生的现金流量净额", 0)) - capital_expenditure
+    }
 
-        # 获取现金流量表数据
-        logger.info(f"{WAIT_ICON} 获取现金流量表数据...")
-        try:
-            cash_flow = ak.stock_financial_report_sina(
-                stock=f"sh{symbol}", symbol="现金流量表")
-            if not cash_flow.empty:
-                latest_cash_flow = cash_flow.iloc[0]
-                previous_cash_flow = cash_flow.iloc[1] if len(
-                    cash_flow) > 1 else cash_flow.iloc[0]
-                logger.info(f"{SUCCESS_ICON} 成功获取现金流量表数据")
+
+def get_financial_statements(symbol: str, periods: int = 2) -> List[Dict[str, Any]]:
+    """获取财务报表数据
+
+    Args:
+        symbol: 股票代码
+        periods: 返回的报告期数量，从最新一期开始；历史不足时用最早一期补齐
+
+    Returns:
+        List[Dict]: 长度为 periods 的财务数据列表，第 0 项为最新一期
+    """
+    default_item = {
+        "net_income": 0,
+        "operating_revenue": 0,
+        "operating_profit": 0,
+        "working_capital": 0,
+        "depreciation_and_amortization": 0,
+        "capital_expenditure": 0,
+        "free_cash_flow": 0
+    }
+    try:
+        logger.info(f"{WAIT_ICON} 正在获取 {symbol} 的财务报表数据...")
+
+        # 三张报表相互独立，并发获取，单张报表失败不影响其他报表
+        # 报表缓存保存完整的多期历史，只在新报告披露后才会重新下载
+        logger.info(f"{WAIT_ICON} 获取资产负债表、利润表和现金流量表数据...")
+        reports = run_concurrently({
+            report_name: (lambda name=report_name: financial_cache.get_report(symbol, name))
+            for report_name in ["资产负债表", "利润表", "现金流量表"]
+        })
+
+        def report_period(report_name, index):
+            """返回报表第 index 期的数据，历史不足时返回最早一期"""
+            report = reports[report_name]
+            if report is None or report.empty:
+                return pd.Series()
+            return report.iloc[min(index, len(report) - 1)]
+
+        for report_name, report in reports.items():
+            if report is None or report.empty:
+                logger.error(f"{ERROR_ICON} 警告：无法获取{report_name}数据")
             else:
-                logger.error(f"{ERROR_ICON} 警告：无法获取现金流量表数据")
-                latest_cash_flow = pd.Series()
-                previous_cash_flow = pd.Series()
-        except Exception as e:
-            logger.error(f"{ERROR_ICON} 获取现金流量表数据时出错：{e}")
-            latest_cash_flow = pd.Series()
-            previous_cash_flow = pd.Series()
+                logger.info(f"{SUCCESS_ICON} 成功获取{report_name}数据，共 {len(report)} 期")
 
         # 构建财务数据
         line_items = []
         try:
-            # 处理最新期间数据
-            current_item = {
-                # 从利润表获取
-                "net_income": float(latest_income.get("净利润", 0)),
-                "operating_revenue": float(latest_income.get("营业总收入", 0)),
-                "operating_profit": float(latest_income.get("营业利润", 0)),
-
-                # 从资产负债表计算营运资金
-                "working_capital": float(latest_balance.get("流动资产合计", 0)) - float(latest_balance.get("流动负债合计", 0)),
-
-                # 从现金流量表获取
-                "depreciation_and_amortization": float(latest_cash_flow.get("固定资产折旧、油气资产折耗、生产性生物资产折旧", 0)),
-                "capital_expenditure": abs(float(latest_cash_flow.get("购建固定资产、无形资产和其他长期资产支付的现金", 0))),
-                "free_cash_flow": float(latest_cash_flow.get("经营活动产生的现金流量净额", 0)) - abs(float(latest_cash_flow.get("购建固定资产、无形资产和其他长期资产支付的现金", 0)))
-            }
-            line_items.append(current_item)
-            logger.info(f"{SUCCESS_ICON} 成功处理最新期间数据")
-
-            # 处理上一期间数据
-            previous_item = {
-                "net_income": float(previous_income.get("净利润", 0)),
-                "operating_revenue": float(previous_income.get("营业总收入", 0)),
-                "operating_profit": float(previous_income.get("营业利润", 0)),
-                "working_capital": float(previous_balance.get("流动资产合计", 0)) - float(previous_balance.get("流动负债合计", 0)),
-                "depreciation_and_amortization": float(previous_cash_flow.get("固定资产折旧、油气资产折耗、生产性生物资产折旧", 0)),
-                "capital_expenditure": abs(float(previous_cash_flow.get("购建固定资产、无形资产和其他长期资产支付的现金", 0))),
-                "free_cash_flow": float(previous_cash_flow.get("经营活动产生的现金流量净额", 0)) - abs(float(previous_cash_flow.get("购建固定资产、无形资产和其他长期资产支付的现金", 0)))
-            }
-            line_items.append(previous_item)
-            logger.info(f"{SUCCESS_ICON} 成功处理上一期间数据")
+            for index in range(periods):
+                line_items.append(_build_line_item(
+                    report_period("资产负债表", index),
+                    report_period("利润表", index),
+                    report_period("现金流量表", index)))
+            logger.info(f"{SUCCESS_ICON} 成功处理 {periods} 期财务数据")
 
         except Exception as e:
             logger.error(f"{ERROR_ICON} 处理财务数据时出错：{e}")
-            default_item = {
-                "net_income": 0,
-                "operating_revenue": 0,
-                "operating_profit": 0,
-                "working_capital": 0,
-                "depreciation_and_amortization": 0,
-                "capital_expenditure": 0,
-                "free_cash_flow": 0
-            }
-            line_items = [default_item, default_item]
+            line_items = [default_item] * periods
 
         return line_items
 
     except Exception as e:
         logger.error(f"{ERROR_ICON} 获取财务报表时出错：{e}")
-        default_item = {
-            "net_income": 0,
-            "operating_revenue": 0,
-            "operating_profit": 0,
-            "working_capital": 0,
-            "depreciation_and_amortization": 0,
-            "capital_expenditure": 0,
-            "free_cash_flow": 0
-        }
-        return [default_item, default_item]
+        return [default_item] * periods
 
 
 def get_market_data(symbol: str) -> Dict[str, Any]:
     """获取市场数据"""
     try:
-        # 获取实时行情
-        realtime_data = ak.stock_zh_a_spot_em()
-        stock_data = realtime_data[realtime_data['代码'] == symbol].iloc[0]
+        # 获取实时行情（与 get_financial_metrics 共享同一份全市场快照）
+        stock_data = spot_snapshot.get_row(symbol)
+        if stock_data is None:
+            raise ValueError(f"未找到股票 {symbol} 的实时行情数据")
 
         return {
             "market_cap": float(stock_data.get("总市值", 0)),
@@ -291,7 +250,8 @@ def get_market_data(symbol: str) -> Dict[str, Any]:
         return {}
 
 
-def get_price_history(symbol: str, start_date: str = None, end_date: str = None, adjust: str = "qfq") -> pd.DataFrame:
+def get_price_history(symbol: str, start_date: str = None, end_date: str = None, adjust: str = "qfq",
+                      with_indicators: bool = True) -> pd.DataFrame:
     """获取历史价格数据
 
     Args:
@@ -302,6 +262,8 @@ def get_price_history(symbol: str, start_date: str = None, end_date: str = None,
                - "": 不复权
                - "qfq": 前复权（默认）
                - "hfq": 后复权
+        with_indicators: 是否附加下列技术指标列。为 False 时只返回行情数据，
+               指标由调用方通过 feature_frame 按需计算
 
     Returns:
         包含以下列的DataFrame：
@@ -354,36 +316,8 @@ def get_price_history(symbol: str, start_date: str = None, end_date: str = None,
         logger.info(f"结束日期：{end_date.strftime('%Y-%m-%d')}")
 
         def get_and_process_data(start_date, end_date):
-            """获取并处理数据，包括重命名列等操作"""
-            df = ak.stock_zh_a_hist(
-                symbol=symbol,
-                period="daily",
-                start_date=start_date.strftime("%Y%m%d"),
-                end_date=end_date.strftime("%Y%m%d"),
-                adjust=adjust
-            )
-
-            if df is None or df.empty:
-                return pd.DataFrame()
-
-            # 重命名列以匹配技术分析代理的需求
-            df = df.rename(columns={
-                "日期": "date",
-                "开盘": "open",
-                "最高": "high",
-                "最低": "low",
-                "收盘": "close",
-                "成交量": "volume",
-                "成交额": "amount",
-                "振幅": "amplitude",
-                "涨跌幅": "pct_change",
-                "涨跌额": "change_amount",
-                "换手率": "turnover"
-            })
-
-            # 确保日期列为datetime类型
-            df["date"] = pd.to_datetime(df["date"])
-            return df
+            """从本地行情存储获取数据，缺失的日期区间会自动增量下载"""
+            return price_store.get(symbol, start_date, end_date, adjust=adjust)
 
         # 获取历史行情数据
         df = get_and_process_data(start_date, end_date)
@@ -393,133 +327,28 @@ def get_price_history(symbol: str, start_date: str = None, end_date: str = None,
             return pd.DataFrame()
 
         # 检查数据量是否足够
-        min_required_days = 120  # 至少需要120个交易日的数据
+        min_required_days = MIN_HISTORY_ROWS  # 至少需要120个交易日的数据
         if len(df) < min_required_days:
             logger.error(
                 f"{ERROR_ICON} 警告：获取到的数据量（{len(df)}条）不足以计算所有技术指标（需要至少{min_required_days}条）")
             logger.info(f"{WAIT_ICON} 尝试获取更长时间范围的数据...")
 
             # 扩大时间范围到2年
-            start_date = end_date - timedelta(days=730)
+            start_date = end_date - timedelta(days=FALLBACK_HISTORY_DAYS)
             df = get_and_process_data(start_date, end_date)
 
             if len(df) < min_required_days:
                 logger.error(f"{ERROR_ICON} 警告：即使扩大时间范围，数据量（{len(df)}条）仍然不足")
 
-        # 计算动量指标
-        df["momentum_1m"] = df["close"].pct_change(periods=20)  # 20个交易日约等于1个月
-        df["momentum_3m"] = df["close"].pct_change(periods=60)  # 60个交易日约等于3个月
-        df["momentum_6m"] = df["close"].pct_change(periods=120)  # 120个交易日约等于6个月
-
-        # 计算成交量动量（相对于20日平均成交量的变化）
-        df["volume_ma20"] = df["volume"].rolling(window=20).mean()
-        df["volume_momentum"] = df["volume"] / df["volume_ma20"]
-
-        # 计算波动率指标
-        # 1. 历史波动率 (20日)
-        returns = df["close"].pct_change()
-        df["historical_volatility"] = returns.rolling(window=20).std() * np.sqrt(252)  # 年化
-
-        # 2. 波动率区间 (相对于过去120天的波动率的位置)
-        volatility_120d = returns.rolling(window=120).std() * np.sqrt(252)
-        vol_min = volatility_120d.rolling(window=120).min()
-        vol_max = volatility_120d.rolling(window=120).max()
-        vol_range = vol_max - vol_min
-        df["volatility_regime"] = np.where(
-            vol_range > 0,
-            (df["historical_volatility"] - vol_min) / vol_range,
-            0  # 当范围为0时返回0
-        )
-
-        # 3. 波动率Z分数
-        vol_mean = df["historical_volatility"].rolling(window=120).mean()
-        vol_std = df["historical_volatility"].rolling(window=120).std()
-        df["volatility_z_score"] = (
-            df["historical_volatility"] - vol_mean) / vol_std
-
-        # 4. ATR比率
-        tr = pd.DataFrame()
-        tr["h-l"] = df["high"] - df["low"]
-        tr["h-pc"] = abs(df["high"] - df["close"].shift(1))
-        tr["l-pc"] = abs(df["low"] - df["close"].shift(1))
-        tr["tr"] = tr[["h-l", "h-pc", "l-pc"]].max(axis=1)
-        df["atr"] = tr["tr"].rolling(window=14).mean()
-        df["atr_ratio"] = df["atr"] / df["close"]
-
-        # 计算统计套利指标
-        # 1. 赫斯特指数 (使用过去120天的数据)
-        def calculate_hurst(series):
-            """
-            计算Hurst指数。
-
-            Args:
-                series: 价格序列
-
-            Returns:
-                float: Hurst指数，或在计算失败时返回np.nan
-            """
-            try:
-                series = series.dropna()
-                if len(series) < 30:  # 降低最小数据点要求
-                    return np.nan
-
-                # 使用对数收益率
-                log_returns = np.log(series / series.shift(1)).dropna()
-                if len(log_returns) < 30:  # 降低最小数据点要求
-                    return np.nan
-
-                # 使用更小的lag范围
-                # 减少lag范围到2-10天
-                lags = range(2, min(11, len(log_returns) // 4))
-
-                # 计算每个lag的标准差
-                tau = []
-                for lag in lags:
-                    # 计算滚动标准差
-                    std = log_returns.rolling(window=lag).std().dropna()
-                    if len(std) > 0:
-                        tau.append(np.mean(std))
-
-                # 基本的数值检查
-                if len(tau) < 3:  # 进一步降低最小要求
-                    return np.nan
-
-                # 使用对数回归
-                lags_log = np.log(list(lags))
-                tau_log = np.log(tau)
-
-                # 计算回归系数
-                reg = np.polyfit(lags_log, tau_log, 1)
-                hurst = reg[0] / 2.0
-
-                # 只保留基本的数值检查
-                if np.isnan(hurst) or np.isinf(hurst):
-                    return np.nan
-
-                return hurst
-
-            except Exception as e:
-                return np.nan
-
-        # 使用对数收益率计算Hurst指数
-        log_returns = np.log(df["close"] / df["close"].shift(1))
-        df["hurst_exponent"] = log_returns.rolling(
-            window=120,
-            min_periods=60  # 要求至少60个数据点
-        ).apply(calculate_hurst)
-
-        # 2. 偏度 (20日)
-        df["skewness"] = returns.rolling(window=20).skew()
-
-        # 3. 峰度 (20日)
-        df["kurtosis"] = returns.rolling(window=20).kurt()
-
         # 按日期升序排序
         df = df.sort_values("date")
 
         # 重置索引
         df = df.reset_index(drop=True)
 
+        if with_indicators:
+            add_price_indicators(df)
+
         logger.info(f"成功获取历史行情数据，共 {len(df)} 条记录")
 
         # 检查并报告NaN值
@@ -536,10 +365,93 @@ def get_price_history(symbol: str, start_date: str = None, end_date: str = None,
         return pd.DataFrame()
 
 
+def add_price_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """向行情数据原地添加 get_price_history 文档中列出的技术指标列
+
+    指标通过 feature_frame(df) 计算，之后在同一个 df 上请求的相同特征
+    （如收益率、20 日波动率）直接复用缓存结果。
+    """
+    features = feature_frame(df)
+
+    # 计算动量指标
+    df["momentum_1m"] = features.get("returns", periods=20)  # 20个交易日约等于1个月
+    df["momentum_3m"] = features.get("returns", periods=60)  # 60个交易日约等于3个月
+    df["momentum_6m"] = features.get("returns", periods=120)  # 120个交易日约等于6个月
+
+    # 计算成交量动量（相对于20日平均成交量的变化）
+    df["volume_ma20"] = features.get("sma", column="volume", window=20)
+    df["volume_momentum"] = df["volume"] / df["volume_ma20"]
+
+    # 计算波动率指标
+    # 1. 历史波动率 (20日)，年化
+    historical_volatility = features.get("volatility", window=20)
+    df["historical_volatility"] = historical_volatility
+
+    # 2. 波动率区间 (相对于过去120天的波动率的位置)
+    volatility_120d = features.get("volatility", window=120)
+    vol_min = indicators.rolling_min(volatility_120d, 120)
+    vol_max = indicators.rolling_max(volatility_120d, 120)
+    vol_range = vol_max - vol_min
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["volatility_regime"] = np.where(
+            vol_range > 0,
+            (historical_volatility - vol_min) / vol_range,
+            0  # 当范围为0时返回0
+        )
+
+    # 3. 波动率Z分数
+    vol_mean = indicators.rolling_mean(historical_volatility, 120)
+    vol_std = indicators.rolling_std(historical_volatility, 120)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        df["volatility_z_score"] = (historical_volatility - vol_mean) / vol_std
+
+    # 4. ATR比率
+    df["atr"] = features.get("atr", period=14, min_periods=14)
+    df["atr_ratio"] = df["atr"] / df["close"]
+
+    # 计算统计套利指标
+    # 1. 赫斯特指数 (使用过去120天的数据，要求至少60个数据点)
+    df["hurst_exponent"] = features.get("rolling_hurst", window=120, min_periods=60)
+
+    # 2. 偏度 (20日)
+    df["skewness"] = features.get("rolling_skew", window=20)
+
+    # 3. 峰度 (20日)
+    df["kurtosis"] = features.get("rolling_kurt", window=20)
+    return df
+
+
+def prices_to_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """将价格 DataFrame 转换为列式数据，用于在 AgentState 中传递
+
+    每列对应一个只读的 numpy 数组视图，不复制底层数据，也不再为每一行创建
+    字典。各节点通过 prices_to_df 重建 DataFrame 时同样不复制数据，只读标记
+    保证任何节点都无法原地修改其他节点共享的价格数据。
+    """
+    columns = {}
+    for col in df.columns:
+        values = df[col].to_numpy()
+        if values.flags.writeable:
+            # 设置只读标记前先取视图，不影响原 DataFrame
+            values = values.view()
+            values.flags.writeable = False
+        columns[str(col)] = values
+    return columns
+
+
 def prices_to_df(prices):
-    """Convert price data to DataFrame with standardized column names"""
+    """Convert price data to DataFrame with standardized column names
+
+    prices 可以是 prices_to_columns 生成的列式数据（零拷贝重建）、
+    DataFrame 或旧格式的 list-of-dicts。
+    """
     try:
-        df = pd.DataFrame(prices)
+        if isinstance(prices, pd.DataFrame):
+            df = prices.copy(deep=False)
+        elif isinstance(prices, dict):
+            df = pd.DataFrame(prices, copy=False)
+        else:
+            df = pd.DataFrame(prices)
 
         # 标准化列名映射
         column_mapping = {
@@ -0,0 +1,320 @@
+import os
+import copy
+import gzip
+import json
+import pickle
+import hashlib
+import tempfile
+import threading
+from contextlib import ExitStack, contextmanager, nullcontext
+from datetime import datetime
+from typing import Optional
+
+from src.utils.logger_config import get_logger, ERROR_ICON, SUCCESS_ICON
+from src.utils.lazy import lazy_import
+
+ak = lazy_import("akshare")
+
+logger = get_logger()
+
+# 使用 akshare 的模块，录制和回放时把其中的 ak 替换为代理
+AKSHARE_MODULES = (
+    "src.utils.price_store",
+    "src.utils.spot_snapshot",
+    "src.utils.financial_cache",
+    "src.utils.news_crawler",
+    "src.utils.api",
+)
+
+# 磁带文件格式版本，格式不兼容时递增
+CASSETTE_VERSION = 2
+
+# akshare 调用中表示查询区间的参数，回放时只有这些参数不同的调用可以按录制顺序替代
+DATE_RANGE_ARGS = ("start_date", "end_date", "start_year")
+
+
+class CassetteMiss(LookupError):
+    """回放时磁带中没有对应的调用"""
+
+
+def _call_key(kind: str, name: str, key_args) -> str:
+    """调用的匹配键：类型、名称和参数的规范化 JSON 的哈希"""
+    text = json.dumps([kind, name, key_args], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _match_key(kind: str, name: str, key_args) -> Optional[str]:
+    """去掉查询区间参数后的匹配键，LLM 调用没有可替代的记录"""
+    if kind != "akshare":
+        return None
+    args, kwargs = key_args
+    kwargs = {k: v for k, v in kwargs.items() if k not in DATE_RANGE_ARGS}
+    return _call_key(kind, name, [args, kwargs])
+
+
+def _picklable_error(error: BaseException) -> BaseException:
+    """无法 pickle 的异常转换为同样信息的 RuntimeError"""
+    try:
+        pickle.dumps(error, protocol=pickle.HIGHEST_PROTOCOL)
+        return error
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+class Cassette:
+    """akshare 与 LLM 调用的录制 / 回放磁带
+
+    录制模式下执行真实调用，按调用顺序保存参数和返回值（或异常）；回放模式下不访问网络，
+    按参数返回录制的结果。同一调用多次出现时依次返回各次录制的结果，用完后重复最后一次。
+    akshare 调用只有查询区间（DATE_RANGE_ARGS，如依赖当天日期的结束日期）不同时，按录制顺序
+    使用其他参数相同的调用中下一条未用过的记录；LLM 请求不同或没有可替代的记录时抛出 CassetteMiss。
+
+    文件为 gzip 压缩的 pickle，保存 DataFrame 的完整类型。加载磁带等同于执行其中的代码，
+    只能回放自己录制或来源可信的磁带，不要回放从不可信来源获得的文件。
+
+    Args:
+        path: 磁带文件路径
+        mode: "record" 或 "replay"
+    """
+
+    def __init__(self, path: str, mode: str = "replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"未知的磁带模式: {mode}")
+        self.path = path
+        self.mode = mode
+        self.meta = {}
+        self._records = []
+        self._by_key = {}
+        self._by_match = {}
+        self._used = set()
+        self._lock = threading.Lock()
+        if mode == "replay":
+            self._load()
+        else:
+            self.meta["created_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def __len__(self):
+        return len(self._records)
+
+    def _load(self):
+        # pickle.load 会执行文件中的代码，磁带必须来自可信来源
+        with gzip.open(self.path, "rb") as f:
+            content = pickle.load(f)
+        if content.get("version") != CASSETTE_VERSION:
+            raise ValueError(f"不支持的磁带格式版本: {content.get('version')}")
+        self.meta = content["meta"]
+        for record in content["records"]:
+            self._append(record)
+        logger.info(f"{SUCCESS_ICON} 已加载磁带 {self.path}，共 {len(self._records)} 条调用")
+
+    def _append(self, record: dict):
+        index = len(self._records)
+        self._records.append(record)
+        self._by_key.setdefault(record["key"], []).append(index)
+        if record["match"] is not None:
+            self._by_match.setdefault(record["match"], []).append(index)
+
+    def save(self):
+        """写入磁带文件，先写临时文件再原子替换"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            content = {"version": CASSETTE_VERSION, "meta": self.meta, "records": list(self._records)}
+        fd, tmp_file = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                pickle.dump(content, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, self.path)
+        except Exception:
+            os.remove(tmp_file)
+            raise
+        logger.info(f"{SUCCESS_ICON} 磁带已写入 {self.path}，共 {len(content['records'])} 条调用")
+
+    def _record(self, kind: str, name: str, key: str, match: Optional[str],
+                value=None, error: BaseException = None):
+        # 保存副本，调用方之后修改返回值不影响录制结果
+        record = {"kind": kind, "name": name, "key": key, "match": match}
+        if error is not None:
+            record["error"] = _picklable_error(error)
+        else:
+            record["value"] = copy.deepcopy(value)
+        with self._lock:
+            self._append(record)
+
+    def _replay(self, kind: str, name: str, key: str, match: Optional[str]):
+        with self._lock:
+            candidates = self._by_key.get(key)
+            if candidates:
+                unused = [index for index in candidates if index not in self._used]
+                index = unused[0] if unused else candidates[-1]
+            else:
+                unused = [index for index in self._by_match.get(match, ()) if index not in self._used]
+                if not unused:
+                    logger.error(f"{ERROR_ICON} 磁带中没有与本次 {kind}.{name} 调用匹配的记录")
+                    raise CassetteMiss(f"磁带 {self.path} 中没有与本次 {kind}.{name} 调用匹配的记录")
+                index = unused[0]
+                logger.warning(f"{ERROR_ICON} {kind}.{name} 的查询区间与录制时不同，按录制顺序回放")
+            self._used.add(index)
+            record = self._records[index]
+        if "error" in record:
+            raise record["error"]
+        # 返回副本，多次回放同一条记录时互不影响
+        return copy.deepcopy(record["value"])
+
+    def call(self, kind: str, name: str, key_args, func):
+        """录制时执行 func() 并保存结果，回放时返回录制的结果
+
+        Args:
+            kind: 调用类型，"akshare" 或 "llm"
+            name: 调用名称，如 akshare 函数名
+            key_args: 用于匹配的参数，需可转为 JSON；akshare 调用为 [位置参数, 关键字参数]
+            func: 无参数的真实调用
+        """
+        key, match = _call_key(kind, name, key_args), _match_key(kind, name, key_args)
+        if self.replaying:
+            return self._replay(kind, name, key, match)
+        try:
+            value = func()
+        except Exception as e:
+            self._record(kind, name, key, match, error=e)
+            raise
+        self._record(kind, name, key, match, value)
+        return value
+
+    async def acall(self, kind: str, name: str, key_args, afunc):
+        """call 的异步版本，afunc 为无参数的协程函数"""
+        key, match = _call_key(kind, name, key_args), _match_key(kind, name, key_args)
+        if self.replaying:
+            return self._replay(kind, name, key, match)
+        try:
+            value = await afunc()
+        except Exception as e:
+            self._record(kind, name, key, match, error=e)
+            raise
+        self._record(kind, name, key, match, value)
+        return value
+
+
+class CassetteAkshare:
+    """替换各模块中 ak 的代理，akshare 函数的调用经过磁带录制或回放"""
+
+    def __init__(self, cassette: Cassette, source=None):
+        self._cassette = cassette
+        self._source = source if source is not None else ak
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        cassette = self._cassette
+        source = self._source
+
+        def call(*args, **kwargs):
+            return cassette.call("akshare", name, [list(args), kwargs],
+                                 lambda: getattr(source, name)(*args, **kwargs))
+        call.__name__ = name
+        return call
+
+
+# 当前生效的磁带，get_chat_completion 据此录制或回放 LLM 调用
+_active_cassette: Optional[Cassette] = None
+
+
+def current_cassette() -> Optional[Cassette]:
+    return _active_cassette
+
+
+@contextmanager
+def isolated_environment(ak_source, data_dir: str = None, llm_cache: bool = False):
+    """把各模块的 ak 替换为 ak_source，行情、财务、新闻与各类缓存指向独立目录
+
+    本地没有任何缓存，工作流需要的数据全部经过 ak_source 获取。
+
+    Args:
+        ak_source: 与 akshare 接口相同的数据源
+        data_dir: 行情、财务、新闻与各类缓存的目录，默认为临时目录，退出时删除
+        llm_cache: 是否启用 LLM 回复缓存，默认关闭，每次都调用模型
+    """
+    # unittest.mock 导入较慢，只在使用时导入
+    from unittest.mock import patch
+
+    from src.utils.financial_cache import FinancialCache
+    from src.utils.llm_cache import LLMCache
+    from src.utils.price_store import PriceStore
+    from src.utils.spot_snapshot import SpotSnapshot
+
+    with ExitStack() as stack:
+        if data_dir is None:
+            data_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        for module in AKSHARE_MODULES:
+            stack.enter_context(patch(f"{module}.ak", ak_source))
+        stack.enter_context(patch("src.utils.api.price_store",
+                                  PriceStore(os.path.join(data_dir, "prices"))))
+        stack.enter_context(patch("src.utils.api.financial_cache",
+                                  FinancialCache(os.path.join(data_dir, "financial"))))
+        stack.enter_context(patch("src.utils.api.spot_snapshot", SpotSnapshot()))
+        stack.enter_context(patch("src.utils.openrouter_config.llm_cache",
+                                  LLMCache(os.path.join(data_dir, "llm_cache"))))
+        stack.enter_context(patch("src.utils.news_crawler._data_dir", lambda: data_dir))
+        stack.enter_context(patch("src.utils.news_crawler._news_archive", None))
+        stack.enter_context(patch("src.utils.news_crawler._sentiment_cache", None))
+        stack.enter_context(patch.dict(os.environ, {
+            "NEWS_ARCHIVE_PATH": os.path.join(data_dir, "news_archive.sqlite3"),
+            "SENTIMENT_CACHE_PATH": os.path.join(data_dir, "sentiment_cache.sqlite3"),
+            "LLM_CACHE": "on" if llm_cache else "off",
+        }))
+        try:
+            yield ak_source
+        finally:
+            from src.utils import news_crawler
+            for store in (news_crawler._news_archive, news_crawler._sentiment_cache):
+                if store is not None:
+                    store.close()
+
+
+@contextmanager
+def use_cassette(path: str, mode: str = "replay", data_dir: str = None, source=None):
+    """在磁带上录制或回放一次运行
+
+    录制和回放都在空的本地缓存上进行，录制时的每次数据获取都会出现在磁带中，
+    回放时也按同样的顺序发生。录制模式退出时（包括运行出错时）写入磁带文件。
+
+    Args:
+        path: 磁带文件路径
+        mode: "record" 或 "replay"
+        data_dir: 本地缓存目录，默认为临时目录
+        source: 录制时的数据源，默认为 akshare
+
+    用法：
+        with use_cassette("cassettes/600519.cassette", "record") as cassette:
+            cassette.meta["run"] = {...}
+            run_hedge_fund(...)
+    """
+    global _active_cassette
+    cassette = Cassette(path, mode)
+    with isolated_environment(CassetteAkshare(cassette, source), data_dir):
+        previous, _active_cassette = _active_cassette, cassette
+        try:
+            yield cassette
+        finally:
+            _active_cassette = previous
+            if cassette.recording:
+                cassette.save()
+
+
+def cassette_from_args(record: str = None, replay: str = None):
+    """命令行 --record / --replay 对应的上下文，都未指定时返回 None"""
+    if record and replay:
+        raise ValueError("--record 与 --replay 不能同时使用")
+    if record:
+        return use_cassette(record, "record")
+    if replay:
+        return use_cassette(replay, "replay")
+    return nullcontext()
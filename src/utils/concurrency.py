@@ -0,0 +1,83 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from src.utils.logger_config import get_logger, ERROR_ICON
+
+# 设置日志记录
+logger = get_logger()
+
+# 默认的并发数据请求线程数
+DEFAULT_FETCH_WORKERS = 4
+
+
+def get_fetch_workers() -> int:
+    """并发数据请求的线程数上限，可通过 FETCH_MAX_WORKERS 配置"""
+    try:
+        return max(1, int(os.getenv("FETCH_MAX_WORKERS", DEFAULT_FETCH_WORKERS)))
+    except ValueError:
+        return DEFAULT_FETCH_WORKERS
+
+
+def run_concurrently(
+    tasks: Dict[str, Callable[[], Any]],
+    defaults: Optional[Dict[str, Any]] = None,
+    max_workers: Optional[int] = None
+) -> Dict[str, Any]:
+    """在有界线程池中并发执行相互独立的 I/O 任务
+
+    每个任务的异常单独捕获：失败的任务记录日志并返回 defaults 中对应的默认值
+    （未提供时为 None），不影响其他任务。
+
+    Args:
+        tasks: 任务名到无参可调用对象的映射
+        defaults: 任务失败时使用的默认值
+        max_workers: 线程数上限，默认读取 FETCH_MAX_WORKERS
+
+    Returns:
+        任务名到结果的映射，顺序与 tasks 一致
+    """
+    defaults = defaults or {}
+    if not tasks:
+        return {}
+
+    workers = min(max_workers or get_fetch_workers(), len(tasks))
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {name: executor.submit(func) for name, func in tasks.items()}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"{ERROR_ICON} 并发任务 {name} 执行失败: {e}")
+                results[name] = defaults.get(name)
+    return results
+
+
+async def run_concurrently_async(
+    tasks: Dict[str, Callable[[], Any]],
+    defaults: Optional[Dict[str, Any]] = None,
+    max_workers: Optional[int] = None
+) -> Dict[str, Any]:
+    """run_concurrently 的异步版本
+
+    阻塞的 I/O 任务在线程中执行，等待期间事件循环可以调度其他协程；
+    同时执行的任务数不超过 max_workers，失败处理与 run_concurrently 相同。
+    """
+    defaults = defaults or {}
+    if not tasks:
+        return {}
+
+    semaphore = asyncio.Semaphore(min(max_workers or get_fetch_workers(), len(tasks)))
+
+    async def run(name: str, func: Callable[[], Any]) -> Any:
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(func)
+            except Exception as e:
+                logger.error(f"{ERROR_ICON} 并发任务 {name} 执行失败: {e}")
+                return defaults.get(name)
+
+    results = await asyncio.gather(*(run(name, func) for name, func in tasks.items()))
+    return dict(zip(tasks, results))
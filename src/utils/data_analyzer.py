@@ -1,7 +1,6 @@
-import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
 from src.utils.api import get_price_history
+from src.utils.feature_engine import feature_frame
 
 
 def analyze_stock_data(symbol: str, start_date: str = None, end_date: str = None):
@@ -21,47 +20,43 @@ def analyze_stock_data(symbol: str, start_date: str = None, end_date: str = None
         return
 
     # 计算额外的技术指标
+    # get_price_history 已在同一个 df 上计算过的特征（收益率、20 日波动率等）直接复用
+    features = feature_frame(df)
+
     # 1. 移动平均线
-    df['ma5'] = df['close'].rolling(window=5).mean()
-    df['ma10'] = df['close'].rolling(window=10).mean()
-    df['ma20'] = df['close'].rolling(window=20).mean()
-    df['ma60'] = df['close'].rolling(window=60).mean()
+    df['ma5'] = features.get("sma", window=5)
+    df['ma10'] = features.get("sma", window=10)
+    df['ma20'] = features.get("sma", window=20)
+    df['ma60'] = features.get("sma", window=60)
 
     # 2. MACD
-    exp1 = df['close'].ewm(span=12, adjust=False).mean()
-    exp2 = df['close'].ewm(span=26, adjust=False).mean()
-    df['macd'] = exp1 - exp2
-    df['signal_line'] = df['macd'].ewm(span=9, adjust=False).mean()
-    df['macd_hist'] = df['macd'] - df['signal_line']
+    macd_line, signal_line = features.get("macd")
+    df['macd'] = macd_line
+    df['signal_line'] = signal_line
+    df['macd_hist'] = macd_line - signal_line
 
     # 3. RSI
-    delta = df['close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    df['rsi'] = 100 - (100 / (1 + rs))
-
-    # 4. 布林带
-    df['bb_middle'] = df['close'].rolling(window=20).mean()
-    bb_std = df['close'].rolling(window=20).std()
-    df['bb_upper'] = df['bb_middle'] + (bb_std * 2)
-    df['bb_lower'] = df['bb_middle'] - (bb_std * 2)
+    df['rsi'] = features.get("rsi", period=14)
+
+    # 4. 布林带（中轨与 ma20 共享同一份结果）
+    bb_upper, bb_middle, bb_lower = features.get("bollinger", window=20)
+    df['bb_middle'] = bb_middle
+    df['bb_upper'] = bb_upper
+    df['bb_lower'] = bb_lower
 
     # 5. 成交量相关指标
-    df['volume_ma5'] = df['volume'].rolling(window=5).mean()
-    df['volume_ma20'] = df['volume'].rolling(window=20).mean()
+    df['volume_ma5'] = features.get("sma", column="volume", window=5)
+    df['volume_ma20'] = features.get("sma", column="volume", window=20)
     df['volume_ratio'] = df['volume'] / df['volume_ma5']
 
     # 6. 价格动量指标
-    df['price_momentum'] = df['close'].pct_change(periods=5)
+    df['price_momentum'] = features.get("returns", periods=5)
     df['price_acceleration'] = df['price_momentum'].diff()
 
     # 7. 波动率指标
-    df['daily_return'] = df['close'].pct_change()
-    df['volatility_5d'] = df['daily_return'].rolling(
-        window=5).std() * np.sqrt(252)
-    df['volatility_20d'] = df['daily_return'].rolling(
-        window=20).std() * np.sqrt(252)
+    df['daily_return'] = features.get("returns")
+    df['volatility_5d'] = features.get("volatility", window=5)
+    df['volatility_20d'] = features.get("volatility", window=20)
 
     # 保存为CSV文件
     output_file = f"{symbol}_analysis_{datetime.now().strftime('%Y%m%d')}.csv"
@@ -0,0 +1,288 @@
+"""
+技术指标特征引擎
+
+指标以特征的形式注册，声明参数默认值以及依赖的其他特征或价格列，构成一张
+依赖图。FeatureFrame 绑定一个价格 frame 并按需计算：只有被请求的特征及其依赖
+才会计算，结果按 (特征名, 参数) 缓存，同一 frame 上的所有调用方共享同一份结果。
+
+用法：
+    features = feature_frame(prices_df)
+    rsi_14 = features.series("rsi", period=14)
+    upper, middle, lower = features.get("bollinger", window=20)
+"""
+import math
+import threading
+import weakref
+from functools import partial
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils import indicators
+
+# 年化系数（按每年 252 个交易日）
+ANNUALIZATION = math.sqrt(252)
+
+class Feature:
+    """已注册特征的声明：计算函数、参数默认值与依赖"""
+
+    def __init__(self, name: str, func: Callable, deps, defaults: Dict[str, Any]):
+        self.name = name
+        self.func = func
+        self.deps = deps
+        self.defaults = defaults
+
+    def resolve_params(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        unknown = set(params) - set(self.defaults)
+        if unknown:
+            raise TypeError(f"特征 {self.name} 不支持参数: {sorted(unknown)}")
+        return {**self.defaults, **params}
+
+    def resolve_deps(self, params: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        deps = self.deps(params) if callable(self.deps) else self.deps
+        return [(dep, {}) if isinstance(dep, str) else (dep[0], dict(dep[1])) for dep in deps]
+
+
+# 特征名 -> 特征声明
+FEATURES: Dict[str, Feature] = {}
+
+
+def feature(name: str, deps=(), **defaults):
+    """注册特征的装饰器
+
+    Args:
+        name: 特征名
+        deps: 依赖列表，元素为特征名、价格列名或 (特征名, 参数) 元组；
+              依赖取决于本特征的参数时，传入接收参数字典并返回依赖列表的函数
+        **defaults: 特征支持的全部参数及其默认值
+
+    计算函数按声明顺序接收各依赖的结果，参数以关键字形式传入。
+    """
+    def decorator(func):
+        FEATURES[name] = Feature(name, func, deps, defaults)
+        return func
+    return decorator
+
+
+def _freeze(value):
+    """把结果中的数组设为只读，防止调用方修改共享的缓存"""
+    if isinstance(value, np.ndarray):
+        if not value.flags.writeable:
+            # 依赖的结果原样返回时保持同一个对象
+            return value
+        value = value.view()
+        value.flags.writeable = False
+        return value
+    if isinstance(value, tuple):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return {k: _freeze(v) for k, v in value.items()}
+    return value
+
+
+class FeatureFrame:
+    """绑定到单个价格 frame 的惰性特征计算与缓存
+
+    请求特征后不应再原地修改 frame 中的价格列，否则缓存的结果会过期。
+    """
+
+    def __init__(self, columns: Mapping[str, Any], index: Optional[pd.Index] = None):
+        self._columns = dict(columns)
+        self.index = index
+        self._cache: Dict[Tuple, Any] = {}
+        # 依赖在持有锁时递归计算，需要可重入锁
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame) -> "FeatureFrame":
+        # 只保存列数组和索引，不引用 DataFrame 本身
+        return cls({str(col): df[col].to_numpy() for col in df.columns}, df.index)
+
+    @staticmethod
+    def _key(name: str, params: Dict[str, Any]) -> Tuple:
+        return (name, tuple(sorted(params.items())))
+
+    def _column(self, name: str) -> np.ndarray:
+        if name not in self._columns:
+            raise KeyError(f"未注册的特征或价格列: {name}")
+        return np.asarray(self._columns[name], dtype=np.float64)
+
+    def get(self, name: str, **params):
+        """返回特征值（只读数组，或由只读数组组成的元组/字典），首次请求时才计算"""
+        spec = FEATURES.get(name)
+        if spec is None:
+            if params:
+                raise TypeError(f"价格列 {name} 不接受参数")
+            params = {}
+        else:
+            params = spec.resolve_params(params)
+        key = self._key(name, params)
+
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+            if spec is None:
+                value = _freeze(self._column(name))
+            else:
+                inputs = [self.get(dep, **dep_params)
+                          for dep, dep_params in spec.resolve_deps(params)]
+                value = _freeze(spec.func(*inputs, **params))
+            self._cache[key] = value
+            return value
+
+    def series(self, name: str, **params) -> pd.Series:
+        """以 pd.Series 形式返回数组类型的特征，索引与原 frame 一致"""
+        return pd.Series(self.get(name, **params), index=self.index)
+
+    def is_computed(self, name: str, **params) -> bool:
+        """特征是否已经计算并缓存"""
+        spec = FEATURES.get(name)
+        if spec is not None:
+            params = spec.resolve_params(params)
+        with self._lock:
+            return self._key(name, params) in self._cache
+
+
+# id(DataFrame) -> (DataFrame 的弱引用, FeatureFrame)
+_frames: Dict[int, Tuple[weakref.ref, FeatureFrame]] = {}
+_frames_lock = threading.Lock()
+
+
+def _release(key: int, ref: weakref.ref):
+    """DataFrame 被回收时释放对应的缓存；id 已被新对象复用时不做处理"""
+    entry = _frames.get(key)
+    if entry is not None and entry[0] is ref:
+        _frames.pop(key, None)
+
+
+def feature_frame(df: pd.DataFrame) -> FeatureFrame:
+    """返回绑定到 df 的 FeatureFrame，同一个 DataFrame 对象始终得到同一个实例
+
+    缓存的生命周期与 df 相同，df 被回收后自动释放。
+    """
+    key = id(df)
+    with _frames_lock:
+        entry = _frames.get(key)
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+        frame = FeatureFrame.from_df(df)
+        _frames[key] = (weakref.ref(df, partial(_release, key)), frame)
+        return frame
+
+
+def _rolling(values: np.ndarray, window: int, min_periods: Optional[int]):
+    return pd.Series(values).rolling(window, min_periods=min_periods)
+
+
+##### 收益率 #####
+
+@feature("returns", deps=["close"], periods=1)
+def _returns(close, periods):
+    """收盘价的 periods 期涨跌幅，与 ``pct_change(periods)`` 一致"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return close / indicators.shift(close, periods) - 1
+
+
+@feature("log_returns", deps=["close"])
+def _log_returns(close):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.log(close / indicators.shift(close, 1))
+
+
+##### 滚动统计 #####
+
+@feature("sma", deps=lambda p: [p["column"]], column="close", window=20, min_periods=None)
+def _sma(values, column, window, min_periods):
+    return indicators.rolling_mean(values, window, min_periods)
+
+
+@feature("rolling_std", deps=lambda p: [p["column"]], column="close", window=20)
+def _rolling_std(values, column, window):
+    return indicators.rolling_std(values, window)
+
+
+@feature("rolling_sum", deps=lambda p: [p["column"]], column="returns", window=21, min_periods=None)
+def _rolling_sum(values, column, window, min_periods):
+    return _rolling(values, window, min_periods).sum().to_numpy()
+
+
+@feature("rolling_max", deps=lambda p: [p["column"]], column="close", window=60)
+def _rolling_max(values, column, window):
+    return indicators.rolling_max(values, window)
+
+
+@feature("rolling_skew", deps=["returns"], window=42, min_periods=None)
+def _rolling_skew(returns, window, min_periods):
+    return _rolling(returns, window, min_periods).skew().to_numpy()
+
+
+@feature("rolling_kurt", deps=["returns"], window=42, min_periods=None)
+def _rolling_kurt(returns, window, min_periods):
+    return _rolling(returns, window, min_periods).kurt().to_numpy()
+
+
+@feature("volatility", deps=["returns"], window=20, min_periods=None)
+def _volatility(returns, window, min_periods):
+    """日收益率的滚动标准差，按年化"""
+    return _rolling(returns, window, min_periods).std().to_numpy() * ANNUALIZATION
+
+
+@feature("rolling_hurst", deps=["log_returns"], window=120, min_periods=60)
+def _rolling_hurst(log_returns, window, min_periods):
+    return indicators.rolling_hurst(log_returns, window=window, min_periods=min_periods)
+
+
+##### 技术指标 #####
+
+@feature("ema", deps=["close"], span=20)
+def _ema(close, span):
+    return indicators.ema(close, span)
+
+
+@feature("macd", deps=lambda p: [("ema", {"span": p["fast"]}), ("ema", {"span": p["slow"]})],
+         fast=12, slow=26, signal=9)
+def _macd(ema_fast, ema_slow, fast, slow, signal):
+    """返回 (MACD 线, 信号线)"""
+    macd_line = ema_fast - ema_slow
+    return macd_line, indicators.ema(macd_line, signal)
+
+
+@feature("rsi", deps=["close"], period=14)
+def _rsi(close, period):
+    return indicators.rsi(close, period)
+
+
+@feature("bollinger",
+         deps=lambda p: [("sma", {"window": p["window"]}), ("rolling_std", {"window": p["window"]})],
+         window=20, num_std=2.0)
+def _bollinger(middle, std, window, num_std):
+    """返回 (上轨, 中轨, 下轨)，中轨与同窗口的 sma 共享"""
+    width = std * num_std
+    return middle + width, middle, middle - width
+
+
+@feature("obv", deps=["close", "volume"])
+def _obv(close, volume):
+    return indicators.obv(close, volume)
+
+
+@feature("true_range", deps=["high", "low", "close"])
+def _true_range(high, low, close):
+    return indicators.true_range(high, low, close)
+
+
+@feature("atr", deps=["true_range"], period=14, min_periods=7)
+def _atr(true_range, period, min_periods):
+    return indicators.rolling_mean(true_range, period, min_periods)
+
+
+@feature("adx", deps=["high", "low", "close"], period=14)
+def _adx(high, low, close, period):
+    """返回 (ADX, +DI, -DI)"""
+    return indicators.adx(high, low, close, period)
+
+
+@feature("ichimoku", deps=["high", "low", "close"])
+def _ichimoku(high, low, close):
+    return indicators.ichimoku(high, low, close)
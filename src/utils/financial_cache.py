@@ -0,0 +1,245 @@
+import os
+import pickle
+import threading
+from datetime import date, datetime
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from src.utils.logger_config import get_logger, ERROR_ICON, SUCCESS_ICON, WAIT_ICON
+from src.utils.lazy import lazy_import
+from src.utils.tracing import payload_size, tracer
+
+# 设置日志记录
+logger = get_logger()
+
+# akshare 导入耗时较长，首次请求数据时才导入
+ak = lazy_import("akshare")
+
+# 新浪三大报表
+REPORT_NAMES = ["资产负债表", "利润表", "现金流量表"]
+
+# 财务指标缓存类型
+INDICATOR = "财务指标"
+
+# 首次获取财务指标时回溯的年数，可通过 FINANCIAL_INDICATOR_YEARS 配置
+DEFAULT_INDICATOR_YEARS = 5
+
+# 各报告期的法定披露截止日（月, 日），年报在次年披露
+# 一季报 4 月 30 日，半年报 8 月 31 日，三季报 10 月 31 日，年报次年 4 月 30 日
+DISCLOSURE_DEADLINES = {
+    3: (4, 30),
+    6: (8, 31),
+    9: (10, 31),
+    12: (4, 30),
+}
+
+
+def _default_cache_dir() -> str:
+    project_root = os.path.dirname(os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(project_root, "src", "data", "financial_cache")
+
+
+def next_report_period(period: date) -> date:
+    """返回 period 之后的下一个报告期（季度末）"""
+    if period.month >= 12:
+        return date(period.year + 1, 3, 31)
+    month = (period.month // 3 + 1) * 3
+    day = 30 if month in (6, 9) else 31
+    return date(period.year, month, day)
+
+
+def disclosure_deadline(period: date) -> date:
+    """返回报告期的法定披露截止日"""
+    month, day = DISCLOSURE_DEADLINES[period.month]
+    year = period.year + 1 if period.month == 12 else period.year
+    return date(year, month, day)
+
+
+class FinancialCache:
+    """财务报表与财务指标的本地缓存
+
+    按 (股票代码, 报表类型) 持久化完整的多期历史数据。财务数据只在新的定期报告
+    披露后才会变化，因此缓存不按时间过期，而是依据已缓存的最新报告期和披露日历
+    判断：下一报告期尚未结束时不可能有新报告，直接使用缓存；下一报告期结束后
+    进入披露窗口，每天最多向数据源确认一次。刷新失败时继续使用旧数据。
+    """
+
+    def __init__(self, root_dir: Optional[str] = None):
+        self.root_dir = root_dir or os.getenv(
+            "FINANCIAL_CACHE_DIR") or _default_cache_dir()
+        self._memory: Dict[Tuple[str, str], dict] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, symbol: str, kind: str) -> threading.Lock:
+        with self._locks_guard:
+            key = (symbol, kind)
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _cache_file(self, symbol: str, kind: str) -> str:
+        return os.path.join(self.root_dir, symbol, f"{kind}.pkl")
+
+    @staticmethod
+    def _today() -> date:
+        return date.today()
+
+    def _read(self, symbol: str, kind: str) -> Optional[dict]:
+        key = (symbol, kind)
+        if key in self._memory:
+            return self._memory[key]
+        cache_file = self._cache_file(symbol, kind)
+        if not os.path.exists(cache_file):
+            return None
+        try:
+            with open(cache_file, 'rb') as f:
+                entry = pickle.load(f)
+        except Exception as e:
+            logger.error(f"{ERROR_ICON} 读取 {symbol} 的{kind}缓存失败: {e}")
+            return None
+        self._memory[key] = entry
+        return entry
+
+    def _write(self, symbol: str, kind: str, entry: dict):
+        """先写临时文件再原子替换，读者不会看到写了一半的缓存"""
+        cache_file = self._cache_file(symbol, kind)
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        tmp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        except Exception as e:
+            logger.error(f"{ERROR_ICON} 写入 {symbol} 的{kind}缓存失败: {e}")
+        self._memory[(symbol, kind)] = entry
+
+    def is_fresh(self, entry: Optional[dict], today: Optional[date] = None) -> bool:
+        """根据最新报告期和披露日历判断缓存是否仍然有效"""
+        if entry is None or entry.get("latest_period") is None:
+            return False
+        today = today or self._today()
+        # 下一报告期尚未结束，不可能有新的定期报告
+        if today <= next_report_period(entry["latest_period"]):
+            return True
+        # 已进入披露窗口，每天最多确认一次
+        return entry.get("checked_at") == today
+
+    @staticmethod
+    def _fetch_report(symbol: str, report_name: str) -> pd.DataFrame:
+        with tracer.span("ak.stock_financial_report_sina", "akshare", symbol=symbol) as span:
+            df = ak.stock_financial_report_sina(stock=f"sh{symbol}", symbol=report_name)
+            span.set(size=payload_size(df))
+        return df
+
+    @staticmethod
+    def _fetch_indicator(symbol: str, start_year: int) -> pd.DataFrame:
+        with tracer.span("ak.stock_financial_analysis_indicator", "akshare", symbol=symbol) as span:
+            df = ak.stock_financial_analysis_indicator(
+                symbol=symbol, start_year=str(start_year))
+            span.set(size=payload_size(df))
+        return df
+
+    @staticmethod
+    def _normalize_report(df: pd.DataFrame) -> pd.DataFrame:
+        """按报告日从新到旧排序"""
+        df = df.copy()
+        df["报告日"] = df["报告日"].astype(str)
+        return df.sort_values("报告日", ascending=False, ignore_index=True)
+
+    @staticmethod
+    def _normalize_indicator(df: pd.DataFrame) -> pd.DataFrame:
+        """按日期从新到旧排序，同一日期保留最新获取的数据"""
+        df = df.copy()
+        df["日期"] = pd.to_datetime(df["日期"])
+        df = df.drop_duplicates(subset="日期", keep="last")
+        return df.sort_values("日期", ascending=False, ignore_index=True)
+
+    def _refresh(self, symbol: str, kind: str, entry: Optional[dict]) -> Optional[dict]:
+        """从数据源获取数据，报表整体替换，财务指标按日期增量合并"""
+        logger.info(f"{WAIT_ICON} 获取 {symbol} 的{kind}数据...")
+        try:
+            if kind == INDICATOR:
+                if entry is not None:
+                    # 只重新获取最新报告期所在年度及之后的数据
+                    start_year = entry["latest_period"].year
+                else:
+                    years = int(os.getenv("FINANCIAL_INDICATOR_YEARS",
+                                          DEFAULT_INDICATOR_YEARS))
+                    start_year = self._today().year - years
+                fetched = self._fetch_indicator(symbol, start_year)
+                if fetched is None or fetched.empty:
+                    raise ValueError("数据源返回空数据")
+                if entry is not None:
+                    fetched = pd.concat([entry["data"], fetched], ignore_index=True)
+                data = self._normalize_indicator(fetched)
+                latest_period = data["日期"].iloc[0].date()
+            else:
+                fetched = self._fetch_report(symbol, kind)
+                if fetched is None or fetched.empty:
+                    raise ValueError("数据源返回空数据")
+                data = self._normalize_report(fetched)
+                latest_period = datetime.strptime(
+                    data["报告日"].iloc[0], "%Y%m%d").date()
+        except Exception as e:
+            if entry is None:
+                raise
+            # 刷新失败时继续使用旧数据，下次调用再重试
+            logger.error(f"{ERROR_ICON} 刷新 {symbol} 的{kind}失败，继续使用缓存: {e}")
+            return entry
+
+        if entry is not None and latest_period > entry["latest_period"]:
+            logger.info(f"{SUCCESS_ICON} {symbol} 披露了新的报告期：{latest_period}")
+        elif self._today() > disclosure_deadline(next_report_period(latest_period)):
+            logger.warning(
+                f"WARNING: {symbol} 的{kind}已超过 {next_report_period(latest_period)} 报告期的披露截止日")
+
+        entry = {
+            "data": data,
+            "latest_period": latest_period,
+            "checked_at": self._today(),
+        }
+        self._write(symbol, kind, entry)
+        logger.info(f"{SUCCESS_ICON} 成功获取 {symbol} 的{kind}数据，共 {len(data)} 期")
+        return entry
+
+    def _get(self, symbol: str, kind: str) -> pd.DataFrame:
+        with self._lock_for(symbol, kind), \
+                tracer.span("financial_cache", "cache", symbol=symbol, kind=kind) as span:
+            entry = self._read(symbol, kind)
+            fresh = self.is_fresh(entry)
+            if fresh:
+                logger.info(f"{SUCCESS_ICON} 使用缓存的 {symbol} {kind}数据")
+            else:
+                entry = self._refresh(symbol, kind, entry)
+            span.set(cache_hit=fresh, size=len(entry["data"]))
+            return entry["data"].copy()
+
+    def get_report(self, symbol: str, report_name: str) -> pd.DataFrame:
+        """返回完整的多期新浪财务报表，按报告日从新到旧排序
+
+        Args:
+            symbol: 股票代码
+            report_name: 资产负债表 / 利润表 / 现金流量表
+        """
+        if report_name not in REPORT_NAMES:
+            raise ValueError(f"不支持的报表类型: {report_name}")
+        return self._get(symbol, report_name)
+
+    def get_indicator(self, symbol: str) -> pd.DataFrame:
+        """返回新浪财务指标的多期历史，按日期从新到旧排序"""
+        return self._get(symbol, INDICATOR)
+
+    def clear(self, symbol: Optional[str] = None):
+        """清空内存中的缓存（不删除磁盘文件）"""
+        if symbol is None:
+            self._memory.clear()
+        else:
+            for key in [k for k in self._memory if k[0] == symbol]:
+                del self._memory[key]
+
+
+# 全局共享的财务数据缓存
+financial_cache = FinancialCache()
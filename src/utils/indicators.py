@@ -0,0 +1,462 @@
+"""
+纯 NumPy 实现的指标计算内核
+
+所有函数接收 numpy 数组并返回新的 numpy 数组，不修改输入。
+计算结果与 src/agents/technicals.py 中原先基于 pandas 的实现保持一致。
+"""
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def rolling_hurst(log_returns: np.ndarray, window: int = 120, min_periods: int = 60,
+                  max_lag: int = 11, min_points: int = 30) -> np.ndarray:
+    """滚动窗口的 Hurst 指数
+
+    与 get_price_history 原先的 ``log_returns.rolling(window, min_periods).apply(calculate_hurst)``
+    结果一致：窗口内先对输入序列再取一次对数比值（非正比值产生的 NaN 被丢弃），
+    对 lag = 2..min(max_lag, n // 4) - 1 分别计算滚动标准差的均值 tau，
+    再以 log(tau) 对 log(lag) 做线性回归，斜率的一半即为 Hurst 指数。
+
+    实现上不再逐窗口回调 Python 函数：每个 lag 的滚动标准差只在整条序列上用
+    stride tricks 计算一次，各窗口的 tau 由累积和做区间求和得到，回归斜率使用
+    闭式解批量计算。
+
+    Args:
+        log_returns: 对数收益率序列
+        window: 滚动窗口长度
+        min_periods: 窗口内最少的有效数据点
+        max_lag: lag 上限（不含）
+        min_points: 窗口内计算所需的最少数据点
+
+    Returns:
+        np.ndarray: 与输入等长的 Hurst 指数序列，无法计算的位置为 NaN
+    """
+    x = np.asarray(log_returns, dtype=np.float64)
+    n = len(x)
+    result = np.full(n, np.nan)
+    if n == 0:
+        return result
+
+    # 压缩掉 NaN 后的有效数据及其原始位置
+    positions = np.flatnonzero(~np.isnan(x))
+    values = x[positions]
+    if len(values) < 2:
+        return result
+
+    # 相邻有效数据的对数比值，配对 i 由 values[i-1] 和 values[i] 组成
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratios = np.log(values[1:] / values[:-1])
+    pair_index = np.arange(1, len(values))
+    valid_pairs = pair_index[~np.isnan(ratios)]
+    y = ratios[~np.isnan(ratios)]
+
+    # 每个窗口覆盖的有效数据区间
+    ends = np.arange(n)
+    starts = np.maximum(ends - window + 1, 0)
+    first = np.searchsorted(positions, starts, side="left")
+    last = np.searchsorted(positions, ends, side="right") - 1
+    counts = last - first + 1
+
+    # 窗口内完整的配对为 first+1..last，再映射到去掉 NaN 后的比值序列
+    k_lo = np.searchsorted(valid_pairs, first + 1, side="left")
+    k_hi = np.searchsorted(valid_pairs, last, side="right") - 1
+    n_ratios = k_hi - k_lo + 1
+
+    eligible = (counts >= max(min_periods, 1)) & (counts >= min_points) & (n_ratios >= min_points)
+    if not eligible.any():
+        return result
+
+    upper = np.minimum(max_lag, n_ratios // 4)
+    lags = np.arange(2, max_lag)
+    tau = np.full((n, len(lags)), np.nan)
+
+    for j, lag in enumerate(lags):
+        if len(y) < lag:
+            continue
+        # 每个 lag 的滚动标准差在整条序列上只计算一次
+        with np.errstate(invalid="ignore"):
+            stds = sliding_window_view(y, lag).std(axis=1, ddof=1)
+        finite = ~np.isnan(stds)
+        std_sum = np.concatenate(([0.0], np.cumsum(np.where(finite, stds, 0.0))))
+        std_count = np.concatenate(([0], np.cumsum(finite)))
+
+        # stds[k - lag + 1] 对应以比值 k 结尾的窗口；窗口内可用的为 k_lo+lag-1..k_hi
+        lo = np.clip(k_lo, 0, len(stds))
+        hi = np.clip(k_hi - lag + 2, 0, len(stds))
+        hi = np.maximum(hi, lo)
+        total = std_sum[hi] - std_sum[lo]
+        count = std_count[hi] - std_count[lo]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            tau[:, j] = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+    log_lags = np.log(lags)
+    for u in np.unique(upper[eligible]):
+        rows = eligible & (upper == u)
+        used = lags < u
+        if used.sum() < 3:
+            continue
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_tau = np.log(tau[rows][:, used])
+        x_centered = log_lags[used] - log_lags[used].mean()
+        slope = (log_tau * x_centered).sum(axis=1) / (x_centered ** 2).sum()
+        hurst = slope / 2.0
+        # 任一 lag 缺失或 tau 非正时，原实现同样返回 NaN
+        hurst[~np.isfinite(hurst)] = np.nan
+        result[rows] = hurst
+
+    return result
+
+
+# 线性递推分块求解时允许的最大衰减（自然对数），保证块内 1 / Π a 不溢出
+_LOG_DECAY_LIMIT = 200.0
+
+
+def _linear_filter(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """求解一阶线性递推 y[t] = a[t] * y[t-1] + b[t]，y[-1] = 0，要求 0 <= a <= 1
+
+    不逐点循环：块内 y[t] = q[t] * (a[s] * y[s-1] + cumsum(b / q)[t])，
+    其中 q[t] = a[s+1] * ... * a[t]。按累积衰减把序列切成若干块，使块内 q 不会
+    下溢，块与块之间只传递一个标量。
+    """
+    n = len(b)
+    y = np.empty(n)
+    if n == 0:
+        return y
+
+    with np.errstate(divide="ignore"):
+        log_a = np.maximum(np.log(a), -(_LOG_DECAY_LIMIT + 1.0))
+    decay = np.cumsum(log_a)
+
+    start = 0
+    prev = 0.0
+    while start < n:
+        # 块内累积衰减不超过阈值；单步衰减超过阈值的位置自然成为新块的起点
+        end = int(np.searchsorted(-decay, _LOG_DECAY_LIMIT - decay[start], side="right"))
+        end = max(end, start + 1)
+        q = np.exp(decay[start:end] - decay[start])
+        block = b[start:end] / q
+        block[0] += a[start] * prev
+        np.cumsum(block, out=block)
+        block *= q
+        y[start:end] = block
+        prev = block[-1]
+        start = end
+    return y
+
+
+def _decay_filter(b: np.ndarray, decay: float) -> np.ndarray:
+    """求解常系数递推 y[t] = decay * y[t-1] + b[t]，y[-1] = 0，0 <= decay <= 1
+
+    序列按固定长度分块并排成二维数组，所有块的块内前缀和一次完成；块间只需
+    在块数量级上传递末尾值，再按 decay 的幂次一次性补回各块。
+    """
+    n = len(b)
+    if n == 0 or decay <= 0.0:
+        return np.array(b, dtype=np.float64)
+
+    block = n if decay >= 1.0 else max(1, min(n, int(_LOG_DECAY_LIMIT / -np.log(decay))))
+    rows = -(-n // block)
+    buffer = np.zeros(rows * block)
+    buffer[:n] = b
+    blocks = buffer.reshape(rows, block)
+
+    # 块内：y[s+j] = decay^j * cumsum(b / decay^j)
+    powers = decay ** np.arange(block, dtype=np.float64)
+    blocks /= powers
+    np.cumsum(blocks, axis=1, out=blocks)
+    blocks *= powers
+
+    if rows > 1:
+        # 块间：依次传递上一块末尾的值，再加到后续各块上
+        carry = blocks[:, -1].copy()
+        step = decay ** block
+        for k in range(1, rows):
+            carry[k] += step * carry[k - 1]
+        powers *= decay
+        blocks[1:] += carry[:-1, None] * powers
+
+    return buffer[:n]
+
+
+def ema(values: np.ndarray, span: int, adjust: bool = False, min_periods: int = 0) -> np.ndarray:
+    """指数移动平均，与 ``pd.Series.ewm(span=span, adjust=adjust).mean()`` 一致
+
+    NaN 的处理与 pandas 默认的 ignore_na=False 相同：NaN 不参与加权，但权重仍按
+    绝对位置衰减，NaN 位置输出上一个有效的均值。
+
+    Args:
+        values: 输入序列
+        span: 跨度，alpha = 2 / (span + 1)
+        adjust: 是否使用调整后的权重（pandas 的 adjust 参数）
+        min_periods: 输出有效值所需的最少观测数
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = len(x)
+    alpha = 2.0 / (span + 1.0)
+    decay = 1.0 - alpha
+
+    observed = ~np.isnan(x)
+    if observed.all():
+        # 不含 NaN 的常见情况
+        if n == 0:
+            return np.empty(0)
+        if adjust:
+            out = _decay_filter(x, decay)
+            out /= _decay_filter(np.ones(n), decay)
+        else:
+            b = x * alpha
+            b[0] = x[0]
+            out = _decay_filter(b, decay)
+        if min_periods > 1:
+            out[:min_periods - 1] = np.nan
+        return out
+
+    result = np.full(n, np.nan)
+    positions = np.flatnonzero(observed)
+    if len(positions) == 0:
+        return result
+    first = positions[0]
+    x = x[first:]
+    observed = observed[first:]
+
+    if adjust:
+        # y[t] = sum(decay^(t-i) * x[i]) / sum(decay^(t-i))，求和只包括有效观测
+        out = _decay_filter(np.where(observed, x, 0.0), decay)
+        out /= _decay_filter(observed.astype(np.float64), decay)
+    else:
+        # 有效观测处 y = (w * y_prev + alpha * x) / (w + alpha)，w = decay^(间隔 + 1)
+        # NaN 处 y 保持不变
+        m = len(x)
+        a = np.ones(m)
+        b = np.zeros(m)
+        obs_positions = positions - first
+        w = decay ** np.diff(obs_positions).astype(np.float64)
+        a[obs_positions[1:]] = w / (w + alpha)
+        b[obs_positions[1:]] = alpha * x[obs_positions[1:]] / (w + alpha)
+        b[0] = x[0]
+        out = _linear_filter(a, b)
+
+    if min_periods > 1:
+        out[np.cumsum(observed) < min_periods] = np.nan
+    result[first:] = out
+    return result
+
+
+def _window_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """长度为 window 的滑动窗口求和，返回 len(values) - window + 1 个值
+
+    不含 NaN 时用累积和相减；先减去首个值以降低累积和的量级，控制相减带来的
+    舍入误差。含 NaN 时改用卷积，NaN 只影响包含它的窗口。
+    """
+    if np.isnan(values).any():
+        return np.convolve(values, np.ones(window), mode="valid")
+    base = values[0]
+    cumulative = np.empty(len(values) + 1)
+    cumulative[0] = 0.0
+    np.subtract(values, base, out=cumulative[1:])
+    np.cumsum(cumulative[1:], out=cumulative[1:])
+    sums = cumulative[window:] - cumulative[:-window]
+    sums += window * base
+    return sums
+
+
+def rolling_mean(values: np.ndarray, window: int, min_periods: Optional[int] = None) -> np.ndarray:
+    """滚动均值，与 ``rolling(window, min_periods).mean()`` 一致"""
+    x = np.asarray(values, dtype=np.float64)
+    n = len(x)
+    min_periods = window if min_periods is None else max(min_periods, 1)
+    result = np.full(n, np.nan)
+    if n == 0:
+        return result
+
+    if min_periods >= window:
+        # 窗口必须完整且不含 NaN，NaN 在卷积中自然传播
+        if n >= window:
+            result[window - 1:] = _window_sum(x, window)
+            result[window - 1:] /= window
+        return result
+
+    # 序列开头的窗口不完整，补 window - 1 个 0 后按完整窗口求和
+    valid = ~np.isnan(x)
+    padded = np.zeros(n + window - 1)
+    np.copyto(padded[window - 1:], x, where=valid)
+    sums = _window_sum(padded, window)
+    counts = np.cumsum(valid)
+    counts[window:] -= counts[:-window].copy()
+    np.divide(sums, counts, out=result, where=counts >= min_periods)
+    return result
+
+
+def rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """滚动样本标准差（ddof=1），与 ``rolling(window).std()`` 一致
+
+    先求窗口均值，再逐个偏移累加离差平方（两遍法），不会像 E[x²] - E[x]² 那样
+    在价格较高、波动较小时出现抵消误差。
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = len(x)
+    result = np.full(n, np.nan)
+    if n < max(window, 2):
+        return result
+
+    m = n - window + 1
+    mean = _window_sum(x, window)
+    mean /= window
+    total = np.zeros(m)
+    deviation = np.empty(m)
+    for k in range(window):
+        np.subtract(x[k:k + m], mean, out=deviation)
+        deviation *= deviation
+        total += deviation
+    total /= window - 1
+    np.sqrt(total, out=result[window - 1:])
+    return result
+
+
+def _rolling_extreme(values: np.ndarray, window: int, func) -> np.ndarray:
+    """滚动极值：按 1, 2, 4, ... 倍增区间长度，两段重叠区间合并得到窗口极值
+
+    只需 O(log window) 次整列运算；NaN 通过 np.maximum / np.minimum 传播，
+    与 pandas 在窗口含 NaN 时返回 NaN 一致。
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = len(x)
+    result = np.full(n, np.nan)
+    if n < window:
+        return result
+
+    # covered[i] 为 x[i:i + span] 的极值
+    covered = x
+    span = 1
+    while span * 2 <= window:
+        covered = func(covered[:-span], covered[span:])
+        span *= 2
+    m = n - window + 1
+    func(covered[:m], covered[window - span:window - span + m], out=result[window - 1:])
+    return result
+
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """滚动最大值，与 ``rolling(window).max()`` 一致"""
+    return _rolling_extreme(values, window, np.maximum)
+
+
+def rolling_min(values: np.ndarray, window: int) -> np.ndarray:
+    """滚动最小值，与 ``rolling(window).min()`` 一致"""
+    return _rolling_extreme(values, window, np.minimum)
+
+
+def shift(values: np.ndarray, periods: int = 1) -> np.ndarray:
+    """与 ``pd.Series.shift(periods)`` 一致，空出的位置填 NaN"""
+    x = np.asarray(values, dtype=np.float64)
+    result = np.full(len(x), np.nan)
+    if periods == 0:
+        result[:] = x
+    elif abs(periods) < len(x):
+        if periods > 0:
+            result[periods:] = x[:-periods]
+        else:
+            result[:periods] = x[-periods:]
+    return result
+
+
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26,
+         signal: int = 9) -> Tuple[np.ndarray, np.ndarray]:
+    """MACD 线与信号线"""
+    macd_line = ema(close, fast) - ema(close, slow)
+    return macd_line, ema(macd_line, signal)
+
+
+def rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """相对强弱指数（简单移动平均版本）"""
+    x = np.asarray(close, dtype=np.float64)
+    delta = np.empty(len(x))
+    if len(x):
+        delta[0] = np.nan
+        np.subtract(x[1:], x[:-1], out=delta[1:])
+    # fmax 忽略 NaN，与原实现一样把 NaN 按 0 处理
+    gain = np.fmax(delta, 0.0)
+    loss = np.fmax(np.negative(delta, out=delta), 0.0)
+    avg_gain = rolling_mean(gain, period)
+    avg_loss = rolling_mean(loss, period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        return 100.0 - 100.0 / (1.0 + rs)
+
+
+def bollinger_bands(close: np.ndarray, window: int = 20,
+                    num_std: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """布林带，返回 (上轨, 中轨, 下轨)"""
+    middle = rolling_mean(close, window)
+    width = rolling_std(close, window)
+    width *= num_std
+    return middle + width, middle, middle - width
+
+
+def obv(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """能量潮指标：收盘价上涨累加成交量，下跌累减，持平不变，首个值为 0"""
+    c = np.asarray(close, dtype=np.float64)
+    v = np.asarray(volume, dtype=np.float64)
+    flow = np.zeros(len(c))
+    if len(c) > 1:
+        diff = c[1:] - c[:-1]
+        # 收盘价为 NaN 时比较结果为 False，视为持平
+        np.copyto(flow[1:], v[1:], where=diff > 0)
+        np.copyto(flow[1:], -v[1:], where=diff < 0)
+    return np.cumsum(flow, out=flow)
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """真实波幅，三项中忽略 NaN 取最大值"""
+    h = np.asarray(high, dtype=np.float64)
+    l = np.asarray(low, dtype=np.float64)
+    prev_close = shift(close, 1)
+    tr = h - l
+    with np.errstate(invalid="ignore"):
+        np.fmax(tr, np.abs(h - prev_close), out=tr)
+        np.fmax(tr, np.abs(l - prev_close), out=tr)
+    return tr
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+        period: int = 14, min_periods: int = 7) -> np.ndarray:
+    """平均真实波幅"""
+    return rolling_mean(true_range(high, low, close), period, min_periods)
+
+
+def adx(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+        period: int = 14) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """平均趋向指数，返回 (ADX, +DI, -DI)，平滑方式与原实现一样使用 adjust=True 的 EMA"""
+    h = np.asarray(high, dtype=np.float64)
+    l = np.asarray(low, dtype=np.float64)
+    up_move = h - shift(h, 1)
+    down_move = shift(l, 1) - l
+    with np.errstate(invalid="ignore"):
+        plus_dm = np.where((up_move > down_move) & (up_move > 0), up_move, 0.0)
+        minus_dm = np.where((down_move > up_move) & (down_move > 0), down_move, 0.0)
+
+    tr_ema = ema(true_range(h, l, close), period, adjust=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        plus_di = 100.0 * ema(plus_dm, period, adjust=True) / tr_ema
+        minus_di = 100.0 * ema(minus_dm, period, adjust=True) / tr_ema
+        dx = 100.0 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return ema(dx, period, adjust=True), plus_di, minus_di
+
+
+def ichimoku(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+             conversion: int = 9, base: int = 26, span_b: int = 52,
+             displacement: int = 26) -> Dict[str, np.ndarray]:
+    """一目均衡表各分量"""
+    tenkan_sen = (rolling_max(high, conversion) + rolling_min(low, conversion)) / 2
+    kijun_sen = (rolling_max(high, base) + rolling_min(low, base)) / 2
+    senkou_span_a = shift((tenkan_sen + kijun_sen) / 2, displacement)
+    senkou_span_b = shift((rolling_max(high, span_b) + rolling_min(low, span_b)) / 2, displacement)
+    return {
+        "tenkan_sen": tenkan_sen,
+        "kijun_sen": kijun_sen,
+        "senkou_span_a": senkou_span_a,
+        "senkou_span_b": senkou_span_b,
+        "chikou_span": shift(close, -displacement),
+    }
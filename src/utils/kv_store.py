@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+from src.utils.logger_config import get_logger
+
+# 设置日志记录
+logger = get_logger()
+
+# 其他进程持有写锁时的最长等待时间（秒）
+BUSY_TIMEOUT = 30
+
+
+def retry_locked(func, timeout: float = BUSY_TIMEOUT):
+    """执行 func，遇到锁冲突（OperationalError）时等待后重试，超过 timeout 秒后抛出
+
+    切换 WAL 模式等操作不受 busy_timeout 保护，多个进程同时打开新文件时可能立即失败。
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+    while True:
+        try:
+            return func()
+        except sqlite3.OperationalError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+
+def connect_sqlite(path: str) -> sqlite3.Connection:
+    """打开一个 WAL 模式的 SQLite 连接，必要时创建所在目录"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # isolation_level=None：每条语句自动提交，显式事务使用 BEGIN
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+    retry_locked(lambda: conn.execute("PRAGMA journal_mode=WAL"))
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def init_schema(conn: sqlite3.Connection, statements):
+    """在一个 BEGIN IMMEDIATE 事务中执行建表语句，锁冲突时重试
+
+    多个进程同时初始化同一个文件时由写锁串行化，不会在建表中途互相干扰。
+    """
+    def create():
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+    retry_locked(create)
+
+
+def hash_key(key: str) -> str:
+    """把任意长度的键转换为定长的 SHA-256 十六进制摘要"""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class SQLiteStore:
+    """WAL 模式 SQLite 存储的公共基类
+
+    sqlite3 连接不能跨线程使用，每个线程各自持有一个连接；fork 出的子进程重新打开连接。
+    首次连接时执行 schema() 返回的建表语句，并创建共用的 meta 表。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def schema(self) -> list:
+        """子类的建表语句"""
+        return []
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and getattr(self._local, "pid", None) == os.getpid():
+            return conn
+
+        conn = connect_sqlite(self.path)
+        with self._init_lock:
+            if not self._initialized:
+                init_schema(conn, self.schema() + [
+                    "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)"])
+                self._initialized = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get_meta(self, name: str) -> Optional[str]:
+        row = self._connect().execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, name: str, value: str):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, value))
+
+    def close(self):
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class KVStore(SQLiteStore):
+    """基于 SQLite（WAL 模式）的持久化键值存储
+
+    键以 SHA-256 摘要作为主键，查询是一次索引查找，打开存储的开销与条目数量无关。
+    每次写入是一个独立的事务，多个线程、多个进程可以同时读写同一个文件：
+    WAL 模式下读者不会阻塞写者，写者之间由 SQLite 的文件锁串行化。
+    值以 JSON 形式保存。
+    """
+
+    def __init__(self, path: str, table: str = "kv"):
+        super().__init__(path)
+        self.table = table
+
+    def schema(self) -> list:
+        return [f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)"]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """按原始键查询，未找到时返回 default"""
+        row = self._connect().execute(
+            f"SELECT value FROM {self.table} WHERE key = ?", (hash_key(key),)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def __contains__(self, key: str) -> bool:
+        return self._connect().execute(
+            f"SELECT 1 FROM {self.table} WHERE key = ?", (hash_key(key),)).fetchone() is not None
+
+    def put(self, key: str, value: Any):
+        """写入或覆盖一条记录，单条语句即为一个原子事务"""
+        self._connect().execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, updated_at) VALUES (?, ?, ?)",
+            (hash_key(key), json.dumps(value, ensure_ascii=False), time.time()))
+
+    def put_many(self, items: Dict[str, Any]):
+        """在一个事务中批量写入"""
+        now = time.time()
+        rows = [(hash_key(k), json.dumps(v, ensure_ascii=False), now) for k, v in items.items()]
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, updated_at) VALUES (?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, key: str):
+        self._connect().execute(f"DELETE FROM {self.table} WHERE key = ?", (hash_key(key),))
+
+    def __len__(self) -> int:
+        return self._connect().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
@@ -0,0 +1,68 @@
+import sys
+import importlib
+import threading
+from types import ModuleType
+
+
+class LazyModule:
+    """首次访问属性时才真正导入的模块代理
+
+    akshare、openai、google-genai、matplotlib 等依赖导入一次需要数百毫秒，
+    而很多入口（帮助信息、快速回测、只查缓存的任务）根本用不到它们。
+    导入在锁内完成，多个线程同时首次访问时只导入一次；属性的读取、设置和删除
+    都转发给真实模块，unittest.mock.patch("x.ak.func") 的行为与直接导入时相同。
+    """
+
+    __slots__ = ("_lazy_name", "_lazy_module", "_lazy_lock")
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_lazy_name", name)
+        object.__setattr__(self, "_lazy_module", None)
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+
+    def _load(self) -> ModuleType:
+        module = object.__getattribute__(self, "_lazy_module")
+        if module is None:
+            with object.__getattribute__(self, "_lazy_lock"):
+                module = object.__getattribute__(self, "_lazy_module")
+                if module is None:
+                    module = importlib.import_module(object.__getattribute__(self, "_lazy_name"))
+                    object.__setattr__(self, "_lazy_module", module)
+        return module
+
+    @property
+    def __dict__(self):
+        return self._load().__dict__
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __delattr__(self, attr):
+        delattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        name = object.__getattribute__(self, "_lazy_name")
+        if object.__getattribute__(self, "_lazy_module") is None:
+            return f"<lazy module '{name}' (not loaded)>"
+        return repr(self._lazy_module)
+
+
+def lazy_import(name: str):
+    """返回模块本身（已导入时）或其延迟导入代理"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
+
+
+def is_loaded(module) -> bool:
+    """模块（或代理）是否已经真正导入"""
+    if isinstance(module, LazyModule):
+        return object.__getattribute__(module, "_lazy_module") is not None
+    return True
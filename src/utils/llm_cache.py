@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.logger_config import get_logger, ERROR_ICON, SUCCESS_ICON
+from src.utils.tracing import tracer
+
+# 设置日志记录
+logger = get_logger()
+
+# 默认缓存容量（MB），可通过 LLM_CACHE_MAX_MB 配置
+DEFAULT_CACHE_MAX_MB = 256
+
+
+def _default_cache_dir() -> str:
+    project_root = os.path.dirname(os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(project_root, "src", "data", "llm_cache")
+
+
+def cache_enabled() -> bool:
+    """LLM_CACHE 设为 0 / off / false 时全局关闭缓存"""
+    return os.getenv("LLM_CACHE", "on").strip().lower() not in ("0", "off", "false", "no")
+
+
+def cache_key(provider: str, model: str, messages: List[dict], temperature: Optional[float]) -> str:
+    """按服务商、实际模型名、消息和温度计算内容地址"""
+    payload = json.dumps(
+        {"provider": provider, "model": model, "messages": messages, "temperature": temperature},
+        ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """以请求内容哈希为键的 LLM 回复磁盘缓存
+
+    每条回复保存为 <root>/<键前两位>/<键>.json，写入时先写临时文件再原子替换，
+    多个进程可以共享同一目录。总大小超过上限时按最近使用时间淘汰，
+    设置 ttl（秒）后超过有效期的回复视为未命中。
+    """
+
+    def __init__(self, root_dir: Optional[str] = None, max_bytes: Optional[int] = None,
+                 ttl: Optional[float] = None):
+        self.root_dir = root_dir or os.getenv("LLM_CACHE_DIR") or _default_cache_dir()
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("LLM_CACHE_MAX_MB", DEFAULT_CACHE_MAX_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        if ttl is None and os.getenv("LLM_CACHE_TTL"):
+            ttl = float(os.getenv("LLM_CACHE_TTL"))
+        self.ttl = ttl
+        # 键 -> (文件大小, 最近使用时间)，首次使用时扫描目录建立
+        self._index: Optional[Dict[str, Tuple[int, float]]] = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root_dir, key[:2], f"{key}.json")
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        if os.path.isdir(self.root_dir):
+            for prefix in os.listdir(self.root_dir):
+                prefix_dir = os.path.join(self.root_dir, prefix)
+                if not os.path.isdir(prefix_dir):
+                    continue
+                for name in os.listdir(prefix_dir):
+                    if not name.endswith(".json"):
+                        continue
+                    try:
+                        stat = os.stat(os.path.join(prefix_dir, name))
+                    except OSError:
+                        continue
+                    self._index[name[:-5]] = (stat.st_size, stat.st_mtime)
+        self._size = sum(size for size, _ in self._index.values())
+
+    def _remove(self, key: str):
+        size, _ = self._index.pop(key, (0, 0))
+        self._size -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[str]:
+        """返回缓存的回复，未命中或已过期时返回 None"""
+        with tracer.span("llm_cache", "cache") as span:
+            content = self._get(key)
+            span.set(cache_hit=content is not None, size=len(content or ""))
+        return content
+
+    def _get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"{ERROR_ICON} 读取 LLM 缓存失败: {e}")
+            return None
+
+        with self._lock:
+            self._load_index()
+            if self.ttl is not None and time.time() - entry.get("created_at", 0) > self.ttl:
+                self._remove(key)
+                return None
+            now = time.time()
+            try:
+                # 用修改时间记录最近使用时间，供淘汰时排序
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+            if key in self._index:
+                self._index[key] = (self._index[key][0], now)
+        return entry.get("content")
+
+    def put(self, key: str, content: str, **metadata):
+        """写入回复，必要时淘汰最久未使用的条目"""
+        path = self._path(key)
+        entry = {"content": content, "created_at": time.time(), **metadata}
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_file = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_file, path)
+            size = os.path.getsize(path)
+        except Exception as e:
+            logger.error(f"{ERROR_ICON} 写入 LLM 缓存失败: {e}")
+            return
+
+        with self._lock:
+            self._load_index()
+            old_size, _ = self._index.get(key, (0, 0))
+            self._index[key] = (size, time.time())
+            self._size += size - old_size
+            if self._size > self.max_bytes:
+                for old_key, _ in sorted(self._index.items(), key=lambda item: item[1][1]):
+                    if self._size <= self.max_bytes:
+                        break
+                    if old_key != key:
+                        self._remove(old_key)
+
+    def clear(self):
+        """删除全部缓存条目"""
+        with self._lock:
+            self._load_index()
+            for key in list(self._index):
+                self._remove(key)
+        logger.info(f"{SUCCESS_ICON} 已清空 LLM 缓存")
+
+
+# 全局共享的 LLM 回复缓存实例
+llm_cache = LLMCache()
@@ -1,14 +1,120 @@
 import os
 import time
+import queue
+import atexit
+import hashlib
 import logging
+from logging.handlers import QueueHandler, QueueListener
 
 # 状态图标
 SUCCESS_ICON = "✓"
 ERROR_ICON = "✗"
 WAIT_ICON = "⟳"
 
+# 日志中请求、响应等文本预览的最大字符数
+PREVIEW_CHARS = 500
+
 # 全局 logger 实例
 _global_logger = None
+# 后台写日志的监听线程
+_listener = None
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() not in ("0", "off", "false", "no")
+
+
+def compact_logging() -> bool:
+    """LOG_COMPACT=on 时大对象只记录类型、长度和哈希，不输出内容"""
+    return _env_flag("LOG_COMPACT", "off")
+
+
+def summarize(obj) -> str:
+    """对象的紧凑摘要：类型、元素个数、字符数和内容哈希"""
+    text = obj if isinstance(obj, str) else str(obj)
+    digest = hashlib.sha1(text.encode("utf-8", "replace")).hexdigest()[:12]
+    size = f" len={len(obj)}" if hasattr(obj, "__len__") and not isinstance(obj, str) else ""
+    return f"<{type(obj).__name__}{size} chars={len(text)} sha1={digest}>"
+
+
+def _snapshot(obj):
+    """复制 dict / list 的结构，叶子对象（字符串、DataFrame、消息等）不复制
+
+    日志在后台线程中格式化，调用方之后继续修改同一个状态字典时，
+    日志仍然输出记录时的内容，也不会在迭代中途遇到字典大小变化。
+    """
+    if type(obj) is dict:
+        return {key: _snapshot(value) for key, value in obj.items()}
+    if type(obj) is list:
+        return [_snapshot(value) for value in obj]
+    return obj
+
+
+class payload:
+    """延迟格式化的日志参数：只有日志真正输出时才转换为字符串
+
+    用法：logger.info("状态数据: %s", payload(state))。紧凑模式下输出摘要。
+    创建时复制 dict / list 的结构，格式化的是记录时的状态。
+    """
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj):
+        self.obj = _snapshot(obj)
+
+    def __str__(self):
+        return summarize(self.obj) if compact_logging() else str(self.obj)
+
+
+class preview(payload):
+    """延迟格式化并截断到 limit 个字符的日志参数"""
+
+    __slots__ = ("limit",)
+
+    def __init__(self, obj, limit: int = PREVIEW_CHARS):
+        super().__init__(obj)
+        self.limit = limit
+
+    def __str__(self):
+        if compact_logging():
+            return summarize(self.obj)
+        text = str(self.obj)
+        return f"{text[:self.limit]}..." if len(text) > self.limit else text
+
+
+class DeferredQueueHandler(QueueHandler):
+    """把日志记录原样放入队列，格式化和写入都在后台线程完成
+
+    标准库的 QueueHandler 会在调用线程中先格式化消息，这里跳过这一步，
+    payload / preview 参数只在后台线程中转换为字符串。
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def _start_listener(handler: QueueHandler, targets):
+    global _listener
+    log_queue = queue.SimpleQueue()
+    handler.queue = log_queue
+    _listener = QueueListener(log_queue, *targets, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    """停止后台线程，返回前写完已排队的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def flush_logs():
+    """等待后台线程写完已排队的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener.start()
 
 def setup_logger(name='stock_agent', log_level=logging.INFO):
     """
@@ -62,9 +168,20 @@ def setup_logger(name='stock_agent', log_level=logging.INFO):
     file_handler.setFormatter(formatter)
     console_handler.setFormatter(formatter)
     
-    # 添加处理器
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # 添加处理器：默认经队列交给后台线程写入，LOG_ASYNC=off 时在调用线程中直接写入
+    if _env_flag("LOG_ASYNC", "on"):
+        queue_handler = DeferredQueueHandler(queue.SimpleQueue())
+        targets = (file_handler, console_handler)
+        _start_listener(queue_handler, targets)
+        logger.addHandler(queue_handler)
+        # 进程退出前写完剩余日志
+        atexit.register(_stop_listener)
+        # fork 出的子进程（如回测进程池）没有监听线程，需要重新启动
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=lambda: _start_listener(queue_handler, targets))
+    else:
+        logger.addHandler(file_handler)
+        logger.addHandler(console_handler)
     
     # 立即测试日志记录
     logger.info("Logger initialization completed")
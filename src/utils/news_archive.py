@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import hashlib
+from datetime import datetime
+from typing import List, Optional, Union
+
+from src.utils.kv_store import SQLiteStore
+from src.utils.logger_config import get_logger, ERROR_ICON, SUCCESS_ICON, WAIT_ICON
+
+# 设置日志记录
+logger = get_logger()
+
+NEWS_FIELDS = ("title", "content", "publish_time", "source", "url", "keyword")
+
+
+def news_id(news: dict) -> str:
+    """新闻的去重键：优先使用新闻链接，没有链接时使用标题和发布时间的哈希"""
+    url = (news.get("url") or "").strip()
+    if url:
+        return url
+    return hashlib.sha256(
+        f"{news.get('title', '')}|{news.get('publish_time', '')}".encode("utf-8")).hexdigest()
+
+
+def _as_of_bound(as_of: Union[str, datetime, None]) -> Optional[str]:
+    """把时点转换为可与 publish_time 直接比较的字符串，只给日期时包含当天全部新闻"""
+    if as_of is None:
+        return None
+    if isinstance(as_of, datetime):
+        return as_of.strftime("%Y-%m-%d %H:%M:%S")
+    as_of = str(as_of).strip()
+    return f"{as_of} 23:59:59" if len(as_of) == 10 else as_of
+
+
+class NewsArchive(SQLiteStore):
+    """按股票累积保存个股新闻的 SQLite 存档
+
+    新闻以 (股票代码, 新闻链接) 为主键合并去重，并按 (股票代码, 发布时间) 建立索引，
+    可以查询任意时点之前已发布的最新新闻，回测时无需访问网络。
+    连接与并发方式与 KVStore 相同（SQLiteStore）：WAL 模式，每个线程各自持有一个连接。
+    """
+
+    def schema(self) -> list:
+        return [
+            "CREATE TABLE IF NOT EXISTS news ("
+            "symbol TEXT NOT NULL, id TEXT NOT NULL, publish_time TEXT NOT NULL, "
+            "title TEXT, content TEXT, source TEXT, url TEXT, keyword TEXT, "
+            "fetched_at REAL NOT NULL, PRIMARY KEY (symbol, id))",
+            "CREATE INDEX IF NOT EXISTS news_symbol_time ON news (symbol, publish_time)",
+        ]
+
+    def merge(self, symbol: str, news_list: List[dict]) -> int:
+        """在一个事务中合并新闻，已存在的新闻保持不变
+
+        Returns:
+            新增的新闻条数
+        """
+        now = time.time()
+        rows = [(symbol, news_id(news), news["publish_time"],
+                 *(news.get(field, "") for field in NEWS_FIELDS if field != "publish_time"), now)
+                for news in news_list]
+        conn = self._connect()
+        before = conn.total_changes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO news (symbol, id, publish_time, title, content, source, url, "
+                "keyword, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return conn.total_changes - before
+
+    def query(self, symbol: str, limit: int = 10,
+              as_of: Union[str, datetime, None] = None) -> List[dict]:
+        """返回 as_of 时点之前发布的最新 limit 条新闻，按发布时间倒序
+
+        Args:
+            as_of: 时点，"YYYY-MM-DD" 表示包含当天的全部新闻；为 None 时不限制
+        """
+        sql = ("SELECT title, content, publish_time, source, url, keyword "
+               "FROM news WHERE symbol = ?")
+        params = [symbol]
+        bound = _as_of_bound(as_of)
+        if bound is not None:
+            sql += " AND publish_time <= ?"
+            params.append(bound)
+        sql += " ORDER BY publish_time DESC LIMIT ?"
+        params.append(limit)
+        rows = self._connect().execute(sql, params).fetchall()
+        return [dict(zip(NEWS_FIELDS, row)) for row in rows]
+
+    def count(self, symbol: str) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM news WHERE symbol = ?", (symbol,)).fetchone()[0]
+
+    def known_ids(self, symbol: str) -> set:
+        """返回某只股票已存档的全部新闻去重键"""
+        return {row[0] for row in self._connect().execute(
+            "SELECT id FROM news WHERE symbol = ?", (symbol,))}
+
+    def last_refresh(self, symbol: str) -> Optional[float]:
+        """返回最近一次从网络更新该股票新闻的时间戳，旧版按日期记录的值视为未更新"""
+        try:
+            return float(self.get_meta(f"refreshed:{symbol}"))
+        except (TypeError, ValueError):
+            return None
+
+    def mark_refreshed(self, symbol: str, timestamp: Optional[float] = None):
+        self.set_meta(f"refreshed:{symbol}", str(time.time() if timestamp is None else timestamp))
+
+    def import_json(self, symbol: str, json_file: str) -> int:
+        """一次性导入旧版 {symbol}_news.json 中的新闻，已导入过的文件不会重复导入
+
+        Returns:
+            新增的新闻条数
+        """
+        marker = f"imported:{os.path.abspath(json_file)}"
+        if not os.path.exists(json_file) or self.get_meta(marker):
+            return 0
+        logger.info(f"{WAIT_ICON} 迁移旧版新闻文件: {json_file}")
+        try:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                news_list = json.load(f).get("news", [])
+            added = self.merge(symbol, [news for news in news_list if news.get("publish_time")])
+        except Exception as e:
+            logger.error(f"{ERROR_ICON} 读取旧版新闻文件失败: {e}")
+            return 0
+        self.set_meta(marker, str(time.time()))
+        logger.info(f"{SUCCESS_ICON} 已迁移 {added} 条新闻")
+        return added
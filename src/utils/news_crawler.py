@@ -1,195 +1,233 @@
 import os
+import asyncio
 import sys
 import json
 from datetime import datetime
-import akshare as ak
-import requests
-from bs4 import BeautifulSoup
-from src.utils.openrouter_config import get_chat_completion
+from src.utils.openrouter_config import get_chat_completion, get_chat_completion_async
 from src.utils.logger_config import get_logger, SUCCESS_ICON, ERROR_ICON, WAIT_ICON
+from src.utils.lazy import lazy_import
+from src.utils.tracing import payload_size, tracer
 import time
+import hashlib
+import threading
+from typing import Optional
 import pandas as pd
+from src.utils.concurrency import run_concurrently
+from src.utils.kv_store import KVStore
+from src.utils.news_archive import NewsArchive
 
 # 设置日志记录
 logger = get_logger()
 
-def get_stock_news(symbol: str, max_news: int = 10) -> list:
+# akshare 导入耗时较长，首次请求数据时才导入
+ak = lazy_import("akshare")
+
+# 个股新闻从网络更新的最短间隔（秒）
+DEFAULT_NEWS_REFRESH_TTL = 3600
+
+def _parse_news_rows(news_df: pd.DataFrame, known_ids: set) -> list:
+    """把 ak.stock_news_em 返回的数据转换为新闻列表，跳过已存档和内容过短的新闻"""
+    news_list = []
+    for _, row in news_df.iterrows():
+        try:
+            url = row["新闻链接"].strip()
+            if url in known_ids:
+                continue
+
+            # 获取新闻内容
+            content = row["新闻内容"] if "新闻内容" in row and not pd.isna(
+                row["新闻内容"]) else ""
+            if not content:
+                content = row["新闻标题"]
+
+            # 只去除首尾空白字符
+            content = content.strip()
+            if len(content) < 10:  # 内容太短的跳过
+                continue
+
+            # 获取关键词
+            keyword = row["关键词"] if "关键词" in row and not pd.isna(
+                row["关键词"]) else ""
+
+            # 添加新闻
+            news_item = {
+                "title": row["新闻标题"].strip(),
+                "content": content,
+                "publish_time": str(row["发布时间"]),
+                "source": row["文章来源"].strip(),
+                "url": url,
+                "keyword": keyword.strip()
+            }
+            news_list.append(news_item)
+            logger.info(f"{SUCCESS_ICON} 成功添加新闻: {news_item['title']}")
+
+        except Exception as e:
+            logger.error(f"{ERROR_ICON} 处理单条新闻时出错: {e}")
+            continue
+    return news_list
+
+
+def refresh_stock_news(symbol: str, ttl: Optional[float] = None) -> int:
+    """从网络获取最新的个股新闻并合并到存档，距上次更新不足 ttl 秒时不访问网络
+
+    Args:
+        ttl: 更新间隔，默认读取 NEWS_REFRESH_TTL
+
+    Returns:
+        新增的新闻条数
+    """
+    if ttl is None:
+        ttl = float(os.getenv("NEWS_REFRESH_TTL", DEFAULT_NEWS_REFRESH_TTL))
+    archive = get_news_archive()
+    last_refresh = archive.last_refresh(symbol)
+    if last_refresh is not None and time.time() - last_refresh < ttl:
+        return 0
+
+    logger.info(f"{WAIT_ICON} 开始获取{symbol}的新闻数据...")
+    try:
+        with tracer.span("ak.stock_news_em", "akshare", symbol=symbol) as span:
+            news_df = ak.stock_news_em(symbol=symbol)
+            span.set(size=payload_size(news_df))
+    except Exception as e:
+        logger.error(f"{ERROR_ICON} 获取新闻数据时出错: {e}")
+        return 0
+    if news_df is None or len(news_df) == 0:
+        logger.warning(f"{ERROR_ICON} 未获取到{symbol}的新闻数据")
+        return 0
+
+    # 只处理存档中还没有的新闻
+    news_list = _parse_news_rows(news_df, archive.known_ids(symbol))
+    try:
+        added = archive.merge(symbol, news_list)
+        archive.mark_refreshed(symbol)
+    except Exception as e:
+        logger.error(f"{ERROR_ICON} 保存新闻数据到存档时出错: {e}")
+        return 0
+    logger.info(f"{SUCCESS_ICON} 获取到{len(news_df)}条新闻，新增{added}条，"
+                f"存档共{archive.count(symbol)}条")
+    return added
+
+
+def get_stock_news(symbol: str, max_news: int = 10, as_of: Optional[str] = None) -> list:
     """获取并处理个股新闻
 
+    新闻累积保存在按股票索引的存档中，每只股票每 NEWS_REFRESH_TTL 秒最多从网络更新一次，
+    只合并存档中还没有的新闻。
+
     Args:
         symbol (str): 股票代码，如 "300059"
         max_news (int, optional): 获取的新闻条数，默认为10条。最大支持100条。
+        as_of (str, optional): 时点（"YYYY-MM-DD" 或 "YYYY-MM-DD HH:MM:SS"），
+            只返回该时点之前发布的新闻。早于今天的时点直接查询存档，不访问网络。
 
     Returns:
-        list: 新闻列表，每条新闻包含标题、内容、发布时间等信息
+        list: 新闻列表，按发布时间倒序，每条新闻包含标题、内容、发布时间等信息
     """
-
-    # 设置pandas显示选项，确保显示完整内容
-    pd.set_option('display.max_columns', None)
-    pd.set_option('display.max_rows', None)
-    pd.set_option('display.max_colwidth', None)
-    pd.set_option('display.width', None)
-
     # 限制最大新闻条数
     max_news = min(max_news, 100)
 
-    # 获取当前日期
-    today = datetime.now().strftime("%Y-%m-%d")
-
-    # 构建新闻文件路径
-    news_dir = os.path.join("src", "data", "stock_news")
-    logger.info(f"{WAIT_ICON} 新闻保存目录: {news_dir}")
-
-    # 确保目录存在
     try:
-        os.makedirs(news_dir, exist_ok=True)
-        logger.info(f"{SUCCESS_ICON} 成功创建或确认目录存在: {news_dir}")
+        archive = get_news_archive()
+        # 迁移旧版按天覆盖的新闻文件
+        archive.import_json(symbol, os.path.join(_data_dir(), "stock_news", f"{symbol}_news.json"))
     except Exception as e:
-        logger.error(f"{ERROR_ICON} 创建目录失败: {e}")
+        logger.error(f"{ERROR_ICON} 打开新闻存档失败: {e}")
         return []
 
-    news_file = os.path.join(news_dir, f"{symbol}_news.json")
-    logger.info(f"{WAIT_ICON} 新闻文件路径: {news_file}")
-
-    # 检查是否需要更新新闻
-    need_update = True
-    if os.path.exists(news_file):
-        try:
-            with open(news_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if data.get("date") == today:
-                    cached_news = data.get("news", [])
-                    if len(cached_news) >= max_news:
-                        logger.info(f"{SUCCESS_ICON} 使用缓存的新闻数据: {news_file}")
-                        return cached_news[:max_news]
-                    else:
-                        logger.info(
-                            f"{WAIT_ICON} 缓存的新闻数量({len(cached_news)})不足，需要获取更多新闻({max_news}条)")
-        except Exception as e:
-            logger.error(f"{ERROR_ICON} 读取缓存文件失败: {e}")
+    today = datetime.now().strftime("%Y-%m-%d")
+    if as_of is None or str(as_of)[:10] >= today:
+        refresh_stock_news(symbol)
+
+    with tracer.span("news_archive", "cache", symbol=symbol) as span:
+        news_list = archive.query(symbol, max_news, as_of=as_of)
+        span.set(size=len(news_list))
+    if len(news_list) < max_news:
+        logger.warning(f"{ERROR_ICON} 警告：可获取的新闻数量({len(news_list)})少于请求的数量({max_news})")
+    else:
+        logger.info(f"{SUCCESS_ICON} 从新闻存档获取{len(news_list)}条新闻")
+    return news_list
 
-    logger.info(f"{WAIT_ICON} 开始获取{symbol}的新闻数据...")
 
-    try:
-        # 获取新闻列表
-        news_df = ak.stock_news_em(symbol=symbol)
-        if news_df is None or len(news_df) == 0:
-            logger.warning(f"{ERROR_ICON} 未获取到{symbol}的新闻数据")
-            return []
-
-        logger.info(f"{SUCCESS_ICON} 成功获取到{len(news_df)}条新闻")
-
-        # 实际可获取的新闻数量
-        available_news_count = len(news_df)
-        if available_news_count < max_news:
-            logger.warning(f"{ERROR_ICON} 警告：实际可获取的新闻数量({available_news_count})少于请求的数量({max_news})")
-            max_news = available_news_count
-
-        # 获取指定条数的新闻（考虑到可能有些新闻内容为空，多获取50%）
-        news_list = []
-        for _, row in news_df.head(int(max_news * 1.5)).iterrows():
-            try:
-                # 获取新闻内容
-                content = row["新闻内容"] if "新闻内容" in row and not pd.isna(
-                    row["新闻内容"]) else ""
-                if not content:
-                    content = row["新闻标题"]
-
-                # 只去除首尾空白字符
-                content = content.strip()
-                if len(content) < 10:  # 内容太短的跳过
-                    continue
-
-                # 获取关键词
-                keyword = row["关键词"] if "关键词" in row and not pd.isna(
-                    row["关键词"]) else ""
-
-                # 添加新闻
-                news_item = {
-                    "title": row["新闻标题"].strip(),
-                    "content": content,
-                    "publish_time": row["发布时间"],
-                    "source": row["文章来源"].strip(),
-                    "url": row["新闻链接"].strip(),
-                    "keyword": keyword.strip()
-                }
-                news_list.append(news_item)
-                logger.info(f"{SUCCESS_ICON} 成功添加新闻: {news_item['title']}")
+async def get_stock_news_async(symbol: str, max_news: int = 10, as_of: Optional[str] = None) -> list:
+    """get_stock_news 的异步版本，网络请求和存档查询在线程中执行"""
+    return await asyncio.to_thread(get_stock_news, symbol, max_news, as_of)
 
-            except Exception as e:
-                logger.error(f"{ERROR_ICON} 处理单条新闻时出错: {e}")
-                continue
 
-        # 按发布时间排序
-        news_list.sort(key=lambda x: x["publish_time"], reverse=True)
+def _data_dir() -> str:
+    project_root = os.path.dirname(os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(project_root, "src", "data")
 
-        # 只保留指定条数的有效新闻
-        news_list = news_list[:max_news]
 
-        # 保存到文件
-        try:
-            save_data = {
-                "date": today,
-                "news": news_list
-            }
-            with open(news_file, 'w', encoding='utf-8') as f:
-                json.dump(save_data, f, ensure_ascii=False, indent=2)
-            logger.info(f"{SUCCESS_ICON} 成功保存{len(news_list)}条新闻到文件: {news_file}")
-        except Exception as e:
-            logger.error(f"{ERROR_ICON} 保存新闻数据到文件时出错: {e}")
+# 每次 LLM 调用打分的新闻条数
+SENTIMENT_BATCH_SIZE = 5
 
-        return news_list
+# 新闻存档，首次使用时打开
+_news_archive = None
+_news_archive_lock = threading.Lock()
 
-    except Exception as e:
-        logger.error(f"{ERROR_ICON} 获取新闻数据时出错: {e}")
-        return []
 
+def get_news_archive() -> NewsArchive:
+    """返回个股新闻存档"""
+    global _news_archive
+    with _news_archive_lock:
+        if _news_archive is None:
+            _news_archive = NewsArchive(os.getenv("NEWS_ARCHIVE_PATH")
+                                        or os.path.join(_data_dir(), "news_archive.sqlite3"))
+        return _news_archive
 
-def get_news_sentiment(news_list: list, num_of_news: int = 5, model: list = ["moonshot"]) -> float:
-    """分析新闻情感得分
 
-    Args:
-        news_list (list): 新闻列表
-        num_of_news (int): 用于分析的新闻数量，默认为5条
-        model (list): 用于分析的模型，默认为["moonshot"]
+# 情感分析缓存，首次使用时打开
+_sentiment_cache = None
+_sentiment_cache_lock = threading.Lock()
 
-    Returns:
-        float: 情感得分，范围[-1, 1]，-1最消极，1最积极
-    """
-    if not news_list:
-        return 0.0
 
-    # 检查是否有缓存的情感分析结果
-    cache_file = "src/data/sentiment_cache.json"
-    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+def get_sentiment_cache() -> KVStore:
+    """返回情感分析缓存
 
-    # 生成新闻内容的唯一标识
-    news_key = "|".join([
-        f"{news['title']}|{news['content'][:100]}|{news['publish_time']}"
-        for news in news_list[:num_of_news]
-    ])
+    旧版 sentiment_cache.json 按整组新闻保存得分，其中多为失败时写入的中性 0.0，不再导入。
+    """
+    global _sentiment_cache
+    with _sentiment_cache_lock:
+        if _sentiment_cache is None:
+            _sentiment_cache = KVStore(os.getenv("SENTIMENT_CACHE_PATH")
+                                       or os.path.join(_data_dir(), "sentiment_cache.sqlite3"))
+        return _sentiment_cache
+
+
+def article_key(news: dict) -> str:
+    """单条新闻的缓存键：优先使用新闻链接，没有链接时使用内容哈希"""
+    url = (news.get("url") or "").strip()
+    if url:
+        return f"article:{url}"
+    digest = hashlib.sha256(
+        f"{news['title']}|{news['content']}|{news['publish_time']}".encode("utf-8")).hexdigest()
+    return f"article:{digest}"
+
+
+def _parse_scores(content: str, count: int) -> Optional[list]:
+    """解析模型返回的得分数组，格式不符时返回 None"""
+    content = content.strip().replace("```json", "").replace("```", "").strip()
+    try:
+        scores = json.loads(content)
+    except ValueError:
+        return None
+    if isinstance(scores, (int, float)) and count == 1:
+        scores = [scores]
+    if not isinstance(scores, list) or len(scores) != count:
+        return None
+    try:
+        return [max(-1.0, min(1.0, float(score))) for score in scores]
+    except (TypeError, ValueError):
+        return None
 
-    # 检查缓存
-    if os.path.exists(cache_file):
-        logger.info(f"{WAIT_ICON} 发现情感分析缓存文件")
-        try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                cache = json.load(f)
-                if news_key in cache:
-                    logger.info(f"{SUCCESS_ICON} 使用缓存的情感分析结果")
-                    return cache[news_key]
-                logger.info(f"{WAIT_ICON} 未找到匹配的情感分析缓存")
-        except Exception as e:
-            logger.error(f"{ERROR_ICON} 读取情感分析缓存出错: {e}")
-            cache = {}
-    else:
-        logger.info(f"{WAIT_ICON} 未找到情感分析缓存文件，将创建新文件")
-        cache = {}
 
+def _batch_messages(batch: list) -> list:
+    """构造为一批新闻逐条打分的提示词"""
     # 准备系统消息
     system_message = {
         "role": "system",
-        "content": """你是一个专业的A股市场分析师，擅长解读新闻对股票走势的影响。你需要分析一组新闻的情感倾向，并给出一个介于-1到1之间的分数：
+        "content": """你是一个专业的A股市场分析师，擅长解读新闻对股票走势的影响。你需要逐条分析新闻的情感倾向，并为每条新闻给出一个介于-1到1之间的分数：
         - 1表示极其积极（例如：重大利好消息、超预期业绩、行业政策支持）
         - 0.5到0.9表示积极（例如：业绩增长、新项目落地、获得订单）
         - 0.1到0.4表示轻微积极（例如：小额合同签订、日常经营正常）
@@ -216,54 +254,169 @@ def get_news_sentiment(news_list: list, num_of_news: int = 5, model: list = ["mo
 
     # 准备新闻内容
     news_content = "\n\n".join([
+        f"【新闻{i}】\n"
         f"标题：{news['title']}\n"
         f"来源：{news['source']}\n"
         f"时间：{news['publish_time']}\n"
         f"内容：{news['content']}"
-        for news in news_list[:num_of_news]  # 使用指定数量的新闻
+        for i, news in enumerate(batch, 1)
     ])
 
     user_message = {
         "role": "user",
-        "content": f"请分析以下A股上市公司相关新闻的情感倾向：\n\n{news_content}\n\n请直接返回一个数字，范围是-1到1，无需解释。"
+        "content": f"请逐条分析以下{len(batch)}条A股上市公司相关新闻的情感倾向：\n\n{news_content}\n\n"
+                   f"请按新闻顺序直接返回一个包含{len(batch)}个数字的JSON数组，每个数字范围是-1到1，无需解释。"
+    }
+
+    return [system_message, user_message]
+
+
+def _batch_scores(batch: list, results: dict) -> dict:
+    """解析各模型返回的得分
+
+    Returns:
+        dict: 新闻缓存键 -> 得分（多个模型时取平均），解析失败的新闻不包含在内
+    """
+    model_scores = []
+    for res_model, content in results.items():
+        scores = _parse_scores(content, len(batch))
+        if scores is None:
+            logger.error(f"{ERROR_ICON} 模型 {res_model} 解析情感得分出错，原始结果: {content}")
+            continue
+        logger.info(f"{SUCCESS_ICON} 模型 {res_model} 的情感分析得分: {scores}")
+        model_scores.append(scores)
+
+    if not model_scores:
+        return {}
+    return {
+        article_key(news): sum(scores[i] for scores in model_scores) / len(model_scores)
+        for i, news in enumerate(batch)
     }
 
+
+def _score_batch(batch: list, model: list) -> dict:
+    """用一次 LLM 调用为一批新闻逐条打分"""
+    logger.info(f"{WAIT_ICON} 正在使用LLM分析 {len(batch)} 条新闻的情感...")
+    return _batch_scores(batch, get_chat_completion(_batch_messages(batch), model))
+
+
+async def _score_batch_async(batch: list, model: list) -> dict:
+    """_score_batch 的异步版本"""
+    logger.info(f"{WAIT_ICON} 正在使用LLM分析 {len(batch)} 条新闻的情感...")
     try:
-        # 获取LLM分析结果
-        logger.info(f"{WAIT_ICON} 正在使用LLM分析新闻情感...")
-        results = get_chat_completion([system_message, user_message], model)
-        if len(results) == 0:
-            logger.error(f"{ERROR_ICON} LLM返回空值")
-            return 0.0
-
-        # 提取数字结果
-        sentiment_scores = []
-        for res_model, res_score in results.items():
-            try:
-                sentiment_score = float(res_score.strip())
-                logger.info(f"{SUCCESS_ICON} 模型 {res_model} 的情感分析得分: {sentiment_score}")
-                sentiment_scores.append(sentiment_score)
-            except ValueError as e:
-                logger.error(f"{ERROR_ICON} 模型 {res_model} 解析情感得分出错: {e}")
-                logger.error(f"{ERROR_ICON} 原始结果: {res_score}")
-                continue
-    
-        # 确保分数在-1到1之间
-        if len(sentiment_scores) > 0:
-            sentiment_score_combine = max(-1.0, min(1.0, sum(sentiment_scores) * 1.0/len(sentiment_scores)))
-        else:
-            sentiment_score_combine = 0.0  # 如果没有有效的情感分数，返回中性值
-        
-            # 缓存结果
-            cache[news_key] = sentiment_score_combine
+        results = await get_chat_completion_async(_batch_messages(batch), model)
+    except Exception as e:
+        logger.error(f"{ERROR_ICON} 分析新闻情感时出错: {e}")
+        return {}
+    return _batch_scores(batch, results)
+
+
+def _cached_scores(articles: list):
+    """按新闻逐条查询缓存
+
+    Returns:
+        (scores, unseen): 已缓存的得分，以及尚未分析的新闻（缓存键 -> 新闻）
+    """
+    cache = get_sentiment_cache()
+    scores = {}
+    unseen = {}
+    for news in articles:
+        key = article_key(news)
+        if key in scores or key in unseen:
+            continue
+        with tracer.span("sentiment_cache", "cache") as span:
             try:
-                with open(cache_file, 'w', encoding='utf-8') as f:
-                    json.dump(cache, f, ensure_ascii=False, indent=2)
-                logger.info(f"{SUCCESS_ICON} 情感分析结果已缓存")
+                cached_score = cache.get(key)
             except Exception as e:
-                logger.error(f"{ERROR_ICON} 写入缓存出错: {e}")
+                logger.error(f"{ERROR_ICON} 读取情感分析缓存出错: {e}")
+                cached_score = None
+            span.set(cache_hit=cached_score is not None)
+        if cached_score is None:
+            unseen[key] = news
+        else:
+            scores[key] = cached_score
+    logger.info(f"{SUCCESS_ICON} 情感分析缓存命中 {len(scores)} 条，待分析 {len(unseen)} 条")
+    return scores, unseen
+
+
+def _sentiment_batches(unseen: dict) -> list:
+    pending = list(unseen.values())
+    return [pending[i:i + SENTIMENT_BATCH_SIZE]
+            for i in range(0, len(pending), SENTIMENT_BATCH_SIZE)]
+
+
+def _combine_scores(articles: list, scores: dict, batch_results: list) -> float:
+    """缓存新分析的得分，返回全部新闻得分的平均值"""
+    new_scores = {}
+    for batch_scores in batch_results:
+        new_scores.update(batch_scores or {})
+
+    # 缓存结果（一个事务写入本次的全部新闻）
+    if new_scores:
+        try:
+            get_sentiment_cache().put_many(new_scores)
+            logger.info(f"{SUCCESS_ICON} {len(new_scores)} 条新闻的情感分析结果已缓存")
+        except Exception as e:
+            logger.error(f"{ERROR_ICON} 写入缓存出错: {e}")
+    scores.update(new_scores)
 
-        return sentiment_score_combine  # 修正返回值
+    valid_scores = [scores[article_key(news)] for news in articles if article_key(news) in scores]
+    if not valid_scores:
+        logger.error(f"{ERROR_ICON} 没有有效的情感分析结果")
+        return 0.0  # 如果没有有效的情感分数，返回中性值
+
+    # 确保分数在-1到1之间
+    return max(-1.0, min(1.0, sum(valid_scores) / len(valid_scores)))
+
+
+def get_news_sentiment(news_list: list, num_of_news: int = 5, model: list = ["moonshot"]) -> float:
+    """分析新闻情感得分
+
+    每条新闻单独打分并按新闻缓存，只有未分析过的新闻才会发送给 LLM（每
+    SENTIMENT_BATCH_SIZE 条一次调用），整体得分为各条新闻得分的平均值。
+
+    Args:
+        news_list (list): 新闻列表
+        num_of_news (int): 用于分析的新闻数量，默认为5条
+        model (list): 用于分析的模型，默认为["moonshot"]
+
+    Returns:
+        float: 情感得分，范围[-1, 1]，-1最消极，1最积极
+    """
+    if not news_list:
+        return 0.0
+
+    try:
+        articles = news_list[:num_of_news]
+        scores, unseen = _cached_scores(articles)
+        batches = _sentiment_batches(unseen)
+        results = run_concurrently(
+            {f"batch_{i}": (lambda batch=batch: _score_batch(batch, model))
+             for i, batch in enumerate(batches)},
+            defaults={f"batch_{i}": {} for i in range(len(batches))}
+        )
+        return _combine_scores(articles, scores, list(results.values()))
+
+    except Exception as e:
+        logger.error(f"{ERROR_ICON} 分析新闻情感时出错: {e}")
+        return 0.0  # 出错时返回中性分数
+
+
+async def get_news_sentiment_async(news_list: list, num_of_news: int = 5,
+                                   model: list = ["moonshot"]) -> float:
+    """get_news_sentiment 的异步版本，各批次的 LLM 调用在同一事件循环中并发等待
+
+    情感分析缓存（SQLite）的读写在线程中执行，不阻塞事件循环。
+    """
+    if not news_list:
+        return 0.0
+
+    try:
+        articles = news_list[:num_of_news]
+        scores, unseen = await asyncio.to_thread(_cached_scores, articles)
+        results = await asyncio.gather(
+            *(_score_batch_async(batch, model) for batch in _sentiment_batches(unseen)))
+        return await asyncio.to_thread(_combine_scores, articles, scores, list(results))
 
     except Exception as e:
         logger.error(f"{ERROR_ICON} 分析新闻情感时出错: {e}")
@@ -1,16 +1,29 @@
 import os
+import asyncio
 import time
-from google import genai
-from openai import OpenAI  # 更新 OpenAI 导入方式
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from dotenv import load_dotenv
 from dataclasses import dataclass
 import backoff
-from src.utils.logger_config import get_logger, SUCCESS_ICON, ERROR_ICON, WAIT_ICON
+from src.utils.logger_config import get_logger, payload, preview, SUCCESS_ICON, ERROR_ICON, WAIT_ICON
+from src.utils.cassette import current_cassette
+from src.utils.llm_cache import cache_enabled, cache_key, llm_cache
+from src.utils.rate_limiter import rate_limiter
+from src.utils.tracing import tracer
+from src.utils.lazy import lazy_import
 
 # GLOBAL SETTINGS
 # 设置日志记录
 logger = get_logger()
 
+# SDK 导入耗时较长，首次创建对应服务商的客户端时才导入
+genai = lazy_import("google.genai")
+openai = lazy_import("openai")
+# 本地 LLM 替身，只在使用 stub 模型时才导入
+stub_llm = lazy_import("src.utils.stub_llm")
+
 @dataclass
 class ChatMessage:
     content: str
@@ -24,29 +37,72 @@ class ChatCompletion:
     choices: list[ChatChoice]
 
 # 模型处理器配置字典
+# requests_per_minute / burst 为默认配额，可通过 GEMINI_RPM、MOONSHOT_RPM 等环境变量按实际账户配额覆盖
+# env_key 为 None 的模型不需要 API 密钥；explicit_only 的模型只在显式指定时使用
 model_handlers = {
     "gemini": {
         "env_key": "GEMINI_API_KEY",
         "env_model": "GEMINI_MODEL",
         "default_model": "gemini-1.5-flash",
         "init_func": lambda key: genai.Client(api_key=key),
-        "name": "Gemini"
+        "name": "Gemini",
+        "requests_per_minute": 15,
+        "burst": 2
     },
     "moonshot": {
         "env_key": "KIMI_API_KEY",
         "env_model": "KIMI_MODEL",
         "default_model": "moonshot-v1-8k",
-        "init_func": lambda key: OpenAI(api_key=key, base_url="https://api.moonshot.cn/v1"),
-        "name": "Moonshot"
+        "init_func": lambda key: openai.OpenAI(api_key=key, base_url="https://api.moonshot.cn/v1"),
+        "name": "Moonshot",
+        "requests_per_minute": 20,
+        "burst": 2
+    },
+    "stub": {
+        "env_key": None,
+        "env_model": "STUB_LLM_MODEL",
+        "default_model": "stub-chat",
+        "init_func": lambda key: stub_llm.StubLLMClient(),
+        "name": "Stub",
+        "requests_per_minute": 600000,
+        "burst": 1000,
+        "explicit_only": True
     }
 }
 
+for _provider, _handler in model_handlers.items():
+    rate_limiter.configure(_provider, _handler.get("requests_per_minute"), _handler.get("burst"))
+
+# OpenAI 兼容接口的采样温度，同时参与 LLM 缓存的键
+OPENAI_TEMPERATURE = 0.3
+
+# 被服务商限流后，该服务商暂停发出请求的秒数
+RATE_LIMIT_COOLDOWN = 10
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    """判断异常是否为服务商的限流错误
+
+    依据 HTTP 状态码（openai 的 status_code、google-genai 的 code）、SDK 的 RateLimitError
+    类型和明确的限流标记判断；消息中偶然出现的 "429"（如股票代码、token 数）不算限流。
+    """
+    if getattr(e, "status_code", None) == 429 or getattr(e, "code", None) == 429:
+        return True
+    # 按类名判断，不为此导入 openai
+    if any(cls.__name__ == "RateLimitError" for cls in type(e).__mro__):
+        return True
+    message = str(e)
+    return ("rate limit" in message.lower() or "RESOURCE_EXHAUSTED" in message
+            or "AFC is enabled" in message)
+
 class ClientManager:
     _instance = None
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(ClientManager, cls).__new__(cls)
             cls._instance.clients = {}  # 初始化客户端字典
+            # 常驻服务中多个请求线程可能同时初始化客户端
+            cls._instance._lock = threading.Lock()
             # 获取项目根目录
             project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
             env_path = os.path.join(project_root, '.env')
@@ -64,35 +120,38 @@ class ClientManager:
         """获取模型客户端信息，如果客户端已初始化则复用"""
         if models is None:
             # 如果未指定模型，默认使用所有可用模型
-            models = list(model_handlers.keys())
+            models = [model for model, handler in model_handlers.items()
+                      if not handler.get("explicit_only")]
             logger.info(f"未指定模型，将尝试使用所有可用模型: {models}")
         
         if isinstance(models, str):
             models = [models]
             
-        for model in models:
-            if model in self.clients.keys():
-                logger.info(f"{SUCCESS_ICON} {model} 客户端已被初始化")
-                continue
-                
-            if model in model_handlers.keys():
-                handler = model_handlers[model]
-                env_key = os.getenv(handler["env_key"])
-                env_model = os.getenv(handler["env_model"]) if os.getenv(handler["env_model"]) else handler["default_model"]
-                init_func = handler["init_func"]
-                name = handler["name"]
-                
-                if env_key and env_model:
-                    logger.info(f"{SUCCESS_ICON} {name} 客户端初始化成功，当前选用模型为: {env_model}")
-                    client = init_func(env_key)
-                    self.clients[model] = (client, env_model)
+        with self._lock:
+            for model in models:
+                if model in self.clients.keys():
+                    logger.info(f"{SUCCESS_ICON} {model} 客户端已被初始化")
+                    continue
+
+                if model in model_handlers.keys():
+                    handler = model_handlers[model]
+                    env_key = os.getenv(handler["env_key"]) if handler["env_key"] else None
+                    env_model = os.getenv(handler["env_model"]) if os.getenv(handler["env_model"]) else handler["default_model"]
+                    init_func = handler["init_func"]
+                    name = handler["name"]
+
+                    if (env_key or handler["env_key"] is None) and env_model:
+                        logger.info(f"{SUCCESS_ICON} {name} 客户端初始化成功，当前选用模型为: {env_model}")
+                        client = init_func(env_key)
+                        self.clients[model] = (client, env_model)
+                    else:
+                        logger.warning(f"{ERROR_ICON} {name} 客户端初始化失败，未找到环境变量")
                 else:
-                    logger.warning(f"{ERROR_ICON} {name} 客户端初始化失败，未找到环境变量")
-            else:
-                logger.warning(f"{ERROR_ICON} 未知模型: {model}")
-        
-        logger.info(f"已初始化 {len(self.clients)} 个客户端")
-        return self.clients
+                    logger.warning(f"{ERROR_ICON} 未知模型: {model}")
+
+            logger.info(f"已初始化 {len(self.clients)} 个客户端")
+            # 只返回本次请求的模型，之前为其他请求初始化的客户端不参与调用
+            return {model: self.clients[model] for model in models if model in self.clients}
 
 # 创建全局的客户端管理器实例
 client_manager = ClientManager()
@@ -103,27 +162,38 @@ client_manager = ClientManager()
     max_tries=5,
     max_time=300
 )
-def generate_openai_content_with_retry(client, model, messages):
-    """带重试机制的基于OpenAI公共API的内容生成函数"""
+def generate_openai_content_with_retry(client, model, messages, provider="moonshot"):
+    """带重试机制的基于OpenAI公共API的内容生成函数
+
+    每次尝试（包括重试）都先从 provider 的令牌桶取得令牌。
+    """
     try:
         if client is None:
             raise ValueError("OpenAI客户端未初始化")
-        
+
+        rate_limiter.acquire(provider, model)
         logger.info(f"{WAIT_ICON} 正在调用 {model} ...")
-        logger.info(f"请求消息: {str(messages)[:500]}..." if len(str(messages)) > 500 else f"请求消息: {messages}")
+        logger.info("请求消息: %s", preview(messages))
 
         # 使用 OpenAI API
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=0.3,  # Kimi 特定参数
-        )
+        with tracer.span(f"llm.{provider}", "llm", model=model) as span:
+            if span:
+                span.set(request_chars=sum(len(str(m.get("content", ""))) for m in messages))
+            response = client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=OPENAI_TEMPERATURE,  # Kimi 特定参数
+            )
+            content = response.choices[0].message.content
+            span.set(size=len(content or ""))
 
         logger.info(f"{SUCCESS_ICON} {model} 调用成功")
-        content = response.choices[0].message.content
-        logger.info(f"响应内容: {content[:500]}..." if len(content) > 500 else f"响应内容: {content}")
+        logger.info("响应内容: %s", preview(content))
         return response
     except Exception as e:
+        if is_rate_limit_error(e):
+            # 暂停该服务商的令牌桶，其他线程也不再继续发出请求
+            rate_limiter.pause(provider, RATE_LIMIT_COOLDOWN)
         logger.error(f"{ERROR_ICON} {model} 调用失败: {str(e)}")
         logger.error(f"错误详情: {str(e)}")
         raise e
@@ -133,124 +203,273 @@ def generate_openai_content_with_retry(client, model, messages):
     (Exception),
     max_tries=5,
     max_time=300,
-    giveup=lambda e: "AFC is enabled" not in str(e)
+    giveup=lambda e: not is_rate_limit_error(e)
 )
-def generate_google_content_with_retry(client, model, contents, config=None):
-    """带重试机制的内容生成函数"""
+def generate_google_content_with_retry(client, model, contents, config=None, provider="gemini"):
+    """带重试机制的内容生成函数
+
+    每次尝试（包括重试）都先从 provider 的令牌桶取得令牌。
+    """
     try:
         if client is None:
             raise ValueError("GenAI客户端未初始化")
+
+        rate_limiter.acquire(provider, model)
         logger.info(f"{WAIT_ICON} 正在调用 Gemini API...")
-        logger.info(f"请求内容: {contents[:500]}..." if len(
-            str(contents)) > 500 else f"请求内容: {contents}")
-        logger.info(f"请求配置: {config}")
+        logger.info("请求内容: %s", preview(contents))
+        logger.info("请求配置: %s", payload(config))
 
-        response = client.models.generate_content(  # 使用 gemini_client
-            model=model,
-            contents=contents,
-            config=config
-        )
+        with tracer.span(f"llm.{provider}", "llm", model=model, request_chars=len(contents)) as span:
+            response = client.models.generate_content(  # 使用 gemini_client
+                model=model,
+                contents=contents,
+                config=config
+            )
+            span.set(size=len(response.text or ""))
 
         logger.info(f"{SUCCESS_ICON} API 调用成功")
-        logger.info(f"响应内容: {response.text[:500]}..." if len(
-            str(response.text)) > 500 else f"响应内容: {response.text}")
+        logger.info("响应内容: %s", preview(response.text))
         return response
     except Exception as e:
-        if "AFC is enabled" in str(e):
+        if is_rate_limit_error(e):
             logger.warning(f"{ERROR_ICON} 触发 API 限制，等待重试... 错误: {str(e)}")
-            time.sleep(5)
+            rate_limiter.pause(provider, RATE_LIMIT_COOLDOWN)
             raise e
         logger.error(f"{ERROR_ICON} API 调用失败: {str(e)}")
         logger.error(f"错误详情: {str(e)}")
         raise e
 
-def get_chat_completion(messages, model=None, max_retries=3, initial_retry_delay=1):
-    """获取聊天完成的内容，支持多种模型以及同时调用多个模型"""
+def _complete_with_model(k, client, env_model, messages, max_retries=3, initial_retry_delay=1,
+                         use_cache=True):
+    """使用单个模型获取回复，所有尝试均失败时返回 None
+
+    use_cache 为 True 时先查找相同请求的缓存回复，成功获取的回复写入缓存。
+    """
+    logger.info(f"{WAIT_ICON} 使用模型: {k}")
+    logger.debug("消息内容: %s", payload(messages))
+
+    is_gemini = "gemini" in k.lower()
+
+    # 确保客户端已初始化
+    if client is None:
+        logger.error(f"{ERROR_ICON} {k} 客户端未初始化")
+        return None
+
+    key = cache_key(k, env_model, messages, None if is_gemini else OPENAI_TEMPERATURE)
+    if use_cache:
+        content = llm_cache.get(key)
+        if content is not None:
+            logger.info(f"{SUCCESS_ICON} {k} 命中 LLM 缓存")
+            return content
+
+    for attempt in range(max_retries):
+        try:
+            if not is_gemini:   # 非 Gemini 模型统一使用OpenAI API
+                # 直接调用 OpenAI API
+                response = generate_openai_content_with_retry(
+                    client=client,
+                    model=env_model,
+                    messages=messages,
+                    provider=k,
+                )
+                if response is None:
+                    raise ValueError(f"{k} API 返回空值")
+                content = response.choices[0].message.content
+            else:               # Gemini API 调用前需要转换格式
+                prompt = ""
+                system_instruction = None
+
+                for message in messages:
+                    role = message["role"]
+                    content = message["content"]
+                    if role == "system":
+                        system_instruction = content
+                    elif role == "user":
+                        prompt += f"User: {content}\n"
+                    elif role == "assistant":
+                        prompt += f"Assistant: {content}\n"
+
+                config = {}
+                if system_instruction:
+                    config['system_instruction'] = system_instruction
+
+                response = generate_google_content_with_retry(
+                    client=client,
+                    model=env_model,
+                    contents=prompt.strip(),
+                    config=config,
+                    provider=k
+                )
+
+                if response is None:
+                    raise ValueError(f"{k} API 返回空值")
+
+                content = response.text
+
+            logger.info(f"{SUCCESS_ICON} {k} 成功获取响应")
+            logger.debug("原始响应: %s", preview(content))
+            if use_cache:
+                llm_cache.put(key, content, provider=k, model=env_model)
+            return content
+
+        except Exception as e:
+            logger.error(
+                f"{ERROR_ICON} {k} 尝试 {attempt + 1}/{max_retries} 失败: {str(e)}")
+            if attempt < max_retries - 1:
+                retry_delay = initial_retry_delay * (2 ** attempt)
+                logger.info(f"{WAIT_ICON} 等待 {retry_delay} 秒后重试...")
+                time.sleep(retry_delay)
+            else:
+                logger.error(f"{ERROR_ICON} {k} 最终错误: {str(e)}")
+    return None
+
+
+def get_chat_completion(messages, model=None, max_retries=3, initial_retry_delay=1,
+                        timeout=None, first_n=None, use_cache=None):
+    """获取聊天完成的内容，支持多种模型以及同时调用多个模型
+
+    所有模型并发调用，总耗时取决于最慢的模型而不是各模型耗时之和。
+
+    Args:
+        timeout: 整个调用的截止时间（秒），到期仍未返回的模型视为失败，
+                 默认读取 LLM_CALL_TIMEOUT，未配置时一直等待
+        first_n: 只需要 first_n 个模型成功时，拿到足够的结果后立即返回，
+                 默认读取 LLM_FIRST_N，未配置时等待全部模型
+        use_cache: 是否使用磁盘上的 LLM 回复缓存，默认开启，可通过 LLM_CACHE=off 关闭
+
+    Returns:
+        dict: {模型: 回复内容}，顺序与客户端顺序一致
+    """
+    cassette = current_cassette()
+    if cassette is not None:
+        # 录制时保存请求与回复，回放时不创建客户端、不访问网络
+        return cassette.call("llm", _cassette_name(model), messages, lambda: _chat_completion(
+            messages, model, max_retries, initial_retry_delay, timeout, first_n, use_cache))
+    return _chat_completion(messages, model, max_retries, initial_retry_delay, timeout, first_n, use_cache)
+
+
+def _chat_completion(messages, model, max_retries, initial_retry_delay, timeout, first_n, use_cache):
     clients = client_manager.get_clients_info(model)
-    contents = {}
-    
     if not clients:
         logger.error(f"{ERROR_ICON} 没有可用的客户端")
-        return contents
-    
-    for k, v in clients.items():
-        try:
-            logger.info(f"{WAIT_ICON} 使用模型: {k}")
-            logger.debug(f"消息内容: {messages}")
-            
-            is_gemini = "gemini" in k.lower()
-            _client, _env_model = v
+        return {}
+    timeout, wanted, use_cache = _call_options(len(clients), timeout, first_n, use_cache)
 
-            # 确保客户端已初始化
-            if _client is None:
-                logger.error(f"{ERROR_ICON} {k} 客户端未初始化")
+    executor = ThreadPoolExecutor(max_workers=len(clients))
+    futures = {
+        executor.submit(_complete_with_model, k, client, env_model, messages,
+                        max_retries, initial_retry_delay, use_cache): k
+        for k, (client, env_model) in clients.items()
+    }
+    results = {}
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            k = futures[future]
+            try:
+                content = future.result()
+            except Exception as e:
+                logger.error(f"{ERROR_ICON} {k} 处理过程中发生错误: {str(e)}")
                 continue
+            if content is not None:
+                results[k] = content
+                if len(results) >= wanted:
+                    break
+    except FuturesTimeoutError:
+        pending = [k for future, k in futures.items() if not future.done()]
+        logger.error(f"{ERROR_ICON} 模型调用超过 {timeout} 秒未返回: {pending}")
+    finally:
+        # 不等待未完成的调用，其结果将被丢弃
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return _ordered_contents(clients, results, wanted)
+
+
+async def get_chat_completion_async(messages, model=None, max_retries=3, initial_retry_delay=1,
+                                    timeout=None, first_n=None, use_cache=None):
+    """get_chat_completion 的异步版本，参数与返回值相同
+
+    各模型的调用在线程中执行，等待期间事件循环可以调度其他节点或其他股票的工作流。
+    """
+    cassette = current_cassette()
+    if cassette is not None:
+        return await cassette.acall("llm", _cassette_name(model), messages, lambda: _chat_completion_async(
+            messages, model, max_retries, initial_retry_delay, timeout, first_n, use_cache))
+    return await _chat_completion_async(
+        messages, model, max_retries, initial_retry_delay, timeout, first_n, use_cache)
+
 
-            for attempt in range(max_retries):
+async def _chat_completion_async(messages, model, max_retries, initial_retry_delay, timeout, first_n, use_cache):
+    clients = client_manager.get_clients_info(model)
+    if not clients:
+        logger.error(f"{ERROR_ICON} 没有可用的客户端")
+        return {}
+    timeout, wanted, use_cache = _call_options(len(clients), timeout, first_n, use_cache)
+
+    tasks = {
+        asyncio.ensure_future(asyncio.to_thread(
+            _complete_with_model, k, client, env_model, messages,
+            max_retries, initial_retry_delay, use_cache)): k
+        for k, (client, env_model) in clients.items()
+    }
+    results = {}
+    pending = set(tasks)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        while pending and len(results) < wanted:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                logger.error(f"{ERROR_ICON} 模型调用超过 {timeout} 秒未返回: "
+                             f"{[tasks[task] for task in pending]}")
+                break
+            for task in done:
+                k = tasks[task]
                 try:
-                    if not is_gemini:   # 非 Gemini 模型统一使用OpenAI API
-                        # 直接调用 OpenAI API
-                        response = generate_openai_content_with_retry(
-                            client=_client,
-                            model=_env_model,
-                            messages=messages,
-                        )
-                        if response is None:
-                            raise ValueError(f"{k} API 返回空值")
-                        content = response.choices[0].message.content
-                    else:               # Gemini API 调用前需要转换格式
-                        prompt = ""
-                        system_instruction = None
-
-                        for message in messages:
-                            role = message["role"]
-                            content = message["content"]
-                            if role == "system":
-                                system_instruction = content
-                            elif role == "user":
-                                prompt += f"User: {content}\n"
-                            elif role == "assistant":
-                                prompt += f"Assistant: {content}\n"
-
-                        config = {}
-                        if system_instruction:
-                            config['system_instruction'] = system_instruction
-
-                        response = generate_google_content_with_retry(
-                            client=_client,
-                            model=_env_model,
-                            contents=prompt.strip(),
-                            config=config
-                        )
-                        
-                        if response is None:
-                            raise ValueError(f"{k} API 返回空值")
-                        
-                        content = response.text
-
-                    logger.info(f"{SUCCESS_ICON} {k} 成功获取响应")
-                    logger.debug(f"原始响应: {content[:500]}..." if len(
-                        content) > 500 else f"原始响应: {content}")
-                    contents[k] = content
-                    break
-                
+                    content = task.result()
                 except Exception as e:
-                    logger.error(
-                        f"{ERROR_ICON} {k} 尝试 {attempt + 1}/{max_retries} 失败: {str(e)}")
-                    if attempt < max_retries - 1:
-                        retry_delay = initial_retry_delay * (2 ** attempt)
-                        logger.info(f"{WAIT_ICON} 等待 {retry_delay} 秒后重试...")
-                        time.sleep(retry_delay)
-                    else:
-                        logger.error(f"{ERROR_ICON} {k} 最终错误: {str(e)}")
+                    logger.error(f"{ERROR_ICON} {k} 处理过程中发生错误: {str(e)}")
+                    continue
+                if content is not None:
+                    results[k] = content
+    finally:
+        # 不等待未完成的调用，其结果将被丢弃
+        for task in pending:
+            task.cancel()
 
-        except Exception as e:
-            logger.error(f"{ERROR_ICON} {k} 处理过程中发生错误: {str(e)}")
-            continue
+    return _ordered_contents(clients, results, wanted)
+
+
+def _cassette_name(model) -> str:
+    """磁带中 LLM 调用的名称：同步与异步调用、相同模型组合使用同一名称"""
+    if model is None:
+        return "default"
+    return model if isinstance(model, str) else ",".join(model)
+
+
+def _call_options(client_count, timeout, first_n, use_cache):
+    """补全调用选项的默认值
+
+    Returns:
+        (timeout, wanted, use_cache): wanted 为需要成功的模型数量
+    """
+    if timeout is None and os.getenv("LLM_CALL_TIMEOUT"):
+        timeout = float(os.getenv("LLM_CALL_TIMEOUT"))
+    if first_n is None and os.getenv("LLM_FIRST_N"):
+        first_n = int(os.getenv("LLM_FIRST_N"))
+    wanted = min(first_n or client_count, client_count)
+    if use_cache is None:
+        use_cache = cache_enabled()
+    return timeout, wanted, use_cache
+
+
+def _ordered_contents(clients, results, wanted):
+    """按客户端顺序整理成功的回复，并记录失败情况"""
+    contents = {k: results[k] for k in clients if k in results}
 
     if not contents:
         logger.error(f"{ERROR_ICON} 所有模型调用均失败")
-    elif len(contents) < len(clients):
+    elif len(contents) < wanted:
         logger.warning(f"{WAIT_ICON} 部分模型调用失败，成功率: {len(contents)}/{len(clients)}")
-        
+
     return contents
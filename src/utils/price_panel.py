@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.utils.api import (FALLBACK_HISTORY_DAYS, MIN_HISTORY_ROWS,
+                           get_price_history, prices_to_columns)
+from src.utils.logger_config import get_logger, SUCCESS_ICON, WAIT_ICON
+
+# 设置日志记录
+logger = get_logger()
+
+DateLike = Union[str, datetime, pd.Timestamp]
+
+
+class PricePanel:
+    """单只股票在整个回测区间上的内存行情面板
+
+    回测开始前一次性加载全部日线数据，之后每个模拟交易日的价格查询只是对
+    日期数组做二分查找和切片，不再访问行情存储或网络。切片返回只读的列式
+    数组视图（与 prices_to_columns 格式一致），所有交易日共享同一份内存。
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        df = df.sort_values("date", ignore_index=True) if not df.empty else df
+        self.columns = prices_to_columns(df)
+        self.dates = (df["date"].to_numpy(dtype="datetime64[ns]")
+                      if "date" in df.columns else np.array([], dtype="datetime64[ns]"))
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray]) -> "PricePanel":
+        """由已按日期排序的列式数组构建面板，不复制数据"""
+        panel = cls.__new__(cls)
+        panel.columns = columns
+        panel.dates = columns.get("date", np.array([], dtype="datetime64[ns]"))
+        return panel
+
+    @classmethod
+    def load(cls, ticker: str, start_date: DateLike, end_date: DateLike) -> "PricePanel":
+        """一次性获取 [start_date, end_date] 的行情数据
+
+        start_date 应覆盖各交易日可能回看的最早日期，见 history_start。
+        """
+        start = pd.Timestamp(start_date).strftime("%Y-%m-%d")
+        end = pd.Timestamp(end_date).strftime("%Y-%m-%d")
+        logger.info(f"{WAIT_ICON} 预加载 {ticker} {start} 至 {end} 的行情面板...")
+        df = get_price_history(ticker, start, end, with_indicators=False)
+        panel = cls(df)
+        logger.info(f"{SUCCESS_ICON} 行情面板加载完成，共 {len(panel)} 个交易日")
+        return panel
+
+    @staticmethod
+    def history_start(start_date: DateLike, lookback_days: int) -> pd.Timestamp:
+        """回测区间内各交易日可能请求的最早日期
+
+        与 get_price_history 一致，回看区间不足 MIN_HISTORY_ROWS 个交易日时
+        会扩大到 FALLBACK_HISTORY_DAYS 天。
+        """
+        return pd.Timestamp(start_date) - timedelta(days=max(lookback_days, FALLBACK_HISTORY_DAYS))
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def _bounds(self, start_date: DateLike, end_date: DateLike) -> Tuple[int, int]:
+        """[start_date, end_date] 在日期数组中对应的行号区间（左闭右开）"""
+        lo = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start_date)), side="left")
+        hi = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end_date)), side="right")
+        return int(lo), int(max(hi, lo))
+
+    def history(self, start_date: DateLike, end_date: DateLike) -> Dict[str, np.ndarray]:
+        """截至 end_date 的时点数据切片，语义与 get_price_history 相同
+
+        区间内不足 MIN_HISTORY_ROWS 个交易日时，起点提前到 end_date 之前
+        FALLBACK_HISTORY_DAYS 天。返回的数组是面板的只读视图，不复制数据。
+        """
+        lo, hi = self._bounds(start_date, end_date)
+        if hi - lo < MIN_HISTORY_ROWS:
+            fallback_start = pd.Timestamp(end_date) - timedelta(days=FALLBACK_HISTORY_DAYS)
+            lo, hi = self._bounds(fallback_start, end_date)
+        return {col: values[lo:hi] for col, values in self.columns.items()}
+
+    def price_on(self, date: DateLike, column: str = "open") -> Optional[float]:
+        """date 当天（非交易日取之前最近一个交易日）的价格，没有数据时返回 None"""
+        row = int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date)), side="right")) - 1
+        if row < 0:
+            return None
+        return float(self.columns[column][row])
+
+    def to_shared_memory(self) -> Tuple[shared_memory.SharedMemory, dict]:
+        """把面板复制到一块共享内存中，供其他进程以只读方式挂载
+
+        Returns:
+            (共享内存块, 描述符)。描述符可以跨进程传递，交给 attach_shared 使用；
+            调用方负责在所有进程用完后 close() 并 unlink() 共享内存块。
+        """
+        layout = []
+        offset = 0
+        for col, values in self.columns.items():
+            if values.dtype.hasobject:
+                # object 列无法放入共享内存
+                continue
+            layout.append((col, values.dtype.str, len(values), offset))
+            # 各列按 8 字节对齐
+            offset += -(-values.nbytes // 8) * 8
+
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for col, dtype, length, start in layout:
+            target = np.ndarray(length, dtype=dtype, buffer=shm.buf, offset=start)
+            target[:] = self.columns[col]
+        return shm, {"name": shm.name, "layout": layout}
+
+    @classmethod
+    def attach_shared(cls, handle: dict) -> Tuple["PricePanel", shared_memory.SharedMemory]:
+        """挂载 to_shared_memory 创建的共享内存，返回只读面板
+
+        返回的共享内存块需要在面板使用期间保持引用。
+        """
+        shm = shared_memory.SharedMemory(name=handle["name"])
+        columns = {}
+        for col, dtype, length, start in handle["layout"]:
+            values = np.ndarray(length, dtype=dtype, buffer=shm.buf, offset=start)
+            values.flags.writeable = False
+            columns[col] = values
+        return cls.from_columns(columns), shm
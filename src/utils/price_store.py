@@ -0,0 +1,299 @@
+import os
+import json
+import uuid
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logger_config import get_logger, ERROR_ICON, SUCCESS_ICON, WAIT_ICON
+from src.utils.lazy import lazy_import
+from src.utils.tracing import payload_size, tracer
+
+try:
+    import fcntl
+except ImportError:
+    # Windows 没有 fcntl，不加跨进程锁；被映射的旧版本文件在 Windows 下本就无法删除
+    fcntl = None
+
+# 设置日志记录
+logger = get_logger()
+
+# akshare 导入耗时较长，首次请求数据时才导入
+ak = lazy_import("akshare")
+
+# akshare 日线字段到本地列名的映射
+HIST_COLUMN_MAPPING = {
+    "日期": "date",
+    "开盘": "open",
+    "最高": "high",
+    "最低": "low",
+    "收盘": "close",
+    "成交量": "volume",
+    "成交额": "amount",
+    "振幅": "amplitude",
+    "涨跌幅": "pct_change",
+    "涨跌额": "change_amount",
+    "换手率": "turnover"
+}
+
+# 本地存储的数值列（date 列单独以 datetime64 存储）
+PRICE_COLUMNS = ["open", "high", "low", "close", "volume", "amount",
+                 "amplitude", "pct_change", "change_amount", "turnover"]
+
+# 复权价格核对时允许的相对误差
+_ADJUST_TOLERANCE = 1e-6
+
+
+def _default_store_dir() -> str:
+    project_root = os.path.dirname(os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(project_root, "src", "data", "price_store")
+
+
+@contextmanager
+def _series_file_lock(series_dir: str, exclusive: bool):
+    """目录级的跨进程文件锁：加载数据时共享，切换版本和清理旧文件时独占"""
+    if fcntl is None or not os.path.isdir(series_dir):
+        yield
+        return
+    with open(os.path.join(series_dir, ".lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class PriceStore:
+    """本地列式日线行情存储
+
+    每个 (股票代码, 复权类型) 对应一个目录，每列保存为一个 .npy 文件，读取时使用
+    内存映射，多个进程可以共享同一份页缓存。meta.json 记录已覆盖的日期区间和当前
+    数据版本，写入时先落盘新版本的列文件，再原子替换 meta.json，读者不会看到写了
+    一半的数据。多个进程共享同一目录：读取 meta.json 并映射列文件时持有共享文件锁，
+    切换版本并删除旧版本文件时持有独占文件锁，其他进程正在打开的版本不会被删除。
+
+    请求的日期区间中，只有未被覆盖的部分才会调用 ak.stock_zh_a_hist 下载。
+    """
+
+    def __init__(self, root_dir: Optional[str] = None):
+        self.root_dir = root_dir or os.getenv(
+            "PRICE_STORE_DIR") or _default_store_dir()
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, symbol: str, adjust: str) -> threading.Lock:
+        with self._locks_guard:
+            key = (symbol, adjust)
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _series_dir(self, symbol: str, adjust: str) -> str:
+        return os.path.join(self.root_dir, adjust or "none", symbol)
+
+    def _read_meta(self, series_dir: str) -> Optional[dict]:
+        meta_file = os.path.join(series_dir, "meta.json")
+        if not os.path.exists(meta_file):
+            return None
+        try:
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"{ERROR_ICON} 读取行情存储元数据失败: {e}")
+            return None
+
+    def _load(self, symbol: str, adjust: str) -> Tuple[Optional[dict], Dict[str, np.ndarray]]:
+        """以内存映射方式加载已存储的全部列"""
+        series_dir = self._series_dir(symbol, adjust)
+        # 映射建立后旧版本文件被删除也不影响读取，只需在打开期间持有共享锁
+        with _series_file_lock(series_dir, exclusive=False):
+            meta = self._read_meta(series_dir)
+            if meta is None:
+                return None, {}
+
+            columns = {}
+            try:
+                for col in ["date"] + PRICE_COLUMNS:
+                    path = os.path.join(series_dir, f"{col}.{meta['version']}.npy")
+                    columns[col] = np.load(path, mmap_mode='r')
+            except Exception as e:
+                logger.error(f"{ERROR_ICON} 加载 {symbol} 的本地行情数据失败: {e}")
+                return None, {}
+        return meta, columns
+
+    def _save(self, symbol: str, adjust: str, df: pd.DataFrame, start: datetime, end: datetime):
+        """写入新版本数据并原子切换 meta.json，随后清理旧版本文件"""
+        series_dir = self._series_dir(symbol, adjust)
+        os.makedirs(series_dir, exist_ok=True)
+
+        version = uuid.uuid4().hex
+        np.save(os.path.join(series_dir, f"date.{version}.npy"),
+                df["date"].values.astype("datetime64[ns]"))
+        for col in PRICE_COLUMNS:
+            np.save(os.path.join(series_dir, f"{col}.{version}.npy"),
+                    df[col].values.astype(np.float64))
+
+        meta = {
+            "symbol": symbol,
+            "adjust": adjust,
+            "version": version,
+            "start": start.strftime("%Y-%m-%d"),
+            "end": end.strftime("%Y-%m-%d"),
+            "rows": len(df),
+        }
+        tmp_file = os.path.join(series_dir, f"meta.{version}.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+        # 持有独占锁期间没有其他进程正在打开旧版本，切换后即可删除
+        with _series_file_lock(series_dir, exclusive=True):
+            os.replace(tmp_file, os.path.join(series_dir, "meta.json"))
+            for name in os.listdir(series_dir):
+                if name.endswith(".npy") and f".{version}." not in name:
+                    try:
+                        os.remove(os.path.join(series_dir, name))
+                    except OSError:
+                        # Windows 下仍被映射的文件无法删除，留待下次清理
+                        pass
+
+    @staticmethod
+    def _to_frame(columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+        if not columns:
+            return pd.DataFrame(columns=["date"] + PRICE_COLUMNS)
+        return pd.DataFrame({col: np.array(columns[col]) for col in ["date"] + PRICE_COLUMNS})
+
+    @staticmethod
+    def _fetch(symbol: str, start: datetime, end: datetime, adjust: str) -> pd.DataFrame:
+        """从 akshare 下载指定区间的日线数据并标准化列名"""
+        logger.info(
+            f"{WAIT_ICON} 下载 {symbol} 行情: {start.strftime('%Y-%m-%d')} ~ {end.strftime('%Y-%m-%d')}")
+        with tracer.span("ak.stock_zh_a_hist", "akshare", symbol=symbol) as span:
+            df = ak.stock_zh_a_hist(
+                symbol=symbol,
+                period="daily",
+                start_date=start.strftime("%Y%m%d"),
+                end_date=end.strftime("%Y%m%d"),
+                adjust=adjust
+            )
+            span.set(size=payload_size(df))
+        if df is None or df.empty:
+            return pd.DataFrame(columns=["date"] + PRICE_COLUMNS)
+
+        df = df.rename(columns=HIST_COLUMN_MAPPING)
+        df["date"] = pd.to_datetime(df["date"])
+        for col in PRICE_COLUMNS:
+            if col not in df.columns:
+                df[col] = np.nan
+        return df[["date"] + PRICE_COLUMNS]
+
+    @staticmethod
+    def _overlap_consistent(stored: pd.DataFrame, fetched: pd.DataFrame) -> bool:
+        """检查新下载的数据与已存储数据在重叠日期上的价格是否一致
+
+        前复权价格会随除权除息整体变动，此时旧数据不能再与新数据拼接。
+        """
+        merged = stored[["date", "close"]].merge(
+            fetched[["date", "close"]], on="date", suffixes=("_old", "_new"))
+        if merged.empty:
+            return True
+        diff = np.abs(merged["close_old"] - merged["close_new"])
+        scale = np.maximum(np.abs(merged["close_old"]), 1.0)
+        return bool((diff <= scale * _ADJUST_TOLERANCE).all())
+
+    def get(self, symbol: str, start_date: datetime, end_date: datetime, adjust: str = "qfq") -> pd.DataFrame:
+        """获取 [start_date, end_date] 区间的原始日线数据（不含技术指标）
+
+        Args:
+            symbol: 股票代码
+            start_date: 开始日期
+            end_date: 结束日期，不会晚于昨天
+            adjust: 复权类型，"" / "qfq" / "hfq"
+
+        Returns:
+            按日期升序排列的 DataFrame，列为 date 和 PRICE_COLUMNS
+        """
+        yesterday = datetime.now() - timedelta(days=1)
+        start = datetime(start_date.year, start_date.month, start_date.day)
+        end = min(end_date, yesterday)
+        end = datetime(end.year, end.month, end.day)
+        if start > end:
+            return self._to_frame({})
+
+        with self._lock_for(symbol, adjust), tracer.span("price_store", "cache", symbol=symbol) as span:
+            meta, columns = self._load(symbol, adjust)
+
+            if meta is None:
+                fetch_ranges = [(start, end)]
+                covered_start, covered_end = start, end
+            else:
+                covered_start = datetime.strptime(meta["start"], "%Y-%m-%d")
+                covered_end = datetime.strptime(meta["end"], "%Y-%m-%d")
+                stored_dates = columns["date"]
+                first_bar = pd.Timestamp(stored_dates[0]).to_pydatetime() if len(stored_dates) else covered_start
+                last_bar = pd.Timestamp(stored_dates[-1]).to_pydatetime() if len(stored_dates) else covered_end
+                fetch_ranges = []
+                # 与已有数据多重叠一根K线，用于核对复权价格是否发生变化
+                if start < covered_start:
+                    fetch_ranges.append((start, first_bar))
+                if end > covered_end:
+                    fetch_ranges.append((last_bar, end))
+
+            if fetch_ranges:
+                stored = self._to_frame(columns)
+                frames = [stored]
+                # 只有返回了数据的区间才计入已覆盖区间，没有数据（上市前、数据源异常）的区间下次重新下载
+                new_start, new_end = (covered_start, covered_end) if meta is not None else (None, None)
+                try:
+                    for range_start, range_end in fetch_ranges:
+                        fetched = self._fetch(symbol, range_start, range_end, adjust)
+                        if fetched.empty:
+                            logger.warning(f"{ERROR_ICON} {symbol} 在 {range_start.strftime('%Y-%m-%d')} ~ "
+                                           f"{range_end.strftime('%Y-%m-%d')} 没有行情数据，不计入已覆盖区间")
+                            continue
+                        if meta is not None and not self._overlap_consistent(stored, fetched):
+                            logger.info(f"{WAIT_ICON} {symbol} 复权价格已变化，重新下载完整区间")
+                            full_start, full_end = min(start, covered_start), max(end, covered_end)
+                            fetched = self._fetch(symbol, full_start, full_end, adjust)
+                            # 完整区间没有返回数据时保留原有数据，不用空数据覆盖
+                            frames = [fetched] if not fetched.empty else None
+                            new_start, new_end = full_start, full_end
+                            break
+                        frames.append(fetched)
+                        new_start = range_start if new_start is None else min(new_start, range_start)
+                        new_end = range_end if new_end is None else max(new_end, range_end)
+                except Exception as e:
+                    logger.error(f"{ERROR_ICON} 下载 {symbol} 行情数据失败: {e}")
+                    frames = None
+
+                # 没有下载到任何新数据时不改写存储
+                if frames is not None and (len(frames) > 1 or frames[0] is not stored):
+                    merged = pd.concat([f for f in frames if not f.empty] or [stored], ignore_index=True)
+                    merged = merged.drop_duplicates(subset="date", keep="last")
+                    merged = merged.sort_values("date").reset_index(drop=True)
+                    try:
+                        self._save(symbol, adjust, merged, new_start, new_end)
+                        logger.info(f"{SUCCESS_ICON} {symbol} 本地行情已更新，共 {len(merged)} 条记录")
+                    except Exception as e:
+                        logger.error(f"{ERROR_ICON} 写入 {symbol} 本地行情失败: {e}")
+                    columns = {col: merged[col].values for col in ["date"] + PRICE_COLUMNS}
+            else:
+                logger.info(f"{SUCCESS_ICON} 使用本地行情数据: {symbol}")
+            span.set(cache_hit=not fetch_ranges, size=len(columns["date"]) if columns else 0)
+
+        if not columns:
+            return self._to_frame({})
+
+        # 只拷贝请求区间内的切片，其余数据仍留在内存映射中
+        dates = columns["date"]
+        lo = np.searchsorted(dates, np.datetime64(start, "ns"), side="left")
+        hi = np.searchsorted(dates, np.datetime64(end + timedelta(days=1), "ns"), side="left")
+        return self._to_frame({col: values[lo:hi] for col, values in columns.items()})
+
+
+# 全局共享的行情存储实例
+price_store = PriceStore()
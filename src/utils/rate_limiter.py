@@ -0,0 +1,152 @@
+import os
+import time
+import asyncio
+import threading
+from typing import Dict, Optional, Tuple
+
+from src.utils.logger_config import get_logger, WAIT_ICON
+
+# 设置日志记录
+logger = get_logger()
+
+# 未配置的服务商默认每分钟请求数与突发容量
+DEFAULT_REQUESTS_PER_MINUTE = 8
+DEFAULT_BURST = 2
+
+
+class TokenBucket:
+    """令牌桶限流器
+
+    令牌以 rate（个/秒）的速度补充，最多累积 capacity 个；每次请求消耗一个令牌，
+    没有令牌时等待到下一个令牌生成为止。同一个实例可以同时被多个线程和协程使用。
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = float(rate)
+        self.capacity = max(float(capacity), 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        # 被服务商限流后暂停发放令牌，直到该时刻
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self, tokens: float) -> float:
+        """尝试取出令牌，成功返回 0，否则返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """不等待地取令牌"""
+        return self._reserve(tokens) == 0.0
+
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """阻塞直到取得令牌，超过 timeout 秒仍未取得时返回 False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._reserve(tokens)
+            if wait == 0.0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """acquire 的协程版本，等待期间不阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            wait = self._reserve(tokens)
+            if wait == 0.0:
+                return True
+            if deadline is not None:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """服务商返回限流错误后，在 seconds 秒内停止发放令牌并清空已累积的令牌"""
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0.0
+            self._updated = self._paused_until
+
+
+class RateLimiter:
+    """按 (服务商, 模型) 划分令牌桶的进程级限流服务
+
+    每个服务商的配额依次取自环境变量 ``<服务商>_RPM`` / ``<服务商>_BURST``
+    （如 MOONSHOT_RPM、GEMINI_BURST）、configure 设置的值以及模块默认值。
+    同一服务商下的不同模型使用各自独立的令牌桶。
+    """
+
+    def __init__(self):
+        self._limits: Dict[str, Tuple[Optional[float], Optional[float]]] = {}
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, provider: str, requests_per_minute: Optional[float] = None,
+                  burst: Optional[float] = None):
+        """设置服务商的默认配额，已创建的令牌桶会在下次使用时按新配额重建"""
+        with self._lock:
+            self._limits[provider] = (requests_per_minute, burst)
+            for key in [key for key in self._buckets if key[0] == provider]:
+                del self._buckets[key]
+
+    def limit_for(self, provider: str) -> Tuple[float, float]:
+        """服务商当前生效的 (每分钟请求数, 突发容量)"""
+        configured_rpm, configured_burst = self._limits.get(provider, (None, None))
+        prefix = provider.upper()
+        rpm = os.getenv(f"{prefix}_RPM") or configured_rpm or DEFAULT_REQUESTS_PER_MINUTE
+        burst = os.getenv(f"{prefix}_BURST") or configured_burst or DEFAULT_BURST
+        return float(rpm), float(burst)
+
+    def bucket(self, provider: str, model: Optional[str] = None) -> TokenBucket:
+        key = (provider, model or "")
+        with self._lock:
+            if key not in self._buckets:
+                rpm, burst = self.limit_for(provider)
+                self._buckets[key] = TokenBucket(rpm / 60.0, burst)
+            return self._buckets[key]
+
+    def acquire(self, provider: str, model: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """调用服务商接口前取得一个令牌"""
+        bucket = self.bucket(provider, model)
+        if not bucket.try_acquire():
+            logger.info(f"{WAIT_ICON} {provider}/{model} 达到速率上限，等待令牌...")
+            return bucket.acquire(timeout=timeout)
+        return True
+
+    async def acquire_async(self, provider: str, model: Optional[str] = None,
+                            timeout: Optional[float] = None) -> bool:
+        return await self.bucket(provider, model).acquire_async(timeout=timeout)
+
+    def pause(self, provider: str, seconds: float, model: Optional[str] = None):
+        """服务商返回限流错误后暂停其令牌桶；未指定模型时暂停该服务商的全部模型"""
+        with self._lock:
+            buckets = [bucket for (name, bucket_model), bucket in self._buckets.items()
+                       if name == provider and (model is None or bucket_model == model)]
+        if model is not None and not buckets:
+            buckets = [self.bucket(provider, model)]
+        for bucket in buckets:
+            bucket.pause(seconds)
+
+
+# 全局共享的限流服务实例
+rate_limiter = RateLimiter()
@@ -0,0 +1,113 @@
+import os
+import time
+import threading
+from typing import Optional
+
+import pandas as pd
+
+from src.utils.logger_config import get_logger, ERROR_ICON, SUCCESS_ICON, WAIT_ICON
+from src.utils.lazy import lazy_import
+from src.utils.tracing import payload_size, tracer
+
+# 设置日志记录
+logger = get_logger()
+
+# akshare 导入耗时较长，首次请求数据时才导入
+ak = lazy_import("akshare")
+
+# 默认快照有效期（秒）
+DEFAULT_SPOT_TTL = 300
+# 刷新失败后，继续使用旧快照、暂不重试的时间（秒）
+DEFAULT_SPOT_RETRY = 30
+
+
+class SpotSnapshot:
+    """全市场实时行情（ak.stock_zh_a_spot_em）的进程级快照
+
+    全市场约 5000 行数据只下载一次，按股票代码建立索引，TTL 内所有股票、所有
+    agent 共享同一份快照。并发调用时只有一个线程负责下载，其余线程等待结果。
+    刷新失败时继续使用旧快照，retry 秒内不再重试，数据源故障期间不会每次查询都重新下载。
+    """
+
+    def __init__(self, ttl: Optional[float] = None, retry: Optional[float] = None):
+        self.ttl = ttl if ttl is not None else float(
+            os.getenv("SPOT_SNAPSHOT_TTL", DEFAULT_SPOT_TTL))
+        self.retry = retry if retry is not None else float(
+            os.getenv("SPOT_SNAPSHOT_RETRY", DEFAULT_SPOT_RETRY))
+        self._table: Optional[pd.DataFrame] = None
+        self._fetched_at = 0.0
+        self._failed_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_fresh(self) -> bool:
+        return self._table is not None and time.time() - self._fetched_at < self.ttl
+
+    def _usable(self) -> bool:
+        """快照未过期，或上次刷新失败后仍在重试间隔内"""
+        return self.is_fresh() or (self._table is not None
+                                   and time.time() - self._failed_at < self.retry)
+
+    def refresh(self) -> Optional[pd.DataFrame]:
+        """强制重新下载全市场快照"""
+        with self._lock:
+            return self._download()
+
+    def _download(self) -> Optional[pd.DataFrame]:
+        logger.info(f"{WAIT_ICON} 获取全市场实时行情快照...")
+        try:
+            with tracer.span("ak.stock_zh_a_spot_em", "akshare") as span:
+                table = ak.stock_zh_a_spot_em()
+                span.set(size=payload_size(table))
+        except Exception as e:
+            if self._table is None:
+                raise
+            # 下载失败时继续使用过期快照，而不是让所有调用方都失败
+            self._failed_at = time.time()
+            logger.error(f"{ERROR_ICON} 刷新实时行情快照失败，{self.retry:.0f} 秒内继续使用旧快照: {e}")
+            return self._table
+        if table is None or table.empty:
+            self._failed_at = time.time()
+            logger.error(f"{ERROR_ICON} 警告：无法获取实时行情数据")
+            return self._table
+
+        # 按代码建立索引，后续查询为 O(1)
+        table = table.drop_duplicates(subset="代码").set_index("代码", drop=False)
+        self._table = table
+        self._fetched_at = time.time()
+        logger.info(f"{SUCCESS_ICON} 成功获取实时行情快照，共 {len(table)} 条记录")
+        return table
+
+    def get_table(self) -> Optional[pd.DataFrame]:
+        """返回全市场快照，过期时自动刷新，刷新失败后的重试间隔内返回旧快照"""
+        with tracer.span("spot_snapshot", "cache") as span:
+            if self._usable():
+                span.set(cache_hit=True)
+                return self._table
+            with self._lock:
+                # 等锁期间可能已被其他线程刷新
+                if self._usable():
+                    span.set(cache_hit=True)
+                    return self._table
+                table = self._download()
+                span.set(cache_hit=False, size=payload_size(table))
+                return table
+
+    def get_row(self, symbol: str) -> Optional[pd.Series]:
+        """返回单只股票的实时行情，未找到时返回 None"""
+        table = self.get_table()
+        if table is None:
+            return None
+        try:
+            return table.loc[symbol]
+        except KeyError:
+            return None
+
+    def clear(self):
+        with self._lock:
+            self._table = None
+            self._fetched_at = 0.0
+            self._failed_at = 0.0
+
+
+# 全局共享的实时行情快照
+spot_snapshot = SpotSnapshot()
@@ -0,0 +1,98 @@
+import os
+import re
+import json
+import time
+import hashlib
+
+from src.utils.openrouter_config import ChatChoice, ChatCompletion, ChatMessage
+
+# 每次调用模拟的网络延迟（秒），可通过 STUB_LLM_LATENCY 配置
+DEFAULT_STUB_LATENCY = 0.0
+
+
+def _unit(text: str) -> float:
+    """由文本哈希得到 [0, 1) 内的确定性数值"""
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16) / 0x100000000
+
+
+def _sentiment_scores(prompt: str) -> str:
+    """为情感分析提示词中的每条新闻给出确定性的得分"""
+    count = int(re.search(r"包含(\d+)个数字", prompt).group(1))
+    articles = re.split(r"【新闻\d+】", prompt)[1:] or [prompt] * count
+    scores = [round(_unit(article) * 2 - 1, 2) for article in articles[:count]]
+    scores += [0.0] * (count - len(scores))
+    return json.dumps(scores)
+
+
+def _trading_decision(prompt: str) -> str:
+    """跟随风险管理的交易建议给出确定性的决策"""
+    match = re.search(r"Risk Management Trading Signal: (\{.*\})", prompt)
+    risk = json.loads(match.group(1)) if match else {}
+    position = re.search(r"Current Position: (\d+) shares", prompt)
+    position = int(position.group(1)) if position else 0
+
+    suggestion = risk.get("trading_action", "hold")
+    if suggestion in ("buy", "bullish"):
+        action, quantity = "buy", 100
+    elif suggestion in ("sell", "reduce", "bearish") and position > 0:
+        action, quantity = "sell", position
+    else:
+        action, quantity = "hold", 0
+
+    signals = {}
+    for name, label in (("technical_analysis", "Technical"), ("fundamental_analysis", "Fundamental"),
+                        ("sentiment_analysis", "Sentiment"), ("valuation_analysis", "Valuation")):
+        found = re.search(label + r" Analysis Trading Signal: (\{.*\})", prompt)
+        try:
+            signals[name] = json.loads(found.group(1)).get("signal", "neutral")
+        except (AttributeError, ValueError):
+            signals[name] = "neutral"
+
+    return json.dumps({
+        "action": action,
+        "quantity": quantity,
+        "confidence": round(0.5 + _unit(prompt) / 2, 2),
+        "agent_signals": [
+            {"agent_name": name, "signal": signal, "confidence": 0.5}
+            for name, signal in signals.items()
+        ] + [{"agent_name": "risk_management", "signal": suggestion, "confidence": 1.0}],
+        "reasoning": f"Stub decision following risk management suggestion: {suggestion}",
+    })
+
+
+class _Completions:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def create(self, model, messages, temperature=None, **kwargs) -> ChatCompletion:
+        """与 OpenAI chat.completions.create 相同的调用方式，相同的消息总是得到相同的回复"""
+        if self.latency > 0:
+            time.sleep(self.latency)
+        prompt = "\n".join(str(message.get("content", "")) for message in messages)
+        if "包含" in prompt and "JSON数组" in prompt:
+            content = _sentiment_scores(prompt)
+        elif "trading decision" in prompt:
+            content = _trading_decision(prompt)
+        else:
+            content = json.dumps({"stub": True, "digest": hashlib.sha256(
+                prompt.encode("utf-8")).hexdigest()[:16]})
+        return ChatCompletion(choices=[ChatChoice(message=ChatMessage(content=content))])
+
+
+class _Chat:
+    def __init__(self, latency: float):
+        self.completions = _Completions(latency)
+
+
+class StubLLMClient:
+    """本地的确定性 LLM 替身，接口与 OpenAI 客户端的 chat.completions 相同
+
+    不访问网络，按提示词类型返回格式正确的回复：新闻情感分析返回得分数组，
+    投资决策返回跟随风险管理建议的 JSON。用于离线基准测试和无网络环境下的端到端运行，
+    通过 model_handlers 中的 "stub" 使用（--model stub）。
+    """
+
+    def __init__(self, latency: float = None):
+        if latency is None:
+            latency = float(os.getenv("STUB_LLM_LATENCY", DEFAULT_STUB_LATENCY))
+        self.chat = _Chat(latency)
@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import asyncio
+import functools
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Optional
+
+# 内存中保留的区间数量上限，超过后丢弃最早的区间
+DEFAULT_TRACE_MAX_EVENTS = 200000
+
+
+class _NoopSpan:
+    """关闭追踪时使用的空区间，所有操作都不做任何事
+
+    布尔值为 False，调用方可以用 `if span:` 跳过只为追踪而做的计算。
+    """
+
+    __slots__ = ()
+
+    def set(self, **args):
+        pass
+
+    def __bool__(self):
+        return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """一个计时区间，退出时记录开始、结束时间和附加参数
+
+    附加参数约定：size 为数据量（DataFrame 行数、文本字符数、条目数），
+    cache_hit 为是否命中缓存。
+    """
+
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer, name: str, category: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0.0
+
+    def set(self, **args):
+        self.args.update(args)
+
+    def __bool__(self):
+        return True
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.record(self.name, self.category, self.start, time.perf_counter(), self.args)
+        return False
+
+
+def _current_track():
+    """区间所在的轨道：协程任务各自一条轨道，否则按线程区分
+
+    同一事件循环线程上并发的异步节点在时间上交错，放在同一条轨道上无法正确嵌套。
+    """
+    thread = threading.current_thread()
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    if task is not None:
+        return id(task), f"{thread.name}/{task.get_name()}"
+    return thread.ident, thread.name
+
+
+class Tracer:
+    """进程内的计时追踪器
+
+    记录 LangGraph 节点、akshare 调用、LLM 调用和缓存查询的耗时，可导出为 Chrome
+    trace-event JSON（chrome://tracing 或 https://ui.perfetto.dev 打开）和按名称汇总的表格。
+    默认关闭（TRACE=on 开启），关闭时每个埋点只多一次属性判断。
+    最多保留 max_events 个区间（TRACE_MAX_EVENTS），超过后丢弃最早的区间。
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, max_events: Optional[int] = None):
+        if enabled is None:
+            enabled = os.getenv("TRACE", "off").strip().lower() in ("1", "on", "true", "yes")
+        if max_events is None:
+            max_events = int(os.getenv("TRACE_MAX_EVENTS", DEFAULT_TRACE_MAX_EVENTS))
+        self.enabled = enabled
+        self.max_events = max(1, max_events)
+        self.dropped = 0
+        self._events = deque(maxlen=self.max_events)
+        self._thread_names = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """清空已记录的区间"""
+        with self._lock:
+            self._events = deque(maxlen=self.max_events)
+            self._thread_names = {}
+            self.dropped = 0
+
+    def events(self, since: Optional[float] = None) -> list:
+        """返回已记录区间的副本，指定 since（time.perf_counter() 的读数）时只返回此后开始的区间"""
+        with self._lock:
+            events = list(self._events)
+        if since is not None:
+            start = (since - self._origin) * 1e6
+            events = [event for event in events if event["ts"] >= start]
+        return events
+
+    def span(self, name: str, category: str, **args):
+        """创建计时区间，用法：with tracer.span("ak.stock_zh_a_hist", "akshare") as span: ..."""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, category, args)
+
+    def record(self, name: str, category: str, start: float, end: float, args: Optional[dict] = None):
+        """记录一个已经结束的区间，时间为 time.perf_counter() 的读数"""
+        tid, track_name = _current_track()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": (start - self._origin) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": os.getpid(),
+            "tid": tid,
+            "args": args or {},
+        }
+        with self._lock:
+            if len(self._events) == self.max_events:
+                self.dropped += 1
+            self._events.append(event)
+            self._thread_names[tid] = track_name
+
+    def chrome_trace(self, events: Optional[list] = None) -> dict:
+        """转换为 Chrome trace-event 格式，附带线程名称"""
+        events = self.events() if events is None else events
+        with self._lock:
+            thread_names = dict(self._thread_names)
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+             "args": {"name": thread_names.get(tid, str(tid))}}
+            for pid, tid in sorted({(event["pid"], event["tid"]) for event in events})
+        ]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms",
+                "otherData": {"dropped_events": self.dropped}}
+
+    def export_chrome_trace(self, path: str, events: Optional[list] = None) -> str:
+        """把区间写入 Chrome trace-event JSON 文件"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(events), f, ensure_ascii=False, default=str)
+        return path
+
+    def summary(self, events: Optional[list] = None) -> list:
+        """按 (类别, 名称) 汇总次数、耗时、缓存命中次数和数据量，按总耗时降序"""
+        events = self.events() if events is None else events
+        groups = defaultdict(list)
+        for event in events:
+            groups[(event["cat"], event["name"])].append(event)
+
+        rows = []
+        for (category, name), group in groups.items():
+            durations = [event["dur"] / 1000 for event in group]
+            lookups = [event["args"]["cache_hit"] for event in group if "cache_hit" in event["args"]]
+            sizes = [event["args"]["size"] for event in group
+                     if isinstance(event["args"].get("size"), (int, float))]
+            rows.append({
+                "category": category,
+                "name": name,
+                "count": len(group),
+                "total_ms": sum(durations),
+                "mean_ms": sum(durations) / len(durations),
+                "max_ms": max(durations),
+                "cache_hits": f"{sum(bool(hit) for hit in lookups)}/{len(lookups)}" if lookups else "",
+                "size": sum(sizes) if sizes else "",
+            })
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        return rows
+
+    def format_summary(self, events: Optional[list] = None) -> str:
+        """汇总表的文本形式"""
+        rows = self.summary(events)
+        lines = [f"{'category':<10} {'name':<36} {'count':>6} {'total_ms':>10} "
+                 f"{'mean_ms':>9} {'max_ms':>9} {'cache_hits':>10} {'size':>10}"]
+        for row in rows:
+            lines.append(f"{row['category']:<10} {row['name']:<36} {row['count']:>6} "
+                         f"{row['total_ms']:>10.1f} {row['mean_ms']:>9.1f} {row['max_ms']:>9.1f} "
+                         f"{row['cache_hits']:>10} {row['size']:>10}")
+        return "\n".join(lines)
+
+
+def payload_size(obj) -> Optional[int]:
+    """数据量：DataFrame 和列表为行数，文本为字符数"""
+    if obj is None:
+        return 0
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+def traced(name: Optional[str] = None, category: str = "function"):
+    """为同步或异步函数添加计时区间的装饰器，关闭追踪时直接调用原函数"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not tracer.enabled:
+                    return await func(*args, **kwargs)
+                with tracer.span(span_name, category):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with tracer.span(span_name, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# 全局共享的追踪器实例
+tracer = Tracer()
+
+
+def trace_file(path: Optional[str] = None) -> Optional[str]:
+    """追踪文件路径：命令行 --trace 参数，未指定时为环境变量 TRACE_FILE"""
+    return path or os.getenv("TRACE_FILE") or None
+
+
+def run_trace_path(path: str, run_id: str) -> str:
+    """同一进程中多次运行各自的追踪文件，在扩展名前插入运行编号，如 logs/trace.600519.json"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{run_id}{ext or '.json'}"
+
+
+@contextmanager
+def trace_run(path: Optional[str]):
+    """追踪一次运行：开启追踪并清空之前的区间，结束时（包括出错时）写入 path
+
+    path 为空时不做任何事。用于同一时间只有一次运行的进程（命令行、回测进程池的工作进程）。
+    """
+    if not path:
+        yield None
+        return
+    tracer.enable()
+    tracer.reset()
+    try:
+        yield tracer
+    finally:
+        tracer.export_chrome_trace(path)